@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Command line analysis of CSV/Parquet fundamentals files
+
+Usage:
+    python analyze_file.py universe.parquet metrics.parquet
+    python analyze_file.py universe.csv metrics.arrow --chunk-size 250000
+"""
+
+import argparse
+import sys
+import time
+
+from app.services.file_service import (
+    FileAnalysisService,
+    INPUT_FORMATS,
+    OUTPUT_FORMATS,
+    detect_format
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Analyze a fundamentals file into a metrics file")
+    parser.add_argument("input", help="CSV or Parquet file with CompanyFinancialData columns")
+    parser.add_argument("output", help="Destination CSV, Parquet or Arrow file")
+    parser.add_argument("--input-format", choices=INPUT_FORMATS, help="Defaults to the input extension")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, help="Defaults to the output extension")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows analyzed per chunk")
+    args = parser.parse_args(argv)
+
+    try:
+        input_format = args.input_format or detect_format(args.input, INPUT_FORMATS)
+        output_format = args.output_format or detect_format(args.output, OUTPUT_FORMATS)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    rows = FileAnalysisService.analyze_file(
+        args.input, args.output, input_format, output_format, args.chunk_size
+    )
+    elapsed = time.perf_counter() - start
+
+    rate = rows / elapsed * 60 if elapsed > 0 else float("inf")
+    print(f"Analyzed {rows} companies in {elapsed:.2f}s ({rate:,.0f} rows/min) -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""
+Adaptive admission control: per-lane concurrency limits that follow observed
+latency, with bounded queues and fast rejections when a lane is saturated
+"""
+
+from app.config import settings
+from app.telemetry import registry
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import asyncio
+import json
+import math
+import time
+
+API_PREFIX = "/api/v1"
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# Endpoints whose cost grows with the request body (many companies, files,
+# scenarios, portfolios). POST and PUT requests to these paths, or below them,
+# take the bulk lane; every other API request is interactive.
+BULK_PATHS = (
+    "/api/v1/analyze/batch",
+    "/api/v1/analyze/arrow",
+    "/api/v1/analyze/file",
+    "/api/v1/analyze/panel",
+    "/api/v1/analyze/scenarios",
+    "/api/v1/analyze/dcf",
+    "/api/v1/analyze/portfolio",
+    "/api/v1/portfolios",
+    "/api/v1/snapshots",
+    "/api/v1/screening",
+    "/api/v1/jobs",
+)
+
+# Moving average weights of the short- and long-term latency
+SHORT_WEIGHT = 0.1
+LONG_WEIGHT = 0.01
+# Short-term latency may reach this multiple of the long-term one before the limit shrinks
+TOLERANCE = 2.0
+# Fraction of each computed limit blended into the current one
+SMOOTHING = 0.2
+# Relative rate per second at which a lane's baseline (best recent) latency may creep up
+BASELINE_DRIFT = 0.02
+# Seconds after which a lane's latency no longer holds back the lanes protecting it
+STALE_SECONDS = 1.0
+
+ADMITTED = registry.counter(
+    "financial_api_admission_admitted", "Requests admitted, by lane", ("lane",)
+)
+REJECTED = registry.counter(
+    "financial_api_admission_rejected",
+    "Requests shed, by lane and reason (queue_full: 429, queue_timeout: 503)",
+    ("lane", "reason")
+)
+QUEUE_WAIT = registry.histogram(
+    "financial_api_admission_queue_wait_seconds", "Time admitted requests spent queued", ("lane",)
+)
+
+
+class LaneLimiter:
+    """
+    Concurrency limit of one lane, adapted to its latency (gradient style).
+
+    The limit is scaled by the ratio of long-term to short-term latency
+    (times TOLERANCE, capped at 1), so it shrinks once requests slow down and
+    grows by about ``sqrt(limit)`` while latency holds. A lane that
+    ``protects`` another shrinks with every sample of the protected lane
+    slower than TOLERANCE times its baseline latency, and does not grow
+    meanwhile, which is how bulk work makes room for interactive requests.
+    The baseline is the best recent latency, so unlike the long-term average
+    it does not settle on the slowdown while bulk work persists. Requests
+    over the limit wait in a FIFO queue of at most ``max_queue`` for up to
+    ``queue_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        max_queue: int,
+        queue_timeout: float,
+        protects: Optional["LaneLimiter"] = None
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial_limit)))
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.protects = protects
+        # Lanes that protect this one
+        self._protectors: List["LaneLimiter"] = []
+        if protects is not None:
+            protects._protectors.append(self)
+        self.in_flight = 0
+        self.short_latency: Optional[float] = None
+        self.long_latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self._observed_at = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def gradient(self) -> float:
+        """Long- over short-term latency times TOLERANCE, between 0.5 and 1; 1 without samples"""
+        if self.short_latency is None:
+            return 1.0
+        return max(0.5, min(1.0, TOLERANCE * self.long_latency / self.short_latency))
+
+    def pressure(self, now: float) -> float:
+        """Baseline over short-term latency times TOLERANCE, between 0.5 and 1; 1 without recent samples"""
+        if self.short_latency is None or now - self._observed_at > STALE_SECONDS:
+            return 1.0
+        return max(0.5, min(1.0, TOLERANCE * self.baseline_latency / self.short_latency))
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead is likely to have drained"""
+        latency = self.short_latency or 0.0
+        return max(1, math.ceil(latency * (self.queue_depth + 1) / self.limit))
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot, queueing if needed; None once admitted, else why the request was shed"""
+        if not self._waiters and self._has_capacity():
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            return "queue_timeout"
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as the request went away
+                self.release(None)
+            else:
+                self._discard(waiter)
+            raise
+        return None
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, latency: Optional[float]) -> None:
+        """Free a slot, learn from the request's latency (None when it failed) and admit waiters"""
+        self.in_flight -= 1
+        if latency is not None:
+            self._observe(latency)
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _observe(self, latency: float) -> None:
+        now = time.monotonic()
+        if self.short_latency is None:
+            self.short_latency = self.long_latency = self.baseline_latency = latency
+        else:
+            self.short_latency += (latency - self.short_latency) * SHORT_WEIGHT
+            self.long_latency += (latency - self.long_latency) * LONG_WEIGHT
+            # Let the long-term latency follow a lasting speed-up instead of over-admitting
+            if self.long_latency > 2 * self.short_latency:
+                self.long_latency *= 0.95
+            drift = 1 + BASELINE_DRIFT * (now - self._observed_at)
+            self.baseline_latency = min(self.short_latency, self.baseline_latency * drift)
+        self._observed_at = now
+
+        gradient = self.gradient()
+        if self.protects is not None and self.protects.pressure(now) < 1.0:
+            # No headroom while the protected lane is slow; its samples shrink this limit
+            target = self.limit * gradient
+        elif gradient >= 1.0 and self.in_flight + 1 < self.limit / 2:
+            # A lane using less than half its limit gives no evidence that a higher one is safe
+            target = self.limit
+        else:
+            target = self.limit * gradient + math.sqrt(self.limit)
+        self._smooth_to(target)
+
+        pressure = self.pressure(now)
+        if pressure < 1.0:
+            for lane in self._protectors:
+                lane._smooth_to(lane.limit * pressure)
+
+    def _smooth_to(self, target: float) -> None:
+        limit = self.limit * (1 - SMOOTHING) + target * SMOOTHING
+        self.limit = min(self.max_limit, max(self.min_limit, limit))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "short_latency_ms": self.short_latency * 1000 if self.short_latency is not None else None,
+            "long_latency_ms": self.long_latency * 1000 if self.long_latency is not None else None,
+            "baseline_latency_ms": self.baseline_latency * 1000 if self.baseline_latency is not None else None,
+            "admitted": ADMITTED.value((self.name,)),
+            "rejected": {
+                reason: REJECTED.value((self.name, reason)) for reason in ("queue_full", "queue_timeout")
+            },
+        }
+
+
+def lane_for(method: str, path: str) -> Optional[str]:
+    """The lane of a request, or None for requests outside the API (health, metrics, docs)"""
+    if not path.startswith(API_PREFIX + "/"):
+        return None
+    if method in ("POST", "PUT") and any(path == bulk or path.startswith(bulk + "/") for bulk in BULK_PATHS):
+        return BULK
+    return INTERACTIVE
+
+
+class AdmissionController:
+    """The interactive and bulk lanes; the bulk lane backs off when interactive latency rises"""
+
+    def __init__(
+        self,
+        interactive_max: int = 256,
+        bulk_max: int = 16,
+        max_queue: int = 128,
+        interactive_queue_timeout: float = 1.0,
+        bulk_queue_timeout: float = 10.0
+    ):
+        interactive = LaneLimiter(
+            INTERACTIVE, interactive_max // 4, 4, interactive_max, max_queue, interactive_queue_timeout
+        )
+        bulk = LaneLimiter(
+            BULK, bulk_max // 4, 1, bulk_max, max_queue, bulk_queue_timeout, protects=interactive
+        )
+        self.lanes: Dict[str, LaneLimiter] = {INTERACTIVE: interactive, BULK: bulk}
+
+    def stats(self) -> Dict[str, object]:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+    def samples(self, attribute: str) -> List[Tuple[Tuple[str], float]]:
+        return [((name,), getattr(lane, attribute)) for name, lane in self.lanes.items()]
+
+
+admission_controller = AdmissionController(
+    settings.admission_interactive_max_concurrency,
+    settings.admission_bulk_max_concurrency,
+    settings.admission_queue_size,
+    settings.admission_interactive_queue_timeout_seconds,
+    settings.admission_bulk_queue_timeout_seconds
+)
+
+registry.gauge(
+    "financial_api_admission_limit", "Current concurrency limit, by lane",
+    lambda: admission_controller.samples("limit"), ("lane",)
+)
+registry.gauge(
+    "financial_api_admission_in_flight", "Requests being handled, by lane",
+    lambda: admission_controller.samples("in_flight"), ("lane",)
+)
+registry.gauge(
+    "financial_api_admission_queue_depth", "Requests waiting for a slot, by lane",
+    lambda: admission_controller.samples("queue_depth"), ("lane",)
+)
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware admitting API requests through their lane's limiter.
+
+    A request that finds its lane's queue full is rejected at once with 429;
+    one that waits longer than the lane's queue timeout gets 503. Both carry
+    a ``Retry-After`` estimated from the lane's latency and queue.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        lane_name = lane_for(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if lane_name is None:
+            await self.app(scope, receive, send)
+            return
+
+        lane = self.controller.lanes[lane_name]
+        queued = time.perf_counter()
+        reason = await lane.acquire()
+        if reason is not None:
+            REJECTED.inc((lane_name, reason))
+            await self._reject(send, lane, reason)
+            return
+
+        started = time.perf_counter()
+        ADMITTED.inc((lane_name,))
+        QUEUE_WAIT.observe((lane_name,), started - queued)
+        latency = None
+        try:
+            await self.app(scope, receive, send)
+            latency = time.perf_counter() - started
+        finally:
+            lane.release(latency)
+
+    @staticmethod
+    async def _reject(send, lane: LaneLimiter, reason: str) -> None:
+        if reason == "queue_full":
+            status, detail = 429, f"Too many {lane.name} requests queued; retry later"
+        else:
+            status, detail = 503, f"Server overloaded: {lane.name} request was not admitted in time"
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(lane.retry_after()).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,365 @@
+from fastapi import APIRouter, File, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import FileResponse, Response
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from app.api.routing import TimedRoute
+from app.api.ndjson import (
+    NDJSON_MEDIA_TYPE,
+    NDJSONStreamingResponse,
+    RecordParseError,
+    RequestBody,
+    iter_json_records,
+    ndjson_line
+)
+from app.api.responses import encode_response
+from app.models.financial_models import (
+    CompanyFinancialData,
+    CompanyFinancialPanel,
+    DCFRequest,
+    DCFResult,
+    PanelAnalysisResult,
+    ScenarioRequest,
+    ScenarioResult
+)
+from app.services.arrow_service import ARROW_FILE_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE, ArrowAnalysisService
+from app.services.batch_service import BatchAnalysisService, CompanyBatch, NUMERIC_FIELDS
+from app.services.dcf_service import DCFService
+from app.services.executor import ClientDisconnectedError, ExecutorTimeoutError, analysis_executor
+from app.services.panel_service import PanelAnalysisService
+from app.services.scenario_service import ScenarioAnalysisService
+from app.services.validation_service import company_validator
+from app.telemetry import VALIDATION_FAILURES
+from app.services.file_service import (
+    FileAnalysisService,
+    INPUT_FORMATS,
+    MEDIA_TYPES,
+    detect_format
+)
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Literal, Optional
+import asyncio
+import os
+import shutil
+import tempfile
+
+router = APIRouter(route_class=TimedRoute)
+
+# nginx's non-standard status for a request the client abandoned
+HTTP_499_CLIENT_CLOSED_REQUEST = 499
+
+_BATCH_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "application/json": {
+            "schema": {
+                "type": "array",
+                "items": {"$ref": "#/components/schemas/CompanyFinancialData"}
+            }
+        },
+        NDJSON_MEDIA_TYPE: {
+            "schema": {"$ref": "#/components/schemas/CompanyFinancialData"}
+        }
+    }
+}
+
+_ARROW_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        ARROW_STREAM_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+        ARROW_FILE_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}
+    }
+}
+
+
+def _executor_error(error: Exception) -> HTTPException:
+    if isinstance(error, ExecutorTimeoutError):
+        return HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(error))
+    return HTTPException(status_code=HTTP_499_CLIENT_CLOSED_REQUEST, detail=str(error))
+
+
+def _validate_chunk(rows: List[object], indices: List[int], errors: Dict[int, dict], route: str):
+    """
+    Validate a chunk of decoded records column by column, adding an error
+    record per rejected row; returns the valid rows' batch and input indices
+    """
+    validated = company_validator.validate_records(rows)
+    invalid = validated.invalid
+    if len(invalid):
+        VALIDATION_FAILURES.inc((route,), len(invalid))
+    for row in invalid.tolist():
+        errors[indices[row]] = {
+            "index": indices[row], "error": "validation_error", "detail": validated.row_errors(row)
+        }
+    return validated.batch, [indices[row] for row in validated.indices.tolist()]
+
+
+async def _analyze_chunk(batch: CompanyBatch, indices: List[int], errors: Dict[int, dict]) -> List[bytes]:
+    """Run one chunk of validated rows through the batch engine and render its NDJSON lines"""
+    records = dict(errors)
+    if len(batch):
+        try:
+            results = await analysis_executor.run(BatchAnalysisService.analyze_to_dicts, batch, size=len(batch))
+            records.update({index: {"index": index, "result": result} for index, result in zip(indices, results)})
+        except ExecutorTimeoutError as e:
+            records.update({index: {"index": index, "error": "timeout", "detail": str(e)} for index in indices})
+        except Exception as e:
+            # A failed chunk is reported on its rows; the rest of the stream carries on
+            records.update(
+                {index: {"index": index, "error": "analysis_error", "detail": str(e)} for index in indices}
+            )
+    return [ndjson_line(records[index]) for index in sorted(records)]
+
+
+async def _stream_batch_results(request: Request, body: RequestBody, chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Validate and analyze streamed records chunk by chunk, yielding NDJSON lines
+    in input order. Up to one chunk per executor worker is analyzed while the
+    next one is parsed, so memory stays bounded by the worker count.
+    """
+    rows: List[object] = []
+    indices: List[int] = []
+    errors: Dict[int, dict] = {}
+    in_flight: Deque[asyncio.Task] = deque()
+    max_in_flight = max(1, analysis_executor.max_workers)
+
+    def submit() -> None:
+        batch, valid_indices = _validate_chunk(rows, indices, errors, request.url.path)
+        in_flight.append(asyncio.ensure_future(_analyze_chunk(batch, valid_indices, dict(errors))))
+        rows.clear()
+        indices.clear()
+        errors.clear()
+
+    try:
+        async for index, record in iter_json_records(body.stream()):
+            if isinstance(record, RecordParseError):
+                errors[index] = {"index": index, "error": "invalid_json", "detail": str(record)}
+            else:
+                # Validated a chunk at a time in submit()
+                rows.append(record)
+                indices.append(index)
+
+            if len(rows) + len(errors) >= chunk_size:
+                submit()
+                # Emit finished chunks in order; wait once every worker has one
+                while in_flight and (len(in_flight) >= max_in_flight or in_flight[0].done()):
+                    for line in await in_flight.popleft():
+                        yield line
+
+        if rows or errors:
+            submit()
+        while in_flight:
+            for line in await in_flight.popleft():
+                yield line
+    finally:
+        # The client went away: drop chunks that have not been analyzed yet
+        for task in in_flight:
+            task.cancel()
+
+
+@router.post(
+    "/analyze/batch",
+    response_class=NDJSONStreamingResponse,
+    openapi_extra={"requestBody": _BATCH_REQUEST_BODY},
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}}
+)
+async def analyze_batch(
+    request: Request,
+    chunk_size: int = Query(1000, ge=1, le=50000, description="Records analyzed per chunk")
+):
+    """
+    Perform complete financial analysis on many companies.
+
+    Accepts a JSON array or NDJSON body of company data and streams one NDJSON
+    record per input row, in input order: ``{"index": i, "result": {...}}`` for
+    analyzed rows and ``{"index": i, "error": ..., "detail": ...}`` for rows
+    that failed to parse or validate.
+    """
+    body = RequestBody(request)
+    return NDJSONStreamingResponse(_stream_batch_results(request, body, chunk_size), body=body)
+
+
+@router.post(
+    "/analyze/arrow",
+    response_class=Response,
+    openapi_extra={"requestBody": _ARROW_REQUEST_BODY},
+    responses={200: {"content": {ARROW_STREAM_MEDIA_TYPE: {}}}}
+)
+async def analyze_arrow(request: Request):
+    """
+    Perform complete financial analysis on an Arrow IPC stream (or file) of
+    company data columns and return an Arrow IPC stream with one row per
+    company and one float64 column per metric
+    """
+    data = await request.body()
+    try:
+        body = await analysis_executor.run(
+            ArrowAnalysisService.analyze_ipc,
+            data,
+            # Approximate row count from the size of the numeric column buffers
+            size=len(data) // (8 * len(NUMERIC_FIELDS)),
+            request=request
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid Arrow data: {str(e)}"
+        )
+    except (ExecutorTimeoutError, ClientDisconnectedError) as e:
+        raise _executor_error(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error performing Arrow analysis: {str(e)}"
+        )
+    return Response(body, media_type=ARROW_STREAM_MEDIA_TYPE)
+
+
+@router.post("/analyze/file", response_class=FileResponse)
+async def analyze_file(
+    request: Request,
+    file: UploadFile = File(..., description="CSV or Parquet file with company data columns"),
+    output_format: Literal["csv", "parquet", "arrow"] = Query("parquet", description="Result file format"),
+    input_format: Optional[Literal["csv", "parquet"]] = Query(
+        None, description="Upload format, inferred from the file name when omitted"
+    ),
+    chunk_size: int = Query(100_000, ge=1, le=1_000_000, description="Rows analyzed per chunk")
+):
+    """
+    Analyze an uploaded fundamentals file and return a metrics file with one
+    row per company and one column per metric
+    """
+    try:
+        input_format = input_format or detect_format(file.filename, INPUT_FORMATS)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Work on named files so the analysis can run in a worker process
+    with tempfile.NamedTemporaryFile(suffix=f".{input_format}", delete=False) as upload:
+        input_path = upload.name
+        await run_in_threadpool(shutil.copyfileobj, file.file, upload)
+    with tempfile.NamedTemporaryFile(suffix=f".{output_format}", delete=False) as output:
+        output_path = output.name
+    try:
+        rows = await analysis_executor.run(
+            FileAnalysisService.analyze_file,
+            input_path, output_path, input_format, output_format, chunk_size,
+            request=request
+        )
+    except ValueError as e:
+        os.unlink(output_path)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid input file: {str(e)}"
+        )
+    except (ExecutorTimeoutError, ClientDisconnectedError) as e:
+        os.unlink(output_path)
+        raise _executor_error(e)
+    except Exception as e:
+        os.unlink(output_path)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error analyzing file: {str(e)}"
+        )
+    finally:
+        os.unlink(input_path)
+
+    stem = os.path.splitext(os.path.basename(file.filename or "companies"))[0]
+    return FileResponse(
+        output_path,
+        media_type=MEDIA_TYPES[output_format],
+        filename=f"{stem}_metrics.{output_format}",
+        headers={"X-Row-Count": str(rows)},
+        background=BackgroundTask(os.unlink, output_path)
+    )
+
+
+@router.post("/analyze/panel", response_model=List[PanelAnalysisResult])
+async def analyze_panel(request: Request, panels: List[CompanyFinancialPanel]):
+    """
+    Compute TTM sums, YoY/QoQ growth, line item CAGRs and rolling ROE/ROIC
+    over quarterly or annual multi-period company data
+    """
+    try:
+        return await analysis_executor.run(
+            PanelAnalysisService.analyze_panels,
+            panels,
+            size=sum(len(panel.periods) for panel in panels),
+            request=request
+        )
+    except (ExecutorTimeoutError, ClientDisconnectedError) as e:
+        raise _executor_error(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error performing panel analysis: {str(e)}"
+        )
+
+
+@router.post("/analyze/scenarios", response_model=ScenarioResult)
+async def analyze_scenarios(request: Request, scenario: ScenarioRequest):
+    """
+    Evaluate metrics of a base company across perturbed inputs: random draws
+    from per-field distributions and/or the product of per-field shock grids.
+    Returns per-metric statistics and quantiles over all scenarios and,
+    with ``sensitivity``, tornado bars ranking each field's effect
+    """
+    try:
+        result = await analysis_executor.run(
+            ScenarioAnalysisService.analyze,
+            scenario,
+            size=ScenarioAnalysisService.scenario_count(scenario),
+            request=request
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except (ExecutorTimeoutError, ClientDisconnectedError) as e:
+        raise _executor_error(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error performing scenario analysis: {str(e)}"
+        )
+    return encode_response(request, result)
+
+
+@router.post(
+    "/analyze/dcf",
+    response_model=DCFResult,
+    responses={200: {"content": {ARROW_STREAM_MEDIA_TYPE: {}}}}
+)
+async def analyze_dcf(request: Request, dcf: DCFRequest):
+    """
+    Discounted free cash flow valuation: multi-stage growth, Gordon or
+    exit-multiple terminal value, WACC and value per share with upside
+    against the market price. ``wacc_grid`` and ``terminal_grid`` add a
+    value-per-share sensitivity table per company. Send
+    ``Accept: application/vnd.apache.arrow.stream`` to get an Arrow IPC
+    stream instead of JSON, which is much faster for universe-wide tables.
+    """
+    arrow = ARROW_STREAM_MEDIA_TYPE in request.headers.get("accept", "")
+    try:
+        result = await analysis_executor.run(
+            DCFService.analyze_arrow if arrow else DCFService.analyze,
+            dcf.companies,
+            dcf.assumptions,
+            size=len(dcf.companies),
+            request=request
+        )
+    except (ExecutorTimeoutError, ClientDisconnectedError) as e:
+        raise _executor_error(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error performing DCF valuation: {str(e)}"
+        )
+    if arrow:
+        return Response(result, media_type=ARROW_STREAM_MEDIA_TYPE)
+    return encode_response(request, result)
+
+
+@router.get("/executor/stats")
+async def get_executor_stats():
+    """
+    Get the analysis executor backend, queue depth and dispatch counters
+    """
+    return analysis_executor.stats()
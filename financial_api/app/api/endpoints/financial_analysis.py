@@ -1,4 +1,7 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from app.api.responses import compact_result, encode_response, family_result, nested_result
+from app.api.routing import TimedRoute
+from app.config import settings
 from app.models.financial_models import (
     CompanyFinancialData,
     FinancialAnalysisResult,
@@ -6,21 +9,41 @@ from app.models.financial_models import (
     GrowthMetrics,
     ProfitabilityMetrics,
     LiquidityMetrics,
-    LeverageMetrics
+    LeverageMetrics,
+    SelectedMetricsResult
 )
 from app.services.financial_service import FinancialAnalysisService
-import pandas as pd
+from app.services.cache_service import CachedAnalysisService
+from app.services.metric_graph import metric_graph
+from app.services.single_flight import CoalescedAnalysisService
+from app.telemetry import OPERATION_DURATION
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+
+async def _family_response(request: Request, data: CompanyFinancialData, family: str):
+    """One metric family, encoded directly when fast responses are enabled"""
+    if settings.fast_responses:
+        values = await CoalescedAnalysisService.analysis_values(data, family)
+        return encode_response(request, family_result(values, family))
+    return await CoalescedAnalysisService.calculate_family(family, data)
 
 
 @router.post("/analyze", response_model=FinancialAnalysisResult)
-async def analyze_financial_data(data: CompanyFinancialData):
+async def analyze_financial_data(
+    request: Request,
+    data: CompanyFinancialData,
+    compact: bool = Query(False, description="Return one flat object with a key per metric")
+):
     """
     Perform complete financial analysis on company data
     """
     try:
-        result = FinancialAnalysisService.perform_complete_analysis(data)
+        if compact:
+            return encode_response(request, compact_result(await CoalescedAnalysisService.analysis_values(data)))
+        if settings.fast_responses:
+            return encode_response(request, nested_result(await CoalescedAnalysisService.analysis_values(data)))
+        result = await CoalescedAnalysisService.perform_complete_analysis(data)
         return result
     except Exception as e:
         raise HTTPException(
@@ -29,14 +52,54 @@ async def analyze_financial_data(data: CompanyFinancialData):
         )
 
 
+@router.post("/analyze/metrics", response_model=SelectedMetricsResult)
+async def analyze_selected_metrics(
+    data: CompanyFinancialData,
+    metrics: str = Query(..., description="Comma-separated metric names, e.g. roe,ev_ebitda_ratio")
+):
+    """
+    Calculate only the requested metrics; intermediates they depend on are
+    evaluated once and nothing else is computed
+    """
+    names = [name.strip() for name in metrics.split(",") if name.strip()]
+    try:
+        metric_graph.validate_names(names)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    try:
+        values = FinancialAnalysisService.calculate_metrics(data, names)
+        return SelectedMetricsResult(company_name=data.company_name, industry=data.industry, metrics=values)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error calculating metrics: {str(e)}"
+        )
+
+
+@router.get("/metrics/catalog")
+async def get_metric_catalog():
+    """
+    List every metric and intermediate that can be requested by name
+    """
+    return [
+        {
+            "name": node.name,
+            "family": node.family,
+            "description": node.description,
+            "inputs": list(node.inputs)
+        }
+        for node in (metric_graph.nodes[name] for name in metric_graph.order)
+    ]
+
+
 @router.post("/analyze/market-valuation", response_model=MarketValuationMetrics)
-async def analyze_market_valuation(data: CompanyFinancialData):
+async def analyze_market_valuation(request: Request, data: CompanyFinancialData):
     """
     Calculate market and valuation metrics only
     """
     try:
-        result = FinancialAnalysisService.calculate_market_valuation_metrics(data)
-        return result
+        return await _family_response(request, data, "market_valuation_metrics")
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -45,13 +108,12 @@ async def analyze_market_valuation(data: CompanyFinancialData):
 
 
 @router.post("/analyze/growth", response_model=GrowthMetrics)
-async def analyze_growth_metrics(data: CompanyFinancialData):
+async def analyze_growth_metrics(request: Request, data: CompanyFinancialData):
     """
     Calculate growth metrics only
     """
     try:
-        result = FinancialAnalysisService.calculate_growth_metrics(data)
-        return result
+        return await _family_response(request, data, "growth_metrics")
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -60,13 +122,12 @@ async def analyze_growth_metrics(data: CompanyFinancialData):
 
 
 @router.post("/analyze/profitability", response_model=ProfitabilityMetrics)
-async def analyze_profitability_metrics(data: CompanyFinancialData):
+async def analyze_profitability_metrics(request: Request, data: CompanyFinancialData):
     """
     Calculate profitability metrics only
     """
     try:
-        result = FinancialAnalysisService.calculate_profitability_metrics(data)
-        return result
+        return await _family_response(request, data, "profitability_metrics")
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -75,13 +136,12 @@ async def analyze_profitability_metrics(data: CompanyFinancialData):
 
 
 @router.post("/analyze/liquidity", response_model=LiquidityMetrics)
-async def analyze_liquidity_metrics(data: CompanyFinancialData):
+async def analyze_liquidity_metrics(request: Request, data: CompanyFinancialData):
     """
     Calculate liquidity metrics only
     """
     try:
-        result = FinancialAnalysisService.calculate_liquidity_metrics(data)
-        return result
+        return await _family_response(request, data, "liquidity_metrics")
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -90,13 +150,12 @@ async def analyze_liquidity_metrics(data: CompanyFinancialData):
 
 
 @router.post("/analyze/leverage", response_model=LeverageMetrics)
-async def analyze_leverage_metrics(data: CompanyFinancialData):
+async def analyze_leverage_metrics(request: Request, data: CompanyFinancialData):
     """
     Calculate leverage metrics only
     """
     try:
-        result = FinancialAnalysisService.calculate_leverage_metrics(data)
-        return result
+        return await _family_response(request, data, "leverage_metrics")
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -126,7 +185,7 @@ async def analyze_with_dataframe(data: CompanyFinancialData):
     """
     try:
         # Perform complete analysis
-        result = FinancialAnalysisService.perform_complete_analysis(data)
+        result = await CoalescedAnalysisService.perform_complete_analysis(data)
         
         # Convert to dictionary format suitable for DataFrame
         df_data = {
@@ -142,16 +201,48 @@ async def analyze_with_dataframe(data: CompanyFinancialData):
             "Debt to Equity": [result.leverage_metrics.net_debt_to_equity],
         }
         
-        # Create DataFrame
-        df = pd.DataFrame(df_data)
-        
-        return {
-            "dataframe": df.to_dict(orient="records"),
-            "columns": df.columns.tolist(),
-            "shape": df.shape
-        }
+        # Create DataFrame; pandas is imported on the first call rather than at startup
+        with OPERATION_DURATION.time(("dataframe",)):
+            import pandas as pd
+
+            df = pd.DataFrame(df_data)
+
+            return {
+                "dataframe": df.to_dict(orient="records"),
+                "columns": df.columns.tolist(),
+                "shape": df.shape
+            }
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating DataFrame analysis: {str(e)}"
         )
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get result cache size and hit/miss/eviction counters
+    """
+    if CachedAnalysisService.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **CachedAnalysisService.cache.stats()}
+
+
+@router.get("/coalescing/stats")
+async def get_coalescing_stats():
+    """
+    Get how many requests led a computation and how many joined one in flight
+    """
+    if CoalescedAnalysisService.flights is None:
+        return {"enabled": False}
+    return {"enabled": True, **CoalescedAnalysisService.flights.stats()}
+
+
+@router.delete("/cache", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_cache():
+    """
+    Drop all cached analysis results
+    """
+    if CachedAnalysisService.cache is not None:
+        CachedAnalysisService.cache.clear()
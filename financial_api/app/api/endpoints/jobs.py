@@ -0,0 +1,205 @@
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.api.ndjson import NDJSON_MEDIA_TYPE
+from app.api.routing import TimedRoute
+from app.models.financial_models import JobPriority, JobRequest, JobState, JobStatus
+from app.services.file_service import INPUT_FORMATS, MEDIA_TYPES, detect_format
+from app.services.job_service import JobStore, job_manager, new_job_id
+from typing import List, Literal, Optional
+import json
+import os
+import shutil
+
+router = APIRouter(route_class=TimedRoute)
+
+
+def _store() -> JobStore:
+    if not job_manager.running:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Job queue is not running")
+    return job_manager.store
+
+
+def _job(job_id: str) -> dict:
+    job = _store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job: {job_id}")
+    return job
+
+
+def _finished(job: dict) -> dict:
+    if job["status"] != "succeeded":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job {job['id']} is {job['status']}; results are available once it has succeeded"
+        )
+    return job
+
+
+@router.post("/jobs", response_model=JobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(job: JobRequest):
+    """
+    Queue a batch, DCF or scenario analysis to run in the background and
+    return its id; poll ``/jobs/{id}`` for progress and fetch the results
+    from ``/jobs/{id}/results`` once it has succeeded
+    """
+    _store()
+    if job.kind == "scenarios":
+        params = {"scenario": job.scenario.model_dump(mode="json")}
+        total = None
+    else:
+        params = {"companies": job.companies, "chunk_size": job.chunk_size}
+        if job.kind == "dcf":
+            params["assumptions"] = job.assumptions.model_dump(mode="json")
+        total = len(job.companies)
+    try:
+        return job_manager.submit(job.kind, job.priority, params, total)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error submitting job: {str(e)}"
+        )
+
+
+@router.post("/jobs/file", response_model=JobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_file_job(
+    file: UploadFile = File(..., description="CSV or Parquet file with company data columns"),
+    output_format: Literal["csv", "parquet", "arrow"] = Query("parquet", description="Result file format"),
+    input_format: Optional[Literal["csv", "parquet"]] = Query(
+        None, description="Upload format, inferred from the file name when omitted"
+    ),
+    chunk_size: int = Query(100_000, ge=1, le=1_000_000, description="Rows analyzed per chunk"),
+    priority: JobPriority = Query("normal", description="Queue priority")
+):
+    """
+    Queue the analysis of an uploaded fundamentals file; the metrics file is
+    fetched from ``/jobs/{id}/download`` once the job has succeeded
+    """
+    store = _store()
+    try:
+        input_format = input_format or detect_format(file.filename, INPUT_FORMATS)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    job_id = new_job_id()
+    input_path = store.file_path(job_id, f"input.{input_format}")
+    try:
+        with open(input_path, "wb") as upload:
+            await run_in_threadpool(shutil.copyfileobj, file.file, upload)
+        return job_manager.submit(
+            "file", priority,
+            {
+                "input_file": input_path,
+                "input_format": input_format,
+                "output_format": output_format,
+                "chunk_size": chunk_size
+            },
+            job_id=job_id
+        )
+    except Exception as e:
+        if os.path.exists(input_path):
+            os.unlink(input_path)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error submitting file job: {str(e)}"
+        )
+
+
+@router.get("/jobs", response_model=List[JobStatus])
+async def list_jobs(
+    status_filter: Optional[JobState] = Query(None, alias="status", description="Only jobs in this state"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum jobs returned, most recent first")
+):
+    """
+    List background jobs, most recent first
+    """
+    return _store().list(status_filter, limit)
+
+
+@router.get("/jobs/stats")
+async def get_job_stats():
+    """
+    Get job counts by status and the worker concurrency
+    """
+    return job_manager.stats()
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """
+    Get a job's state and progress
+    """
+    return _job(job_id)
+
+
+@router.get("/jobs/{job_id}/results")
+async def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0, description="Index of the first result record"),
+    limit: int = Query(1000, ge=1, le=100_000, description="Maximum result records returned")
+):
+    """
+    Get a page of a succeeded job's result records: one record per input
+    company (``index`` with ``result`` or ``error``) for batch and DCF jobs,
+    the scenario result for scenario jobs
+    """
+    job = _finished(_job(job_id))
+    if job["kind"] == "file":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="File jobs produce a file; fetch it from the download endpoint"
+        )
+    records = await run_in_threadpool(job_manager.store.results, job_id, offset, limit)
+    # Stored records are already JSON, so the page is assembled without decoding them
+    head = json.dumps({"job_id": job_id, "offset": offset, "limit": limit, "total": job["result_rows"]})
+    body = head[:-1].encode("utf-8") + b', "records": [' + b",".join(records) + b"]}"
+    return Response(body, media_type="application/json")
+
+
+@router.get(
+    "/jobs/{job_id}/download",
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}, "application/octet-stream": {}}}}
+)
+async def download_job_results(job_id: str):
+    """
+    Download all of a succeeded job's results: the metrics file of a file
+    job, NDJSON result records otherwise
+    """
+    job = _finished(_job(job_id))
+    if job["kind"] == "file":
+        path = job_manager.store.result_file(job_id)
+        output_format = os.path.splitext(path)[1][1:]
+        return FileResponse(
+            path,
+            media_type=MEDIA_TYPES[output_format],
+            filename=f"{job_id}_metrics.{output_format}",
+            headers={"X-Row-Count": str(job["result_rows"])}
+        )
+    return StreamingResponse(job_manager.store.iter_results(job_id), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    """
+    Cancel a job: a queued job is cancelled at once, a running one stops
+    after its current chunk; finished jobs are left as they are
+    """
+    job = _store().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@router.delete("/jobs/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_job(job_id: str):
+    """
+    Remove a finished job and its results
+    """
+    deleted = _store().delete(job_id)
+    if deleted is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job: {job_id}")
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job {job_id} has not finished; cancel it first"
+        )
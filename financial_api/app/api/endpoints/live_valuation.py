@@ -0,0 +1,106 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from app.api.routing import TimedRoute
+from app.config import settings
+from app.services.live_valuation import SlowConsumerError, Subscriber, live_valuation_hub
+from typing import Any, Dict
+import asyncio
+import math
+
+router = APIRouter(route_class=TimedRoute)
+
+
+def _ticker_list(message: Dict[str, Any]) -> list:
+    tickers = message.get("tickers")
+    if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+        raise ValueError("'tickers' must be a list of strings")
+    return tickers
+
+
+def _price_map(message: Dict[str, Any]) -> Dict[str, float]:
+    prices = message.get("prices")
+    if not isinstance(prices, dict):
+        raise ValueError("'prices' must be an object of ticker to price")
+    for ticker, price in prices.items():
+        if isinstance(price, bool) or not isinstance(price, (int, float)) or not math.isfinite(price) or price <= 0:
+            raise ValueError(f"Price for {ticker} should be a number greater than 0")
+    return {ticker: float(price) for ticker, price in prices.items()}
+
+
+def _handle_message(subscriber: Subscriber, message: Any) -> None:
+    """Apply one client message, queueing any reply on the subscriber"""
+    if not isinstance(message, dict):
+        raise ValueError("Messages must be JSON objects")
+
+    action = message.get("action")
+    if action == "subscribe":
+        current, unknown = live_valuation_hub.subscribe(subscriber, _ticker_list(message))
+        subscriber.push({"type": "snapshot", "metrics": current, "unknown_tickers": unknown})
+    elif action == "unsubscribe":
+        tickers = _ticker_list(message)
+        live_valuation_hub.unsubscribe(subscriber, tickers)
+        subscriber.push({"type": "unsubscribed", "tickers": tickers})
+    elif action == "tick":
+        _, unknown = live_valuation_hub.publish(_price_map(message))
+        if unknown:
+            subscriber.push({"type": "error", "detail": f"Unknown tickers: {', '.join(unknown)}"})
+    else:
+        raise ValueError(f"Unknown action: {action!r}")
+
+
+async def _receive_messages(websocket: WebSocket, subscriber: Subscriber) -> None:
+    while True:
+        message = await websocket.receive_json()
+        try:
+            _handle_message(subscriber, message)
+        except ValueError as e:
+            subscriber.push({"type": "error", "detail": str(e)})
+
+
+@router.websocket("/ws/valuation")
+async def live_valuation_stream(websocket: WebSocket):
+    """
+    Stream market valuation metrics of registered snapshots.
+
+    Client messages:
+      {"action": "subscribe", "tickers": [...]}
+      {"action": "unsubscribe", "tickers": [...]}
+      {"action": "tick", "prices": {"TICKER": price, ...}}
+
+    Server messages:
+      {"type": "snapshot", "metrics": {...}, "unknown_tickers": [...]}
+      {"type": "valuation", "updates": {"TICKER": {changed fields only}}}
+      {"type": "error", "detail": "..."}
+    """
+    await websocket.accept()
+    subscriber = Subscriber(
+        websocket.send_json,
+        coalesce_interval=settings.live_coalesce_interval,
+        send_timeout=settings.live_send_timeout
+    )
+    live_valuation_hub.connect(subscriber)
+
+    receiver = asyncio.create_task(_receive_messages(websocket, subscriber))
+    sender = asyncio.create_task(subscriber.run())
+    try:
+        done, pending = await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        if sender in done and isinstance(sender.exception(), SlowConsumerError):
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Slow consumer")
+        elif receiver in done and not isinstance(receiver.exception(), WebSocketDisconnect):
+            await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+    except RuntimeError:
+        # The connection was already closed
+        pass
+    finally:
+        live_valuation_hub.disconnect(subscriber)
+
+
+@router.get("/ws/valuation/stats")
+async def live_valuation_stats():
+    """
+    Get connection, subscription and delivery counters of the live valuation stream
+    """
+    return live_valuation_hub.stats()
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, HTTPException, status
+from app.api.routing import TimedRoute
+from app.models.financial_models import (
+    CompanyFinancialData,
+    IndustryPeerStatistics,
+    PeerComparisonResult
+)
+from app.services.cache_service import CachedAnalysisService
+from app.services.snapshot_service import snapshot_store
+from typing import Dict, Optional
+
+router = APIRouter(route_class=TimedRoute)
+
+
+def _comparison(company_name: str, industry: str, values: Dict[str, Optional[float]]) -> PeerComparisonResult:
+    peers = snapshot_store.sync_peers()
+    ranks = peers.rank(industry, values)
+    if ranks is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No registered peers in industry: {industry}")
+    return PeerComparisonResult(
+        company_name=company_name,
+        industry=industry,
+        peer_count=peers.industries().get(industry, 0),
+        metrics=ranks
+    )
+
+
+@router.get("/peers")
+async def get_peer_industries():
+    """
+    List industries of registered snapshots with their company counts
+    """
+    return [
+        {"industry": industry, "count": count}
+        for industry, count in sorted(snapshot_store.peers.industries().items())
+    ]
+
+
+@router.get("/peers/{industry}", response_model=IndustryPeerStatistics)
+async def get_industry_statistics(industry: str):
+    """
+    Get count, mean, standard deviation, range and quantiles of every metric
+    across an industry's registered companies
+    """
+    summary = snapshot_store.sync_peers().summary(industry)
+    if summary is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown industry: {industry}")
+    return summary
+
+
+@router.get("/snapshots/{ticker}/peers", response_model=PeerComparisonResult)
+async def get_snapshot_peer_comparison(ticker: str):
+    """
+    Get a registered ticker's metrics with its percentile and z-score within its industry
+    """
+    stored = snapshot_store.get_values(ticker)
+    if stored is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown ticker: {ticker}")
+    return _comparison(*stored)
+
+
+@router.post("/analyze/peers", response_model=PeerComparisonResult)
+async def analyze_peer_comparison(data: CompanyFinancialData):
+    """
+    Analyze a company and rank each metric against the registered companies of its industry
+    """
+    try:
+        values = CachedAnalysisService.analysis_values(data)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error performing financial analysis: {str(e)}"
+        )
+    return _comparison(data.company_name, data.industry, values.metrics)
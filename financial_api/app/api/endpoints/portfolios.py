@@ -0,0 +1,188 @@
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.exceptions import RequestValidationError
+from app.api.endpoints.batch_analysis import _executor_error
+from app.api.responses import encode_response
+from app.api.routing import TimedRoute
+from app.models.financial_models import PortfolioResult, PortfolioWeights
+from app.services.executor import ClientDisconnectedError, ExecutorTimeoutError, analysis_executor
+from app.services.portfolio_service import (
+    PortfolioAnalysisService,
+    PortfolioFrame,
+    PortfolioValidationError,
+    portfolio_store
+)
+import json
+
+router = APIRouter(route_class=TimedRoute)
+
+# PortfolioRequest, read and validated by PortfolioFrame.from_payload rather than by FastAPI
+_PORTFOLIO_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "application/json": {
+            "schema": {
+                "title": "PortfolioRequest",
+                "type": "object",
+                "required": ["holdings"],
+                "properties": {
+                    "holdings": {
+                        "type": "array",
+                        "minItems": 1,
+                        "items": {
+                            "title": "PortfolioHolding",
+                            "type": "object",
+                            "required": ["ticker", "shares", "data"],
+                            "properties": {
+                                "ticker": {"type": "string", "description": "Unique within the portfolio"},
+                                "shares": {"type": "number", "minimum": 0},
+                                "data": {"$ref": "#/components/schemas/CompanyFinancialData"}
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+
+_POSITIONS = Query(False, description="Also return each position's market value and weight")
+
+
+async def _payload(request: Request) -> object:
+    """Decoded request body; malformed JSON is reported as FastAPI would"""
+    body = await request.body()
+    try:
+        return json.loads(body)
+    except json.JSONDecodeError as e:
+        raise RequestValidationError([
+            {"type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error", "input": {},
+             "ctx": {"error": e.msg}}
+        ])
+
+
+def _invalid(error: PortfolioValidationError) -> RequestValidationError:
+    return RequestValidationError([{**e, "loc": ("body",) + e["loc"]} for e in error.errors])
+
+
+def _size(payload: object) -> int:
+    holdings = payload.get("holdings") if isinstance(payload, dict) else None
+    return len(holdings) if isinstance(holdings, list) else 0
+
+
+def _unknown(portfolio_id: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown portfolio: {portfolio_id}")
+
+
+@router.post(
+    "/analyze/portfolio",
+    response_model=PortfolioResult,
+    openapi_extra={"requestBody": _PORTFOLIO_REQUEST_BODY}
+)
+async def analyze_portfolio(request: Request, include_positions: bool = _POSITIONS):
+    """
+    Aggregate holdings' metrics weighted by market value: harmonic means for
+    P/E, P/B, P/S and EV/EBITDA, weighted means for yields, returns, margins
+    and leverage, plus exposure by industry and concentration
+    """
+    payload = await _payload(request)
+    try:
+        result = await analysis_executor.run(
+            PortfolioAnalysisService.analyze_payload,
+            payload,
+            include_positions,
+            size=_size(payload),
+            request=request
+        )
+    except PortfolioValidationError as e:
+        raise _invalid(e)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except (ExecutorTimeoutError, ClientDisconnectedError) as e:
+        raise _executor_error(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error performing portfolio analysis: {str(e)}"
+        )
+    return encode_response(request, result)
+
+
+@router.put(
+    "/portfolios/{portfolio_id}",
+    response_model=PortfolioResult,
+    openapi_extra={"requestBody": _PORTFOLIO_REQUEST_BODY}
+)
+async def store_portfolio(request: Request, portfolio_id: str, include_positions: bool = _POSITIONS):
+    """
+    Analyze holdings and keep their metrics under an id, so new share counts
+    can be re-aggregated without recomputing them; replaces a portfolio with
+    the same id
+    """
+    payload = await _payload(request)
+    try:
+        frame = await analysis_executor.run(
+            PortfolioFrame.from_payload, payload, size=_size(payload), request=request
+        )
+        result = portfolio_store.put(portfolio_id, frame, include_positions)
+    except PortfolioValidationError as e:
+        raise _invalid(e)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except (ExecutorTimeoutError, ClientDisconnectedError) as e:
+        raise _executor_error(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error storing portfolio: {str(e)}"
+        )
+    return encode_response(request, result)
+
+
+@router.get("/portfolios/stats")
+async def get_portfolio_stats():
+    """
+    Get the number of stored portfolios and positions
+    """
+    return portfolio_store.stats()
+
+
+@router.get("/portfolios/{portfolio_id}", response_model=PortfolioResult)
+async def get_portfolio(request: Request, portfolio_id: str, include_positions: bool = _POSITIONS):
+    """
+    Get a stored portfolio's aggregates at its current share counts
+    """
+    result = portfolio_store.aggregate(portfolio_id, include_positions)
+    if result is None:
+        raise _unknown(portfolio_id)
+    return encode_response(request, result)
+
+
+@router.post("/portfolios/{portfolio_id}/weights", response_model=PortfolioResult)
+async def reweight_portfolio(
+    request: Request, portfolio_id: str, weights: PortfolioWeights, include_positions: bool = _POSITIONS
+):
+    """
+    Change share counts of a stored portfolio's positions and re-aggregate
+    from the metrics computed when it was stored
+    """
+    try:
+        result = portfolio_store.reweight(portfolio_id, weights.shares, include_positions)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error re-weighting portfolio: {str(e)}"
+        )
+    if result is None:
+        raise _unknown(portfolio_id)
+    return encode_response(request, result)
+
+
+@router.delete("/portfolios/{portfolio_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_portfolio(portfolio_id: str):
+    """
+    Drop a stored portfolio
+    """
+    if not portfolio_store.remove(portfolio_id):
+        raise _unknown(portfolio_id)
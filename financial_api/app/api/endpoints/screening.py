@@ -0,0 +1,91 @@
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from app.api.responses import encode_response
+from app.api.routing import TimedRoute
+from app.models.financial_models import CompanySnapshot, ScreenResult
+from app.services.screening_service import ScreenQueryError, screening_store
+from typing import List, Optional
+
+router = APIRouter(route_class=TimedRoute)
+
+
+def _names(value: Optional[str]) -> List[str]:
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+@router.post("/screening/companies")
+async def add_screening_companies(companies: List[CompanySnapshot]):
+    """
+    Analyze companies and store their metrics in the screening universe under
+    tickers; a ticker already present is replaced
+    """
+    try:
+        stored = screening_store.add_companies([(c.ticker, c.data) for c in companies])
+        return {"stored": stored, "total": len(screening_store)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error storing screening companies: {str(e)}"
+        )
+
+
+@router.delete("/screening/companies/{ticker}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_screening_company(ticker: str):
+    """
+    Remove a ticker from the screening universe
+    """
+    if not screening_store.remove(ticker):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown ticker: {ticker}")
+
+
+@router.get("/screen", response_model=ScreenResult)
+async def screen_companies(
+    request: Request,
+    where: str = Query("", description="Filter, e.g. roe > 0.15 AND debt_to_ebitda < 3 AND industry = 'Technology'"),
+    sort: Optional[str] = Query(None, description="Comma-separated metrics, '-' prefix for descending, e.g. -roe,pe_ratio"),
+    limit: int = Query(100, ge=1, le=10_000, description="Maximum companies returned"),
+    fields: Optional[str] = Query(None, description="Comma-separated metrics to return (default all)")
+):
+    """
+    Screen the stored universe with a filter expression.
+
+    Comparisons (=, !=, <, <=, >, >=, BETWEEN x AND y, IN (...)) on any metric,
+    =, != and IN on industry, company_name and ticker, combined with AND, OR
+    and parentheses. Companies whose metric is undefined never match a
+    comparison on it.
+    """
+    try:
+        result = screening_store.query(where, _names(sort), limit, _names(fields) if fields else None)
+    except ScreenQueryError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error screening companies: {str(e)}"
+        )
+    return encode_response(request, result)
+
+
+@router.get("/screening/stats")
+async def get_screening_stats():
+    """
+    Get the size of the screening universe and the metrics indexed so far
+    """
+    return screening_store.stats()
+
+
+@router.post("/screening/compact")
+async def compact_screening_store():
+    """
+    Rewrite the persistent metric store without superseded rows
+    """
+    store = screening_store.store
+    if store is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No metric store configured")
+    try:
+        store.compact()
+        return store.stats()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error compacting metric store: {str(e)}"
+        )
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from app.api.routing import TimedRoute
+from app.models.financial_models import (
+    CompanySnapshot,
+    FinancialAnalysisResult,
+    MarketValuationMetrics,
+    PriceUpdate,
+    PriceUpdateResult
+)
+from app.services.live_valuation import live_valuation_hub
+from app.services.snapshot_service import snapshot_store
+from typing import List
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.post("/snapshots")
+async def register_snapshots(snapshots: List[CompanySnapshot]):
+    """
+    Register company fundamentals under tickers; re-registering a ticker replaces it
+    """
+    try:
+        registered = snapshot_store.register([(s.ticker, s.data) for s in snapshots])
+        return {"registered": registered, "total": len(snapshot_store)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error registering snapshots: {str(e)}"
+        )
+
+
+@router.post("/snapshots/prices", response_model=PriceUpdateResult)
+async def update_snapshot_prices(
+    updates: List[PriceUpdate],
+    include_metrics: bool = Query(True, description="Return the recomputed market valuation metrics")
+):
+    """
+    Apply price ticks to registered tickers; only price-dependent metrics are recomputed
+    and live valuation subscribers are notified
+    """
+    try:
+        updated, unknown = live_valuation_hub.publish(
+            {u.ticker: u.market_price_per_share for u in updates}
+        )
+        return PriceUpdateResult(
+            updated=len(updated),
+            unknown_tickers=unknown,
+            market_valuation_metrics=snapshot_store.market_valuation(updated) if include_metrics else None
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error updating prices: {str(e)}"
+        )
+
+
+@router.get("/snapshots/{ticker}", response_model=FinancialAnalysisResult)
+async def get_snapshot_analysis(ticker: str):
+    """
+    Get the complete analysis of a registered ticker at its latest price
+    """
+    result = snapshot_store.get(ticker)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown ticker: {ticker}")
+    return result
+
+
+@router.get("/snapshots/{ticker}/market-valuation", response_model=MarketValuationMetrics)
+async def get_snapshot_market_valuation(ticker: str):
+    """
+    Get the market valuation metrics of a registered ticker at its latest price
+    """
+    metrics = snapshot_store.market_valuation([ticker])
+    if ticker not in metrics:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown ticker: {ticker}")
+    return metrics[ticker]
+
+
+@router.delete("/snapshots/{ticker}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_snapshot(ticker: str):
+    """
+    Remove a registered ticker
+    """
+    if not snapshot_store.remove(ticker):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown ticker: {ticker}")
@@ -0,0 +1,200 @@
+"""
+Incremental JSON array / NDJSON parsing for streamed request bodies
+"""
+
+import asyncio
+import codecs
+import json
+from typing import Any, AsyncIterator, Mapping, Optional, Tuple
+import anyio
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.services.batch_service import ndjson_line  # noqa: F401 - re-exported for the endpoints
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# A single record larger than this is treated as malformed instead of
+# buffering the rest of the body looking for its end.
+MAX_RECORD_BYTES = 1 << 20
+
+
+class RecordParseError(ValueError):
+    """Raised for a record that is not valid JSON"""
+
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+async def iter_json_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield ``(index, record)`` pairs from a JSON array or NDJSON byte stream.
+
+    The format is detected from the first non-whitespace character. A record
+    that fails to parse is yielded as a RecordParseError instance so callers
+    can report it per row; for NDJSON parsing continues with the next line,
+    for a JSON array the stream cannot be resynchronised and parsing stops.
+    Only one record is buffered at a time.
+    """
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    index = 0
+    mode = None  # "array" or "ndjson"
+    array_closed = False
+    # What the array grammar allows next: "first" element or "]", an element
+    # after a comma ("value"), or a "separator" (",", "]") after an element
+    expect = "first"
+
+    async def more() -> bool:
+        nonlocal buffer
+        async for chunk in chunks:
+            if chunk:
+                buffer += text_decoder.decode(chunk)
+                return True
+        buffer += text_decoder.decode(b"", final=True)
+        return False
+
+    exhausted = False
+    while True:
+        if mode is None:
+            buffer = buffer.lstrip(_WHITESPACE)
+            if not buffer:
+                if exhausted or not await more():
+                    return
+                continue
+            if buffer[0] == "[":
+                mode = "array"
+                buffer = buffer[1:]
+            else:
+                mode = "ndjson"
+            continue
+
+        if mode == "ndjson":
+            newline = buffer.find("\n")
+            if newline < 0 and not exhausted:
+                if len(buffer) > MAX_RECORD_BYTES:
+                    yield index, RecordParseError("Record exceeds maximum size")
+                    return
+                exhausted = not await more()
+                continue
+            line, buffer = (buffer, "") if newline < 0 else (buffer[:newline], buffer[newline + 1:])
+            if line.strip():
+                try:
+                    yield index, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield index, RecordParseError(f"Invalid JSON: {e}")
+                index += 1
+            if exhausted and not buffer:
+                return
+            continue
+
+        # JSON array: decode one element at a time, with exactly one comma between elements
+        buffer = buffer.lstrip(_WHITESPACE)
+        if array_closed:
+            if buffer:
+                yield index, RecordParseError("Unexpected data after end of array")
+            return
+        if not buffer:
+            if exhausted:
+                yield index, RecordParseError("Unterminated JSON array")
+                return
+            exhausted = not await more()
+            continue
+        if buffer[0] == "]" and expect != "value":
+            array_closed = True
+            buffer = buffer[1:].lstrip(_WHITESPACE)
+            if not buffer and not exhausted:
+                exhausted = not await more()
+            continue
+        if expect == "separator":
+            if buffer[0] != ",":
+                yield index, RecordParseError("Invalid JSON: expected ',' or ']' after array element")
+                return
+            buffer = buffer[1:]
+            expect = "value"
+            continue
+        if buffer[0] in ",]":
+            yield index, RecordParseError("Invalid JSON: expected an array element")
+            return
+        try:
+            record, end = _decoder.raw_decode(buffer)
+        except json.JSONDecodeError as e:
+            if exhausted or len(buffer) > MAX_RECORD_BYTES:
+                yield index, RecordParseError(f"Invalid JSON: {e}")
+                return
+            exhausted = not await more()
+            continue
+        # A bare number may have been cut at a chunk boundary ("12" of "1234")
+        if end == len(buffer) and not exhausted and not isinstance(record, (dict, list, str)):
+            exhausted = not await more()
+            continue
+        buffer = buffer[end:]
+        expect = "separator"
+        yield index, record
+        index += 1
+
+
+class RequestBody:
+    """
+    A request body read as a stream of chunks, flagging once it has been
+    read in full so that a response can watch ``receive`` from then on
+    """
+
+    def __init__(self, request: Request):
+        self.request = request
+        self.consumed = asyncio.Event()
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        async for chunk in self.request.stream():
+            yield chunk
+        self.consumed.set()
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    NDJSON streaming response whose body generator may still be reading the
+    request body.
+
+    StreamingResponse listens for ``http.disconnect`` on ``receive`` while it
+    streams, which would swallow request body messages; here the generator
+    owns ``receive`` while it reads the body, and a disconnect meanwhile
+    surfaces from ``Request.stream()``. Given the ``body`` being read, the
+    response listens for a disconnect itself once it has been consumed, and
+    stops streaming when the client goes away.
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    def __init__(
+        self,
+        content,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+        body: Optional[RequestBody] = None
+    ):
+        super().__init__(content, status_code, headers, media_type, background)
+        self.body = body
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self.body is None:
+            await self.stream_response(send)
+        else:
+            async with anyio.create_task_group() as task_group:
+                async def stream() -> None:
+                    await self.stream_response(send)
+                    task_group.cancel_scope.cancel()
+
+                task_group.start_soon(stream)
+                await self._wait_for_disconnect(receive)
+                task_group.cancel_scope.cancel()
+        if self.background is not None:
+            await self.background()
+
+    async def _wait_for_disconnect(self, receive) -> None:
+        await self.body.consumed.wait()
+        while (await receive())["type"] != "http.disconnect":
+            pass
@@ -0,0 +1,79 @@
+"""
+OpenAPI schema cached on disk across restarts
+
+FastAPI builds the schema from every route and model on the first request
+for /openapi.json or /docs. With a cache path the schema is built once (for
+example while building the container image, ``python -m app.api.openapi``)
+and later processes load the file instead. The file records a fingerprint
+of the application sources and version, and a stale file is rebuilt.
+"""
+
+from fastapi import FastAPI
+from pathlib import Path
+from typing import Optional
+import hashlib
+import json
+import os
+
+_ROOT = Path(__file__).resolve().parents[2]
+
+
+def source_fingerprint(app: FastAPI) -> str:
+    """Hash of the app version and every application source file"""
+    digest = hashlib.sha256(app.version.encode("utf-8"))
+    for path in sorted([_ROOT / "main.py", *(_ROOT / "app").rglob("*.py")]):
+        if path.is_file():
+            digest.update(str(path.relative_to(_ROOT)).encode("utf-8"))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _load(path: Path, fingerprint: str) -> Optional[dict]:
+    try:
+        with open(path, "rb") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("fingerprint") != fingerprint:
+        return None
+    return cached.get("schema")
+
+
+def _save(path: Path, fingerprint: str, schema: dict) -> None:
+    # Write then rename so a concurrently starting worker never reads half a file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "schema": schema}, f, separators=(",", ":"))
+    os.replace(temporary, path)
+
+
+def install_schema_cache(app: FastAPI, path: str) -> None:
+    """Serve ``app.openapi()`` from the file at ``path``, building and writing it when missing or stale"""
+    cache_path = Path(path)
+
+    def openapi() -> dict:
+        if app.openapi_schema is None:
+            fingerprint = source_fingerprint(app)
+            schema = _load(cache_path, fingerprint)
+            if schema is None:
+                schema = FastAPI.openapi(app)
+                try:
+                    _save(cache_path, fingerprint, schema)
+                except OSError:
+                    # A read-only location still serves the freshly built schema
+                    pass
+            app.openapi_schema = schema
+        return app.openapi_schema
+
+    app.openapi = openapi
+
+
+if __name__ == "__main__":
+    from app.config import settings
+    from main import app
+
+    if not settings.openapi_cache_path:
+        raise SystemExit("Set FINANCIAL_API_OPENAPI_CACHE_PATH to the schema file to build")
+    _save(Path(settings.openapi_cache_path), source_fingerprint(app), FastAPI.openapi(app))
+    print(f"Wrote {settings.openapi_cache_path}")
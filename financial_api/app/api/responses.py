@@ -0,0 +1,143 @@
+"""
+Fast response encoding: orjson (byte-identical to the default JSON) or
+msgpack, chosen by the Accept header, for results already shaped as plain
+dicts so FastAPI's response-model revalidation and jsonable_encoder are skipped
+"""
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from app.models.financial_models import SelectedMetricsResult
+from app.services.metric_graph import FAMILY_METRICS
+from typing import Any, Dict, Optional
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def _orjson_matches_stdlib(value: Any) -> bool:
+    """
+    Whether orjson encodes every float in ``value`` exactly as the standard
+    library does. They differ only in exponent notation, which the standard
+    library uses below 1e-4 and from 1e16 up.
+    """
+    if type(value) is float:
+        return value == 0 or 1e-4 <= abs(value) < 1e16
+    if type(value) is dict:
+        return all(_orjson_matches_stdlib(item) for item in value.values())
+    if type(value) in (list, tuple):
+        return all(_orjson_matches_stdlib(item) for item in value)
+    return True
+
+
+def dumps_json(content: Any) -> bytes:
+    """Encode like Starlette's JSONResponse, through orjson when the bytes are identical"""
+    if orjson is not None and _orjson_matches_stdlib(content):
+        try:
+            return orjson.dumps(content)
+        except TypeError:
+            pass
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps_json"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class MsgPackResponse(Response):
+    """MessagePack response; requires the optional ``msgpack`` package"""
+
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def _quality(params: str) -> float:
+    """The q-value of an Accept entry's parameters; 1 when absent, 0 (refused) when malformed"""
+    for param in params.split(";"):
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def negotiate_format(request: Request) -> Optional[str]:
+    """
+    "msgpack" when the client names a MessagePack media type it prefers at
+    least as much as JSON, "json" otherwise, or None when it only accepts
+    MessagePack and that cannot be produced
+    """
+    msgpack_quality = None
+    # Quality of JSON by the most specific matching range: 2 application/json, 1 application/*, 0 */*
+    json_quality, json_precedence = 1.0, -1
+    for part in request.headers.get("accept", "").split(","):
+        media_type, _, params = part.partition(";")
+        media_type = media_type.strip().lower()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_quality = max(msgpack_quality or 0.0, _quality(params))
+        elif media_type in ("application/json", "application/*", "*/*"):
+            precedence = ("*/*", "application/*", "application/json").index(media_type)
+            if precedence > json_precedence:
+                json_quality, json_precedence = _quality(params), precedence
+
+    if msgpack_quality is None or msgpack_quality <= 0:
+        return "json"
+    if msgpack is not None and msgpack_quality >= json_quality:
+        return "msgpack"
+    if json_precedence >= 0 and json_quality > 0:
+        return "json"
+    return None if msgpack is None else "msgpack"
+
+
+def encode_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """
+    Plain-dict content as MessagePack when preferred, else as fast JSON;
+    406 when only MessagePack is accepted and msgpack is not installed
+    """
+    response_format = negotiate_format(request)
+    if response_format == "msgpack":
+        return MsgPackResponse(content, status_code=status_code)
+    if response_format is None:
+        return FastJSONResponse(
+            {"detail": "MessagePack responses require the msgpack package; accept application/json instead"},
+            status_code=406
+        )
+    return FastJSONResponse(content, status_code=status_code)
+
+
+def nested_result(values: SelectedMetricsResult) -> Dict[str, Any]:
+    """FinancialAnalysisResult-shaped dict from flat metric values"""
+    metrics = values.metrics
+    return {
+        "company_name": values.company_name,
+        "industry": values.industry,
+        **{family: {name: metrics[name] for name in names} for family, names in FAMILY_METRICS.items()}
+    }
+
+
+def family_result(values: SelectedMetricsResult, family: str) -> Dict[str, Optional[float]]:
+    """One family's model-shaped dict from flat metric values"""
+    return {name: values.metrics[name] for name in FAMILY_METRICS[family]}
+
+
+def compact_result(values: SelectedMetricsResult) -> Dict[str, Any]:
+    """Flat result: company_name, industry and one key per metric"""
+    return {"company_name": values.company_name, "industry": values.industry, **values.metrics}
@@ -0,0 +1,82 @@
+from fastapi import Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from app.telemetry import TIMING_SCOPE_KEY, VALIDATION_FAILURES, RequestTiming
+from contextvars import ContextVar
+from typing import Any, Callable, Coroutine, Optional
+import asyncio
+import functools
+import time
+
+_current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    """Wrap an endpoint so the route handler can tell its run time from parsing and serialization"""
+
+    def mark(key: str) -> None:
+        timing = _current_timing.get()
+        if timing is not None:
+            timing.stages[key] = time.perf_counter()
+
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed(*args, **kwargs):
+            mark("_endpoint_started")
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                mark("_endpoint_finished")
+    else:
+        @functools.wraps(endpoint)
+        def timed(*args, **kwargs):
+            mark("_endpoint_started")
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                mark("_endpoint_finished")
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that labels the request with its path template and splits its
+    handling into parse (body read, JSON decoding and Pydantic validation),
+    endpoint and serialize (response model validation and JSON rendering)
+    stages for TelemetryMiddleware.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        route = self.path_format
+
+        async def timed_handler(request: Request) -> Response:
+            timing = request.scope.get(TIMING_SCOPE_KEY)
+            if timing is None:
+                return await handler(request)
+
+            timing.route = route
+            token = _current_timing.set(timing)
+            started = time.perf_counter()
+            try:
+                return await handler(request)
+            except RequestValidationError:
+                VALIDATION_FAILURES.inc((timing.route,))
+                raise
+            finally:
+                finished = time.perf_counter()
+                _current_timing.reset(token)
+                stages = timing.stages
+                endpoint_started = stages.pop("_endpoint_started", None)
+                endpoint_finished = stages.pop("_endpoint_finished", None)
+                if endpoint_started is None or endpoint_finished is None:
+                    stages["parse"] = finished - started
+                else:
+                    stages["parse"] = endpoint_started - started
+                    stages["endpoint"] = endpoint_finished - endpoint_started
+                    stages["serialize"] = finished - endpoint_finished
+
+        return timed_handler
@@ -0,0 +1,101 @@
+"""
+Runtime settings read from FINANCIAL_API_* environment variables
+"""
+
+import os
+from typing import Optional
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    value = os.getenv(name)
+    return value if value not in (None, "") else default
+
+
+class Settings:
+    """Application settings, resolved once at import time"""
+
+    def __init__(self):
+        # Result cache
+        self.cache_enabled = _env_bool("FINANCIAL_API_CACHE_ENABLED", True)
+        self.cache_max_size = _env_int("FINANCIAL_API_CACHE_MAX_SIZE", 10_000)
+        self.cache_ttl_seconds = _env_float("FINANCIAL_API_CACHE_TTL_SECONDS", 300.0)
+        self.cache_redis_url = _env_str("FINANCIAL_API_CACHE_REDIS_URL")
+
+        # Concurrent identical single-company requests share one computation
+        self.coalesce_enabled = _env_bool("FINANCIAL_API_COALESCE_ENABLED", True)
+        self.coalesce_window_seconds = _env_float("FINANCIAL_API_COALESCE_WINDOW_SECONDS", 0.0)
+
+        # Live valuation WebSocket
+        self.live_coalesce_interval = _env_float("FINANCIAL_API_LIVE_COALESCE_INTERVAL", 0.05)
+        self.live_send_timeout = _env_float("FINANCIAL_API_LIVE_SEND_TIMEOUT", 5.0)
+
+        # Peer statistics over registered snapshots
+        self.peer_compression = _env_float("FINANCIAL_API_PEER_COMPRESSION", 200.0)
+        self.peer_rebuild_fraction = _env_float("FINANCIAL_API_PEER_REBUILD_FRACTION", 0.1)
+
+        # Persistent metric store; unset keeps the screening universe in memory only
+        self.store_path = _env_str("FINANCIAL_API_STORE_PATH")
+        self.store_compact_ratio = _env_float("FINANCIAL_API_STORE_COMPACT_RATIO", 0.3)
+        self.store_max_segments = _env_int("FINANCIAL_API_STORE_MAX_SEGMENTS", 32)
+
+        # Portfolios kept in memory for re-weighting
+        self.portfolio_max_count = _env_int("FINANCIAL_API_PORTFOLIO_MAX_COUNT", 100)
+
+        # Scenario analysis
+        self.scenario_chunk_size = _env_int("FINANCIAL_API_SCENARIO_CHUNK_SIZE", 131_072)
+        self.scenario_max_count = _env_int("FINANCIAL_API_SCENARIO_MAX_COUNT", 10_000_000)
+
+        # Execution backend for batch, panel and file analysis
+        self.executor_backend = _env_str("FINANCIAL_API_EXECUTOR_BACKEND", "thread")
+        self.executor_workers = _env_int("FINANCIAL_API_EXECUTOR_WORKERS", 0)
+        self.executor_inline_threshold = _env_int("FINANCIAL_API_EXECUTOR_INLINE_THRESHOLD", 500)
+        self.executor_timeout_seconds = _env_float("FINANCIAL_API_EXECUTOR_TIMEOUT_SECONDS", 120.0)
+
+        # Background jobs; ":memory:" keeps the queue in memory only (tests)
+        self.jobs_path = _env_str("FINANCIAL_API_JOBS_PATH", "jobs")
+        self.jobs_concurrency = _env_int("FINANCIAL_API_JOBS_CONCURRENCY", 2)
+
+        # Admission control: adaptive concurrency limits of the interactive and bulk lanes
+        self.admission_enabled = _env_bool("FINANCIAL_API_ADMISSION_ENABLED", True)
+        self.admission_interactive_max_concurrency = _env_int(
+            "FINANCIAL_API_ADMISSION_INTERACTIVE_MAX_CONCURRENCY", 256
+        )
+        self.admission_bulk_max_concurrency = _env_int("FINANCIAL_API_ADMISSION_BULK_MAX_CONCURRENCY", 16)
+        self.admission_queue_size = _env_int("FINANCIAL_API_ADMISSION_QUEUE_SIZE", 128)
+        self.admission_interactive_queue_timeout_seconds = _env_float(
+            "FINANCIAL_API_ADMISSION_INTERACTIVE_QUEUE_TIMEOUT_SECONDS", 1.0
+        )
+        self.admission_bulk_queue_timeout_seconds = _env_float(
+            "FINANCIAL_API_ADMISSION_BULK_QUEUE_TIMEOUT_SECONDS", 10.0
+        )
+
+        # Telemetry
+        self.metrics_enabled = _env_bool("FINANCIAL_API_METRICS_ENABLED", True)
+        self.server_timing = _env_bool("FINANCIAL_API_SERVER_TIMING", False)
+
+        # Cold start: skip warming executor workers, load the OpenAPI schema from a file
+        self.lean_startup = _env_bool("FINANCIAL_API_LEAN_STARTUP", False)
+        self.openapi_cache_path = _env_str("FINANCIAL_API_OPENAPI_CACHE_PATH")
+
+        # Analysis responses encoded directly, skipping response model revalidation
+        self.fast_responses = _env_bool("FINANCIAL_API_FAST_RESPONSES", True)
+
+
+settings = Settings()
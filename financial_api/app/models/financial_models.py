@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Any, Dict, List, Literal, Optional
+from datetime import date, datetime, timedelta
 
 
 class CompanyFinancialData(BaseModel):
@@ -113,3 +114,465 @@ class FinancialAnalysisResult(BaseModel):
     profitability_metrics: ProfitabilityMetrics
     liquidity_metrics: LiquidityMetrics
     leverage_metrics: LeverageMetrics
+
+
+class SelectedMetricsResult(BaseModel):
+    """Subset of metrics requested by name"""
+    company_name: str
+    industry: str
+    metrics: Dict[str, Optional[float]]
+
+
+class FinancialPeriod(BaseModel):
+    """Reported figures for one fiscal quarter or year"""
+    period_end: date = Field(..., description="Last day of the period")
+
+    # Flow items, reported for the period
+    revenue: float = Field(..., ge=0, description="Revenue for the period")
+    net_income: float = Field(..., description="Net income for the period")
+    ebit: float = Field(..., description="Earnings Before Interest and Taxes for the period")
+    depreciation: float = Field(0, ge=0, description="Depreciation for the period")
+    amortization: float = Field(0, ge=0, description="Amortization for the period")
+    interest_expense: float = Field(0, ge=0, description="Interest expense for the period")
+    dividends: float = Field(0, ge=0, description="Dividends paid in the period")
+    free_cash_flow: float = Field(0, description="Free cash flow for the period")
+
+    # Stock items, as of period end
+    total_assets: float = Field(..., gt=0, description="Total assets at period end")
+    total_equity: float = Field(..., description="Total equity at period end")
+    total_debt: float = Field(0, ge=0, description="Total debt at period end")
+
+
+# Months covered by one period of each reporting frequency
+MONTHS_PER_PERIOD = {"quarterly": 3, "annual": 12}
+
+
+def period_slot(period_end: date, frequency: str) -> int:
+    """
+    Sequence number of the period ending on ``period_end``: consecutive
+    periods get consecutive numbers. A period belongs to the month whose end
+    is nearest, so 52/53-week fiscal calendars keep their slot.
+    """
+    month = period_end - timedelta(days=15)
+    return ((month.year - 1970) * 12 + month.month - 1) // MONTHS_PER_PERIOD[frequency]
+
+
+class CompanyFinancialPanel(BaseModel):
+    """Reporting periods for one company; missing periods leave gaps"""
+    company_name: str = Field(..., description="Company name")
+    industry: str = Field(..., description="Industry sector")
+    frequency: Literal["quarterly", "annual"] = Field(..., description="Reporting frequency")
+    periods: List[FinancialPeriod] = Field(..., min_length=1, description="Periods, one per quarter or year")
+
+    @model_validator(mode="after")
+    def sort_periods(self) -> "CompanyFinancialPanel":
+        self.periods = sorted(self.periods, key=lambda period: period.period_end)
+        slots = [period_slot(period.period_end, self.frequency) for period in self.periods]
+        if any(a == b for a, b in zip(slots, slots[1:])):
+            unit = "quarter" if self.frequency == "quarterly" else "year"
+            raise ValueError(f"At most one period per {unit}; period_end values fall in the same {unit}")
+        return self
+
+
+class PanelAnalysisResult(BaseModel):
+    """Trailing and rolling metrics over a company's periods"""
+    company_name: str
+    industry: str
+    frequency: Literal["quarterly", "annual"]
+    period_ends: List[date]
+    ttm: Dict[str, List[Optional[float]]] = Field(
+        ..., description="Trailing twelve months sums of flow items, per period"
+    )
+    yoy_growth: Dict[str, List[Optional[float]]] = Field(
+        ..., description="Growth against the same period a year earlier, per period"
+    )
+    qoq_growth: Optional[Dict[str, List[Optional[float]]]] = Field(
+        None, description="Growth against the previous quarter, per period (quarterly panels)"
+    )
+    cagr: Dict[str, Optional[float]] = Field(
+        ..., description="Compound annual growth rate of each line item over the panel"
+    )
+    rolling_roe: List[Optional[float]] = Field(
+        ..., description="TTM net income over average equity, per period"
+    )
+    rolling_roic: List[Optional[float]] = Field(
+        ..., description="TTM EBIT over average equity plus debt, per period"
+    )
+
+
+class CompanySnapshot(BaseModel):
+    """Fundamentals registered under a ticker for incremental price updates"""
+    ticker: str = Field(..., min_length=1, description="Ticker the snapshot is registered under")
+    data: CompanyFinancialData
+
+
+class PriceUpdate(BaseModel):
+    """New market price for a registered ticker"""
+    ticker: str = Field(..., description="Registered ticker")
+    market_price_per_share: float = Field(..., gt=0, description="Market price per share")
+
+
+class PriceUpdateResult(BaseModel):
+    """Outcome of a batch of price updates"""
+    updated: int
+    unknown_tickers: List[str]
+    market_valuation_metrics: Optional[Dict[str, MarketValuationMetrics]] = None
+
+
+class MetricPeerStatistics(BaseModel):
+    """Distribution of one metric across an industry"""
+    count: int = Field(..., description="Companies with a defined value")
+    mean: Optional[float] = None
+    std: Optional[float] = Field(None, description="Sample standard deviation")
+    min: Optional[float] = None
+    max: Optional[float] = None
+    quantiles: Dict[str, Optional[float]] = Field(
+        ..., description="Approximate p10, p25, p50 (median), p75 and p90"
+    )
+
+
+class IndustryPeerStatistics(BaseModel):
+    """Per-metric distributions of an industry's registered companies"""
+    industry: str
+    count: int = Field(..., description="Registered companies in the industry")
+    metrics: Dict[str, MetricPeerStatistics]
+
+
+class MetricPeerRank(BaseModel):
+    """A company's metric value placed within its industry"""
+    value: Optional[float] = None
+    percentile: Optional[float] = Field(None, description="Share of industry peers below the value (ties count half), 0-100")
+    z_score: Optional[float] = Field(None, description="Standard deviations from the industry mean")
+    peer_median: Optional[float] = None
+    peer_count: int = Field(..., description="Peers with a defined value")
+
+
+class PeerComparisonResult(BaseModel):
+    """A company's metrics together with their industry percentiles"""
+    company_name: str
+    industry: str
+    peer_count: int = Field(..., description="Registered companies in the industry")
+    metrics: Dict[str, MetricPeerRank]
+
+
+class ScreenRow(BaseModel):
+    """A company matched by a screen"""
+    ticker: str
+    company_name: str
+    industry: str
+    metrics: Dict[str, Optional[float]]
+
+
+class ScreenResult(BaseModel):
+    """Companies matching a screen, sorted and limited"""
+    total: int = Field(..., description="Companies matching the filter before the limit")
+    results: List[ScreenRow]
+
+
+def _check_input_field(name: str) -> str:
+    field = CompanyFinancialData.model_fields.get(name)
+    if field is None or field.annotation is not float:
+        raise ValueError(f"Not a numeric input field: {name}")
+    return name
+
+
+class ScenarioDistribution(BaseModel):
+    """Random perturbation of one input field"""
+    field: str = Field(..., description="Numeric CompanyFinancialData field")
+    distribution: Literal["normal", "lognormal", "uniform", "triangular"] = "normal"
+    relative: bool = Field(
+        True,
+        description="Draws are relative changes, applied as base * (1 + draw); otherwise they are the field's values"
+    )
+    mean: float = Field(0.0, description="Normal mean (lognormal: mean of the logarithm)")
+    std: float = Field(0.1, ge=0, description="Normal standard deviation (lognormal: of the logarithm)")
+    low: Optional[float] = Field(None, description="Uniform and triangular lower bound")
+    high: Optional[float] = Field(None, description="Uniform and triangular upper bound")
+    mode: Optional[float] = Field(None, description="Triangular mode")
+
+    _check_field = field_validator("field")(_check_input_field)
+
+    @model_validator(mode="after")
+    def check_bounds(self) -> "ScenarioDistribution":
+        if self.distribution in ("uniform", "triangular"):
+            if self.low is None or self.high is None or self.low > self.high:
+                raise ValueError(f"{self.distribution} requires low <= high")
+        if self.distribution == "triangular" and (self.mode is None or not self.low <= self.mode <= self.high):
+            raise ValueError("triangular requires low <= mode <= high")
+        return self
+
+
+class ScenarioGrid(BaseModel):
+    """Fixed shocks of one input field, combined with every other grid"""
+    field: str = Field(..., description="Numeric CompanyFinancialData field")
+    shocks: List[float] = Field(..., min_length=1, description="Shocks, each one grid point")
+    relative: bool = Field(
+        True, description="Shocks are relative changes, applied as base * (1 + shock); otherwise they are values"
+    )
+
+    _check_field = field_validator("field")(_check_input_field)
+
+
+class ScenarioRequest(BaseModel):
+    """Perturbations of a base company to evaluate metrics under"""
+    base: CompanyFinancialData
+    distributions: List[ScenarioDistribution] = Field(default_factory=list)
+    grids: List[ScenarioGrid] = Field(default_factory=list)
+    scenarios: int = Field(
+        10_000, ge=1, description="Random draws; per grid point when grids are given, ignored without distributions"
+    )
+    seed: Optional[int] = Field(None, ge=0, description="Random seed; one is chosen and returned when omitted")
+    metrics: Optional[List[str]] = Field(None, description="Metrics to summarize (default all)")
+    quantiles: List[float] = Field([0.05, 0.25, 0.5, 0.75, 0.95], min_length=1)
+    sensitivity: bool = Field(False, description="Add tornado sensitivities of every metric to every field")
+
+    @field_validator("quantiles")
+    @classmethod
+    def check_quantiles(cls, quantiles: List[float]) -> List[float]:
+        if any(not 0 <= q <= 1 for q in quantiles):
+            raise ValueError("quantiles must be between 0 and 1")
+        return quantiles
+
+    @model_validator(mode="after")
+    def check_fields(self) -> "ScenarioRequest":
+        fields = [d.field for d in self.distributions] + [g.field for g in self.grids]
+        if not fields:
+            raise ValueError("At least one distribution or grid is required")
+        if len(set(fields)) != len(fields):
+            raise ValueError("Each field can be perturbed only once")
+        return self
+
+
+class ScenarioMetricStatistics(BaseModel):
+    """Distribution of one metric across scenarios"""
+    count: int = Field(..., description="Scenarios where the metric is defined")
+    undefined: int = Field(..., description="Scenarios where the metric is undefined or infinite")
+    mean: Optional[float] = None
+    std: Optional[float] = Field(None, description="Sample standard deviation")
+    min: Optional[float] = None
+    max: Optional[float] = None
+    quantiles: Dict[str, Optional[float]] = Field(
+        ..., description="Keyed p5, p50, ...; exact up to one evaluation chunk, t-digest estimates beyond"
+    )
+
+
+class SensitivityBar(BaseModel):
+    """One field's swing of a metric between its low and high input"""
+    field: str
+    low_input: float = Field(..., description="Field value at the 10th percentile (or smallest grid shock)")
+    high_input: float = Field(..., description="Field value at the 90th percentile (or largest grid shock)")
+    low: Optional[float] = Field(None, description="Metric at the low input, other fields at base")
+    high: Optional[float] = Field(None, description="Metric at the high input, other fields at base")
+    swing: Optional[float] = Field(None, description="Absolute difference of high and low")
+
+
+class ScenarioResult(BaseModel):
+    """Summary of metrics across scenarios"""
+    company_name: str
+    industry: str
+    scenarios: int
+    seed: int = Field(..., description="Seed that reproduces the run")
+    base: Dict[str, Optional[float]] = Field(..., description="Metrics of the unperturbed company")
+    metrics: Dict[str, ScenarioMetricStatistics]
+    sensitivities: Optional[Dict[str, List[SensitivityBar]]] = Field(
+        None, description="Per metric, fields ordered by decreasing swing"
+    )
+
+
+class GrowthStage(BaseModel):
+    """Years of free cash flow projected at one growth rate, or fading between two"""
+    years: int = Field(..., ge=1, le=50)
+    growth: Optional[float] = Field(
+        None, gt=-1, description="Annual growth as a fraction; default each company's eps_growth_percent / 100"
+    )
+    growth_end: Optional[float] = Field(
+        None, gt=-1, description="Growth in the stage's last year, reached linearly; default constant growth"
+    )
+
+
+class DCFAssumptions(BaseModel):
+    """Projection, discount rate and terminal value assumptions shared by every company"""
+    stages: List[GrowthStage] = Field(
+        default_factory=lambda: [GrowthStage(years=5), GrowthStage(years=5, growth_end=0.025)],
+        min_length=1,
+        description="Consecutive projection stages (default 5 years at company growth, then 5 fading to 2.5%)"
+    )
+    terminal_method: Literal["gordon", "exit_multiple"] = "gordon"
+    terminal_growth: float = Field(0.025, description="Perpetual growth after the last stage (gordon)")
+    exit_multiple: float = Field(10.0, gt=0, description="EV/EBITDA applied to final-year EBITDA (exit_multiple)")
+    wacc: Optional[float] = Field(
+        None, gt=0, description="Discount rate for every company; default computed per company from the inputs below"
+    )
+    risk_free_rate: float = Field(0.04, description="Risk-free rate for the CAPM cost of equity")
+    equity_risk_premium: float = Field(0.055, description="Equity risk premium for the CAPM cost of equity")
+    beta: float = Field(1.0, description="Equity beta for the CAPM cost of equity")
+    cost_of_debt: float = Field(0.06, ge=0, description="Pre-tax cost of debt")
+    tax_rate: float = Field(0.21, ge=0, lt=1)
+    wacc_grid: Optional[List[float]] = Field(
+        None, min_length=1, description="Discount rates for the sensitivity table rows"
+    )
+    terminal_grid: Optional[List[float]] = Field(
+        None, min_length=1,
+        description="Terminal growth rates (gordon) or exit multiples (exit_multiple) for the sensitivity table columns"
+    )
+
+    @field_validator("wacc_grid")
+    @classmethod
+    def check_wacc_grid(cls, rates: Optional[List[float]]) -> Optional[List[float]]:
+        if rates is not None and any(rate <= -1 for rate in rates):
+            raise ValueError("discount rates must be greater than -1")
+        return rates
+
+
+class DCFRequest(BaseModel):
+    """Companies to value with shared DCF assumptions"""
+    companies: List[CompanyFinancialData] = Field(..., min_length=1)
+    assumptions: DCFAssumptions = Field(default_factory=DCFAssumptions)
+
+
+class DCFValuation(BaseModel):
+    """Discounted free cash flow valuation of one company"""
+    company_name: str
+    industry: str
+    wacc: float = Field(..., description="Discount rate applied")
+    pv_cash_flows: float = Field(..., description="Present value of the projected free cash flows")
+    pv_terminal_value: Optional[float] = Field(None, description="Present value of the terminal value")
+    enterprise_value: Optional[float] = None
+    equity_value: Optional[float] = Field(None, description="Enterprise value less debt plus cash")
+    value_per_share: Optional[float] = None
+    upside: Optional[float] = Field(None, description="value_per_share / market_price_per_share - 1")
+    terminal_value_share: Optional[float] = Field(None, description="Share of enterprise value from the terminal value")
+    sensitivity: Optional[List[List[Optional[float]]]] = Field(
+        None, description="Value per share by discount rate (rows) and terminal assumption (columns)"
+    )
+
+
+class DCFResult(BaseModel):
+    """Valuations in request order, with the axes of their sensitivity tables"""
+    wacc_grid: Optional[List[float]] = None
+    terminal_grid: Optional[List[float]] = None
+    valuations: List[DCFValuation]
+
+
+JobKind = Literal["batch", "dcf", "scenarios", "file"]
+JobPriority = Literal["low", "normal", "high"]
+JobState = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+
+
+class JobRequest(BaseModel):
+    """An analysis to run in the background; file jobs are submitted as uploads instead"""
+    kind: Literal["batch", "dcf", "scenarios"]
+    priority: JobPriority = "normal"
+    chunk_size: int = Field(1000, ge=1, le=100_000, description="Companies analyzed between progress updates")
+    companies: Optional[List[Dict[str, Any]]] = Field(
+        None, min_length=1,
+        description="Company data records (batch, dcf); rows that fail validation become error records"
+    )
+    assumptions: DCFAssumptions = Field(default_factory=DCFAssumptions, description="DCF assumptions (dcf)")
+    scenario: Optional[ScenarioRequest] = Field(None, description="Scenario analysis to run (scenarios)")
+
+    @model_validator(mode="after")
+    def check_inputs(self) -> "JobRequest":
+        if self.kind in ("batch", "dcf") and self.companies is None:
+            raise ValueError(f"{self.kind} jobs need companies")
+        if self.kind == "scenarios" and self.scenario is None:
+            raise ValueError("scenarios jobs need a scenario")
+        return self
+
+
+class JobProgress(BaseModel):
+    """Units of work done (companies, scenarios or file rows) out of the total, when known"""
+    done: int
+    total: Optional[int] = None
+    fraction: Optional[float] = None
+
+
+class JobStatus(BaseModel):
+    """State of a background analysis job"""
+    id: str
+    kind: JobKind
+    priority: JobPriority
+    status: JobState
+    progress: JobProgress
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    cancel_requested: bool = False
+    error: Optional[str] = None
+    result_rows: Optional[int] = Field(None, description="Result records (or file rows) available once succeeded")
+
+
+class HoldingPosition(BaseModel):
+    """Ticker and shares held of a portfolio position"""
+    ticker: str = Field(..., description="Ticker identifying the position within the portfolio")
+    shares: float = Field(..., ge=0, description="Shares held; market value is shares times market_price_per_share")
+
+
+class PortfolioHolding(HoldingPosition):
+    """A position: the shares held of a company"""
+    data: CompanyFinancialData
+
+
+class PortfolioRequest(BaseModel):
+    """Holdings of a long-only portfolio, one per ticker"""
+    holdings: List[PortfolioHolding] = Field(..., min_length=1)
+
+    @field_validator("holdings")
+    @classmethod
+    def check_tickers(cls, holdings: List[PortfolioHolding]) -> List[PortfolioHolding]:
+        tickers = set()
+        for holding in holdings:
+            if holding.ticker in tickers:
+                raise ValueError(f"duplicate ticker: {holding.ticker}")
+            tickers.add(holding.ticker)
+        return holdings
+
+
+class PortfolioWeights(BaseModel):
+    """New share counts of existing positions; positions left out keep theirs"""
+    shares: Dict[str, float] = Field(..., min_length=1, description="Shares held by ticker; 0 drops a position")
+
+    @field_validator("shares")
+    @classmethod
+    def check_shares(cls, shares: Dict[str, float]) -> Dict[str, float]:
+        negative = [ticker for ticker, count in shares.items() if not count >= 0]
+        if negative:
+            raise ValueError(f"shares must be non-negative: {', '.join(negative)}")
+        return shares
+
+
+class IndustryExposure(BaseModel):
+    """Market value held in one industry"""
+    industry: str
+    holdings: int = Field(..., description="Positions with shares held")
+    market_value: float
+    weight: float = Field(..., description="Share of the portfolio's market value")
+
+
+class PortfolioPosition(BaseModel):
+    """Market value and weight of one position"""
+    ticker: str
+    company_name: str
+    industry: str
+    shares: float
+    market_value: float
+    weight: float
+
+
+class PortfolioResult(BaseModel):
+    """Market-value-weighted portfolio metrics and industry exposure"""
+    portfolio_id: Optional[str] = None
+    holdings: int = Field(..., description="Positions with shares held")
+    total_market_value: float
+    herfindahl_index: float = Field(..., description="Sum of squared position weights")
+    effective_holdings: float = Field(..., description="Inverse of the Herfindahl index")
+    metrics: Dict[str, Optional[float]] = Field(
+        ...,
+        description="Aggregate of every metric: weighted harmonic mean for P/E, P/B, P/S and EV/EBITDA, "
+                    "weighted mean of the holdings that report it otherwise"
+    )
+    coverage: Dict[str, float] = Field(
+        ..., description="Share of market value whose holdings report each metric"
+    )
+    industry_exposure: List[IndustryExposure] = Field(..., description="Industries by descending weight")
+    positions: Optional[List[PortfolioPosition]] = None
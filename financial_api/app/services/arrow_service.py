@@ -0,0 +1,129 @@
+from app.services.batch_service import BatchAnalysisService, CompanyBatch, NUMERIC_FIELDS
+from app.services.file_service import FILE_OUTPUT_COLUMNS
+from app.services.validation_service import company_validator
+from typing import Iterator
+import numpy as np
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_MEDIA_TYPE = "application/vnd.apache.arrow.file"
+
+# Leading bytes of the Arrow IPC file format; anything else is read as a stream
+_ARROW_FILE_MAGIC = b"ARROW1"
+
+_LABEL_COLUMNS = ("company_name", "industry")
+_STRING_COLUMNS = _LABEL_COLUMNS + ("error",)
+
+
+def _numeric_column(array) -> np.ndarray:
+    """
+    float64 view of an Arrow column. A float64 column without nulls is used
+    in place; other numeric types are cast and nulls become NaN.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if array.type != pa.float64():
+        try:
+            array = pc.cast(array, pa.float64())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            raise ValueError(f"Column is not numeric: {array.type}")
+    return array.to_numpy(zero_copy_only=False)
+
+
+def _label_column(array):
+    import pyarrow as pa
+
+    return array if array.type == pa.string() else array.cast(pa.string())
+
+
+class ArrowAnalysisService:
+    """
+    Complete analysis of Arrow IPC data.
+
+    Numeric column buffers feed CompanyBatch directly and the metric columns
+    are written back as float64 Arrow arrays without building per-row Python
+    objects. A metric the scalar service reports as None is NaN, as in
+    BatchAnalysisService, so result columns carry no validity bitmap and
+    convert to NumPy/pandas without copying.
+
+    Rows are checked against the CompanyFinancialData field constraints as in
+    FileAnalysisService: a rejected row keeps its place with NaN metrics and
+    an ``error`` naming the failing fields; ``error`` is null for analyzed rows.
+    """
+
+    @staticmethod
+    def result_schema():
+        import pyarrow as pa
+
+        return pa.schema([
+            (name, pa.string() if name in _STRING_COLUMNS else pa.float64())
+            for name in FILE_OUTPUT_COLUMNS
+        ])
+
+    @classmethod
+    def analyze_record_batch(cls, record_batch):
+        """Analyze one record batch of company fundamentals into one record batch of metrics"""
+        import pyarrow as pa
+
+        missing = [name for name in _LABEL_COLUMNS + NUMERIC_FIELDS if name not in record_batch.schema.names]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+        size = record_batch.num_rows
+        columns = {name: _numeric_column(record_batch.column(name)) for name in NUMERIC_FIELDS}
+        labels = {name: _label_column(record_batch.column(name)) for name in _LABEL_COLUMNS}
+        errors = company_validator.validate_columns(
+            {**columns, **{name: label.to_numpy(zero_copy_only=False) for name, label in labels.items()}}, size
+        )
+        valid = errors == 0
+        rejected = not valid.all()
+
+        batch = CompanyBatch({name: column[valid] for name, column in columns.items()} if rejected else columns)
+        metrics = BatchAnalysisService.perform_complete_analysis(batch)
+
+        # Labels pass straight through; metric arrays are wrapped without a copy
+        # unless rejected rows have to be spliced back in as NaN
+        arrays = list(labels.values())
+        for family in metrics.values():
+            for values in family.values():
+                if rejected:
+                    column = np.full(size, np.nan)
+                    column[valid] = values
+                else:
+                    column = np.ascontiguousarray(values)
+                arrays.append(pa.array(column))
+        if rejected:
+            arrays.append(pa.array([
+                None if not mask else "validation_error: " + ", ".join(company_validator.failed_fields(mask))
+                for mask in errors
+            ], pa.string()))
+        else:
+            arrays.append(pa.nulls(size, pa.string()))
+        return pa.RecordBatch.from_arrays(arrays, schema=cls.result_schema())
+
+    @staticmethod
+    def iter_record_batches(data) -> Iterator:
+        """Record batches of an Arrow IPC stream or file held in memory"""
+        import pyarrow as pa
+
+        buffer = pa.py_buffer(data)
+        if data[:len(_ARROW_FILE_MAGIC)] == _ARROW_FILE_MAGIC:
+            reader = pa.ipc.open_file(buffer)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+        else:
+            yield from pa.ipc.open_stream(buffer)
+
+    @classmethod
+    def analyze_ipc(cls, data: bytes) -> bytes:
+        """
+        Analyze an Arrow IPC stream or file and return an Arrow IPC stream of
+        all metrics, one output record batch per input record batch
+        """
+        import pyarrow as pa
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, cls.result_schema()) as writer:
+            for record_batch in cls.iter_record_batches(data):
+                writer.write_batch(cls.analyze_record_batch(record_batch))
+        return sink.getvalue().to_pybytes()
@@ -0,0 +1,276 @@
+from app.models.financial_models import (
+    CompanyFinancialData,
+    MarketValuationMetrics,
+    GrowthMetrics,
+    ProfitabilityMetrics,
+    LiquidityMetrics,
+    LeverageMetrics,
+    FinancialAnalysisResult
+)
+from app.services.metric_graph import ALL_FAMILY_METRICS, FAMILY_METRICS, VECTOR_OPS, metric_graph
+from app.telemetry import FAMILY_DURATION
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Union
+import json
+import math
+import numpy as np
+import sys
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Numeric input columns, in CompanyFinancialData field order
+NUMERIC_FIELDS = tuple(
+    name for name, field in CompanyFinancialData.model_fields.items()
+    if field.annotation is float
+)
+
+# Result families, in FinancialAnalysisResult field order
+METRIC_FAMILIES = {
+    "market_valuation_metrics": MarketValuationMetrics,
+    "growth_metrics": GrowthMetrics,
+    "profitability_metrics": ProfitabilityMetrics,
+    "liquidity_metrics": LiquidityMetrics,
+    "leverage_metrics": LeverageMetrics,
+}
+
+MetricColumns = Dict[str, np.ndarray]
+BatchMetrics = Dict[str, MetricColumns]
+
+
+def _finite(value):
+    """Replace non-finite floats, at any depth, with None"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def ndjson_line(record) -> bytes:
+    """Encode one result record as an NDJSON line, with inf and NaN as null"""
+    try:
+        line = json.dumps(record, allow_nan=False)
+    except ValueError:
+        # Bare Infinity / NaN tokens are not JSON
+        line = json.dumps(_finite(record), allow_nan=False)
+    return (line + "\n").encode("utf-8")
+
+
+def _column(value, size: int) -> np.ndarray:
+    """Broadcast a metric value to a float64 column of the batch size"""
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (size,))
+
+
+class CompanyRecord:
+    """
+    Company inputs without validation, for trusted internal callers.
+
+    Holds the CompanyFinancialData fields in slots and reads like the model
+    (attributes, ``model_dump``), so the scalar service, the metric graph and
+    the result cache accept it, at a fraction of a model's construction cost.
+    """
+
+    __slots__ = ("company_name", "industry") + NUMERIC_FIELDS
+
+    def __init__(self, company_name: str, industry: str, **values: float):
+        self.company_name = company_name
+        self.industry = industry
+        for name in NUMERIC_FIELDS:
+            setattr(self, name, values[name])
+
+    def model_dump(self) -> Dict[str, object]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class CompanyBatch:
+    """
+    Struct-of-arrays view over many companies.
+
+    Every numeric CompanyFinancialData field is held as a float64 column and
+    is readable as an attribute, so the vectorized formulas read like the
+    scalar ones in FinancialAnalysisService.
+    """
+
+    def __init__(
+        self,
+        columns: Mapping[str, Sequence[float]],
+        company_names: Optional[Sequence[str]] = None,
+        industries: Optional[Sequence[str]] = None
+    ):
+        missing = [name for name in NUMERIC_FIELDS if name not in columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+        self.columns: MetricColumns = {
+            name: np.asarray(columns[name], dtype=np.float64) for name in NUMERIC_FIELDS
+        }
+        size = len(self.columns[NUMERIC_FIELDS[0]])
+        if any(len(column) != size for column in self.columns.values()):
+            raise ValueError("All columns must have the same length")
+
+        self.company_names = list(company_names) if company_names is not None else [""] * size
+        self.industries = list(industries) if industries is not None else [""] * size
+        if len(self.company_names) != size or len(self.industries) != size:
+            raise ValueError("company_names and industries must match the column length")
+
+    def __len__(self) -> int:
+        return len(self.company_names)
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        columns = self.__dict__.get("columns", {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def record(self, row: int) -> CompanyRecord:
+        """One company of the batch as a CompanyRecord"""
+        return CompanyRecord(
+            self.company_names[row],
+            self.industries[row],
+            **{name: float(column[row]) for name, column in self.columns.items()}
+        )
+
+    def records(self) -> Iterator[CompanyRecord]:
+        columns = [column.tolist() for column in self.columns.values()]
+        for name, industry, *values in zip(self.company_names, self.industries, *columns):
+            yield CompanyRecord(name, industry, **dict(zip(NUMERIC_FIELDS, values)))
+
+    @classmethod
+    def from_dataframe(cls, df: "pd.DataFrame") -> "CompanyBatch":
+        """Build a batch from a DataFrame whose columns match CompanyFinancialData"""
+        columns = {name: df[name].to_numpy(dtype=np.float64) for name in NUMERIC_FIELDS if name in df}
+        names = df["company_name"].astype(str).tolist() if "company_name" in df else None
+        industries = df["industry"].astype(str).tolist() if "industry" in df else None
+        return cls(columns, names, industries)
+
+    @classmethod
+    def from_records(
+        cls, records: Sequence[Union[CompanyFinancialData, CompanyRecord, Mapping[str, object]]]
+    ) -> "CompanyBatch":
+        """Build a batch from CompanyFinancialData instances, CompanyRecords or plain dicts"""
+        rows = [r.model_dump() if isinstance(r, (CompanyFinancialData, CompanyRecord)) else r for r in records]
+        columns = {
+            name: np.fromiter((row[name] for row in rows), dtype=np.float64, count=len(rows))
+            for name in NUMERIC_FIELDS
+        }
+        return cls(
+            columns,
+            [row["company_name"] for row in rows],
+            [row["industry"] for row in rows]
+        )
+
+
+BatchInput = Union[CompanyBatch, "pd.DataFrame", Sequence[CompanyFinancialData]]
+
+
+def _is_dataframe(data: object) -> bool:
+    """isinstance check that does not import pandas: nothing can be a DataFrame before it is imported"""
+    pandas = sys.modules.get("pandas")
+    return pandas is not None and isinstance(data, pandas.DataFrame)
+
+
+class BatchAnalysisService:
+    """
+    Columnar counterpart of FinancialAnalysisService.
+
+    Evaluates the same metric graph with VectorOps: each calculate_* method
+    returns one array per metric, guard branches of the scalar service become
+    np.where masks, and a P/E that the scalar path reports as None is NaN here.
+    """
+
+    @staticmethod
+    def as_batch(data: BatchInput) -> CompanyBatch:
+        """Coerce a DataFrame or a sequence of records into a CompanyBatch"""
+        if isinstance(data, CompanyBatch):
+            return data
+        if _is_dataframe(data):
+            return CompanyBatch.from_dataframe(data)
+        return CompanyBatch.from_records(data)
+
+    @staticmethod
+    def calculate_metrics(data: CompanyBatch, metrics: Iterable[str]) -> MetricColumns:
+        """Calculate any subset of metrics or intermediates by name"""
+        names = list(dict.fromkeys(metrics))
+        values = metric_graph.evaluate(data, names, VECTOR_OPS)
+        return {name: _column(values[name], len(data)) for name in names}
+
+    @classmethod
+    def calculate_market_valuation_metrics(cls, data: CompanyBatch) -> MetricColumns:
+        """Calculate market and valuation metrics"""
+        return cls.calculate_metrics(data, FAMILY_METRICS["market_valuation_metrics"])
+
+    @classmethod
+    def calculate_growth_metrics(cls, data: CompanyBatch) -> MetricColumns:
+        """Calculate growth metrics"""
+        return cls.calculate_metrics(data, FAMILY_METRICS["growth_metrics"])
+
+    @classmethod
+    def calculate_profitability_metrics(cls, data: CompanyBatch) -> MetricColumns:
+        """Calculate profitability metrics"""
+        return cls.calculate_metrics(data, FAMILY_METRICS["profitability_metrics"])
+
+    @classmethod
+    def calculate_liquidity_metrics(cls, data: CompanyBatch) -> MetricColumns:
+        """Calculate liquidity metrics"""
+        return cls.calculate_metrics(data, FAMILY_METRICS["liquidity_metrics"])
+
+    @classmethod
+    def calculate_leverage_metrics(cls, data: CompanyBatch) -> MetricColumns:
+        """Calculate leverage metrics"""
+        return cls.calculate_metrics(data, FAMILY_METRICS["leverage_metrics"])
+
+    @classmethod
+    def perform_complete_analysis(cls, data: BatchInput) -> BatchMetrics:
+        """Perform complete financial analysis, keyed by result family"""
+
+        batch = cls.as_batch(data)
+        with FAMILY_DURATION.time(("vector", "complete_analysis")):
+            values = metric_graph.evaluate(batch, ALL_FAMILY_METRICS, VECTOR_OPS)
+        return {
+            family: {name: _column(values[name], len(batch)) for name in names}
+            for family, names in FAMILY_METRICS.items()
+        }
+
+    @staticmethod
+    def to_dicts(batch: CompanyBatch, metrics: BatchMetrics) -> List[dict]:
+        """Shape batch metrics as FinancialAnalysisResult dicts without building models"""
+
+        families = {}
+        for family, columns in metrics.items():
+            names = list(columns)
+            families[family] = [
+                {name: (None if math.isnan(value) else value) for name, value in zip(names, row)}
+                for row in zip(*(columns[name].tolist() for name in names))
+            ]
+
+        return [
+            {
+                "company_name": batch.company_names[i],
+                "industry": batch.industries[i],
+                **{family: rows[i] for family, rows in families.items()}
+            }
+            for i in range(len(batch))
+        ]
+
+    @classmethod
+    def analyze_to_dicts(cls, batch: CompanyBatch) -> List[dict]:
+        """Complete analysis as result dicts in one picklable call, so it can run in a worker process"""
+        return cls.to_dicts(batch, cls.perform_complete_analysis(batch))
+
+    @classmethod
+    def to_results(cls, batch: CompanyBatch, metrics: BatchMetrics) -> List[FinancialAnalysisResult]:
+        """Materialize batch metrics as FinancialAnalysisResult models"""
+        return [FinancialAnalysisResult.model_validate(row) for row in cls.to_dicts(batch, metrics)]
+
+    @staticmethod
+    def to_dataframe(batch: CompanyBatch, metrics: BatchMetrics) -> "pd.DataFrame":
+        """Flatten batch metrics to one row per company and one column per metric"""
+        import pandas as pd
+
+        frame = {"company_name": batch.company_names, "industry": batch.industries}
+        for columns in metrics.values():
+            frame.update(columns)
+        return pd.DataFrame(frame)
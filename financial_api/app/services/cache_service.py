@@ -0,0 +1,313 @@
+from app.config import settings
+from app.models.financial_models import CompanyFinancialData, FinancialAnalysisResult, SelectedMetricsResult
+from app.services.batch_service import METRIC_FAMILIES
+from app.services.financial_service import FinancialAnalysisService
+from app.services.metric_graph import FAMILY_METRICS
+from app.telemetry import registry
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pydantic import BaseModel
+from typing import Callable, Dict, Optional, Tuple, Type, TypeVar
+import hashlib
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Scalar service entry point per result family
+FAMILY_CALCULATORS: Dict[str, Callable[[CompanyFinancialData], BaseModel]] = {
+    "market_valuation_metrics": FinancialAnalysisService.calculate_market_valuation_metrics,
+    "growth_metrics": FinancialAnalysisService.calculate_growth_metrics,
+    "profitability_metrics": FinancialAnalysisService.calculate_profitability_metrics,
+    "liquidity_metrics": FinancialAnalysisService.calculate_liquidity_metrics,
+    "leverage_metrics": FinancialAnalysisService.calculate_leverage_metrics,
+}
+
+COMPLETE_ANALYSIS = "complete_analysis"
+METRIC_VALUES = "values"
+
+
+def payload_key(data: CompanyFinancialData) -> str:
+    """Canonical content hash of a company's field values"""
+    canonical = json.dumps(data.model_dump(), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SharedCacheBackend(ABC):
+    """
+    Byte-level cache shared between worker processes; values are serialized
+    result models. Errors raised by a backend are treated as cache misses.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """The value stored under key, or None"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        """Store a value that expires after ttl_seconds"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every value"""
+
+
+class InProcessSharedBackend(SharedCacheBackend):
+    """Local stand-in for a shared backend, for tests and single-worker setups"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl_seconds, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCacheBackend(SharedCacheBackend):
+    """Shared backend on Redis; requires the optional ``redis`` package"""
+
+    def __init__(self, url: str, prefix: str = "financial-api:"):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self._prefix + key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self._client.set(self._prefix + key, value, px=max(1, int(ttl_seconds * 1000)))
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self._prefix + "*"):
+            self._client.delete(key)
+
+
+class ResultCache:
+    """
+    In-process LRU cache with per-entry TTL, optionally backed by a shared
+    backend so several workers can reuse each other's results. A failing
+    backend (an outage, a timeout, a corrupt value) is logged and counted in
+    ``backend_errors``, and the lookup falls back to the local entries.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10_000,
+        ttl_seconds: float = 300.0,
+        shared_backend: Optional[SharedCacheBackend] = None
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.shared_backend = shared_backend
+        self._entries: "OrderedDict[str, Tuple[float, BaseModel]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.backend_errors = 0
+
+    def _backend_failed(self, operation: str, error: Exception) -> None:
+        logger.warning("Shared cache %s failed: %s", operation, error)
+        with self._lock:
+            self.backend_errors += 1
+
+    def get(self, key: str, model: Type[ModelT], record_miss: bool = True) -> Optional[ModelT]:
+        """Look up a result, falling back to the shared backend on a local miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+
+        if self.shared_backend is not None:
+            try:
+                payload = self.shared_backend.get(key)
+                value = model.model_validate_json(payload) if payload is not None else None
+            except Exception as e:
+                self._backend_failed("get", e)
+                value = None
+            if value is not None:
+                self._store(key, value)
+                with self._lock:
+                    self.shared_hits += 1
+                return value
+
+        if record_miss:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def set(self, key: str, value: BaseModel) -> None:
+        """Store a result locally and in the shared backend"""
+        self._store(key, value)
+        if self.shared_backend is not None:
+            try:
+                self.shared_backend.set(key, value.model_dump_json().encode("utf-8"), self.ttl_seconds)
+            except Exception as e:
+                self._backend_failed("set", e)
+
+    def get_or_compute(self, key: str, model: Type[ModelT], compute: Callable[[], ModelT]) -> ModelT:
+        value = self.get(key, model)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def _store(self, key: str, value: BaseModel) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.shared_backend is not None:
+            try:
+                self.shared_backend.clear()
+            except Exception as e:
+                self._backend_failed("clear", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "backend_errors": self.backend_errors,
+                "hit_ratio": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                "shared_backend": type(self.shared_backend).__name__ if self.shared_backend else None
+            }
+
+
+class CachedAnalysisService:
+    """
+    FinancialAnalysisService behind a ResultCache keyed by payload_key.
+
+    A family request is also answered from a cached complete analysis of the
+    same payload.
+    """
+
+    cache: Optional[ResultCache] = None
+
+    @classmethod
+    def perform_complete_analysis(
+        cls, data: CompanyFinancialData, key: Optional[str] = None
+    ) -> FinancialAnalysisResult:
+        """Perform complete financial analysis, reusing cached results"""
+        if cls.cache is None:
+            return FinancialAnalysisService.perform_complete_analysis(data)
+
+        key = key or payload_key(data)
+        return cls.cache.get_or_compute(
+            f"{COMPLETE_ANALYSIS}:{key}",
+            FinancialAnalysisResult,
+            lambda: FinancialAnalysisService.perform_complete_analysis(data)
+        )
+
+    @classmethod
+    def calculate_family(cls, family: str, data: CompanyFinancialData, key: Optional[str] = None) -> BaseModel:
+        """Calculate one metric family, reusing cached family or complete results"""
+        if cls.cache is None:
+            return FAMILY_CALCULATORS[family](data)
+
+        key = key or payload_key(data)
+        model = METRIC_FAMILIES[family]
+        cached = cls.cache.get(f"{family}:{key}", model, record_miss=False)
+        if cached is not None:
+            return cached
+
+        complete = cls.cache.get(f"{COMPLETE_ANALYSIS}:{key}", FinancialAnalysisResult)
+        value = getattr(complete, family) if complete is not None else FAMILY_CALCULATORS[family](data)
+        cls.cache.set(f"{family}:{key}", value)
+        return value
+
+    @classmethod
+    def analysis_values(
+        cls, data: CompanyFinancialData, family: Optional[str] = None, key: Optional[str] = None
+    ) -> SelectedMetricsResult:
+        """
+        Flat metric values of a complete analysis or one family, reusing cached
+        values; a family is also served from the cached complete values
+        """
+        if cls.cache is None:
+            return FinancialAnalysisService.calculate_values(data, family)
+
+        key = key or payload_key(data)
+        complete_key = f"{METRIC_VALUES}:{COMPLETE_ANALYSIS}:{key}"
+        if family is None:
+            return cls.cache.get_or_compute(
+                complete_key, SelectedMetricsResult, lambda: FinancialAnalysisService.calculate_values(data)
+            )
+
+        family_key = f"{METRIC_VALUES}:{family}:{key}"
+        cached = cls.cache.get(family_key, SelectedMetricsResult, record_miss=False)
+        if cached is not None:
+            return cached
+
+        complete = cls.cache.get(complete_key, SelectedMetricsResult)
+        if complete is not None:
+            value = SelectedMetricsResult(
+                company_name=complete.company_name,
+                industry=complete.industry,
+                metrics={name: complete.metrics[name] for name in FAMILY_METRICS[family]}
+            )
+        else:
+            value = FinancialAnalysisService.calculate_values(data, family)
+        cls.cache.set(family_key, value)
+        return value
+
+
+def build_result_cache() -> Optional[ResultCache]:
+    """Create the process-wide result cache from settings"""
+    if not settings.cache_enabled:
+        return None
+    shared_backend = RedisCacheBackend(settings.cache_redis_url) if settings.cache_redis_url else None
+    return ResultCache(settings.cache_max_size, settings.cache_ttl_seconds, shared_backend)
+
+
+CachedAnalysisService.cache = build_result_cache()
+
+
+def _cache_stat(name: str):
+    cache = CachedAnalysisService.cache
+    return [((), cache.stats()[name])] if cache is not None else []
+
+
+registry.gauge("financial_api_cache_entries", "Results held in the in-process cache", lambda: _cache_stat("size"))
+registry.gauge("financial_api_cache_hit_ratio", "Share of cache lookups served from a cache", lambda: _cache_stat("hit_ratio"))
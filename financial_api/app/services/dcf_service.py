@@ -0,0 +1,205 @@
+from app.models.financial_models import CompanyFinancialData, DCFAssumptions
+from app.services.batch_service import CompanyBatch
+from typing import Dict, List, Sequence
+import json
+import numpy as np
+
+# Share of current assets held as cash, as assumed by the cash ratio
+CASH_SHARE_OF_CURRENT_ASSETS = 0.1
+
+
+def _optional_rows(values: np.ndarray) -> list:
+    """Nested lists with None where a value is NaN or infinite"""
+    if np.isfinite(values).all():
+        return values.tolist()
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+class DCFService:
+    """
+    Discounted free cash flow valuation of many companies at once.
+
+    Free cash flow is projected through multi-stage growth, discounted at
+    WACC and completed with a Gordon growth or exit-multiple terminal value.
+    Discount factors depend only on the rates and the projection length, so
+    they are computed once per rate grid and shared by every company: the
+    present value of the projected flows is one matrix product, and terminal
+    values are an outer product of each company's final-year figure with a
+    rate x terminal factor table.
+    """
+
+    @staticmethod
+    def growth_path(stages, company_growth: np.ndarray) -> np.ndarray:
+        """Annual growth per company (rows) and projection year (columns)"""
+        years = []
+        for stage in stages:
+            start = company_growth if stage.growth is None else np.full(len(company_growth), stage.growth)
+            end = start if stage.growth_end is None else np.full(len(company_growth), stage.growth_end)
+            # Linear fade from the stage's first-year to its last-year growth
+            steps = np.linspace(0.0, 1.0, stage.years) if stage.years > 1 else np.zeros(1)
+            years.append(start[:, None] + (end - start)[:, None] * steps)
+        return np.hstack(years)
+
+    @staticmethod
+    def wacc(batch: CompanyBatch, assumptions: DCFAssumptions) -> np.ndarray:
+        """Per-company WACC: CAPM cost of equity and after-tax cost of debt weighted by market values"""
+        if assumptions.wacc is not None:
+            return np.full(len(batch), assumptions.wacc)
+        cost_of_equity = assumptions.risk_free_rate + assumptions.beta * assumptions.equity_risk_premium
+        cost_of_debt = assumptions.cost_of_debt * (1 - assumptions.tax_rate)
+        equity = batch.market_price_per_share * batch.shares_outstanding
+        debt = batch.total_debt
+        return (equity * cost_of_equity + debt * cost_of_debt) / (equity + debt)
+
+    @staticmethod
+    def discount_factors(rates: np.ndarray, years: int) -> np.ndarray:
+        """(1 + rate) ** -t for t = 1..years, with a trailing year axis"""
+        return (1 + rates[..., None]) ** -np.arange(1, years + 1)
+
+    @classmethod
+    def _project(cls, batch: CompanyBatch, assumptions: DCFAssumptions):
+        """Projected free cash flows and final-year EBITDA"""
+        growth = cls.growth_path(assumptions.stages, batch.eps_growth_percent / 100)
+        compounded = np.cumprod(1 + growth, axis=1)
+        cash_flows = batch.free_cash_flow[:, None] * compounded
+        ebitda = (batch.ebit + batch.depreciation + batch.amortization) * compounded[:, -1]
+        return cash_flows, ebitda
+
+    @classmethod
+    def _enterprise_values(
+        cls,
+        cash_flows: np.ndarray,
+        final_ebitda: np.ndarray,
+        rates: np.ndarray,
+        terminals: np.ndarray,
+        method: str
+    ):
+        """
+        Present values of the projected flows (companies x rates) and of the
+        terminal value (companies x rates x terminals). ``rates`` is either
+        one row shared by every company or one row per company.
+        """
+        factors = cls.discount_factors(rates, cash_flows.shape[1])
+        if len(rates) == 1:
+            pv_cash_flows = cash_flows @ factors[0].T
+        else:
+            pv_cash_flows = np.einsum("cn,cwn->cw", cash_flows, factors)
+
+        final_factor = factors[..., -1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if method == "gordon":
+                # Undefined unless the discount rate exceeds the perpetual growth
+                spread = rates[..., None] - terminals
+                multiple = np.where(spread > 0, (1 + terminals) / spread, np.nan) * final_factor
+                final = cash_flows[:, -1]
+            else:
+                multiple = terminals * final_factor
+                final = final_ebitda
+        return pv_cash_flows, final[:, None, None] * multiple
+
+    @classmethod
+    def value(cls, batch: CompanyBatch, assumptions: DCFAssumptions) -> Dict[str, np.ndarray]:
+        """
+        Valuation columns of every company at the base assumptions and, when
+        a grid is given, ``sensitivity``: value per share by rate and terminal
+        assumption (companies x rates x terminals)
+        """
+        cash_flows, final_ebitda = cls._project(batch, assumptions)
+        wacc = cls.wacc(batch, assumptions)
+        base_terminal = assumptions.terminal_growth if assumptions.terminal_method == "gordon" else assumptions.exit_multiple
+        net_debt = batch.total_debt - CASH_SHARE_OF_CURRENT_ASSETS * batch.current_assets
+        shares = batch.shares_outstanding
+
+        rates = wacc[:1, None] if assumptions.wacc is not None else wacc[:, None]
+        pv_cash_flows, pv_terminal = cls._enterprise_values(
+            cash_flows, final_ebitda, rates, np.array([base_terminal]), assumptions.terminal_method
+        )
+        pv_cash_flows, pv_terminal = pv_cash_flows[:, 0], pv_terminal[:, 0, 0]
+        enterprise_value = pv_cash_flows + pv_terminal
+        equity_value = enterprise_value - net_debt
+        value_per_share = equity_value / shares
+        with np.errstate(divide="ignore", invalid="ignore"):
+            terminal_share = pv_terminal / enterprise_value
+        columns = {
+            "wacc": wacc,
+            "pv_cash_flows": pv_cash_flows,
+            "pv_terminal_value": pv_terminal,
+            "enterprise_value": enterprise_value,
+            "equity_value": equity_value,
+            "value_per_share": value_per_share,
+            "upside": value_per_share / batch.market_price_per_share - 1,
+            "terminal_value_share": terminal_share,
+        }
+
+        if assumptions.wacc_grid is not None or assumptions.terminal_grid is not None:
+            grid_rates = rates if assumptions.wacc_grid is None else np.asarray([assumptions.wacc_grid])
+            terminals = np.asarray(assumptions.terminal_grid or [base_terminal], dtype=np.float64)
+            grid_pv_cash_flows, table = cls._enterprise_values(
+                cash_flows, final_ebitda, grid_rates, terminals, assumptions.terminal_method
+            )
+            # Value per share in place: the table is the largest array of a universe-wide run
+            table += grid_pv_cash_flows[:, :, None]
+            table -= net_debt[:, None, None]
+            table /= shares[:, None, None]
+            columns["sensitivity"] = table
+        return columns
+
+    @classmethod
+    def analyze(cls, companies: Sequence[CompanyFinancialData], assumptions: DCFAssumptions) -> dict:
+        """DCFResult-shaped valuations of companies in request order"""
+        return cls.analyze_batch(CompanyBatch.from_records(companies), assumptions)
+
+    @classmethod
+    def analyze_batch(cls, batch: CompanyBatch, assumptions: DCFAssumptions) -> dict:
+        """DCFResult-shaped valuations of a batch's companies"""
+        columns = cls.value(batch, assumptions)
+        table = columns.pop("sensitivity", None)
+        names = list(columns)
+        rows = zip(*(_optional_rows(columns[name]) for name in names))
+        valuations: List[dict] = []
+        for i, values in enumerate(rows):
+            valuation = {"company_name": batch.company_names[i], "industry": batch.industries[i]}
+            valuation.update(zip(names, values))
+            valuation["sensitivity"] = None
+            valuations.append(valuation)
+        if table is not None:
+            for valuation, company_table in zip(valuations, _optional_rows(table)):
+                valuation["sensitivity"] = company_table
+        return {
+            "wacc_grid": assumptions.wacc_grid,
+            "terminal_grid": assumptions.terminal_grid,
+            "valuations": valuations,
+        }
+
+    @classmethod
+    def analyze_arrow(cls, companies: Sequence[CompanyFinancialData], assumptions: DCFAssumptions) -> bytes:
+        """
+        Valuations as an Arrow IPC stream: one row per company, one float64
+        column per DCFValuation field and, with a grid, ``sensitivity`` as a
+        fixed-size list of the row-major rate x terminal table. The grid axes
+        are in the schema metadata. Nothing is converted to Python objects,
+        so universe-wide tables stay fast.
+        """
+        import pyarrow as pa
+
+        batch = CompanyBatch.from_records(companies)
+        columns = cls.value(batch, assumptions)
+        table = columns.pop("sensitivity", None)
+        arrays = [pa.array(batch.company_names, pa.string()), pa.array(batch.industries, pa.string())]
+        names = ["company_name", "industry"]
+        for name, column in columns.items():
+            arrays.append(pa.array(np.ascontiguousarray(column)))
+            names.append(name)
+        if table is not None:
+            arrays.append(pa.FixedSizeListArray.from_arrays(pa.array(table.reshape(-1)), table.shape[1] * table.shape[2]))
+            names.append("sensitivity")
+        metadata = {
+            "wacc_grid": json.dumps(assumptions.wacc_grid),
+            "terminal_grid": json.dumps(assumptions.terminal_grid),
+        }
+        record_batch = pa.RecordBatch.from_arrays(arrays, names=names).replace_schema_metadata(metadata)
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, record_batch.schema) as writer:
+            writer.write_batch(record_batch)
+        return sink.getvalue().to_pybytes()
@@ -0,0 +1,211 @@
+from app.config import settings
+from app.telemetry import registry
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional, TypeVar
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+
+T = TypeVar("T")
+
+BACKENDS = ("inline", "thread", "process")
+
+
+class ExecutorTimeoutError(Exception):
+    """Raised when dispatched work does not finish within its timeout"""
+
+
+class ClientDisconnectedError(Exception):
+    """Raised when the client of a request goes away while its work is pending"""
+
+
+def _warm_worker() -> None:
+    """Import the analysis services and prime their plan caches in a new worker"""
+    from app.services.batch_service import BatchAnalysisService, CompanyBatch
+    from app.services.financial_service import FinancialAnalysisService
+
+    BatchAnalysisService.analyze_to_dicts(CompanyBatch.from_records([FinancialAnalysisService.get_sample_data()]))
+
+
+class AnalysisExecutor:
+    """
+    Runs CPU-bound analysis off the event loop.
+
+    The backend is ``inline`` (call directly), ``thread`` (thread pool) or
+    ``process`` (pool of warm worker processes, so one instance can use
+    every core). Work smaller than ``inline_threshold`` rows always runs
+    inline, where dispatch would cost more than the analysis itself.
+
+    Process workers can only be given picklable, module-level callables and
+    arguments.
+    """
+
+    def __init__(
+        self,
+        backend: str = "thread",
+        max_workers: Optional[int] = None,
+        inline_threshold: int = 500,
+        timeout_seconds: Optional[float] = 120.0,
+        disconnect_poll_interval: float = 0.1
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported executor backend: {backend}. Expected one of: {', '.join(BACKENDS)}")
+        self.backend = backend
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.inline_threshold = inline_threshold
+        self.timeout_seconds = timeout_seconds
+        self.disconnect_poll_interval = disconnect_poll_interval
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.submitted = 0
+        self.inline = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.backend == "process":
+                    # Forking a process that runs an event loop and threads is unsafe
+                    self._pool = ProcessPoolExecutor(
+                        self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_warm_worker
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="analysis")
+            return self._pool
+
+    def start(self) -> None:
+        """Create the pool and, for processes, start every worker before the first request"""
+        if self.backend == "inline":
+            return
+        pool = self._get_pool()
+        if self.backend == "process":
+            wait([pool.submit(_warm_worker) for _ in range(self.max_workers)])
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _finished(self, future: Future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if future.cancelled():
+                return
+            if future.exception() is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    async def _watch_disconnect(self, request) -> None:
+        while not await request.is_disconnected():
+            await asyncio.sleep(self.disconnect_poll_interval)
+
+    async def run(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        size: Optional[int] = None,
+        request=None,
+        timeout: Optional[float] = ...
+    ) -> T:
+        """
+        Run ``func(*args)`` on the configured backend.
+
+        ``size`` is the number of rows the call handles (None for unknown,
+        which always dispatches). When ``request`` is given, the work is
+        cancelled if its client disconnects; ``request`` must not be used to
+        read a body concurrently. Work that has already started in a worker
+        runs to completion, but its result is discarded.
+        """
+        if self.backend == "inline" or (size is not None and size < self.inline_threshold):
+            with self._lock:
+                self.inline += 1
+            return func(*args)
+
+        timeout = self.timeout_seconds if timeout is ... else timeout
+        future = self._get_pool().submit(functools.partial(func, *args))
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        future.add_done_callback(self._finished)
+
+        result = asyncio.wrap_future(future)
+        watcher = asyncio.ensure_future(self._watch_disconnect(request)) if request is not None else None
+        try:
+            done, _ = await asyncio.wait(
+                {result} if watcher is None else {result, watcher},
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if result in done:
+                return result.result()
+            if watcher is not None and watcher in done:
+                self._cancel(future)
+                raise ClientDisconnectedError("Client disconnected before the analysis finished")
+            self._cancel(future, timed_out=True)
+            raise ExecutorTimeoutError(f"Analysis did not finish within {timeout}s")
+        except asyncio.CancelledError:
+            self._cancel(future)
+            raise
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+    def _cancel(self, future: Future, timed_out: bool = False) -> None:
+        future.cancel()
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.cancelled += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "max_workers": self.max_workers,
+                "inline_threshold": self.inline_threshold,
+                "in_flight": self.in_flight,
+                # Submitted work not yet picked up by a worker
+                "queue_depth": max(0, self.in_flight - self.max_workers),
+                "max_in_flight": self.max_in_flight,
+                "submitted": self.submitted,
+                "inline": self.inline,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "cancelled": self.cancelled,
+            }
+
+
+def build_analysis_executor() -> AnalysisExecutor:
+    """Create the process-wide executor from settings"""
+    return AnalysisExecutor(
+        settings.executor_backend,
+        settings.executor_workers or None,
+        settings.executor_inline_threshold,
+        settings.executor_timeout_seconds or None
+    )
+
+
+analysis_executor = build_analysis_executor()
+
+registry.gauge(
+    "financial_api_executor_in_flight", "Analysis work submitted to the executor and not finished",
+    lambda: [((), analysis_executor.in_flight)]
+)
+registry.gauge(
+    "financial_api_executor_queue_depth", "Submitted analysis work waiting for a free worker",
+    lambda: [((), analysis_executor.stats()["queue_depth"])]
+)
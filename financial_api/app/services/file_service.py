@@ -0,0 +1,207 @@
+from app.services.batch_service import (
+    BatchAnalysisService,
+    CompanyBatch,
+    METRIC_FAMILIES,
+    NUMERIC_FIELDS
+)
+from app.services.validation_service import company_validator
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterator, Optional, Union
+import numpy as np
+import os
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+INPUT_FORMATS = ("csv", "parquet")
+OUTPUT_FORMATS = ("csv", "parquet", "arrow")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+_EXTENSIONS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+
+INPUT_COLUMNS = ("company_name", "industry") + NUMERIC_FIELDS
+
+# One column per metric of every FinancialAnalysisResult family
+OUTPUT_COLUMNS = ("company_name", "industry") + tuple(
+    name for model in METRIC_FAMILIES.values() for name in model.model_fields
+)
+
+# Metrics files also flag rows rejected by the CompanyFinancialData constraints
+FILE_OUTPUT_COLUMNS = OUTPUT_COLUMNS + ("error",)
+
+_LABEL_COLUMNS = ("company_name", "industry", "error")
+
+Source = Union[str, os.PathLike, BinaryIO]
+
+
+def detect_format(filename: str, allowed=OUTPUT_FORMATS) -> str:
+    """Infer the file format from a file name extension"""
+    fmt = _EXTENSIONS.get(os.path.splitext(filename or "")[1].lower())
+    if fmt not in allowed:
+        raise ValueError(
+            f"Cannot infer a supported format from '{filename}', expected one of: {', '.join(allowed)}"
+        )
+    return fmt
+
+
+class FileAnalysisService:
+    """Chunked analysis of CSV/Parquet fundamentals files"""
+
+    @staticmethod
+    def iter_input_chunks(source: Source, input_format: str, chunk_size: int) -> Iterator["pd.DataFrame"]:
+        """Read a CSV or Parquet file as DataFrames of at most chunk_size rows"""
+
+        if input_format == "csv":
+            import pandas as pd
+
+            reader = pd.read_csv(
+                source,
+                usecols=lambda column: column in INPUT_COLUMNS,
+                dtype={"company_name": str, "industry": str},
+                chunksize=chunk_size
+            )
+            with reader:
+                yield from reader
+        elif input_format == "parquet":
+            import pyarrow.parquet as pq
+
+            parquet_file = pq.ParquetFile(source)
+            columns = [name for name in INPUT_COLUMNS if name in parquet_file.schema_arrow.names]
+            for record_batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+                yield record_batch.to_pandas()
+        else:
+            raise ValueError(f"Unsupported input format: {input_format}")
+
+    @staticmethod
+    def analyze_chunk(df: "pd.DataFrame") -> "pd.DataFrame":
+        """
+        Analyze one input chunk into one row per company and one column per metric.
+
+        Rows are checked against the CompanyFinancialData field constraints
+        first. A rejected row (a bound not met, or a missing or non-numeric
+        cell) keeps its place with NaN metrics and an ``error`` naming the
+        failing fields; ``error`` is empty for analyzed rows.
+        """
+        import pandas as pd
+
+        missing = [name for name in INPUT_COLUMNS if name not in df]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+        size = len(df)
+        columns = {
+            name: (df[name] if pd.api.types.is_float_dtype(df[name])
+                   else pd.to_numeric(df[name], errors="coerce")).to_numpy(dtype=np.float64)
+            for name in NUMERIC_FIELDS
+        }
+        labels = {name: df[name].to_numpy(dtype=object) for name in ("company_name", "industry")}
+        errors = company_validator.validate_columns({**columns, **labels}, size)
+        valid = errors == 0
+
+        batch = CompanyBatch(
+            {name: column[valid] for name, column in columns.items()},
+            labels["company_name"][valid].tolist(),
+            labels["industry"][valid].tolist()
+        )
+        metrics = BatchAnalysisService.perform_complete_analysis(batch)
+
+        frame = {
+            name: [value if type(value) is str else None for value in column.tolist()]
+            for name, column in labels.items()
+        }
+        for family in metrics.values():
+            for name, values in family.items():
+                column = np.full(size, np.nan)
+                column[valid] = values
+                frame[name] = column
+        frame["error"] = [
+            None if not mask else "validation_error: " + ", ".join(company_validator.failed_fields(mask))
+            for mask in errors
+        ]
+        return pd.DataFrame(frame, columns=FILE_OUTPUT_COLUMNS)
+
+    @classmethod
+    def analyze_file(
+        cls,
+        source: Source,
+        destination: Union[str, os.PathLike, BinaryIO],
+        input_format: str,
+        output_format: str,
+        chunk_size: int = 100_000,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> int:
+        """
+        Analyze a fundamentals file chunk by chunk and write the metrics file,
+        returning the row count; ``progress`` is called with the rows written
+        so far after each chunk
+        """
+
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+
+        writer = _ResultWriter(destination, output_format)
+        rows = 0
+        try:
+            for chunk in cls.iter_input_chunks(source, input_format, chunk_size):
+                result = cls.analyze_chunk(chunk)
+                writer.write(result)
+                rows += len(result)
+                if progress is not None:
+                    progress(rows)
+        finally:
+            writer.close()
+        return rows
+
+
+class _ResultWriter:
+    """Incremental CSV / Parquet / Arrow IPC file writer"""
+
+    def __init__(self, destination, output_format: str):
+        self.output_format = output_format
+        self._owns_handle = isinstance(destination, (str, os.PathLike))
+        self._handle = open(destination, "wb") if self._owns_handle else destination
+        self._writer = None
+        self._schema = None
+
+    def write(self, df: "pd.DataFrame") -> None:
+        import pyarrow as pa
+
+        if self._writer is None:
+            self._schema = pa.schema([
+                (name, pa.string() if name in _LABEL_COLUMNS else pa.float64())
+                for name in FILE_OUTPUT_COLUMNS
+            ])
+            if self.output_format == "csv":
+                import pyarrow.csv as pa_csv
+                self._writer = pa_csv.CSVWriter(self._handle, self._schema)
+            elif self.output_format == "parquet":
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self._handle, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self._handle, self._schema)
+        self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+
+    def close(self) -> None:
+        try:
+            if self._writer is None:
+                import pandas as pd
+
+                # An empty input still produces a file with the output columns
+                self.write(pd.DataFrame({
+                    name: pd.Series(dtype=object if name in _LABEL_COLUMNS else "float64")
+                    for name in FILE_OUTPUT_COLUMNS
+                }))
+            self._writer.close()
+        finally:
+            if self._owns_handle:
+                self._handle.close()
@@ -0,0 +1,517 @@
+from app.models.financial_models import DCFAssumptions, ScenarioRequest
+from app.services.batch_service import BatchAnalysisService, ndjson_line
+from app.services.dcf_service import DCFService
+from app.services.file_service import FileAnalysisService
+from app.services.scenario_service import ScenarioAnalysisService
+from app.services.validation_service import company_validator
+from app.telemetry import registry
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import glob
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+PRIORITIES = {"low": 0, "normal": 1, "high": 2}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+FINISHED = ("succeeded", "failed", "cancelled")
+
+DATABASE = "jobs.sqlite3"
+# Job store path that keeps the database in memory and files in a temporary directory
+MEMORY = ":memory:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result_rows INTEGER,
+    result_file TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, seq);
+CREATE TABLE IF NOT EXISTS job_params (
+    job_id TEXT PRIMARY KEY,
+    params BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (job_id, start)
+);
+"""
+
+_STATUS_COLUMNS = (
+    "id, kind, priority, status, created_at, started_at, finished_at, done, total, "
+    "cancel_requested, error, result_rows, result_file"
+)
+
+JOBS_FINISHED = registry.counter(
+    "financial_api_jobs_finished", "Background jobs that finished, by kind and final status", ("kind", "status")
+)
+
+
+class JobCancelledError(Exception):
+    """Raised inside a running job once it has been cancelled"""
+
+
+class JobInterruptedError(Exception):
+    """Raised inside a running job when the server shuts down; the job is queued again"""
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _timestamp(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+
+
+def _status(row: sqlite3.Row) -> Dict[str, Any]:
+    """JobStatus-shaped dict of a jobs row"""
+    done, total = row["done"], row["total"]
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "priority": PRIORITY_NAMES[row["priority"]],
+        "status": row["status"],
+        "progress": {
+            "done": done,
+            "total": total,
+            "fraction": min(1.0, done / total) if total else (1.0 if total == 0 else None),
+        },
+        "created_at": _timestamp(row["created_at"]),
+        "started_at": _timestamp(row["started_at"]),
+        "finished_at": _timestamp(row["finished_at"]),
+        "cancel_requested": bool(row["cancel_requested"]),
+        "error": row["error"],
+        "result_rows": row["result_rows"],
+    }
+
+
+class JobStore:
+    """
+    Job records, parameters and results in SQLite.
+
+    Results are appended one chunk at a time as NDJSON lines, keyed by the
+    index of their first record, so a page is read from the few chunks it
+    overlaps. Uploaded inputs and result files live next to the database.
+    With the ``MEMORY`` path the database is in memory and files go to a
+    temporary directory, so nothing survives a restart.
+    """
+
+    def __init__(self, path: str):
+        self._temporary = None
+        if path == MEMORY:
+            self._temporary = tempfile.TemporaryDirectory(prefix="financial-api-jobs-")
+            self.directory = self._temporary.name
+            database = MEMORY
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.directory = path
+            database = os.path.join(path, DATABASE)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(database, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        if self._temporary is None:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _query(self, sql: str, parameters: Tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, parameters).fetchall()
+
+    def file_path(self, job_id: str, name: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.{name}")
+
+    def _remove_files(self, job_id: str, keep: Optional[str] = None) -> None:
+        for path in glob.glob(os.path.join(self.directory, f"{job_id}.*")):
+            if path != keep:
+                os.unlink(path)
+
+    def submit(self, job_id: str, kind: str, priority: str, params: bytes, total: Optional[int]) -> Dict[str, Any]:
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, priority, status, created_at, total) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, PRIORITIES[priority], time.time(), total)
+            )
+            db.execute("INSERT INTO job_params (job_id, params) VALUES (?, ?)", (job_id, params))
+            return _status(db.execute(f"SELECT {_STATUS_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def claim(self) -> Optional[Tuple[str, str, bytes]]:
+        """Mark the next queued job (highest priority, then oldest) running; returns its id, kind and parameters"""
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT id, kind FROM jobs WHERE status = 'queued' ORDER BY priority DESC, seq LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, done = 0 WHERE id = ?", (time.time(), row["id"])
+            )
+            params = db.execute("SELECT params FROM job_params WHERE job_id = ?", (row["id"],)).fetchone()["params"]
+            return row["id"], row["kind"], params
+
+    def requeue_running(self) -> int:
+        """Queue again the jobs a previous process left running, dropping their partial results"""
+        with self._transaction() as db:
+            ids = [row["id"] for row in db.execute("SELECT id FROM jobs WHERE status = 'running'")]
+            for job_id in ids:
+                self._reset(db, job_id)
+        return len(ids)
+
+    def requeue(self, job_id: str) -> None:
+        with self._transaction() as db:
+            self._reset(db, job_id)
+
+    def _reset(self, db: sqlite3.Connection, job_id: str) -> None:
+        db.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+        db.execute(
+            "UPDATE jobs SET status = CASE WHEN cancel_requested THEN 'cancelled' ELSE 'queued' END, "
+            "started_at = NULL, finished_at = CASE WHEN cancel_requested THEN ? END, done = 0 WHERE id = ?",
+            (time.time(), job_id)
+        )
+
+    def progress(self, job_id: str, done: int, total: Optional[int] = None) -> bool:
+        """Record progress; returns whether the job has been asked to cancel"""
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET done = ?, total = COALESCE(?, total) WHERE id = ?", (done, total, job_id))
+            return bool(db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()[0])
+
+    def add_results(self, job_id: str, start: int, lines: List[bytes]) -> None:
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO job_results (job_id, start, count, data) VALUES (?, ?, ?, ?)",
+                (job_id, start, len(lines), b"".join(lines))
+            )
+
+    def finish(
+        self, job_id: str, status: str, error: Optional[str] = None,
+        result_rows: Optional[int] = None, result_file: Optional[str] = None
+    ) -> None:
+        with self._transaction() as db:
+            if status != "succeeded":
+                db.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ?, result_rows = ?, result_file = ? WHERE id = ?",
+                (status, time.time(), error, result_rows, result_file, job_id)
+            )
+            # Inputs are no longer needed once a job is over
+            db.execute("DELETE FROM job_params WHERE job_id = ?", (job_id,))
+        self._remove_files(job_id, keep=result_file)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued job now, or ask a running one to stop at its next chunk"""
+        with self._transaction() as db:
+            row = db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["status"] == "queued":
+                db.execute(
+                    "UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ? WHERE id = ?",
+                    (time.time(), job_id)
+                )
+                db.execute("DELETE FROM job_params WHERE job_id = ?", (job_id,))
+            elif row["status"] == "running":
+                db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            status = _status(db.execute(f"SELECT {_STATUS_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone())
+        if status["status"] == "cancelled":
+            self._remove_files(job_id)
+        return status
+
+    def delete(self, job_id: str) -> Optional[bool]:
+        """Remove a finished job and its results; None if unknown, False if it has not finished"""
+        with self._transaction() as db:
+            row = db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["status"] not in FINISHED:
+                return False
+            db.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            db.execute("DELETE FROM job_params WHERE job_id = ?", (job_id,))
+            db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        self._remove_files(job_id)
+        return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(f"SELECT {_STATUS_COLUMNS} FROM jobs WHERE id = ?", (job_id,))
+        return _status(rows[0]) if rows else None
+
+    def result_file(self, job_id: str) -> Optional[str]:
+        rows = self._query("SELECT result_file FROM jobs WHERE id = ?", (job_id,))
+        return rows[0]["result_file"] if rows else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent jobs first"""
+        if status is None:
+            rows = self._query(f"SELECT {_STATUS_COLUMNS} FROM jobs ORDER BY seq DESC LIMIT ?", (limit,))
+        else:
+            rows = self._query(
+                f"SELECT {_STATUS_COLUMNS} FROM jobs WHERE status = ? ORDER BY seq DESC LIMIT ?", (status, limit)
+            )
+        return [_status(row) for row in rows]
+
+    def results(self, job_id: str, offset: int, limit: int) -> List[bytes]:
+        """Encoded result records ``offset`` to ``offset + limit``, without line endings"""
+        rows = self._query(
+            "SELECT start, data FROM job_results WHERE job_id = ? AND start < ? AND start + count > ? ORDER BY start",
+            (job_id, offset + limit, offset)
+        )
+        records = []
+        for row in rows:
+            lines = row["data"].splitlines()
+            records.extend(lines[max(0, offset - row["start"]):offset + limit - row["start"]])
+        return records
+
+    def iter_results(self, job_id: str) -> Iterator[bytes]:
+        """Every result chunk as NDJSON, one query per chunk"""
+        start = -1
+        while True:
+            rows = self._query(
+                "SELECT start, data FROM job_results WHERE job_id = ? AND start > ? ORDER BY start LIMIT 1",
+                (job_id, start)
+            )
+            if not rows:
+                return
+            start = rows[0]["start"]
+            yield rows[0]["data"]
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._query("SELECT status, COUNT(*) AS jobs FROM jobs GROUP BY status")
+        return {row["status"]: row["jobs"] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+        if self._temporary is not None:
+            self._temporary.cleanup()
+
+
+class _JobContext:
+    """What a running job reports through: progress checkpoints and result chunks"""
+
+    __slots__ = ("manager", "job_id", "rows")
+
+    def __init__(self, manager: "JobManager", job_id: str):
+        self.manager = manager
+        self.job_id = job_id
+        self.rows = 0
+
+    def checkpoint(self, done: int, total: Optional[int] = None) -> None:
+        """Record progress, and stop the job here if it was cancelled or the server is stopping"""
+        if self.manager.stopping:
+            raise JobInterruptedError(self.job_id)
+        if self.manager.store.progress(self.job_id, done, total):
+            raise JobCancelledError(self.job_id)
+
+    def write(self, records: List[dict]) -> None:
+        """Append result records, encoded as the batch endpoint's NDJSON lines"""
+        lines = [ndjson_line(record) for record in records]
+        self.manager.store.add_results(self.job_id, self.rows, lines)
+        self.rows += len(records)
+
+
+def _validated_chunks(context: _JobContext, records: List[dict], chunk_size: int):
+    """
+    Bulk-validate records chunk by chunk, writing error records for rejected
+    rows; yields each chunk's valid batch, input indices and error records
+    """
+    total = len(records)
+    for start in range(0, total, chunk_size):
+        context.checkpoint(start, total)
+        validated = company_validator.validate_records(records[start:start + chunk_size])
+        errors = {
+            start + row: {"index": start + row, "error": "validation_error", "detail": validated.row_errors(row)}
+            for row in validated.invalid.tolist()
+        }
+        yield validated.batch, [start + row for row in validated.indices.tolist()], errors
+    context.checkpoint(total, total)
+
+
+def _write_in_order(context: _JobContext, results: Dict[int, dict]) -> None:
+    context.write([results[index] for index in sorted(results)])
+
+
+def _run_batch(context: _JobContext, params: dict) -> Tuple[int, Optional[str]]:
+    for batch, indices, records in _validated_chunks(context, params["companies"], params["chunk_size"]):
+        if indices:
+            for index, result in zip(indices, BatchAnalysisService.analyze_to_dicts(batch)):
+                records[index] = {"index": index, "result": result}
+        _write_in_order(context, records)
+    return context.rows, None
+
+
+def _run_dcf(context: _JobContext, params: dict) -> Tuple[int, Optional[str]]:
+    assumptions = DCFAssumptions.model_validate(params["assumptions"])
+    for batch, indices, records in _validated_chunks(context, params["companies"], params["chunk_size"]):
+        if indices:
+            valuations = DCFService.analyze_batch(batch, assumptions)["valuations"]
+            for index, valuation in zip(indices, valuations):
+                records[index] = {"index": index, "result": valuation}
+        _write_in_order(context, records)
+    return context.rows, None
+
+
+def _run_scenarios(context: _JobContext, params: dict) -> Tuple[int, Optional[str]]:
+    request = ScenarioRequest.model_validate(params["scenario"])
+    context.checkpoint(0, ScenarioAnalysisService.scenario_count(request))
+    context.write([ScenarioAnalysisService.analyze(request, progress=context.checkpoint)])
+    return context.rows, None
+
+
+def _run_file(context: _JobContext, params: dict) -> Tuple[int, Optional[str]]:
+    output_path = context.manager.store.file_path(context.job_id, f"result.{params['output_format']}")
+    context.checkpoint(0)
+    rows = FileAnalysisService.analyze_file(
+        params["input_file"], output_path, params["input_format"], params["output_format"], params["chunk_size"],
+        progress=context.checkpoint
+    )
+    return rows, output_path
+
+
+# Job kind -> runner returning the result row count and result file, if any
+RUNNERS: Dict[str, Callable[[_JobContext, dict], Tuple[int, Optional[str]]]] = {
+    "batch": _run_batch,
+    "dcf": _run_dcf,
+    "scenarios": _run_scenarios,
+    "file": _run_file,
+}
+
+
+class JobManager:
+    """
+    Background analysis jobs on a bounded pool of worker threads.
+
+    Each of ``concurrency`` workers claims the next queued job by priority
+    and age and runs it in a thread. Jobs report progress between chunks,
+    which is also where a cancellation, or a shutdown, takes effect. A job
+    interrupted by a shutdown (or a crash) is queued again when the store is
+    next opened, with its partial results dropped.
+    """
+
+    # Seconds a worker waits for a submission before looking at the queue again
+    POLL_INTERVAL = 1.0
+
+    def __init__(self):
+        self.store: Optional[JobStore] = None
+        self.concurrency = 0
+        self.stopping = False
+        self.requeued = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._workers: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self.store is not None
+
+    def start(self, path: str, concurrency: int = 2) -> None:
+        """Open the store, queue again interrupted jobs and start the workers; needs a running event loop"""
+        self.store = JobStore(path)
+        self.requeued = self.store.requeue_running()
+        self.concurrency = max(1, concurrency)
+        self.stopping = False
+        self._pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix="jobs")
+        self._wake = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def shutdown(self) -> None:
+        """Stop the workers; running jobs stop at their next checkpoint and are queued again"""
+        if self.store is None:
+            return
+        self.stopping = True
+        self._wake.set()
+        await asyncio.gather(*self._workers)
+        self._pool.shutdown(wait=True)
+        self.store.close()
+        self.store = None
+        self._workers = []
+
+    def submit(
+        self, kind: str, priority: str, params: dict, total: Optional[int] = None, job_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        status = self.store.submit(job_id or new_job_id(), kind, priority, json.dumps(params).encode("utf-8"), total)
+        self._wake.set()
+        return status
+
+    async def _work(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self.stopping:
+            # Clear before looking, so a submission made after the claim still wakes this worker
+            self._wake.clear()
+            claimed = self.store.claim()
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await loop.run_in_executor(self._pool, self._execute, *claimed)
+
+    def _execute(self, job_id: str, kind: str, params: bytes) -> None:
+        context = _JobContext(self, job_id)
+        try:
+            rows, result_file = RUNNERS[kind](context, json.loads(params))
+        except JobInterruptedError:
+            self.store.requeue(job_id)
+            return
+        except JobCancelledError:
+            self.store.finish(job_id, "cancelled")
+            status = "cancelled"
+        except Exception as e:
+            self.store.finish(job_id, "failed", error=str(e))
+            status = "failed"
+        else:
+            self.store.finish(job_id, "succeeded", result_rows=rows, result_file=result_file)
+            status = "succeeded"
+        JOBS_FINISHED.inc((kind, status))
+
+    def stats(self) -> Dict[str, Any]:
+        if self.store is None:
+            return {"running": False}
+        return {
+            "running": True,
+            "concurrency": self.concurrency,
+            "requeued_at_start": self.requeued,
+            "jobs": self.store.counts(),
+        }
+
+
+job_manager = JobManager()
+
+
+def _job_counts():
+    if job_manager.store is None:
+        return []
+    return [((status,), count) for status, count in job_manager.store.counts().items()]
+
+
+registry.gauge("financial_api_jobs", "Background jobs by status", _job_counts, ("status",))
@@ -0,0 +1,170 @@
+from app.services.snapshot_service import FundamentalsSnapshotStore, snapshot_store
+from app.telemetry import registry
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+import asyncio
+
+MetricValues = Dict[str, Optional[float]]
+
+
+class SlowConsumerError(Exception):
+    """Raised when a subscriber does not accept a message within the send timeout"""
+
+
+class Subscriber:
+    """
+    One live connection: its subscriptions, the metrics it last received and
+    the updates waiting to be sent.
+
+    Pending updates are kept per ticker and overwritten by newer ticks, so a
+    consumer that falls behind receives the latest values once instead of a
+    growing backlog; memory is bounded by the number of subscriptions.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+        coalesce_interval: float = 0.05,
+        send_timeout: float = 5.0,
+        max_control_messages: int = 100
+    ):
+        self.send = send
+        self.coalesce_interval = coalesce_interval
+        self.send_timeout = send_timeout
+        self.tickers: Set[str] = set()
+        self._last_sent: Dict[str, MetricValues] = {}
+        self._pending: Dict[str, MetricValues] = {}
+        self._control: Deque[Dict[str, Any]] = deque(maxlen=max_control_messages)
+        self._wake = asyncio.Event()
+        self.messages_sent = 0
+        self.updates_coalesced = 0
+
+    def offer(self, ticker: str, metrics: MetricValues) -> None:
+        """Queue the latest metrics of a ticker without blocking"""
+        if ticker in self._pending:
+            self.updates_coalesced += 1
+        self._pending[ticker] = metrics
+        self._wake.set()
+
+    def push(self, message: Dict[str, Any]) -> None:
+        """Queue a control message (snapshot, error, ...), sent before valuation updates"""
+        self._control.append(message)
+        self._wake.set()
+
+    def set_baseline(self, metrics: Mapping[str, MetricValues]) -> None:
+        """Record values the client already has, so later updates only carry changes"""
+        for ticker, values in metrics.items():
+            self._last_sent[ticker] = dict(values)
+            self._pending.pop(ticker, None)
+
+    def forget(self, tickers: Iterable[str]) -> None:
+        for ticker in tickers:
+            self._last_sent.pop(ticker, None)
+            self._pending.pop(ticker, None)
+
+    def _deltas(self, pending: Mapping[str, MetricValues]) -> Dict[str, MetricValues]:
+        updates = {}
+        for ticker, values in pending.items():
+            if ticker not in self.tickers:
+                continue
+            previous = self._last_sent.get(ticker, {})
+            changed = {name: value for name, value in values.items() if previous.get(name, ...) != value}
+            if changed:
+                updates[ticker] = changed
+                self._last_sent[ticker] = dict(values)
+        return updates
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        try:
+            await asyncio.wait_for(self.send(message), self.send_timeout)
+        except asyncio.TimeoutError:
+            raise SlowConsumerError(f"Send did not complete within {self.send_timeout}s")
+        self.messages_sent += 1
+
+    async def run(self) -> None:
+        """Send queued messages until cancelled or the consumer is too slow"""
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while self._control:
+                await self._send(self._control.popleft())
+            if not self._pending:
+                continue
+            if self.coalesce_interval > 0:
+                # Let a burst of ticks collapse into one message
+                await asyncio.sleep(self.coalesce_interval)
+            pending, self._pending = self._pending, {}
+            updates = self._deltas(pending)
+            if updates:
+                await self._send({"type": "valuation", "updates": updates})
+
+
+class LiveValuationHub:
+    """Fans recomputed market valuation metrics out to subscribers of each ticker"""
+
+    def __init__(self, store: FundamentalsSnapshotStore):
+        self.store = store
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._connections: Set[Subscriber] = set()
+        self.ticks_published = 0
+
+    def connect(self, subscriber: Subscriber) -> None:
+        self._connections.add(subscriber)
+
+    def disconnect(self, subscriber: Subscriber) -> None:
+        self.unsubscribe(subscriber, list(subscriber.tickers))
+        self._connections.discard(subscriber)
+
+    def subscribe(self, subscriber: Subscriber, tickers: Iterable[str]) -> Tuple[Dict[str, MetricValues], List[str]]:
+        """Subscribe to tickers, returning their current metrics and the unknown tickers"""
+        tickers = list(dict.fromkeys(tickers))
+        current = self.store.market_valuation(tickers)
+        for ticker in current:
+            subscriber.tickers.add(ticker)
+            self._subscribers.setdefault(ticker, set()).add(subscriber)
+        subscriber.set_baseline(current)
+        return current, [ticker for ticker in tickers if ticker not in current]
+
+    def unsubscribe(self, subscriber: Subscriber, tickers: Iterable[str]) -> None:
+        tickers = list(tickers)
+        for ticker in tickers:
+            subscriber.tickers.discard(ticker)
+            subscribers = self._subscribers.get(ticker)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[ticker]
+        subscriber.forget(tickers)
+
+    def publish(self, prices: Mapping[str, float]) -> Tuple[List[str], List[str]]:
+        """
+        Apply price ticks to the snapshot store and queue the recomputed
+        metrics for every subscriber. Never awaits a consumer.
+        """
+        updated, unknown = self.store.update_prices(prices)
+        self.ticks_published += len(updated)
+        watched = [ticker for ticker in updated if ticker in self._subscribers]
+        if watched:
+            metrics = self.store.market_valuation(watched)
+            for ticker in watched:
+                for subscriber in self._subscribers.get(ticker, ()):
+                    subscriber.offer(ticker, metrics[ticker])
+        return updated, unknown
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "connections": len(self._connections),
+            "subscribed_tickers": len(self._subscribers),
+            "subscriptions": sum(len(s) for s in self._subscribers.values()),
+            "ticks_published": self.ticks_published,
+            "messages_sent": sum(s.messages_sent for s in self._connections),
+            "updates_coalesced": sum(s.updates_coalesced for s in self._connections),
+        }
+
+
+live_valuation_hub = LiveValuationHub(snapshot_store)
+
+registry.gauge(
+    "financial_api_live_valuation_connections", "Open live valuation WebSocket connections",
+    lambda: [((), len(live_valuation_hub._connections))]
+)
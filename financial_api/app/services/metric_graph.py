@@ -0,0 +1,432 @@
+"""
+Declarative metric registry evaluated as a dependency graph.
+
+Every metric and shared intermediate (EBITDA, per-share values, enterprise
+value, ...) is a node that declares the inputs it needs. A request for any
+subset of metrics evaluates only the nodes those metrics depend on, once,
+in topological order. The same definitions serve the scalar service (one
+CompanyFinancialData) and the batch service (NumPy columns) through an
+``ops`` object that implements guarded arithmetic for either.
+"""
+
+from app.models.financial_models import CompanyFinancialData, FinancialAnalysisResult
+from contextlib import nullcontext
+from functools import lru_cache
+from graphlib import CycleError, TopologicalSorter
+from operator import itemgetter
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+import math
+
+import numpy as np
+
+
+class ScalarOps:
+    """Guarded arithmetic on Python floats; guarded branches are evaluated lazily"""
+
+    null = None
+
+    @staticmethod
+    def context():
+        return nullcontext()
+
+    @staticmethod
+    def where(condition, compute: Callable[[], Any], fallback):
+        return compute() if condition else fallback
+
+    @staticmethod
+    def cagr(final, initial, years, condition=True):
+        return (final / initial) ** (1 / years) - 1 if condition else 0.0
+
+
+# NumPy's SIMD ``power`` loops may differ from libm by one ulp, so CAGRs go
+# through libm ``pow`` element-wise to stay identical to the scalar path.
+_libm_pow = np.frompyfunc(math.pow, 2, 1)
+
+
+class VectorOps:
+    """Guarded arithmetic on NumPy arrays; undefined results are NaN"""
+
+    null = np.nan
+
+    @staticmethod
+    def context():
+        # Masked-out lanes may divide by zero; their results are discarded
+        return np.errstate(divide="ignore", invalid="ignore")
+
+    @staticmethod
+    def where(condition, compute: Callable[[], Any], fallback):
+        return np.where(condition, compute(), fallback)
+
+    @staticmethod
+    def cagr(final, initial, years, condition=True):
+        base = np.where(condition, final / initial, 1.0)
+        growth = np.asarray(_libm_pow(base, 1 / years), dtype=np.float64) - 1
+        return np.where(condition, growth, 0.0)
+
+
+SCALAR_OPS = ScalarOps()
+VECTOR_OPS = VectorOps()
+
+
+class MetricNode:
+    """A metric or intermediate computed from named inputs"""
+
+    __slots__ = ("name", "inputs", "compute", "family", "description", "read_inputs")
+
+    def __init__(
+        self,
+        name: str,
+        inputs: Tuple[str, ...],
+        compute: Callable[..., Any],
+        family: Optional[str],
+        description: str
+    ):
+        self.name = name
+        self.inputs = inputs
+        self.compute = compute
+        self.family = family
+        self.description = description
+        # Fetches the input values as a tuple from the evaluation namespace
+        self.read_inputs = itemgetter(*inputs) if len(inputs) > 1 else (lambda values: (values[inputs[0]],))
+
+
+class MetricGraph:
+    """Registry of metric nodes over CompanyFinancialData fields"""
+
+    def __init__(self, input_fields: Iterable[str]):
+        self.input_fields = frozenset(input_fields)
+        self.nodes: Dict[str, MetricNode] = {}
+        self._order: Optional[List[str]] = None
+
+    def metric(
+        self,
+        name: str,
+        inputs: Tuple[str, ...],
+        family: Optional[str] = None,
+        description: str = ""
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """
+        Register a node. The decorated function receives ``ops`` followed by
+        the values of ``inputs`` in order. Nodes without a family are
+        intermediates; they can still be requested by name.
+        """
+
+        def register(compute: Callable[..., Any]) -> Callable[..., Any]:
+            if name in self.nodes or name in self.input_fields:
+                raise ValueError(f"Metric '{name}' is already defined")
+            self.nodes[name] = MetricNode(name, tuple(inputs), compute, family, description)
+            self._order = None
+            self.plan.cache_clear()
+            return compute
+
+        return register
+
+    @property
+    def order(self) -> List[str]:
+        """All nodes in a topological order"""
+        if self._order is None:
+            for node in self.nodes.values():
+                unknown = [i for i in node.inputs if i not in self.nodes and i not in self.input_fields]
+                if unknown:
+                    raise ValueError(f"Metric '{node.name}' depends on unknown inputs: {unknown}")
+            sorter = TopologicalSorter({
+                name: [i for i in node.inputs if i in self.nodes] for name, node in self.nodes.items()
+            })
+            try:
+                self._order = list(sorter.static_order())
+            except CycleError as e:
+                raise ValueError(f"Metric dependency cycle: {e.args[1]}")
+        return self._order
+
+    def family_metrics(self, family: str) -> Tuple[str, ...]:
+        """Metric names of one result family, in registration order"""
+        return tuple(name for name, node in self.nodes.items() if node.family == family)
+
+    def validate_names(self, names: Iterable[str]) -> None:
+        unknown = sorted(set(names) - set(self.nodes))
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+
+    @lru_cache(maxsize=256)
+    def plan(
+        self, targets: FrozenSet[str], given: FrozenSet[str] = frozenset()
+    ) -> Tuple[Tuple[MetricNode, ...], Tuple[str, ...]]:
+        """
+        The nodes needed for ``targets`` in evaluation order, and the raw
+        inputs they read. Names in ``given`` are supplied by the caller, so
+        their own dependencies are not traversed.
+        """
+        self.validate_names(targets)
+        needed = set()
+        inputs = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name in given:
+                continue
+            if name in self.input_fields:
+                inputs.add(name)
+            elif name not in needed:
+                needed.add(name)
+                stack.extend(self.nodes[name].inputs)
+        nodes = tuple(self.nodes[name] for name in self.order if name in needed)
+        return nodes, tuple(sorted(inputs))
+
+    def dependents(self, inputs: Iterable[str]) -> FrozenSet[str]:
+        """Every node whose value changes when any of ``inputs`` changes"""
+        changed = set(inputs)
+        for name in self.order:
+            if changed.intersection(self.nodes[name].inputs):
+                changed.add(name)
+        return frozenset(name for name in changed if name in self.nodes)
+
+    def evaluate(
+        self,
+        source: Any,
+        targets: Iterable[str],
+        ops=SCALAR_OPS,
+        known: Optional[Mapping[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Evaluate ``targets`` for one company (ScalarOps) or a CompanyBatch
+        (VectorOps). Raw inputs are read as attributes of ``source``; nodes
+        and inputs in ``known`` are taken as given and nothing upstream of
+        them is read or recomputed. Returns the values of every evaluated node.
+        """
+        nodes, inputs = self.plan(frozenset(targets), frozenset(known) if known else frozenset())
+        values: Dict[str, Any] = {name: getattr(source, name) for name in inputs}
+        if known:
+            values.update(known)
+        with ops.context():
+            for node in nodes:
+                values[node.name] = node.compute(ops, *node.read_inputs(values))
+        return values
+
+
+metric_graph = MetricGraph(
+    name for name, field in CompanyFinancialData.model_fields.items() if field.annotation is float
+)
+metric = metric_graph.metric
+
+# Result families, in FinancialAnalysisResult field order
+FAMILY_NAMES = tuple(
+    name for name in FinancialAnalysisResult.model_fields if name.endswith("_metrics")
+)
+
+
+# Shared intermediates
+
+@metric("ebitda", ("ebit", "depreciation", "amortization"), description="EBITDA")
+def _ebitda(ops, ebit, depreciation, amortization):
+    return ebit + depreciation + amortization
+
+
+@metric("earnings_per_share", ("net_income", "shares_outstanding"), description="Earnings per share")
+def _earnings_per_share(ops, net_income, shares_outstanding):
+    return net_income / shares_outstanding
+
+
+@metric("book_value_per_share", ("total_equity", "shares_outstanding"), description="Book value per share")
+def _book_value_per_share(ops, total_equity, shares_outstanding):
+    return total_equity / shares_outstanding
+
+
+@metric("dividends_per_share", ("dividends", "shares_outstanding"), description="Dividends per share")
+def _dividends_per_share(ops, dividends, shares_outstanding):
+    return dividends / shares_outstanding
+
+
+@metric("sales_per_share", ("revenue", "shares_outstanding"), description="Revenue per share")
+def _sales_per_share(ops, revenue, shares_outstanding):
+    return revenue / shares_outstanding
+
+
+@metric("market_capitalization", ("market_price_per_share", "shares_outstanding"),
+        description="Market capitalization")
+def _market_capitalization(ops, market_price_per_share, shares_outstanding):
+    return market_price_per_share * shares_outstanding
+
+
+@metric("working_capital", ("current_assets", "current_liabilities"), description="Working capital")
+def _working_capital(ops, current_assets, current_liabilities):
+    return current_assets - current_liabilities
+
+
+@metric("enterprise_value", ("market_capitalization", "total_debt", "working_capital"),
+        description="Enterprise value")
+def _enterprise_value(ops, market_capitalization, total_debt, working_capital):
+    return market_capitalization + total_debt - working_capital
+
+
+# Market and valuation metrics
+
+MARKET_VALUATION = "market_valuation_metrics"
+
+
+@metric("pe_ratio", ("market_price_per_share", "earnings_per_share", "net_income", "shares_outstanding"),
+        MARKET_VALUATION, "Price-to-Earnings ratio")
+def _pe_ratio(ops, market_price_per_share, earnings_per_share, net_income, shares_outstanding):
+    # Undefined for non-positive earnings
+    return ops.where(
+        (net_income > 0) & (shares_outstanding > 0),
+        lambda: market_price_per_share / earnings_per_share,
+        ops.null
+    )
+
+
+@metric("pb_ratio", ("market_price_per_share", "book_value_per_share"), MARKET_VALUATION,
+        "Price-to-Book ratio")
+def _pb_ratio(ops, market_price_per_share, book_value_per_share):
+    return market_price_per_share / book_value_per_share
+
+
+@metric("dividend_yield", ("dividends_per_share", "market_price_per_share"), MARKET_VALUATION,
+        "Dividend yield")
+def _dividend_yield(ops, dividends_per_share, market_price_per_share):
+    return dividends_per_share / market_price_per_share
+
+
+@metric("payout_ratio", ("dividends", "net_income"), MARKET_VALUATION, "Dividend payout ratio")
+def _payout_ratio(ops, dividends, net_income):
+    return ops.where(net_income > 0, lambda: dividends / net_income, 0.0)
+
+
+@metric("ev_ebitda_ratio", ("enterprise_value", "ebitda"), MARKET_VALUATION,
+        "Enterprise Value to EBITDA ratio")
+def _ev_ebitda_ratio(ops, enterprise_value, ebitda):
+    return ops.where(ebitda > 0, lambda: enterprise_value / ebitda, 0.0)
+
+
+@metric("interest_coverage_ratio", ("ebit", "interest_expense"), MARKET_VALUATION,
+        "Interest coverage ratio")
+def _interest_coverage_ratio(ops, ebit, interest_expense):
+    return ops.where(interest_expense > 0, lambda: ebit / interest_expense, 0.0)
+
+
+@metric("price_to_sales_ratio", ("market_price_per_share", "sales_per_share"), MARKET_VALUATION,
+        "Price-to-Sales ratio")
+def _price_to_sales_ratio(ops, market_price_per_share, sales_per_share):
+    return market_price_per_share / sales_per_share
+
+
+# Growth metrics
+
+GROWTH = "growth_metrics"
+
+
+@metric("revenue_cagr", ("revenue_final", "revenue_initial", "years"), GROWTH,
+        "Revenue Compound Annual Growth Rate")
+def _revenue_cagr(ops, revenue_final, revenue_initial, years):
+    return ops.cagr(revenue_final, revenue_initial, years)
+
+
+@metric("net_income_cagr", ("net_income", "years"), GROWTH, "Net Income CAGR")
+def _net_income_cagr(ops, net_income, years):
+    # Assuming 10% increase for initial net income
+    initial_net_income = net_income - (net_income * 0.1)
+    return ops.cagr(net_income, initial_net_income, years, initial_net_income > 0)
+
+
+@metric("dividend_growth_rate", ("dividends", "years"), GROWTH, "Dividend Growth Rate")
+def _dividend_growth_rate(ops, dividends, years):
+    # Assuming 5% increase for initial dividends
+    initial_dividends = dividends - (dividends * 0.05)
+    return ops.cagr(dividends, initial_dividends, years, initial_dividends > 0)
+
+
+@metric("ebitda_growth_rate", ("ebitda", "years"), GROWTH, "EBITDA Growth Rate")
+def _ebitda_growth_rate(ops, ebitda, years):
+    # Assuming 10% increase for initial EBITDA
+    initial_ebitda = ebitda - (ebitda * 0.1)
+    return ops.cagr(ebitda, initial_ebitda, years, initial_ebitda > 0)
+
+
+# Profitability metrics
+
+PROFITABILITY = "profitability_metrics"
+
+
+@metric("roa", ("net_income", "total_assets"), PROFITABILITY, "Return on Assets")
+def _roa(ops, net_income, total_assets):
+    return net_income / total_assets
+
+
+@metric("roe", ("net_income", "total_equity"), PROFITABILITY, "Return on Equity")
+def _roe(ops, net_income, total_equity):
+    return net_income / total_equity
+
+
+@metric("net_profit_margin", ("net_income", "revenue"), PROFITABILITY, "Net Profit Margin")
+def _net_profit_margin(ops, net_income, revenue):
+    return net_income / revenue
+
+
+@metric("operating_margin", ("ebit", "revenue"), PROFITABILITY, "Operating Margin")
+def _operating_margin(ops, ebit, revenue):
+    return ebit / revenue
+
+
+@metric("gross_profit_margin", ("revenue",), PROFITABILITY, "Gross Profit Margin")
+def _gross_profit_margin(ops, revenue):
+    # Assuming COGS is 60% of Revenue
+    return (revenue - (revenue * 0.6)) / revenue
+
+
+@metric("asset_turnover", ("revenue", "total_assets"), PROFITABILITY, "Asset Turnover ratio")
+def _asset_turnover(ops, revenue, total_assets):
+    return revenue / total_assets
+
+
+@metric("roic", ("ebit", "total_equity", "total_debt"), PROFITABILITY, "Return on Invested Capital")
+def _roic(ops, ebit, total_equity, total_debt):
+    return ebit / (total_equity + total_debt)
+
+
+# Liquidity metrics
+
+LIQUIDITY = "liquidity_metrics"
+
+
+@metric("current_ratio", ("current_assets", "current_liabilities"), LIQUIDITY, "Current Ratio")
+def _current_ratio(ops, current_assets, current_liabilities):
+    return current_assets / current_liabilities
+
+
+@metric("quick_ratio", ("current_assets", "current_liabilities"), LIQUIDITY, "Quick Ratio")
+def _quick_ratio(ops, current_assets, current_liabilities):
+    # Assuming 20% of current assets are inventory
+    return (current_assets - (current_assets * 0.2)) / current_liabilities
+
+
+@metric("cash_ratio", ("current_assets", "current_liabilities"), LIQUIDITY, "Cash Ratio")
+def _cash_ratio(ops, current_assets, current_liabilities):
+    # Assuming 10% of current assets are cash
+    return (current_assets * 0.1) / current_liabilities
+
+
+# Leverage metrics
+
+LEVERAGE = "leverage_metrics"
+
+
+@metric("net_debt_to_equity", ("total_debt", "total_equity"), LEVERAGE, "Net Debt to Equity ratio")
+def _net_debt_to_equity(ops, total_debt, total_equity):
+    return total_debt / total_equity
+
+
+@metric("debt_to_assets", ("total_debt", "total_assets"), LEVERAGE, "Debt to Assets ratio")
+def _debt_to_assets(ops, total_debt, total_assets):
+    return total_debt / total_assets
+
+
+@metric("debt_to_ebitda", ("total_debt", "ebitda"), LEVERAGE, "Debt to EBITDA ratio")
+def _debt_to_ebitda(ops, total_debt, ebitda):
+    return ops.where(ebitda > 0, lambda: total_debt / ebitda, 0.0)
+
+
+FAMILY_METRICS: Dict[str, Tuple[str, ...]] = {
+    family: metric_graph.family_metrics(family) for family in FAMILY_NAMES
+}
+# Every family metric, in result model field order
+FAMILY_METRIC_NAMES = tuple(name for names in FAMILY_METRICS.values() for name in names)
+ALL_FAMILY_METRICS = frozenset(FAMILY_METRIC_NAMES)
@@ -0,0 +1,440 @@
+from app.services.batch_service import NUMERIC_FIELDS
+from app.services.metric_graph import FAMILY_METRIC_NAMES
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence
+import json
+import os
+import threading
+import numpy as np
+
+MANIFEST = "manifest.json"
+TOMBSTONES = "tombstones.bin"
+FORMAT_VERSION = 1
+
+_SEGMENT_MAGIC = b"FMCSEG01"
+_ALIGNMENT = 64
+
+# Fixed-width float64 columns: input fundamentals, then every family metric
+FLOAT_COLUMNS = tuple(f"input.{name}" for name in NUMERIC_FIELDS) + FAMILY_METRIC_NAMES
+LABEL_COLUMNS = ("ticker", "company_name")
+
+
+def _fsync_directory(path: str) -> None:
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _encode_labels(labels: Sequence[str]):
+    """int64 offsets and UTF-8 bytes of strings"""
+    joined = "".join(labels)
+    lengths = map(len, labels) if joined.isascii() else (len(label.encode("utf-8")) for label in labels)
+    offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+    offsets[1:] = np.fromiter(lengths, dtype=np.int64, count=len(labels)).cumsum()
+    return offsets, np.frombuffer(joined.encode("utf-8"), dtype=np.uint8)
+
+
+def _decode_labels(offsets: np.ndarray, data: np.ndarray, rows: np.ndarray) -> List[str]:
+    raw = data.tobytes()
+    starts = offsets[rows].tolist()
+    ends = offsets[rows + 1].tolist()
+    if raw.isascii():
+        # Byte offsets are character offsets, so slice one decoded string
+        text = raw.decode("ascii")
+        return [text[start:end] for start, end in zip(starts, ends)]
+    return [raw[start:end].decode("utf-8") for start, end in zip(starts, ends)]
+
+
+def _gather_labels(offsets: np.ndarray, data: np.ndarray, rows: np.ndarray):
+    """Offsets and bytes of the selected labels, copied in one vectorized pass"""
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    gathered = np.zeros(len(rows) + 1, dtype=np.int64)
+    gathered[1:] = lengths.cumsum()
+    positions = np.repeat(starts - gathered[:-1], lengths) + np.arange(gathered[-1])
+    return gathered, data[positions]
+
+
+class EncodedLabels(Sequence):
+    """
+    Strings kept as int64 offsets plus UTF-8 bytes (possibly views of a
+    mapped segment) and decoded on access, so loading a store does not
+    decode every label up front
+    """
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("label index out of range")
+        return self.data[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.tolist())
+
+    def tolist(self) -> List[str]:
+        return _decode_labels(self.offsets, self.data, np.arange(len(self)))
+
+
+class _Segment:
+    """Column views over one memory-mapped segment file"""
+
+    def __init__(self, directory: str, entry: dict):
+        self.file = entry["file"]
+        self.rows = entry["rows"]
+        self.size = entry["size"]
+        buffer = np.memmap(os.path.join(directory, self.file), dtype=np.uint8, mode="r")
+        if bytes(buffer[:len(_SEGMENT_MAGIC)]) != _SEGMENT_MAGIC:
+            raise ValueError(f"{self.file} is not a metric store segment")
+        self.columns = {
+            name: buffer[offset:offset + count * np.dtype(dtype).itemsize].view(dtype)
+            for name, (offset, dtype, count) in entry["blocks"].items()
+        }
+
+    def labels(self, name: str, rows: Optional[np.ndarray] = None) -> EncodedLabels:
+        """Labels of the given rows (all when None); views of the mapped file for all rows"""
+        offsets, data = self.columns[f"{name}.offsets"], self.columns[f"{name}.data"]
+        if rows is None:
+            return EncodedLabels(offsets, data)
+        return EncodedLabels(*_gather_labels(offsets, data, rows))
+
+
+def _write_segment(path: str, blocks: Dict[str, np.ndarray]) -> Dict[str, list]:
+    """Write arrays as aligned blocks after the magic bytes and fsync; returns the block table"""
+    table = {}
+    with open(path, "wb") as f:
+        f.write(_SEGMENT_MAGIC)
+        position = len(_SEGMENT_MAGIC)
+        for name, array in blocks.items():
+            padding = -position % _ALIGNMENT
+            f.write(b"\0" * padding)
+            position += padding
+            array = np.ascontiguousarray(array)
+            f.write(array.data)
+            table[name] = [position, array.dtype.str, len(array)]
+            position += array.nbytes
+        f.flush()
+        os.fsync(f.fileno())
+    return table
+
+
+class StoredUniverse(NamedTuple):
+    """Live rows of a metric store; industries as int32 codes into ``industry_names``"""
+    tickers: Sequence[str]
+    company_names: Sequence[str]
+    industry_names: List[str]
+    industry_codes: np.ndarray
+    columns: Dict[str, np.ndarray]
+
+    @property
+    def industries(self) -> List[str]:
+        return [self.industry_names[code] for code in self.industry_codes.tolist()]
+
+
+class MetricStore:
+    """
+    On-disk store of input fundamentals and computed metrics, keyed by ticker.
+
+    Rows live in immutable segment files of fixed-width columns (float64
+    values, int32 industry codes, offset-encoded labels) that are
+    memory-mapped on open, so opening costs a manifest read however many
+    rows are stored. Writes append a segment and record the rows they
+    supersede in a tombstone log; they become visible by atomically
+    replacing the manifest, so a crash at any point leaves the previous
+    state intact. Compaction rewrites the live rows into a single segment
+    once too many rows are superseded or too many segments accumulate.
+    Segment files it replaces are deleted once nothing maps them; files still
+    mapped by earlier reads (which Windows will not delete) are retried after
+    later commits and otherwise removed on the next open.
+
+    One process writes a store directory at a time.
+    """
+
+    def __init__(self, path: str, compact_ratio: float = 0.3, max_segments: int = 32):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.max_segments = max_segments
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("version") != FORMAT_VERSION or manifest.get("columns") != list(FLOAT_COLUMNS):
+                raise ValueError(f"Metric store at {path} was written with a different format or metric set")
+        else:
+            manifest = {"version": FORMAT_VERSION, "columns": list(FLOAT_COLUMNS), "segments": [],
+                        "industries": [], "tombstones": 0, "next_segment": 0}
+        self._manifest = manifest
+        self._segments = [_Segment(path, entry) for entry in manifest["segments"]]
+        self._industries: List[str] = list(manifest["industries"])
+        self._industry_codes = {industry: code for code, industry in enumerate(self._industries)}
+        # Replaced segment files that could not be deleted yet
+        self._retired: List[str] = []
+        self._remove_orphans()
+
+        self._tombstones = self._read_tombstones()
+        self._live: Optional[np.ndarray] = None
+        self._keys: Optional[Dict[str, int]] = None
+
+    @property
+    def rows(self) -> int:
+        """Stored rows, including superseded ones"""
+        return sum(segment.rows for segment in self._segments)
+
+    def __len__(self) -> int:
+        return self.rows - len(self._tombstones)
+
+    # Layout helpers; callers hold the lock
+
+    def _remove_orphans(self) -> None:
+        """Delete segment files left behind by a write or compaction that never committed"""
+        referenced = {segment.file for segment in self._segments}
+        self._delete_files([name for name in os.listdir(self.path) if name.endswith(".seg") and name not in referenced])
+
+    def _delete_files(self, names: Sequence[str]) -> None:
+        """Delete unreferenced segment files, keeping those still mapped somewhere for a later attempt"""
+        for name in names:
+            try:
+                os.unlink(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+            except PermissionError:
+                # Windows refuses to delete a file while a memory map of it is open
+                self._retired.append(name)
+
+    def _read_tombstones(self) -> np.ndarray:
+        count = self._manifest["tombstones"]
+        if not count:
+            return np.empty(0, dtype=np.int64)
+        # Entries past the committed count belong to a write that never committed
+        return np.fromfile(os.path.join(self.path, TOMBSTONES), dtype=np.int64, count=count)
+
+    def _column(self, name: str) -> np.ndarray:
+        """A column over all stored rows; a view of the mapped file when there is one segment"""
+        parts = [segment.columns[name] for segment in self._segments]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _live_rows(self) -> np.ndarray:
+        if self._live is None:
+            live = np.ones(self.rows, dtype=bool)
+            live[self._tombstones] = False
+            self._live = live
+        return np.flatnonzero(self._live)
+
+    def _labels(self, name: str, rows: Optional[np.ndarray] = None) -> EncodedLabels:
+        """Encoded labels of global rows in ascending order (all rows when None)"""
+        if len(self._segments) == 1 and rows is None:
+            return self._segments[0].labels(name)
+        if rows is None:
+            rows = np.arange(self.rows)
+        offsets, data = [np.zeros(1, dtype=np.int64)], []
+        start = end = 0
+        for segment in self._segments:
+            lo, hi = np.searchsorted(rows, [start, start + segment.rows])
+            labels = segment.labels(name, rows[lo:hi] - start)
+            offsets.append(labels.offsets[1:] + end)
+            data.append(labels.data)
+            end += len(labels.data)
+            start += segment.rows
+        return EncodedLabels(np.concatenate(offsets), np.concatenate(data) if data else np.empty(0, dtype=np.uint8))
+
+    def _key_index(self) -> Dict[str, int]:
+        """Global row of every live ticker, built on the first write"""
+        if self._keys is None:
+            rows = self._live_rows()
+            self._keys = dict(zip(self._labels("ticker", rows).tolist(), rows.tolist()))
+        return self._keys
+
+    def _label_blocks(self, name: str, labels: Sequence[str]) -> Dict[str, np.ndarray]:
+        if isinstance(labels, EncodedLabels):
+            offsets, data = labels.offsets, labels.data
+        else:
+            offsets, data = _encode_labels(labels)
+        return {f"{name}.offsets": offsets, f"{name}.data": data}
+
+    def _new_segment(self, blocks: Dict[str, np.ndarray], rows: int) -> dict:
+        number = self._manifest["next_segment"]
+        self._manifest["next_segment"] = number + 1
+        name = f"{number:08d}.seg"
+        path = os.path.join(self.path, name)
+        table = _write_segment(path, blocks)
+        return {"file": name, "rows": rows, "size": os.path.getsize(path), "blocks": table}
+
+    def _append_tombstones(self, rows: np.ndarray) -> int:
+        """Write superseded rows after the committed ones; returns the new committed count"""
+        count = len(self._tombstones)
+        if not len(rows):
+            return count
+        with open(os.path.join(self.path, TOMBSTONES), "r+b" if count else "wb") as f:
+            f.truncate(count * 8)
+            f.seek(count * 8)
+            f.write(rows.astype(np.int64).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        return count + len(rows)
+
+    def _commit(self, segments: List[dict], tombstones: int) -> None:
+        """Atomically publish a new manifest"""
+        manifest = dict(self._manifest, segments=segments, industries=self._industries, tombstones=tombstones)
+        temporary = os.path.join(self.path, MANIFEST + ".tmp")
+        with open(temporary, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, os.path.join(self.path, MANIFEST))
+        _fsync_directory(self.path)
+        self._manifest = manifest
+        if self._retired:
+            retired, self._retired = self._retired, []
+            self._delete_files(retired)
+
+    def _supersede(self, rows: np.ndarray) -> None:
+        self._tombstones = np.concatenate([self._tombstones, rows])
+        if self._live is not None:
+            self._live[rows] = False
+
+    def _maybe_compact(self) -> None:
+        if len(self._segments) > self.max_segments or len(self._tombstones) > self.compact_ratio * max(self.rows, 1):
+            self._compact()
+
+    def _compact(self) -> None:
+        if len(self._segments) <= 1 and not len(self._tombstones):
+            return
+        rows = self._live_rows()
+        blocks = {name: self._column(name)[rows] for name in FLOAT_COLUMNS + ("industry",)}
+        for name in LABEL_COLUMNS:
+            blocks.update(self._label_blocks(name, self._labels(name, rows)))
+
+        old_files = [segment.file for segment in self._segments]
+        segments = [self._new_segment(blocks, len(rows))] if len(rows) else []
+        self._commit(segments, 0)
+        # Swap in the new segments so this store no longer maps the old files before deleting them
+        self._segments = [_Segment(self.path, entry) for entry in segments]
+        self._tombstones = np.empty(0, dtype=np.int64)
+        self._live = None
+        self._keys = None
+        # Anything left behind by a crash here is removed as an orphan on the next open
+        self._delete_files(old_files)
+        tombstone_path = os.path.join(self.path, TOMBSTONES)
+        if os.path.exists(tombstone_path):
+            os.unlink(tombstone_path)
+
+    # Public API
+
+    def write(
+        self,
+        tickers: Sequence[str],
+        company_names: Sequence[str],
+        industries: Sequence[str],
+        columns: Mapping[str, np.ndarray]
+    ) -> int:
+        """
+        Persist rows, one per ticker, with a column for every FLOAT_COLUMNS
+        name (inputs as ``input.<field>``). A ticker already stored, or
+        repeated in the call, is superseded by its last row here.
+        """
+        size = len(tickers)
+        latest = {ticker: i for i, ticker in enumerate(tickers)}
+        if not latest:
+            return 0
+        unique = len(latest) == size
+        positions = np.fromiter(latest.values(), dtype=np.intp, count=len(latest))
+
+        with self._lock:
+            codes = np.empty(len(latest), dtype=np.int32)
+            for i, position in enumerate(positions.tolist()):
+                industry = industries[position]
+                code = self._industry_codes.get(industry)
+                if code is None:
+                    code = self._industry_codes[industry] = len(self._industries)
+                    self._industries.append(industry)
+                codes[i] = code
+
+            blocks = {
+                name: np.broadcast_to(np.asarray(columns[name], dtype=np.float64), (size,))
+                for name in FLOAT_COLUMNS
+            }
+            if not unique:
+                blocks = {name: column[positions] for name, column in blocks.items()}
+            blocks["industry"] = codes
+            blocks.update(self._label_blocks("ticker", list(latest)))
+            blocks.update(self._label_blocks(
+                "company_name", company_names if unique else [company_names[p] for p in positions.tolist()]
+            ))
+
+            keys = self._key_index()
+            superseded = np.fromiter((keys[t] for t in latest if t in keys), dtype=np.int64)
+            entry = self._new_segment(blocks, len(latest))
+            tombstones = self._append_tombstones(superseded)
+            self._commit(self._manifest["segments"] + [entry], tombstones)
+
+            first = self.rows
+            self._segments.append(_Segment(self.path, entry))
+            if self._live is not None:
+                self._live = np.concatenate([self._live, np.ones(len(latest), dtype=bool)])
+            self._supersede(superseded)
+            keys.update(zip(latest, range(first, first + len(latest))))
+            self._maybe_compact()
+        return len(latest)
+
+    def delete(self, tickers: Sequence[str]) -> int:
+        """Drop stored tickers; returns how many were stored"""
+        with self._lock:
+            keys = self._key_index()
+            rows = np.fromiter((keys.pop(t) for t in set(tickers) if t in keys), dtype=np.int64)
+            if not len(rows):
+                return 0
+            self._commit(self._manifest["segments"], self._append_tombstones(rows))
+            self._supersede(rows)
+            self._maybe_compact()
+            return len(rows)
+
+    def read(self) -> StoredUniverse:
+        """
+        Live rows in storage order, with labels decoded on access. With one
+        segment and nothing superseded, as after compaction, the columns and
+        labels are views of the mapped file.
+        """
+        with self._lock:
+            if not self._segments:
+                return StoredUniverse([], [], list(self._industries), np.empty(0, dtype=np.int32),
+                                      {name: np.empty(0) for name in FLOAT_COLUMNS})
+            if len(self._tombstones):
+                rows = self._live_rows()
+                columns = {name: self._column(name)[rows] for name in FLOAT_COLUMNS}
+                codes = self._column("industry")[rows]
+            else:
+                rows = None
+                columns = {name: self._column(name) for name in FLOAT_COLUMNS}
+                codes = self._column("industry")
+            return StoredUniverse(
+                self._labels("ticker", rows), self._labels("company_name", rows),
+                list(self._industries), codes, columns
+            )
+
+    def compact(self) -> None:
+        """Rewrite the live rows into one segment and drop superseded rows"""
+        with self._lock:
+            self._compact()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "path": self.path,
+                "rows": len(self),
+                "superseded_rows": len(self._tombstones),
+                "segments": len(self._segments),
+                "bytes": sum(segment.size for segment in self._segments),
+            }
@@ -0,0 +1,280 @@
+from app.models.financial_models import MONTHS_PER_PERIOD, CompanyFinancialPanel, PanelAnalysisResult
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Sequence
+import math
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Items summed over the trailing year
+FLOW_ITEMS = (
+    "revenue",
+    "net_income",
+    "ebit",
+    "depreciation",
+    "amortization",
+    "interest_expense",
+    "dividends",
+    "free_cash_flow",
+)
+
+# Balance sheet items, measured at period end
+STOCK_ITEMS = ("total_assets", "total_equity", "total_debt")
+
+LINE_ITEMS = FLOW_ITEMS + STOCK_ITEMS
+
+PERIODS_PER_YEAR = {"quarterly": 4, "annual": 1}
+
+PanelColumns = Dict[str, np.ndarray]
+
+
+def period_slots(period_ends: np.ndarray, frequency: str) -> np.ndarray:
+    """Vectorized ``period_slot``: consecutive periods get consecutive numbers"""
+    months = (np.asarray(period_ends, dtype="datetime64[D]") - np.timedelta64(15, "D")).astype("datetime64[M]")
+    return months.astype(np.int64) // MONTHS_PER_PERIOD[frequency]
+
+
+class PanelBatch:
+    """
+    Companies x periods arrays for one reporting frequency.
+
+    Rows are companies and columns are periods, right-aligned so the latest
+    period of every company is the last column; companies with a shorter
+    history are NaN-padded on the left. Each period sits in the column of its
+    slot, so a missing period is a NaN column (NaT period end) and trailing
+    sums and growth rates whose window spans it are NaN.
+    """
+
+    def __init__(
+        self,
+        columns: Mapping[str, np.ndarray],
+        frequency: str,
+        company_names: Sequence[str],
+        industries: Sequence[str],
+        period_ends: np.ndarray,
+        period_counts: np.ndarray
+    ):
+        if frequency not in PERIODS_PER_YEAR:
+            raise ValueError(f"Unsupported frequency: {frequency}")
+        self.columns = {name: np.asarray(columns[name], dtype=np.float64) for name in LINE_ITEMS}
+        self.frequency = frequency
+        self.company_names = list(company_names)
+        self.industries = list(industries)
+        self.period_ends = period_ends
+        self.period_counts = np.asarray(period_counts)
+
+    def __len__(self) -> int:
+        return len(self.company_names)
+
+    @property
+    def periods_per_year(self) -> int:
+        return PERIODS_PER_YEAR[self.frequency]
+
+    @classmethod
+    def from_long(
+        cls,
+        company_codes: np.ndarray,
+        period_ends: np.ndarray,
+        values: Mapping[str, np.ndarray],
+        frequency: str,
+        company_names: Sequence[str],
+        industries: Sequence[str]
+    ) -> "PanelBatch":
+        """
+        Pivot long-format rows (one per company-period, grouped by company
+        and sorted by period within each company) into right-aligned arrays
+        """
+        company_codes = np.asarray(company_codes)
+        counts = np.bincount(company_codes, minlength=len(company_names))
+        slots = period_slots(period_ends, frequency)
+        same_company = company_codes[1:] == company_codes[:-1]
+        if np.any(same_company & (slots[1:] <= slots[:-1])):
+            raise ValueError("Periods must be sorted with at most one per quarter or year")
+
+        # Slot of each company's first and latest period
+        observed = counts > 0
+        ends_at = np.cumsum(counts)
+        first = np.zeros(len(company_names), dtype=np.int64)
+        latest = np.zeros(len(company_names), dtype=np.int64)
+        first[observed] = slots[(ends_at - counts)[observed]]
+        latest[observed] = slots[ends_at[observed] - 1]
+        width = int((latest - first)[observed].max()) + 1 if observed.any() else 0
+
+        # Position of each row counted back from the company's latest period
+        positions = width - 1 - (latest[company_codes] - slots)
+
+        columns = {}
+        for name in LINE_ITEMS:
+            column = np.full((len(company_names), width), np.nan)
+            column[company_codes, positions] = values[name]
+            columns[name] = column
+
+        ends = np.full((len(company_names), width), np.datetime64("NaT"), dtype="datetime64[D]")
+        ends[company_codes, positions] = np.asarray(period_ends, dtype="datetime64[D]")
+        return cls(columns, frequency, company_names, industries, ends, counts)
+
+    @classmethod
+    def from_panels(cls, panels: Sequence[CompanyFinancialPanel]) -> "PanelBatch":
+        """Build a batch from CompanyFinancialPanel models of one frequency"""
+        frequencies = {panel.frequency for panel in panels}
+        if len(frequencies) > 1:
+            raise ValueError("All panels in a batch must share one frequency")
+
+        periods = [period for panel in panels for period in panel.periods]
+        codes = np.repeat(np.arange(len(panels)), [len(panel.periods) for panel in panels])
+        values = {
+            name: np.fromiter((getattr(p, name) for p in periods), dtype=np.float64, count=len(periods))
+            for name in LINE_ITEMS
+        }
+        return cls.from_long(
+            codes,
+            np.array([p.period_end for p in periods], dtype="datetime64[D]"),
+            values,
+            frequencies.pop() if frequencies else "annual",
+            [panel.company_name for panel in panels],
+            [panel.industry for panel in panels]
+        )
+
+    @classmethod
+    def from_dataframe(cls, df: "pd.DataFrame", frequency: str) -> "PanelBatch":
+        """
+        Build a batch from a long DataFrame with company_name, industry,
+        period_end and line item columns, one row per company-period
+        """
+        import pandas as pd
+
+        df = df.sort_values(["company_name", "period_end"], kind="stable")
+        codes, names = pd.factorize(df["company_name"], sort=False)
+        industries = df.groupby(codes, sort=True)["industry"].first().tolist()
+        values = {name: df[name].to_numpy(dtype=np.float64) for name in LINE_ITEMS}
+        return cls.from_long(
+            codes,
+            pd.to_datetime(df["period_end"]).to_numpy().astype("datetime64[D]"),
+            values,
+            frequency,
+            list(names),
+            industries
+        )
+
+
+def _shift(x: np.ndarray, lag: int) -> np.ndarray:
+    """Values ``lag`` periods earlier, NaN where there is no earlier period"""
+    shifted = np.full_like(x, np.nan)
+    if lag < x.shape[1]:
+        shifted[:, lag:] = x[:, :x.shape[1] - lag]
+    return shifted
+
+
+class PanelAnalysisService:
+    """Vectorized trailing, growth and rolling-return metrics over a PanelBatch"""
+
+    @staticmethod
+    def trailing_sum(x: np.ndarray, window: int) -> np.ndarray:
+        """Sum over the last ``window`` periods; NaN until a full window exists"""
+        result = np.full_like(x, np.nan)
+        if window <= x.shape[1]:
+            windows = np.lib.stride_tricks.sliding_window_view(x, window, axis=1)
+            result[:, window - 1:] = windows.sum(axis=-1)
+        return result
+
+    @staticmethod
+    def growth(x: np.ndarray, lag: int) -> np.ndarray:
+        """Period-over-period growth against ``lag`` periods earlier; NaN for a non-positive base"""
+        previous = _shift(x, lag)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(previous > 0, x / previous - 1, np.nan)
+
+    @staticmethod
+    def cagr(x: np.ndarray, periods_per_year: int) -> np.ndarray:
+        """
+        Compound annual growth rate from each row's first to last observed
+        value; NaN if either end is non-positive or they are the same period
+        """
+        observed = ~np.isnan(x)
+        width = x.shape[1]
+        first = np.argmax(observed, axis=1)
+        last = width - 1 - np.argmax(observed[:, ::-1], axis=1)
+        start = np.take_along_axis(x, first[:, None], axis=1)[:, 0]
+        end = np.take_along_axis(x, last[:, None], axis=1)[:, 0]
+        years = (last - first) / periods_per_year
+        valid = observed.any(axis=1) & (years > 0) & (start > 0) & (end > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(valid, (end / start) ** (1 / np.where(valid, years, 1)) - 1, np.nan)
+
+    @staticmethod
+    def rolling_return(trailing_numerator: np.ndarray, capital: np.ndarray, lag: int) -> np.ndarray:
+        """Trailing flow over the average of opening and closing capital; NaN for non-positive capital"""
+        average = (capital + _shift(capital, lag)) / 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(average > 0, trailing_numerator / average, np.nan)
+
+    @classmethod
+    def analyze(cls, batch: PanelBatch) -> Dict[str, PanelColumns]:
+        """Compute every panel metric as companies x periods arrays in one columnar pass"""
+
+        ppy = batch.periods_per_year
+        columns = batch.columns
+
+        ttm = {name: cls.trailing_sum(columns[name], ppy) for name in FLOW_ITEMS}
+
+        # Flows compound on their trailing-year totals, stocks on period-end values
+        annual_basis = {**ttm, **{name: columns[name] for name in STOCK_ITEMS}}
+        cagr = {name: cls.cagr(annual_basis[name], ppy) for name in LINE_ITEMS}
+
+        metrics = {
+            "ttm": ttm,
+            "yoy_growth": {name: cls.growth(columns[name], ppy) for name in LINE_ITEMS},
+            "cagr": cagr,
+            "rolling": {
+                "rolling_roe": cls.rolling_return(ttm["net_income"], columns["total_equity"], ppy),
+                "rolling_roic": cls.rolling_return(
+                    ttm["ebit"], columns["total_equity"] + columns["total_debt"], ppy
+                ),
+            },
+        }
+        if ppy > 1:
+            metrics["qoq_growth"] = {name: cls.growth(columns[name], 1) for name in LINE_ITEMS}
+        return metrics
+
+    @staticmethod
+    def to_results(batch: PanelBatch, metrics: Dict[str, PanelColumns]) -> List[PanelAnalysisResult]:
+        """Slice each company's reported periods out of the padded arrays"""
+
+        def series(values: np.ndarray, row: int, reported: np.ndarray) -> List[Optional[float]]:
+            return [None if math.isnan(v) else v for v in values[row, reported].tolist()]
+
+        reported_periods = ~np.isnat(batch.period_ends)
+        results = []
+        for row in range(len(batch)):
+            reported = reported_periods[row]
+            qoq = metrics.get("qoq_growth")
+            results.append(PanelAnalysisResult(
+                company_name=batch.company_names[row],
+                industry=batch.industries[row],
+                frequency=batch.frequency,
+                period_ends=batch.period_ends[row, reported].tolist(),
+                ttm={name: series(v, row, reported) for name, v in metrics["ttm"].items()},
+                yoy_growth={name: series(v, row, reported) for name, v in metrics["yoy_growth"].items()},
+                qoq_growth={name: series(v, row, reported) for name, v in qoq.items()} if qoq else None,
+                cagr={
+                    name: (None if np.isnan(v[row]) else float(v[row]))
+                    for name, v in metrics["cagr"].items()
+                },
+                rolling_roe=series(metrics["rolling"]["rolling_roe"], row, reported),
+                rolling_roic=series(metrics["rolling"]["rolling_roic"], row, reported)
+            ))
+        return results
+
+    @classmethod
+    def analyze_panels(cls, panels: Sequence[CompanyFinancialPanel]) -> List[PanelAnalysisResult]:
+        """Analyze panels of mixed frequency, returning results in input order"""
+
+        results: List[Optional[PanelAnalysisResult]] = [None] * len(panels)
+        for frequency in PERIODS_PER_YEAR:
+            indices = [i for i, panel in enumerate(panels) if panel.frequency == frequency]
+            if not indices:
+                continue
+            batch = PanelBatch.from_panels([panels[i] for i in indices])
+            for i, result in zip(indices, cls.to_results(batch, cls.analyze(batch))):
+                results[i] = result
+        return results
@@ -0,0 +1,327 @@
+from app.config import settings
+from app.services.metric_graph import FAMILY_METRIC_NAMES
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+import math
+import threading
+import numpy as np
+
+PEER_METRICS = FAMILY_METRIC_NAMES
+
+QUANTILES = {"p10": 0.10, "p25": 0.25, "p50": 0.50, "p75": 0.75, "p90": 0.90}
+
+
+def _finite(values) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64).ravel()
+    return values[np.isfinite(values)]
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else float(value)
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch (t-digest with the k1 scale function).
+
+    Values are buffered and folded into at most about ``compression / 2``
+    centroids, which stay small in the tails, so extreme quantiles remain
+    accurate. Compression is vectorized: sorted points are grouped by the
+    integer part of their scale function value and averaged with reduceat.
+    """
+
+    def __init__(self, compression: float = 200, buffer_size: Optional[int] = None):
+        self.compression = compression
+        self.buffer_size = buffer_size or int(compression * 5)
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        # Added values (unit weight) and merged centroids, folded in by _compress
+        self._buffer_values: List[np.ndarray] = []
+        self._buffer_means: List[np.ndarray] = []
+        self._buffer_weights: List[np.ndarray] = []
+        self._buffered = 0
+
+    def _buffer(self, size: int, weight: float, low: float, high: float) -> None:
+        self._buffered += size
+        self.count += weight
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+        if self._buffered >= self.buffer_size:
+            self._compress()
+
+    def update(self, values) -> None:
+        """Add values; NaN and infinite values are ignored"""
+        values = _finite(values)
+        if len(values):
+            self._buffer_values.append(values)
+            self._buffer(len(values), len(values), float(values.min()), float(values.max()))
+
+    def merge(self, other: "TDigest") -> None:
+        """Fold another digest into this one"""
+        other._compress()
+        if other.count:
+            self._buffer_means.append(other._means)
+            self._buffer_weights.append(other._weights)
+            self._buffer(len(other._means), other.count, other.min, other.max)
+
+    def _compress(self) -> None:
+        if not self._buffered:
+            return
+        # Plain values sort much faster than an argsort; only the few weighted centroids need one
+        values = np.sort(np.concatenate(self._buffer_values)) if self._buffer_values else np.empty(0)
+        means = np.concatenate([self._means, *self._buffer_means])
+        weights = np.concatenate([self._weights, *self._buffer_weights])
+        order = np.argsort(means)
+        positions = np.searchsorted(values, means[order])
+        means = np.insert(values, positions, means[order])
+        weights = np.insert(np.ones(len(values)), positions, weights[order])
+        self._buffer_values.clear()
+        self._buffer_means.clear()
+        self._buffer_weights.clear()
+        self._buffered = 0
+
+        q = (np.cumsum(weights) - weights / 2) / weights.sum()
+        # k1 scale: each centroid spans at most one unit of k
+        k = np.floor(self.compression / (2 * math.pi) * np.arcsin(2 * q - 1))
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        self._weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / self._weights
+
+    def _points(self):
+        """
+        Distinct centroid means with their mid-point cumulative quantile,
+        anchored at min (quantile 0) and max (quantile 1). Means equal up to
+        rounding are merged so a repeated value is a single point at its
+        mid-rank.
+        """
+        self._compress()
+        means = np.r_[self.min, self._means, self.max]
+        starts = np.flatnonzero(np.r_[True, ~np.isclose(means[1:], means[:-1], rtol=1e-12, atol=0)])
+        weights = np.add.reduceat(np.r_[0.0, self._weights, 0.0], starts)
+        return (np.cumsum(weights) - weights / 2) / self.count, means[starts]
+
+    def quantile(self, q) -> np.ndarray:
+        """Approximate value at quantile(s) ``q`` in [0, 1]"""
+        if not self.count:
+            return np.full(np.shape(q), np.nan)
+        positions, means = self._points()
+        return np.interp(q, positions, means)
+
+    def cdf(self, x) -> np.ndarray:
+        """Approximate fraction of values below ``x``, counting values equal to it half"""
+        if not self.count:
+            return np.full(np.shape(x), np.nan)
+        positions, means = self._points()
+        return np.interp(x, means, positions)
+
+
+class RunningMoments:
+    """Count, mean and variance (Welford / Chan) that support removing values exactly"""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values) -> None:
+        values = _finite(values)
+        n = len(values)
+        if not n:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    def remove(self, values) -> None:
+        values = _finite(values)
+        n = len(values)
+        if not n:
+            return
+        remaining = self.count - n
+        if remaining <= 0:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        rest_mean = (self.count * self.mean - n * mean) / remaining
+        delta = mean - rest_mean
+        self.m2 = max(0.0, self.m2 - m2 - delta * delta * remaining * n / self.count)
+        self.mean = rest_mean
+        self.count = remaining
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation"""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+
+class _MetricAggregate:
+    """Moments, quantile sketch and number of removed values still in the sketch"""
+
+    __slots__ = ("moments", "digest", "stale")
+
+    def __init__(self, compression: float):
+        self.moments = RunningMoments()
+        self.digest = TDigest(compression)
+        self.stale = 0
+
+
+def _group_rows(industries: Sequence[str]) -> Dict[str, np.ndarray]:
+    groups: Dict[str, List[int]] = {}
+    for row, industry in enumerate(industries):
+        groups.setdefault(industry, []).append(row)
+    return {industry: np.asarray(rows) for industry, rows in groups.items()}
+
+
+class PeerStatistics:
+    """
+    Per-industry aggregates of every metric, updated incrementally.
+
+    Counts, means and standard deviations are exact, including after
+    removals. Quantiles and percentiles come from a t-digest, which cannot
+    forget values: a removed value stays in the digest until its industry
+    is rebuilt, which the owner should do once ``needs_rebuild`` reports
+    more than ``rebuild_fraction`` of the industry as stale.
+    """
+
+    def __init__(
+        self,
+        metrics: Iterable[str] = PEER_METRICS,
+        compression: float = 200,
+        rebuild_fraction: float = 0.1
+    ):
+        self.metrics = tuple(metrics)
+        self.compression = compression
+        self.rebuild_fraction = rebuild_fraction
+        self._lock = threading.Lock()
+        self._industries: Dict[str, Dict[str, _MetricAggregate]] = {}
+        self._counts: Dict[str, int] = {}
+        self.rebuilds = 0
+
+    def _aggregates(self, industry: str) -> Dict[str, _MetricAggregate]:
+        aggregates = self._industries.get(industry)
+        if aggregates is None:
+            aggregates = {name: _MetricAggregate(self.compression) for name in self.metrics}
+            self._industries[industry] = aggregates
+            self._counts[industry] = 0
+        return aggregates
+
+    def _update(self, industries: Sequence[str], old, new) -> None:
+        for industry, rows in _group_rows(industries).items():
+            aggregates = self._aggregates(industry)
+            for name, column in (old or {}).items():
+                column = _finite(np.broadcast_to(column, (len(industries),))[rows])
+                aggregates[name].moments.remove(column)
+                aggregates[name].stale += len(column)
+            for name, column in (new or {}).items():
+                column = np.broadcast_to(column, (len(industries),))[rows]
+                aggregates[name].moments.update(column)
+                aggregates[name].digest.update(column)
+
+    def add(self, industries: Sequence[str], values: Mapping[str, np.ndarray]) -> None:
+        """Add companies: one industry per row and one column per metric"""
+        with self._lock:
+            self._update(industries, None, values)
+            for industry, rows in _group_rows(industries).items():
+                self._counts[industry] += len(rows)
+
+    def remove(self, industries: Sequence[str], values: Mapping[str, np.ndarray]) -> None:
+        """Remove companies previously added with these values"""
+        with self._lock:
+            self._update(industries, values, None)
+            for industry, rows in _group_rows(industries).items():
+                self._counts[industry] -= len(rows)
+                if self._counts[industry] <= 0:
+                    del self._industries[industry]
+                    del self._counts[industry]
+
+    def replace(
+        self, industries: Sequence[str], old: Mapping[str, np.ndarray], new: Mapping[str, np.ndarray]
+    ) -> None:
+        """Replace some metric values of companies already added, e.g. after a price update"""
+        with self._lock:
+            self._update(industries, old, new)
+
+    def needs_rebuild(self) -> List[str]:
+        """Industries whose quantile sketches hold too many removed values"""
+        with self._lock:
+            return [
+                industry for industry, aggregates in self._industries.items()
+                if any(
+                    aggregate.stale > self.rebuild_fraction * max(aggregate.moments.count, 1)
+                    for aggregate in aggregates.values()
+                )
+            ]
+
+    def rebuild(self, industry: str, values: Mapping[str, np.ndarray]) -> None:
+        """Replace an industry's aggregates with ones built from its current companies"""
+        size = len(next(iter(values.values()))) if values else 0
+        with self._lock:
+            self._industries.pop(industry, None)
+            self._counts.pop(industry, None)
+            self.rebuilds += 1
+            if not size:
+                return
+            aggregates = self._aggregates(industry)
+            self._counts[industry] = size
+            for name in self.metrics:
+                aggregates[name].moments.update(values[name])
+                aggregates[name].digest.update(values[name])
+
+    def industries(self) -> Dict[str, int]:
+        """Companies per industry"""
+        with self._lock:
+            return dict(self._counts)
+
+    def summary(self, industry: str) -> Optional[dict]:
+        """Count, mean, standard deviation, range and quantiles of every metric in an industry"""
+        with self._lock:
+            aggregates = self._industries.get(industry)
+            if aggregates is None:
+                return None
+            metrics = {}
+            for name, aggregate in aggregates.items():
+                quantiles = aggregate.digest.quantile(list(QUANTILES.values()))
+                metrics[name] = {
+                    "count": aggregate.moments.count,
+                    "mean": _optional(aggregate.moments.mean) if aggregate.moments.count else None,
+                    "std": _optional(aggregate.moments.std),
+                    "min": _optional(aggregate.digest.min) if aggregate.digest.count else None,
+                    "max": _optional(aggregate.digest.max) if aggregate.digest.count else None,
+                    "quantiles": {key: _optional(value) for key, value in zip(QUANTILES, quantiles)},
+                }
+            return {"industry": industry, "count": self._counts[industry], "metrics": metrics}
+
+    def rank(self, industry: str, values: Mapping[str, Optional[float]]) -> Optional[Dict[str, dict]]:
+        """Percentile (0-100) and z-score of a company's metric values within an industry"""
+        with self._lock:
+            aggregates = self._industries.get(industry)
+            if aggregates is None:
+                return None
+            ranks = {}
+            for name, aggregate in aggregates.items():
+                value = values.get(name)
+                moments = aggregate.moments
+                known = value is not None and math.isfinite(value) and moments.count > 0
+                std = moments.std
+                ranks[name] = {
+                    "value": value,
+                    "percentile": _optional(float(aggregate.digest.cdf(value)) * 100) if known else None,
+                    "z_score": (value - moments.mean) / std if known and std > 0 else None,
+                    "peer_median": _optional(float(aggregate.digest.quantile(0.5))) if moments.count else None,
+                    "peer_count": moments.count,
+                }
+            return ranks
+
+
+def build_peer_statistics() -> PeerStatistics:
+    """Create peer statistics from settings"""
+    return PeerStatistics(PEER_METRICS, settings.peer_compression, settings.peer_rebuild_fraction)
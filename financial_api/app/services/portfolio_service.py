@@ -0,0 +1,309 @@
+from app.config import settings
+from app.models.financial_models import HoldingPosition, PortfolioHolding
+from app.services.batch_service import CompanyBatch
+from app.services.metric_graph import FAMILY_METRIC_NAMES, VECTOR_OPS, metric_graph
+from app.services.validation_service import BulkValidator, company_validator
+from collections import OrderedDict
+from collections.abc import Mapping as MappingType
+from typing import Dict, List, Mapping, Optional, Sequence
+import threading
+import numpy as np
+
+# Multiples aggregated harmonically, as the inverse of the weighted mean of each
+# holding's yield (numerator / denominator): total value over total owned earnings,
+# book value, sales or EBITDA. Negative earnings count against the portfolio
+# instead of dropping out, as they would with the holdings' own multiples.
+HARMONIC_METRICS = {
+    "pe_ratio": ("earnings_per_share", "market_price_per_share"),
+    "pb_ratio": ("book_value_per_share", "market_price_per_share"),
+    "price_to_sales_ratio": ("sales_per_share", "market_price_per_share"),
+    "ev_ebitda_ratio": ("ebitda", "enterprise_value"),
+}
+
+# Graph nodes the yields are built from; the rest are input fields
+_YIELD_NODES = frozenset(
+    name for pair in HARMONIC_METRICS.values() for name in pair if name in metric_graph.nodes
+)
+
+position_validator = BulkValidator(HoldingPosition)
+
+
+class PortfolioValidationError(ValueError):
+    """A portfolio request that does not validate, with Pydantic-style errors"""
+
+    def __init__(self, errors: List[dict]):
+        # Errors as the only argument, so the exception pickles back from a worker process
+        super().__init__(errors)
+        self.errors = errors
+
+    def __str__(self) -> str:
+        return f"{len(self.errors)} validation error(s) in portfolio"
+
+
+def _holdings(payload: object) -> list:
+    """The holdings list of a decoded PortfolioRequest body, checked as Pydantic would"""
+    if not isinstance(payload, MappingType):
+        msg = "Input should be a valid dictionary or instance of PortfolioRequest"
+        raise PortfolioValidationError([{"type": "model_type", "loc": (), "msg": msg, "input": payload}])
+    holdings = payload.get("holdings")
+    if holdings is None and "holdings" not in payload:
+        error = {"type": "missing", "loc": ("holdings",), "msg": "Field required", "input": payload}
+    elif not isinstance(holdings, list):
+        error = {"type": "list_type", "loc": ("holdings",), "msg": "Input should be a valid list", "input": holdings}
+    elif not holdings:
+        msg = "List should have at least 1 item after validation, not 0"
+        error = {"type": "too_short", "loc": ("holdings",), "msg": msg, "input": holdings}
+    else:
+        return holdings
+    raise PortfolioValidationError([error])
+
+
+def _first_duplicate(tickers: Sequence[str]) -> Optional[str]:
+    seen = set()
+    for ticker in tickers:
+        if ticker in seen:
+            return ticker
+        seen.add(ticker)
+    return None
+
+
+class PortfolioFrame:
+    """
+    Per-holding metrics of a portfolio, evaluated once.
+
+    Holds a metrics x holdings matrix: each row is a metric column, or the
+    yield column of a harmonically aggregated multiple, with undefined
+    values zeroed and flagged in a matching 0/1 matrix. Aggregating for any
+    share counts is then two matrix-vector products with the weights, so
+    re-weighting never re-evaluates a metric.
+    """
+
+    def __init__(self, tickers: Sequence[str], shares: Sequence[float], batch: CompanyBatch):
+        self.tickers = list(tickers)
+        self.index = {ticker: row for row, ticker in enumerate(self.tickers)}
+        if len(self.index) < len(self.tickers):
+            raise ValueError(f"duplicate ticker: {_first_duplicate(self.tickers)}")
+        self.company_names = batch.company_names
+        self.industries = batch.industries
+        self.prices = batch.market_price_per_share.copy()
+        self.shares = np.asarray(shares, dtype=np.float64)
+
+        values = metric_graph.evaluate(batch, set(FAMILY_METRIC_NAMES) | _YIELD_NODES, VECTOR_OPS)
+
+        def column(name: str) -> np.ndarray:
+            return values[name] if name in values else batch.columns[name]
+
+        rows = []
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for name in FAMILY_METRIC_NAMES:
+                if name in HARMONIC_METRICS:
+                    numerator, denominator = HARMONIC_METRICS[name]
+                    rows.append(column(numerator) / column(denominator))
+                else:
+                    rows.append(np.broadcast_to(column(name), (len(batch),)))
+        matrix = np.array(rows, dtype=np.float64)
+        defined = np.isfinite(matrix)
+        self.values = np.where(defined, matrix, 0.0)
+        self.defined = defined.astype(np.float64)
+        self._harmonic = np.array([name in HARMONIC_METRICS for name in FAMILY_METRIC_NAMES])
+
+        # Industry codes for bincount exposure
+        self.industry_names, self.industry_codes = np.unique(
+            np.asarray(self.industries, dtype=object), return_inverse=True
+        )
+
+    @classmethod
+    def from_holdings(cls, holdings: Sequence[PortfolioHolding]) -> "PortfolioFrame":
+        return cls(
+            [holding.ticker for holding in holdings],
+            [holding.shares for holding in holdings],
+            CompanyBatch.from_records([holding.data for holding in holdings])
+        )
+
+    @classmethod
+    def from_payload(cls, payload: object) -> "PortfolioFrame":
+        """
+        Validate a decoded PortfolioRequest body column by column, positions
+        and company data alike, and prepare its holdings. Accepts and rejects
+        what PortfolioRequest would, at a fraction of the cost for large
+        portfolios; raises PortfolioValidationError with the same errors.
+        """
+        holdings = _holdings(payload)
+        positions = position_validator.validate_records(holdings)
+        companies = company_validator.validate_records(
+            [
+                holding.get("data") if type(holding) is dict or isinstance(holding, MappingType) else None
+                for holding in holdings
+            ]
+        )
+
+        errors = []
+        for row in np.flatnonzero(~(positions.valid & companies.valid)).tolist():
+            holding = holdings[row]
+            loc = ("holdings", row)
+            if not isinstance(holding, MappingType):
+                msg = "Input should be a valid dictionary or instance of PortfolioHolding"
+                errors.append({"type": "model_type", "loc": loc, "msg": msg, "input": holding})
+                continue
+            errors.extend({**error, "loc": loc + error["loc"]} for error in positions.row_errors(row))
+            if "data" not in holding:
+                errors.append({"type": "missing", "loc": loc + ("data",), "msg": "Field required", "input": holding})
+            elif not companies.valid[row]:
+                errors.extend(
+                    {**error, "loc": loc + ("data",) + error["loc"]} for error in companies.row_errors(row)
+                )
+        if errors:
+            raise PortfolioValidationError(errors)
+
+        tickers = positions.columns["ticker"].tolist()
+        duplicate = _first_duplicate(tickers)
+        if duplicate is not None:
+            raise PortfolioValidationError([{
+                "type": "value_error", "loc": ("holdings",), "msg": f"Value error, duplicate ticker: {duplicate}",
+                "input": holdings
+            }])
+        return cls(tickers, positions.columns["shares"], companies.batch)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def set_shares(self, shares: Mapping[str, float]) -> None:
+        """Change share counts of existing positions"""
+        unknown = [ticker for ticker in shares if ticker not in self.index]
+        if unknown:
+            raise ValueError(f"Unknown tickers in portfolio: {', '.join(unknown)}")
+        self.shares[[self.index[ticker] for ticker in shares]] = list(shares.values())
+
+    def aggregate(self, include_positions: bool = False) -> dict:
+        """PortfolioResult-shaped aggregates for the current share counts"""
+        market_values = self.shares * self.prices
+        total = float(market_values.sum())
+        if not total > 0:
+            raise ValueError("Portfolio has no market value")
+        weights = market_values / total
+
+        # Weighted sums over holdings reporting each metric, renormalized by their weight
+        sums = self.values @ weights
+        coverage = self.defined @ weights
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = sums / coverage
+            aggregates = np.where(self._harmonic, 1.0 / means, means)
+        # A non-positive aggregate yield has no meaningful multiple
+        aggregates[(coverage <= 0) | (self._harmonic & ~(means > 0))] = np.nan
+
+        held = market_values > 0
+        industry_values = np.bincount(self.industry_codes, weights=market_values, minlength=len(self.industry_names))
+        industry_counts = np.bincount(self.industry_codes, weights=held, minlength=len(self.industry_names))
+        exposure = [
+            {"industry": self.industry_names[code], "holdings": int(industry_counts[code]),
+             "market_value": float(industry_values[code]), "weight": float(industry_values[code] / total)}
+            for code in np.argsort(-industry_values, kind="stable").tolist()
+            if industry_counts[code]
+        ]
+
+        herfindahl = float(weights @ weights)
+        result = {
+            "holdings": int(held.sum()),
+            "total_market_value": total,
+            "herfindahl_index": herfindahl,
+            "effective_holdings": 1.0 / herfindahl,
+            "metrics": {
+                name: (None if np.isnan(value) else value)
+                for name, value in zip(FAMILY_METRIC_NAMES, aggregates.tolist())
+            },
+            "coverage": dict(zip(FAMILY_METRIC_NAMES, np.minimum(coverage, 1.0).tolist())),
+            "industry_exposure": exposure,
+        }
+        if include_positions:
+            result["positions"] = [
+                {"ticker": ticker, "company_name": name, "industry": industry,
+                 "shares": count, "market_value": value, "weight": weight}
+                for ticker, name, industry, count, value, weight in zip(
+                    self.tickers, self.company_names, self.industries,
+                    self.shares.tolist(), market_values.tolist(), weights.tolist()
+                )
+            ]
+        return result
+
+
+class PortfolioAnalysisService:
+    """Market-value-weighted portfolio metrics over vectorized per-holding metrics"""
+
+    @staticmethod
+    def analyze(holdings: Sequence[PortfolioHolding], include_positions: bool = False) -> dict:
+        """Aggregate a portfolio once, without keeping it"""
+        return PortfolioFrame.from_holdings(holdings).aggregate(include_positions)
+
+    @staticmethod
+    def analyze_payload(payload: object, include_positions: bool = False) -> dict:
+        """Validate a decoded PortfolioRequest body and aggregate it"""
+        return PortfolioFrame.from_payload(payload).aggregate(include_positions)
+
+
+class PortfolioStore:
+    """
+    Portfolios kept for re-weighting, keyed by id. Holds at most
+    ``max_portfolios``; the least recently used one is dropped beyond that.
+    """
+
+    def __init__(self, max_portfolios: int = 100):
+        self.max_portfolios = max_portfolios
+        self._lock = threading.Lock()
+        self._frames: "OrderedDict[str, PortfolioFrame]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def put(self, portfolio_id: str, frame: PortfolioFrame, include_positions: bool = False) -> dict:
+        """Store a portfolio, replacing one with the same id, and aggregate it"""
+        result = {"portfolio_id": portfolio_id, **frame.aggregate(include_positions)}
+        with self._lock:
+            self._frames[portfolio_id] = frame
+            self._frames.move_to_end(portfolio_id)
+            while len(self._frames) > self.max_portfolios:
+                self._frames.popitem(last=False)
+        return result
+
+    def _frame(self, portfolio_id: str) -> Optional[PortfolioFrame]:
+        frame = self._frames.get(portfolio_id)
+        if frame is not None:
+            self._frames.move_to_end(portfolio_id)
+        return frame
+
+    def aggregate(self, portfolio_id: str, include_positions: bool = False) -> Optional[dict]:
+        with self._lock:
+            frame = self._frame(portfolio_id)
+            if frame is None:
+                return None
+            return {"portfolio_id": portfolio_id, **frame.aggregate(include_positions)}
+
+    def reweight(
+        self, portfolio_id: str, shares: Mapping[str, float], include_positions: bool = False
+    ) -> Optional[dict]:
+        """Set new share counts and re-aggregate; the change is kept only if the result is valid"""
+        with self._lock:
+            frame = self._frame(portfolio_id)
+            if frame is None:
+                return None
+            previous = frame.shares.copy()
+            try:
+                frame.set_shares(shares)
+                return {"portfolio_id": portfolio_id, **frame.aggregate(include_positions)}
+            except ValueError:
+                frame.shares = previous
+                raise
+
+    def remove(self, portfolio_id: str) -> bool:
+        with self._lock:
+            return self._frames.pop(portfolio_id, None) is not None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "portfolios": len(self._frames),
+                "positions": sum(len(frame) for frame in self._frames.values()),
+                "max_portfolios": self.max_portfolios,
+            }
+
+
+portfolio_store = PortfolioStore(settings.portfolio_max_count)
@@ -0,0 +1,271 @@
+from app.config import settings
+from app.models.financial_models import ScenarioDistribution, ScenarioGrid, ScenarioRequest
+from app.services.metric_graph import FAMILY_METRIC_NAMES, VectorOps, metric_graph
+from app.services.peer_service import RunningMoments, TDigest
+from statistics import NormalDist
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import math
+import numpy as np
+
+# Input percentiles whose metric values bound a tornado bar
+SENSITIVITY_QUANTILES = (0.1, 0.9)
+
+
+class ScenarioOps(VectorOps):
+    """
+    VectorOps with NumPy ``power`` CAGRs. Scenario statistics do not need the
+    libm-exact results of the batch service, whose element-wise pow would
+    dominate a large run.
+    """
+
+    @staticmethod
+    def cagr(final, initial, years, condition=True):
+        base = np.where(condition, final / initial, 1.0)
+        return np.where(condition, np.power(base, 1 / years) - 1, 0.0)
+
+
+SCENARIO_OPS = ScenarioOps()
+
+
+def _optional(value: float) -> Optional[float]:
+    return float(value) if math.isfinite(value) else None
+
+
+def _quantile_key(q: float) -> str:
+    return f"p{q * 100:g}"
+
+
+def _draw(distribution: ScenarioDistribution, rng: np.random.Generator, size: int) -> np.ndarray:
+    if distribution.distribution == "normal":
+        return rng.normal(distribution.mean, distribution.std, size)
+    if distribution.distribution == "lognormal":
+        return np.exp(rng.normal(distribution.mean, distribution.std, size))
+    if distribution.distribution == "uniform":
+        return rng.uniform(distribution.low, distribution.high, size)
+    if distribution.low == distribution.high:
+        return np.full(size, distribution.low)
+    return rng.triangular(distribution.low, distribution.mode, distribution.high, size)
+
+
+def _inverse_cdf(distribution: ScenarioDistribution, q: float) -> float:
+    """Value of a distribution at quantile ``q``"""
+    if distribution.distribution in ("normal", "lognormal"):
+        value = distribution.mean + distribution.std * NormalDist().inv_cdf(q)
+        return math.exp(value) if distribution.distribution == "lognormal" else value
+    low, high = distribution.low, distribution.high
+    if distribution.distribution == "uniform":
+        return low + q * (high - low)
+    mode, width = distribution.mode, high - low
+    if width == 0:
+        return low
+    if q < (mode - low) / width:
+        return low + math.sqrt(q * width * (mode - low))
+    return high - math.sqrt((1 - q) * width * (high - mode))
+
+
+def _perturb(distribution: ScenarioDistribution, base: float, draws):
+    """Field values from draws of its distribution"""
+    if not distribution.relative:
+        return draws
+    # Lognormal draws are multipliers; the others are relative changes
+    return base * draws if distribution.distribution == "lognormal" else base * (1 + draws)
+
+
+def _shock(grid: ScenarioGrid, base: float, shocks):
+    return base * (1 + shocks) if grid.relative else shocks
+
+
+class _MetricSummary:
+    """Moments, range, undefined count and quantile sketch of one metric over scenario chunks"""
+
+    __slots__ = ("moments", "digest", "undefined", "min", "max")
+
+    def __init__(self):
+        self.moments = RunningMoments()
+        self.digest = TDigest()
+        self.undefined = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values: np.ndarray) -> np.ndarray:
+        finite = values[np.isfinite(values)]
+        self.undefined += len(values) - len(finite)
+        self.moments.update(finite)
+        if len(finite):
+            self.min = min(self.min, float(finite.min()))
+            self.max = max(self.max, float(finite.max()))
+        return finite
+
+    def result(self, quantiles: Sequence[float], exact: Optional[np.ndarray]) -> dict:
+        count = self.moments.count
+        if not count:
+            values = [math.nan] * len(quantiles)
+        elif exact is not None:
+            values = np.quantile(exact, quantiles)
+        else:
+            values = self.digest.quantile(list(quantiles))
+        return {
+            "count": count,
+            "undefined": self.undefined,
+            "mean": _optional(self.moments.mean) if count else None,
+            "std": _optional(self.moments.std),
+            "min": _optional(self.min),
+            "max": _optional(self.max),
+            "quantiles": {_quantile_key(q): _optional(v) for q, v in zip(quantiles, values)},
+        }
+
+
+class ScenarioAnalysisService:
+    """
+    Metrics of a base company under many perturbations of its inputs.
+
+    Scenarios are evaluated in chunks as one CompanyBatch-like source per
+    chunk: perturbed fields are columns and every other field stays a
+    scalar, and only metrics that depend on a perturbed field are evaluated
+    per scenario. Each field draws from its own generator spawned from the
+    seed, so results do not depend on the chunk size. Statistics accumulate
+    per chunk (Welford moments, t-digest quantiles), so memory is bounded
+    by the chunk size whatever the scenario count.
+    """
+
+    @staticmethod
+    def _grid_shape(request: ScenarioRequest) -> Tuple[int, ...]:
+        return tuple(len(grid.shocks) for grid in request.grids)
+
+    @classmethod
+    def scenario_count(cls, request: ScenarioRequest) -> int:
+        """Grid points times draws per point"""
+        points = math.prod(cls._grid_shape(request))
+        return points * request.scenarios if request.distributions else points
+
+    @staticmethod
+    def _evaluate(columns: Dict[str, object], base: Dict[str, float], targets, size: int) -> Dict[str, np.ndarray]:
+        source = SimpleNamespace(**{**base, **columns})
+        values = metric_graph.evaluate(source, targets, SCENARIO_OPS)
+        return {name: np.broadcast_to(np.asarray(values[name], dtype=np.float64), (size,)) for name in targets}
+
+    @classmethod
+    def _sensitivities(cls, request: ScenarioRequest, base: Dict[str, float], metrics: Sequence[str]) -> dict:
+        """Tornado bars: each field alone at its low and high input, every other field at base"""
+        bounds = {}
+        for distribution in request.distributions:
+            bounds[distribution.field] = tuple(
+                float(_perturb(distribution, base[distribution.field], _inverse_cdf(distribution, q)))
+                for q in SENSITIVITY_QUANTILES
+            )
+        for grid in request.grids:
+            bounds[grid.field] = tuple(
+                float(_shock(grid, base[grid.field], shock)) for shock in (min(grid.shocks), max(grid.shocks))
+            )
+
+        # One evaluation: rows 2i and 2i + 1 hold field i at its low and high input
+        fields = list(bounds)
+        size = 2 * len(fields)
+        columns = {}
+        for i, field in enumerate(fields):
+            column = np.full(size, base[field])
+            column[2 * i:2 * i + 2] = bounds[field]
+            columns[field] = column
+        dependents = {field: metric_graph.dependents((field,)) for field in fields}
+        affected = [name for name in metrics if any(name in names for names in dependents.values())]
+        values = cls._evaluate(columns, base, affected, size)
+
+        sensitivities = {}
+        for name in metrics:
+            bars = []
+            for i, field in enumerate(fields):
+                if name not in dependents[field]:
+                    continue
+                low, high = values[name][2 * i], values[name][2 * i + 1]
+                bars.append({
+                    "field": field,
+                    "low_input": bounds[field][0],
+                    "high_input": bounds[field][1],
+                    "low": _optional(low),
+                    "high": _optional(high),
+                    "swing": _optional(abs(high - low)),
+                })
+            bars.sort(key=lambda bar: -bar["swing"] if bar["swing"] is not None else math.inf)
+            sensitivities[name] = bars
+        return sensitivities
+
+    @classmethod
+    def analyze(
+        cls,
+        request: ScenarioRequest,
+        chunk_size: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> dict:
+        """
+        Summary statistics (and optionally tornado sensitivities) of metrics
+        across all scenarios; ``progress`` is called with the scenarios done
+        and the total after each chunk
+        """
+        metrics = tuple(request.metrics) if request.metrics else FAMILY_METRIC_NAMES
+        metric_graph.validate_names(metrics)
+        total = cls.scenario_count(request)
+        if total > settings.scenario_max_count:
+            raise ValueError(f"{total} scenarios exceed the limit of {settings.scenario_max_count}")
+        chunk_size = chunk_size or settings.scenario_chunk_size
+
+        # NumPy scalars so a zero divisor gives inf/NaN as in the columns rather than raising
+        base = {name: np.float64(getattr(request.base, name)) for name in metric_graph.input_fields}
+        base_values = cls._evaluate({}, base, metrics, 1)
+        seed = request.seed if request.seed is not None else np.random.SeedSequence().entropy % 2 ** 63
+        generators = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(len(request.distributions))]
+
+        fields = [d.field for d in request.distributions] + [g.field for g in request.grids]
+        affected = [name for name in metrics if name in metric_graph.dependents(fields)]
+        summaries = {name: _MetricSummary() for name in affected}
+        shape = cls._grid_shape(request)
+        repeats = request.scenarios if request.distributions else 1
+        exact = total <= chunk_size
+        finite = {}
+
+        for start in range(0, total, chunk_size):
+            size = min(chunk_size, total - start)
+            columns = {}
+            for distribution, rng in zip(request.distributions, generators):
+                columns[distribution.field] = _perturb(distribution, base[distribution.field], _draw(distribution, rng, size))
+            if request.grids:
+                points = np.unravel_index(np.arange(start, start + size) // repeats, shape)
+                for grid, index in zip(request.grids, points):
+                    shocks = np.asarray(grid.shocks, dtype=np.float64)[index]
+                    columns[grid.field] = _shock(grid, base[grid.field], shocks)
+
+            values = cls._evaluate(columns, base, affected, size)
+            for name, summary in summaries.items():
+                finite[name] = summary.update(values[name])
+                if not exact:
+                    summary.digest.update(finite[name])
+            if progress is not None:
+                progress(start + size, total)
+
+        statistics = {}
+        for name in metrics:
+            if name in summaries:
+                statistics[name] = summaries[name].result(request.quantiles, finite[name] if exact else None)
+                continue
+            # Unaffected by every perturbed field: the base value in every scenario
+            value = float(base_values[name][0])
+            defined = math.isfinite(value)
+            statistics[name] = {
+                "count": total if defined else 0,
+                "undefined": 0 if defined else total,
+                "mean": _optional(value),
+                "std": (0.0 if total > 1 else None) if defined else None,
+                "min": _optional(value),
+                "max": _optional(value),
+                "quantiles": {_quantile_key(q): _optional(value) for q in request.quantiles},
+            }
+
+        return {
+            "company_name": request.base.company_name,
+            "industry": request.base.industry,
+            "scenarios": total,
+            "seed": int(seed),
+            "base": {name: _optional(float(base_values[name][0])) for name in metrics},
+            "metrics": statistics,
+            "sensitivities": cls._sensitivities(request, base, metrics) if request.sensitivity else None,
+        }
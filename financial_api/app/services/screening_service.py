@@ -0,0 +1,593 @@
+from app.models.financial_models import CompanyFinancialData
+from app.services.batch_service import CompanyBatch, NUMERIC_FIELDS
+from app.services.metric_graph import ALL_FAMILY_METRICS, FAMILY_METRIC_NAMES, VECTOR_OPS, metric_graph
+from app.services.metric_store import MetricStore
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+import math
+import re
+import threading
+import numpy as np
+
+SCREEN_METRICS = FAMILY_METRIC_NAMES
+LABEL_FIELDS = ("industry", "company_name", "ticker")
+
+COMPARISONS = ("=", "!=", "<", "<=", ">", ">=")
+
+
+class ScreenQueryError(ValueError):
+    """Raised for a screening filter or sort that cannot be parsed or refers to unknown fields"""
+
+
+# Filter expression syntax tree
+class Comparison(NamedTuple):
+    field: str
+    op: str  # one of COMPARISONS, "between" or "in"
+    value: object
+
+
+class BoolOp(NamedTuple):
+    op: str  # "and" / "or"
+    children: Tuple[object, ...]
+
+
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<number>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)"
+    r"|'(?P<string>(?:[^']|'')*)'"
+    r"|(?P<op><=|>=|!=|<>|==|=|<|>)"
+    r"|(?P<punct>[(),])"
+    r"|(?P<word>[A-Za-z_][A-Za-z0-9_]*)"
+    r")"
+)
+
+
+def _tokenize(text: str) -> List[Tuple[str, object]]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise ScreenQueryError(f"Unexpected character at position {position}: {text[position:position + 10]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "number":
+            tokens.append(("number", float(value)))
+        elif kind == "string":
+            tokens.append(("string", value.replace("''", "'")))
+        elif kind == "op":
+            tokens.append(("op", {"<>": "!=", "==": "="}.get(value, value)))
+        elif kind == "word" and value.upper() in ("AND", "OR", "BETWEEN", "IN"):
+            tokens.append(("keyword", value.upper()))
+        else:
+            tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser for filter expressions:
+
+        expression := term ("OR" term)*
+        term       := factor ("AND" factor)*
+        factor     := "(" expression ")" | field op literal
+                    | field "BETWEEN" number "AND" number | field "IN" "(" literal ("," literal)* ")"
+    """
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def peek(self) -> Tuple[Optional[str], object]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self, kind: str, value: object = None) -> object:
+        token_kind, token_value = self.peek()
+        if token_kind != kind or (value is not None and token_value != value):
+            expected = value if value is not None else kind
+            found = token_value if token_kind is not None else "end of filter"
+            raise ScreenQueryError(f"Expected {expected}, found {found!r}")
+        self.position += 1
+        return token_value
+
+    def parse(self):
+        node = self.expression()
+        if self.position != len(self.tokens):
+            raise ScreenQueryError(f"Unexpected {self.peek()[1]!r}")
+        return node
+
+    def expression(self):
+        children = [self.term()]
+        while self.peek() == ("keyword", "OR"):
+            self.position += 1
+            children.append(self.term())
+        return children[0] if len(children) == 1 else BoolOp("or", tuple(children))
+
+    def term(self):
+        children = [self.factor()]
+        while self.peek() == ("keyword", "AND"):
+            self.position += 1
+            children.append(self.factor())
+        return children[0] if len(children) == 1 else BoolOp("and", tuple(children))
+
+    def literal(self):
+        kind, value = self.peek()
+        if kind not in ("number", "string"):
+            raise ScreenQueryError(f"Expected a number or a quoted string, found {value!r}")
+        self.position += 1
+        return value
+
+    def factor(self):
+        if self.peek() == ("punct", "("):
+            self.position += 1
+            node = self.expression()
+            self.take("punct", ")")
+            return node
+
+        field = self.take("word")
+        if field not in ALL_FAMILY_METRICS and field not in LABEL_FIELDS:
+            raise ScreenQueryError(f"Unknown field: {field}")
+        numeric = field in ALL_FAMILY_METRICS
+
+        kind, value = self.peek()
+        if (kind, value) == ("keyword", "BETWEEN"):
+            self.position += 1
+            low = self.take("number")
+            self.take("keyword", "AND")
+            high = self.take("number")
+            if not numeric:
+                raise ScreenQueryError(f"BETWEEN needs a metric, not {field}")
+            return Comparison(field, "between", (low, high))
+        if (kind, value) == ("keyword", "IN"):
+            self.position += 1
+            self.take("punct", "(")
+            values = [self.literal()]
+            while self.peek() == ("punct", ","):
+                self.position += 1
+                values.append(self.literal())
+            self.take("punct", ")")
+            return Comparison(field, "in", tuple(self._check(field, numeric, v) for v in values))
+
+        op = self.take("op")
+        operand = self._check(field, numeric, self.literal())
+        if not numeric and op not in ("=", "!="):
+            raise ScreenQueryError(f"{field} only supports =, != and IN")
+        return Comparison(field, op, operand)
+
+    @staticmethod
+    def _check(field: str, numeric: bool, value: object) -> object:
+        if numeric != isinstance(value, float):
+            expected = "a number" if numeric else "a quoted string"
+            raise ScreenQueryError(f"{field} must be compared with {expected}")
+        return value
+
+
+def parse_filter(text: str):
+    """Parse a filter expression such as ``roe > 0.15 AND industry = 'Technology'``; empty matches everything"""
+    if not text or not text.strip():
+        return None
+    return _Parser(text).parse()
+
+
+def parse_sort(keys: Sequence[str]) -> List[Tuple[str, bool]]:
+    """``["-roe", "pe_ratio"]`` as ``[(name, descending)]``"""
+    parsed = []
+    for key in keys:
+        key = key.strip()
+        descending = key.startswith("-")
+        name = key.lstrip("+-")
+        if name not in ALL_FAMILY_METRICS:
+            raise ScreenQueryError(f"Cannot sort by: {name}")
+        parsed.append((name, descending))
+    return parsed
+
+
+class _SortedIndex:
+    """Row numbers of a metric column in value order; NaNs are left out"""
+
+    __slots__ = ("order", "values")
+
+    def __init__(self, column: np.ndarray):
+        order = np.argsort(column, kind="stable")
+        valid = int(np.count_nonzero(~np.isnan(column)))
+        self.order = order[:valid]
+        self.values = column[self.order]
+
+    def span(self, op: str, value) -> Tuple[int, int]:
+        """Positions in the index of the rows matching ``column op value``"""
+        if op == "between":
+            low, high = value
+            return int(np.searchsorted(self.values, low, "left")), int(np.searchsorted(self.values, high, "right"))
+        if op in ("<", "<="):
+            return 0, int(np.searchsorted(self.values, value, "left" if op == "<" else "right"))
+        if op in (">", ">="):
+            return int(np.searchsorted(self.values, value, "right" if op == ">" else "left")), len(self.values)
+        return int(np.searchsorted(self.values, value, "left")), int(np.searchsorted(self.values, value, "right"))
+
+
+_NUMPY_COMPARISONS = {
+    "=": np.equal, "!=": np.not_equal, "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+}
+
+
+class ScreeningStore:
+    """
+    Complete analyses of a universe held as metric columns, queried with
+    filter expressions.
+
+    Every metric column gets a sorted index, built lazily and dropped when
+    the column changes. A comparison becomes a binary-searched range of its
+    index and an industry test a posting list, so a conjunction starts from
+    its most selective predicate. The others are checked against the
+    remaining candidate rows while few remain, or intersected as bitmaps.
+
+    With a MetricStore attached, stored companies are loaded from it and
+    later additions and removals are written through to it. Loading keeps
+    the store's mapped columns and encoded labels as they are; they are
+    copied into growable arrays and lists on the first change.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, int]] = {}
+        self._tickers: Sequence[str] = []
+        self._company_names: Sequence[str] = []
+        self._industry_names: List[str] = []
+        self._industry_codes: Dict[str, int] = {}
+        self._capacity = initial_capacity
+        self._industries = np.empty(initial_capacity, dtype=np.int32)
+        self._values = {name: np.empty(initial_capacity) for name in SCREEN_METRICS}
+        self._sorted: Dict[str, _SortedIndex] = {}
+        self._postings: Optional[Dict[int, np.ndarray]] = None
+        self._store: Optional[MetricStore] = None
+
+    def attach(self, store: MetricStore) -> int:
+        """Replace the universe with the companies persisted in ``store`` and write later changes through to it"""
+        universe = store.read()
+        size = len(universe.tickers)
+        with self._lock:
+            # Built on the first ticker lookup
+            self._index = None
+            self._tickers = universe.tickers
+            self._company_names = universe.company_names
+            self._industry_names = list(universe.industry_names)
+            self._industry_codes = {industry: code for code, industry in enumerate(self._industry_names)}
+            self._capacity = size
+            self._industries = universe.industry_codes
+            self._values = {name: universe.columns[name] for name in SCREEN_METRICS}
+            self._sorted.clear()
+            self._postings = None
+            self._store = store
+        return size
+
+    def detach(self) -> None:
+        self._store = None
+
+    @property
+    def store(self) -> Optional[MetricStore]:
+        return self._store
+
+    def __len__(self) -> int:
+        return len(self._tickers)
+
+    def _ticker_index(self) -> Dict[str, int]:
+        if self._index is None:
+            self._index = {ticker: row for row, ticker in enumerate(self._tickers)}
+        return self._index
+
+    def _own(self) -> None:
+        """Replace columns and labels loaded from a store with growable copies before a change"""
+        if isinstance(self._tickers, list):
+            return
+        self._tickers = list(self._tickers)
+        self._company_names = list(self._company_names)
+        size = len(self._tickers)
+        self._capacity = size
+        industries = np.empty(self._capacity, dtype=np.int32)
+        industries[:size] = self._industries
+        self._industries = industries
+        for name, column in self._values.items():
+            owned = np.empty(self._capacity)
+            owned[:size] = column
+            self._values[name] = owned
+
+    def _reserve(self, size: int) -> None:
+        if size <= self._capacity:
+            return
+        capacity = max(size, self._capacity * 2)
+        industries = np.empty(capacity, dtype=np.int32)
+        industries[:len(self._industries)] = self._industries
+        self._industries = industries
+        for name, column in self._values.items():
+            grown = np.empty(capacity)
+            grown[:len(column)] = column
+            self._values[name] = grown
+        self._capacity = capacity
+
+    def _industry_code(self, industry: str) -> int:
+        code = self._industry_codes.get(industry)
+        if code is None:
+            code = self._industry_codes[industry] = len(self._industry_names)
+            self._industry_names.append(industry)
+        return code
+
+    def upsert(
+        self,
+        tickers: Sequence[str],
+        company_names: Sequence[str],
+        industries: Sequence[str],
+        metrics: Mapping[str, np.ndarray]
+    ) -> int:
+        """Store metric columns for tickers; a ticker already present is replaced"""
+        latest = {ticker: i for i, ticker in enumerate(tickers)}
+        positions = np.fromiter(latest.values(), dtype=np.intp, count=len(latest))
+        with self._lock:
+            self._own()
+            index = self._ticker_index()
+            rows = np.empty(len(latest), dtype=np.intp)
+            for i, (ticker, position) in enumerate(latest.items()):
+                row = index.get(ticker)
+                if row is None:
+                    row = len(self._tickers)
+                    index[ticker] = row
+                    self._tickers.append(ticker)
+                    self._company_names.append(company_names[position])
+                else:
+                    self._company_names[row] = company_names[position]
+                rows[i] = row
+            self._reserve(len(self._tickers))
+            self._industries[rows] = [self._industry_code(industries[p]) for p in positions]
+            for name in SCREEN_METRICS:
+                self._values[name][rows] = np.broadcast_to(metrics[name], (len(tickers),))[positions]
+            self._sorted.clear()
+            self._postings = None
+        return len(latest)
+
+    def add_companies(self, companies: Sequence[Tuple[str, CompanyFinancialData]]) -> int:
+        """Analyze companies with the vectorized engine and store their metrics under tickers"""
+        if not companies:
+            return 0
+        batch = CompanyBatch.from_records([data for _, data in companies])
+        values = metric_graph.evaluate(batch, ALL_FAMILY_METRICS, VECTOR_OPS)
+        tickers = [ticker for ticker, _ in companies]
+        if self._store is not None:
+            # Persist inputs and metrics first so a stored company is never lost on restart
+            columns = {f"input.{name}": batch.columns[name] for name in NUMERIC_FIELDS}
+            columns.update((name, values[name]) for name in FAMILY_METRIC_NAMES)
+            self._store.write(tickers, batch.company_names, batch.industries, columns)
+        return self.upsert(tickers, batch.company_names, batch.industries, values)
+
+    def remove(self, ticker: str) -> bool:
+        """Drop a ticker, moving the last row into its slot"""
+        with self._lock:
+            index = self._ticker_index()
+            row = index.pop(ticker, None)
+            if row is None:
+                return False
+            self._own()
+            last = len(self._tickers) - 1
+            if row != last:
+                moved = self._tickers[last]
+                index[moved] = row
+                self._tickers[row] = moved
+                self._company_names[row] = self._company_names[last]
+                self._industries[row] = self._industries[last]
+                for column in self._values.values():
+                    column[row] = column[last]
+            self._tickers.pop()
+            self._company_names.pop()
+            self._sorted.clear()
+            self._postings = None
+        if self._store is not None:
+            self._store.delete([ticker])
+        return True
+
+    def clear(self) -> None:
+        """Drop every company, including from an attached store"""
+        with self._lock:
+            if self._store is not None:
+                self._store.delete(self._tickers)
+            self._own()
+            self._index = {}
+            self._tickers.clear()
+            self._company_names.clear()
+            self._sorted.clear()
+            self._postings = None
+
+    # Query evaluation; callers hold the lock
+
+    def _sorted_index(self, name: str) -> _SortedIndex:
+        index = self._sorted.get(name)
+        if index is None:
+            index = self._sorted[name] = _SortedIndex(self._values[name][:len(self)])
+        return index
+
+    def _posting(self, industry: str) -> np.ndarray:
+        if self._postings is None:
+            codes = self._industries[:len(self)]
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(self._industry_names) + 1))
+            self._postings = {
+                code: order[bounds[code]:bounds[code + 1]] for code in range(len(self._industry_names))
+            }
+        code = self._industry_codes.get(industry)
+        return self._postings.get(code, np.empty(0, dtype=np.intp)) if code is not None else np.empty(0, dtype=np.intp)
+
+    def _label_mask(self, comparison: Comparison, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Boolean mask of a company_name / ticker / industry test over ``rows`` (all rows when None)"""
+        values = set(comparison.value) if comparison.op == "in" else {comparison.value}
+        if comparison.field == "industry":
+            codes = [self._industry_codes[v] for v in values if v in self._industry_codes]
+            column = self._industries[:len(self)] if rows is None else self._industries[rows]
+            mask = np.isin(column, codes)
+        else:
+            labels = self._company_names if comparison.field == "company_name" else self._tickers
+            selected = labels if rows is None else [labels[row] for row in rows.tolist()]
+            mask = np.fromiter((label in values for label in selected), dtype=bool, count=len(selected))
+        return ~mask if comparison.op == "!=" else mask
+
+    def _candidates(self, comparison: Comparison) -> Optional[np.ndarray]:
+        """Matching rows from an index, or None when the predicate has no index access path"""
+        # Each distinct IN value once, so a repeated value does not repeat its rows
+        values = dict.fromkeys(comparison.value) if comparison.op == "in" else (comparison.value,)
+        if comparison.field == "industry" and comparison.op in ("=", "in"):
+            return np.concatenate([self._posting(v) for v in values])
+        if comparison.field == "ticker" and comparison.op in ("=", "in"):
+            index = self._ticker_index()
+            return np.asarray([index[v] for v in values if v in index], dtype=np.intp)
+        if comparison.field not in ALL_FAMILY_METRICS:
+            return None
+        index = self._sorted_index(comparison.field)
+        if comparison.op == "in":
+            return np.concatenate([index.order[slice(*index.span("=", v))] for v in np.unique(comparison.value)])
+        if comparison.op == "!=":
+            start, stop = index.span("=", comparison.value)
+            return np.concatenate([index.order[:start], index.order[stop:]])
+        return index.order[slice(*index.span(comparison.op, comparison.value))]
+
+    def _estimate(self, node) -> int:
+        """Upper bound of matching rows, from index spans without materializing them"""
+        if isinstance(node, BoolOp):
+            counts = [self._estimate(child) for child in node.children]
+            return min(counts) if node.op == "and" else min(len(self), sum(counts))
+        if node.field in ("industry", "ticker") and node.op in ("=", "in"):
+            return len(self._candidates(node))
+        if node.field in ALL_FAMILY_METRICS and node.op not in ("in", "!="):
+            start, stop = self._sorted_index(node.field).span(node.op, node.value)
+            return stop - start
+        return len(self)
+
+    def _probe(self, node, rows: np.ndarray) -> np.ndarray:
+        """Mask of ``node`` over the given rows, by looking their values up"""
+        if isinstance(node, BoolOp):
+            combine = np.logical_and if node.op == "and" else np.logical_or
+            mask = self._probe(node.children[0], rows)
+            for child in node.children[1:]:
+                mask = combine(mask, self._probe(child, rows))
+            return mask
+        if node.field not in ALL_FAMILY_METRICS:
+            return self._label_mask(node, rows)
+        values = self._values[node.field][rows]
+        if node.op == "between":
+            mask = (values >= node.value[0]) & (values <= node.value[1])
+        elif node.op == "in":
+            mask = np.isin(values, node.value)
+        else:
+            mask = _NUMPY_COMPARISONS[node.op](values, node.value)
+        # As in the sorted indexes, NaN matches no comparison (NaN != x would be true)
+        return mask & ~np.isnan(values)
+
+    def _bitmap(self, node) -> np.ndarray:
+        """Bitmap of every row matching ``node``"""
+        if isinstance(node, BoolOp) and node.op == "or":
+            bitmap = np.zeros(len(self), dtype=bool)
+            for child in node.children:
+                bitmap |= self._bitmap(child)
+            return bitmap
+        if isinstance(node, BoolOp):
+            bitmap = np.zeros(len(self), dtype=bool)
+            bitmap[self._match(node)] = True
+            return bitmap
+        rows = self._candidates(node)
+        if rows is None:
+            return self._label_mask(node, None)
+        bitmap = np.zeros(len(self), dtype=bool)
+        bitmap[rows] = True
+        return bitmap
+
+    def _match(self, node) -> np.ndarray:
+        """Rows matching ``node``, in no particular order"""
+        if node is None:
+            return np.arange(len(self))
+        if not isinstance(node, BoolOp) or node.op == "or":
+            rows = self._candidates(node) if isinstance(node, Comparison) else None
+            return rows if rows is not None else np.flatnonzero(self._bitmap(node))
+
+        # Most selective predicate first; the rest narrow its candidates
+        children = sorted(node.children, key=self._estimate)
+        rows = self._match(children[0])
+        for child in children[1:]:
+            if not len(rows):
+                break
+            if self._estimate(child) < len(rows) or len(rows) > len(self) // 8:
+                rows = rows[self._bitmap(child)[rows]]
+            else:
+                rows = rows[self._probe(child, rows)]
+        return rows
+
+    def _order(self, rows: np.ndarray, sort: List[Tuple[str, bool]], limit: int) -> np.ndarray:
+        """Sort matching rows (NaNs last) and keep the first ``limit``"""
+        if not sort:
+            return np.sort(rows)[:limit]
+        if len(sort) == 1 and len(rows) > len(self) // 8:
+            # Walk the sorted index and keep members, instead of sorting the matches
+            name, descending = sort[0]
+            index = self._sorted_index(name)
+            member = np.zeros(len(self), dtype=bool)
+            member[rows] = True
+            order = index.order[::-1] if descending else index.order
+            ordered = order[member[order]]
+            if len(ordered) < limit:
+                missing = np.setdiff1d(rows, index.order, assume_unique=True)
+                ordered = np.concatenate([ordered, np.sort(missing)])
+            return ordered[:limit]
+
+        # lexsort orders by its last key first; ties keep row order
+        rows = np.sort(rows)
+        keys = []
+        for name, descending in reversed(sort):
+            values = self._values[name][rows]
+            keys.append(np.where(np.isnan(values), np.inf, -values if descending else values))
+        return rows[np.lexsort(keys)][:limit]
+
+    def query(
+        self,
+        where: str = "",
+        sort: Sequence[str] = (),
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None
+    ) -> dict:
+        """
+        Companies matching a filter expression, sorted and limited.
+
+        Returns the total number of matches and the selected rows with their
+        ticker, company name, industry and the requested metrics (all when
+        ``fields`` is None). NaN metrics never match a comparison.
+        """
+        node = parse_filter(where)
+        sort_keys = parse_sort(sort)
+        fields = list(SCREEN_METRICS if fields is None else fields)
+        unknown = [name for name in fields if name not in ALL_FAMILY_METRICS]
+        if unknown:
+            raise ScreenQueryError(f"Unknown fields: {', '.join(unknown)}")
+
+        with self._lock:
+            rows = self._match(node)
+            total = len(rows)
+            selected = self._order(rows, sort_keys, limit)
+            columns = {name: self._values[name][selected].tolist() for name in fields}
+            results = [
+                {
+                    "ticker": self._tickers[row],
+                    "company_name": self._company_names[row],
+                    "industry": self._industry_names[self._industries[row]],
+                    "metrics": {
+                        name: (None if math.isnan(column[i]) else column[i]) for name, column in columns.items()
+                    },
+                }
+                for i, row in enumerate(selected.tolist())
+            ]
+        return {"total": total, "results": results}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "companies": len(self),
+                "industries": len(np.unique(self._industries[:len(self)])),
+                "indexed_metrics": sorted(self._sorted),
+                "store": self._store.stats() if self._store is not None else None,
+            }
+
+
+screening_store = ScreeningStore()
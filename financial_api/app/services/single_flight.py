@@ -0,0 +1,158 @@
+from app.config import settings
+from app.models.financial_models import CompanyFinancialData, SelectedMetricsResult
+from app.services.cache_service import COMPLETE_ANALYSIS, CachedAnalysisService, payload_key
+from app.services.metric_graph import FAMILY_METRICS
+from app.telemetry import registry
+from pydantic import BaseModel
+from typing import Any, Callable, Dict, Hashable, Optional
+import asyncio
+
+COALESCED_REQUESTS = registry.counter(
+    "financial_api_coalesced_requests",
+    "Requests answered by another request's in-flight computation, by what they joined",
+    ("kind",)
+)
+
+# Flight namespaces: flat metric values for the fast response path, result models otherwise
+VALUES = "values"
+MODELS = "models"
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one computation.
+
+    The first caller (the leader) starts the computation as its own task
+    and every caller, leader included, awaits it shielded: a caller that
+    disconnects does not cancel the work the others are waiting for. The
+    task first yields for ``window_seconds`` (by default one event loop
+    turn) so that requests already queued behind the leader can join
+    before the synchronous computation holds the loop.
+    """
+
+    def __init__(self, window_seconds: float = 0.0):
+        self.window_seconds = window_seconds
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced: Dict[str, int] = {}
+
+    def in_flight(self, key: Hashable) -> Optional[asyncio.Task]:
+        return self._flights.get(key)
+
+    async def join(self, flight: asyncio.Task, kind: str) -> Any:
+        """Await another caller's computation"""
+        self.coalesced[kind] = self.coalesced.get(kind, 0) + 1
+        COALESCED_REQUESTS.inc((kind,))
+        return await asyncio.shield(flight)
+
+    async def do(self, key: Hashable, compute: Callable[[], Any], kind: str = "same") -> Any:
+        """Result of ``compute``, shared with every concurrent call for ``key``"""
+        flight = self._flights.get(key)
+        if flight is not None:
+            return await self.join(flight, kind)
+
+        self.leaders += 1
+        flight = asyncio.get_running_loop().create_task(self._run(compute))
+        self._flights[key] = flight
+        flight.add_done_callback(lambda task: self._finish(key, task))
+        return await asyncio.shield(flight)
+
+    async def _run(self, compute: Callable[[], Any]) -> Any:
+        await asyncio.sleep(self.window_seconds)
+        return compute()
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        # Mark the exception retrieved in case every caller has gone
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        coalesced = sum(self.coalesced.values())
+        return {
+            "window_seconds": self.window_seconds,
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "coalesced": coalesced,
+            "coalesced_by_kind": dict(self.coalesced),
+            "coalesced_ratio": coalesced / (coalesced + self.leaders) if self.leaders else 0.0,
+        }
+
+
+def _family_values(complete: SelectedMetricsResult, family: str) -> SelectedMetricsResult:
+    return SelectedMetricsResult(
+        company_name=complete.company_name,
+        industry=complete.industry,
+        metrics={name: complete.metrics[name] for name in FAMILY_METRICS[family]}
+    )
+
+
+class CoalescedAnalysisService:
+    """
+    CachedAnalysisService behind a SingleFlight group keyed by payload_key.
+
+    Identical concurrent requests share one cache lookup and computation. A
+    family request also joins an in-flight complete analysis of the same
+    payload and takes its family from that result.
+    """
+
+    flights: Optional[SingleFlight] = None
+
+    @classmethod
+    async def _coalesce(
+        cls, namespace: str, data: CompanyFinancialData, family: Optional[str],
+        compute: Callable[[str], Any], project: Callable[[Any], Any]
+    ) -> Any:
+        key = payload_key(data)
+        if family is not None:
+            complete = cls.flights.in_flight((namespace, COMPLETE_ANALYSIS, key))
+            if complete is not None:
+                return project(await cls.flights.join(complete, COMPLETE_ANALYSIS))
+        return await cls.flights.do((namespace, family or COMPLETE_ANALYSIS, key), lambda: compute(key))
+
+    @classmethod
+    async def analysis_values(cls, data: CompanyFinancialData, family: Optional[str] = None) -> SelectedMetricsResult:
+        """Flat metric values of a complete analysis or one family"""
+        if cls.flights is None:
+            return CachedAnalysisService.analysis_values(data, family)
+        return await cls._coalesce(
+            VALUES, data, family,
+            lambda key: CachedAnalysisService.analysis_values(data, family, key),
+            lambda complete: _family_values(complete, family)
+        )
+
+    @classmethod
+    async def perform_complete_analysis(cls, data: CompanyFinancialData) -> BaseModel:
+        """Complete analysis result model"""
+        if cls.flights is None:
+            return CachedAnalysisService.perform_complete_analysis(data)
+        return await cls._coalesce(
+            MODELS, data, None, lambda key: CachedAnalysisService.perform_complete_analysis(data, key), None
+        )
+
+    @classmethod
+    async def calculate_family(cls, family: str, data: CompanyFinancialData) -> BaseModel:
+        """One metric family result model"""
+        if cls.flights is None:
+            return CachedAnalysisService.calculate_family(family, data)
+        return await cls._coalesce(
+            MODELS, data, family,
+            lambda key: CachedAnalysisService.calculate_family(family, data, key),
+            lambda complete: getattr(complete, family)
+        )
+
+
+def build_single_flight() -> Optional[SingleFlight]:
+    """Create the process-wide coalescing group from settings"""
+    if not settings.coalesce_enabled:
+        return None
+    return SingleFlight(settings.coalesce_window_seconds)
+
+
+CoalescedAnalysisService.flights = build_single_flight()
+
+registry.gauge(
+    "financial_api_coalesce_in_flight", "Distinct analyses currently in flight",
+    lambda: [((), CoalescedAnalysisService.flights.stats()["in_flight"])] if CoalescedAnalysisService.flights else []
+)
@@ -0,0 +1,267 @@
+from app.models.financial_models import CompanyFinancialData, FinancialAnalysisResult
+from app.services.batch_service import CompanyBatch, NUMERIC_FIELDS
+from app.services.metric_graph import (
+    ALL_FAMILY_METRICS,
+    FAMILY_METRICS,
+    VECTOR_OPS,
+    metric_graph
+)
+from app.services.peer_service import PEER_METRICS, PeerStatistics, build_peer_statistics
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+import math
+import threading
+import numpy as np
+
+PRICE_FIELD = "market_price_per_share"
+
+# Every graph node a complete analysis evaluates
+_STORED_NODES = tuple(node.name for node in metric_graph.plan(ALL_FAMILY_METRICS)[0])
+
+# Nodes whose value moves with the share price, and the stored nodes they build on
+PRICE_DEPENDENT = frozenset(metric_graph.dependents([PRICE_FIELD]))
+_PRICE_TARGETS = tuple(name for name in FAMILY_METRICS["market_valuation_metrics"] if name in PRICE_DEPENDENT)
+_PRICE_GIVEN = frozenset(name for name in _STORED_NODES if name not in PRICE_DEPENDENT)
+
+
+class _RowView:
+    """Attribute access to stored input columns at selected rows, with a price override"""
+
+    def __init__(self, store: "FundamentalsSnapshotStore", rows: np.ndarray, prices: np.ndarray):
+        self._store = store
+        self._rows = rows
+        self.market_price_per_share = prices
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        return self._store._inputs[name][self._rows]
+
+
+class FundamentalsSnapshotStore:
+    """
+    Registered company fundamentals with every evaluated metric graph node,
+    held as columns keyed by ticker.
+
+    Price updates re-evaluate only the nodes downstream of
+    market_price_per_share (P/E, P/B, dividend yield, EV/EBITDA, P/S and the
+    market cap / enterprise value they use); everything else is served from
+    the values computed at registration.
+
+    Per-industry peer statistics follow registrations and removals
+    immediately. Price updates only mark tickers for the peer statistics,
+    which fold them in, one vectorized pass for all ticks since the last
+    read, when ``sync_peers`` is called; the tick path stays as cheap as
+    without them.
+    """
+
+    def __init__(self, initial_capacity: int = 1024, peers: Optional[PeerStatistics] = None):
+        self.peers = peers if peers is not None else PeerStatistics()
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        self._tickers: List[str] = []
+        self._company_names: List[str] = []
+        self._industries: List[str] = []
+        self._capacity = initial_capacity
+        self._inputs = {name: np.empty(initial_capacity) for name in NUMERIC_FIELDS}
+        self._values = {name: np.empty(initial_capacity) for name in _STORED_NODES}
+        # Price-dependent metric values as last folded into the peer statistics
+        self._peer_values = {name: np.empty(initial_capacity) for name in _PRICE_TARGETS}
+        self._peer_dirty = set()
+
+    def __len__(self) -> int:
+        return len(self._tickers)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._index
+
+    def _reserve(self, size: int) -> None:
+        if size <= self._capacity:
+            return
+        capacity = max(size, self._capacity * 2)
+        for columns in (self._inputs, self._values, self._peer_values):
+            for name, column in columns.items():
+                grown = np.empty(capacity)
+                grown[:len(self)] = column[:len(self)]
+                columns[name] = grown
+        self._capacity = capacity
+
+    def register(self, snapshots: Sequence[Tuple[str, CompanyFinancialData]]) -> int:
+        """Store fundamentals and evaluate the full metric graph for them; re-registering replaces"""
+        latest = dict(snapshots)
+        if not latest:
+            return 0
+
+        batch = CompanyBatch.from_records(list(latest.values()))
+        values = metric_graph.evaluate(batch, ALL_FAMILY_METRICS, VECTOR_OPS)
+
+        with self._lock:
+            rows = []
+            replaced_rows = []
+            replaced_industries = []
+            for ticker, data in latest.items():
+                row = self._index.get(ticker)
+                if row is None:
+                    row = len(self._tickers)
+                    self._reserve(row + 1)
+                    self._index[ticker] = row
+                    self._tickers.append(ticker)
+                    self._company_names.append(data.company_name)
+                    self._industries.append(data.industry)
+                else:
+                    replaced_rows.append(row)
+                    replaced_industries.append(self._industries[row])
+                    self._company_names[row] = data.company_name
+                    self._industries[row] = data.industry
+                rows.append(row)
+
+            replaced = self._peer_columns(replaced_rows)
+            rows = np.asarray(rows)
+            for name in NUMERIC_FIELDS:
+                self._inputs[name][rows] = batch.columns[name]
+            for name in _STORED_NODES:
+                self._values[name][rows] = values[name]
+            for name in _PRICE_TARGETS:
+                self._peer_values[name][rows] = values[name]
+
+            if replaced_rows:
+                self.peers.remove(replaced_industries, replaced)
+                self._peer_dirty.difference_update(latest)
+            self.peers.add([data.industry for data in latest.values()], {name: values[name] for name in PEER_METRICS})
+            self._sync_peers()
+        return len(latest)
+
+    def _peer_columns(self, rows) -> Dict[str, np.ndarray]:
+        """Metric values of rows as currently held by the peer statistics"""
+        return {
+            name: (self._peer_values if name in self._peer_values else self._values)[name][rows]
+            for name in PEER_METRICS
+        }
+
+    def _sync_peers(self) -> None:
+        """Fold pending price updates into the peer statistics and rebuild industries with stale sketches"""
+        if self._peer_dirty:
+            rows = np.fromiter((self._index[t] for t in self._peer_dirty), dtype=np.intp, count=len(self._peer_dirty))
+            self._peer_dirty.clear()
+            current = {name: self._values[name][rows] for name in _PRICE_TARGETS}
+            self.peers.replace(
+                [self._industries[row] for row in rows],
+                {name: self._peer_values[name][rows] for name in _PRICE_TARGETS},
+                current
+            )
+            for name, column in current.items():
+                self._peer_values[name][rows] = column
+
+        for industry in self.peers.needs_rebuild():
+            rows = np.flatnonzero(np.asarray(self._industries, dtype=object) == industry)
+            self.peers.rebuild(industry, {name: self._values[name][rows] for name in PEER_METRICS})
+
+    def sync_peers(self) -> PeerStatistics:
+        """Peer statistics including every price update so far"""
+        with self._lock:
+            self._sync_peers()
+        return self.peers
+
+    def remove(self, ticker: str) -> bool:
+        """Drop a ticker, moving the last row into its slot"""
+        with self._lock:
+            row = self._index.pop(ticker, None)
+            if row is None:
+                return False
+            self.peers.remove([self._industries[row]], self._peer_columns([row]))
+            self._peer_dirty.discard(ticker)
+            last = len(self._tickers) - 1
+            if row != last:
+                moved = self._tickers[last]
+                self._index[moved] = row
+                self._tickers[row] = moved
+                self._company_names[row] = self._company_names[last]
+                self._industries[row] = self._industries[last]
+                for columns in (self._inputs, self._values, self._peer_values):
+                    for column in columns.values():
+                        column[row] = column[last]
+            self._tickers.pop()
+            self._company_names.pop()
+            self._industries.pop()
+            return True
+
+    def update_prices(self, prices: Mapping[str, float]) -> Tuple[List[str], List[str]]:
+        """
+        Apply new share prices and recompute only price-dependent metrics.
+
+        Returns the updated tickers and the tickers that are not registered.
+        """
+        with self._lock:
+            updated = [ticker for ticker in prices if ticker in self._index]
+            unknown = [ticker for ticker in prices if ticker not in self._index]
+            if not updated:
+                return updated, unknown
+
+            rows = np.fromiter((self._index[t] for t in updated), dtype=np.intp, count=len(updated))
+            new_prices = np.fromiter((prices[t] for t in updated), dtype=np.float64, count=len(updated))
+
+            known = {name: self._values[name][rows] for name in _PRICE_GIVEN}
+            values = metric_graph.evaluate(
+                _RowView(self, rows, new_prices), _PRICE_TARGETS, VECTOR_OPS, known
+            )
+
+            self._inputs[PRICE_FIELD][rows] = new_prices
+            for name in PRICE_DEPENDENT:
+                if name in values:
+                    self._values[name][rows] = np.broadcast_to(values[name], rows.shape)
+            self._peer_dirty.update(updated)
+        return updated, unknown
+
+    def _family(self, family: str, row: int) -> Dict[str, Optional[float]]:
+        family_values = {}
+        for name in FAMILY_METRICS[family]:
+            value = float(self._values[name][row])
+            family_values[name] = None if math.isnan(value) else value
+        return family_values
+
+    def market_valuation(self, tickers: Iterable[str]) -> Dict[str, Dict[str, Optional[float]]]:
+        """Stored market valuation metrics of registered tickers"""
+        with self._lock:
+            return {
+                ticker: self._family("market_valuation_metrics", self._index[ticker])
+                for ticker in tickers if ticker in self._index
+            }
+
+    def get(self, ticker: str) -> Optional[FinancialAnalysisResult]:
+        """Complete analysis of a registered ticker, from stored values"""
+        with self._lock:
+            row = self._index.get(ticker)
+            if row is None:
+                return None
+            return FinancialAnalysisResult(
+                company_name=self._company_names[row],
+                industry=self._industries[row],
+                **{family: self._family(family, row) for family in FAMILY_METRICS}
+            )
+
+    def get_fundamentals(self, ticker: str) -> Optional[CompanyFinancialData]:
+        """Registered input data of a ticker, including its latest price"""
+        with self._lock:
+            row = self._index.get(ticker)
+            if row is None:
+                return None
+            return CompanyFinancialData(
+                company_name=self._company_names[row],
+                industry=self._industries[row],
+                **{name: float(self._inputs[name][row]) for name in NUMERIC_FIELDS}
+            )
+
+    def get_values(self, ticker: str) -> Optional[Tuple[str, str, Dict[str, Optional[float]]]]:
+        """Company name, industry and flat metric values of a registered ticker"""
+        with self._lock:
+            row = self._index.get(ticker)
+            if row is None:
+                return None
+            values = {}
+            for family in FAMILY_METRICS:
+                values.update(self._family(family, row))
+            return self._company_names[row], self._industries[row], values
+
+    def tickers(self) -> List[str]:
+        with self._lock:
+            return list(self._tickers)
+
+
+snapshot_store = FundamentalsSnapshotStore(peers=build_peer_statistics())
@@ -0,0 +1,267 @@
+from annotated_types import Ge, Gt, Le, Lt
+from app.models.financial_models import CompanyFinancialData
+from app.services.batch_service import CompanyBatch, CompanyRecord
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from collections.abc import Mapping
+from itertools import chain
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Type
+import numpy as np
+
+_MISSING = object()
+
+# Field constraint -> (Pydantic error type, message prefix, passing comparison)
+_BOUNDS = {
+    Gt: ("greater_than", "Input should be greater than", np.greater),
+    Ge: ("greater_than_equal", "Input should be greater than or equal to", np.greater_equal),
+    Lt: ("less_than", "Input should be less than", np.less),
+    Le: ("less_than_equal", "Input should be less than or equal to", np.less_equal),
+}
+
+# Values taken as they are by a float field; anything else goes through Pydantic's parser
+_NUMBER_TYPES = {int, float}
+
+
+class FieldRule:
+    """Type and bounds of one model field, read from its annotation and Field constraints"""
+
+    __slots__ = ("name", "bit", "numeric", "bounds", "adapter")
+
+    def __init__(self, name: str, bit: int, annotation: type, metadata: Sequence[object]):
+        self.name = name
+        self.bit = np.uint64(1) << np.uint64(bit)
+        self.numeric = annotation is float
+        self.bounds: List[Tuple[type, float]] = []
+        for constraint in metadata:
+            for kind in _BOUNDS:
+                if isinstance(constraint, kind):
+                    self.bounds.append((kind, getattr(constraint, kind.__name__.lower())))
+                    break
+            else:
+                raise ValueError(f"Unsupported constraint on {name}: {constraint!r}")
+        self.adapter = TypeAdapter(annotation)
+
+    def failed(self, column: np.ndarray) -> np.ndarray:
+        """Rows outside the bounds; NaN fails every bound, as in Pydantic"""
+        passed = np.ones(len(column), dtype=bool)
+        for kind, limit in self.bounds:
+            passed &= _BOUNDS[kind][2](column, limit)
+        return ~passed
+
+    def bound_error(self, value: object, parsed: float) -> dict:
+        """Error for the first bound ``parsed`` fails"""
+        for kind, limit in self.bounds:
+            error_type, message, compare = _BOUNDS[kind]
+            if not compare(parsed, limit):
+                return {"type": error_type, "loc": (self.name,), "msg": f"{message} {limit}", "input": value}
+        raise ValueError(f"{self.name} is within its bounds")
+
+
+class BulkValidationResult:
+    """
+    Outcome of validating a batch of records.
+
+    ``errors`` has one bitmask per input row: bit ``i`` is set when field
+    ``i`` of the model (in declaration order) is missing, of the wrong type
+    or out of bounds, and ``BulkValidator.record_bit`` when the row is not a
+    mapping at all. ``batch`` holds the valid rows only, in input order, and
+    ``indices`` their input positions.
+    """
+
+    def __init__(
+        self,
+        validator: "BulkValidator",
+        records: Sequence[object],
+        errors: np.ndarray,
+        parse_errors: Dict[Tuple[int, str], dict],
+        columns: Dict[str, np.ndarray]
+    ):
+        self.validator = validator
+        self.errors = errors
+        self._records = records
+        self._parse_errors = parse_errors
+        self.valid = errors == 0
+        self.indices = np.flatnonzero(self.valid)
+        # float64 columns for numeric fields, object columns for labels
+        self.columns = {name: column[self.valid] for name, column in columns.items()}
+
+    @property
+    def batch(self) -> CompanyBatch:
+        """Valid rows as a CompanyBatch, ready for BatchAnalysisService"""
+        return CompanyBatch(
+            {name: self.columns[name] for name in self.validator.numeric_fields},
+            self.columns["company_name"].tolist(),
+            self.columns["industry"].tolist()
+        )
+
+    @property
+    def invalid(self) -> np.ndarray:
+        """Input positions of rejected rows"""
+        return np.flatnonzero(~self.valid)
+
+    def failed_fields(self, row: int) -> List[str]:
+        return self.validator.failed_fields(self.errors[row])
+
+    def row_errors(self, row: int) -> List[dict]:
+        """Pydantic-style errors of one input row, as ``ValidationError.errors(include_url=False, include_context=False)``"""
+        record = self._records[row]
+        mask = self.errors[row]
+        if mask & self.validator.record_bit:
+            return [self.validator.record_error(record)]
+        errors = []
+        for rule in self.validator.rules:
+            if not mask & rule.bit:
+                continue
+            value = record.get(rule.name, _MISSING)
+            if value is _MISSING:
+                errors.append({"type": "missing", "loc": (rule.name,), "msg": "Field required", "input": record})
+            elif (row, rule.name) in self._parse_errors:
+                errors.append(self._parse_errors[(row, rule.name)])
+            else:
+                errors.append(rule.bound_error(value, float(rule.adapter.validate_python(value))))
+        return errors
+
+    def records(self) -> Iterator[CompanyRecord]:
+        """Valid rows as CompanyRecords"""
+        return self.batch.records()
+
+
+class BulkValidator:
+    """
+    Column-at-a-time validation of many records against a flat model.
+
+    Rules come from the model's fields: a ``float`` or ``str`` annotation and
+    ``gt``/``ge``/``lt``/``le`` constraints. When every record has every
+    field and the numeric ones are plain ints and floats (the common case),
+    all numeric fields convert to float64 in one call. Otherwise each field
+    is gathered into a column on its own, and only unusual values (numeric
+    strings, bools, None, ...) go through Pydantic's own parser, one by one.
+    Bounds are then checked on whole columns. No model instance is created, yet a row is accepted exactly
+    when ``model.model_validate`` would accept it, and ``row_errors`` gives
+    the same errors. Models with custom validators are not supported.
+    """
+
+    def __init__(self, model: Type[BaseModel] = CompanyFinancialData):
+        decorators = model.__pydantic_decorators__
+        if (decorators.validators or decorators.field_validators
+                or decorators.root_validators or decorators.model_validators):
+            raise ValueError(f"{model.__name__} has custom validators")
+        self.model = model
+        self.rules: List[FieldRule] = []
+        for bit, (name, field) in enumerate(model.model_fields.items()):
+            if field.annotation not in (float, str) or not field.is_required():
+                raise ValueError(f"Unsupported field {name}: only required float and str fields")
+            self.rules.append(FieldRule(name, bit, field.annotation, field.metadata))
+        if len(self.rules) >= 64:
+            raise ValueError(f"{model.__name__} has too many fields for a 64-bit error mask")
+        self.record_bit = np.uint64(1) << np.uint64(len(self.rules))
+        self.numeric_fields = tuple(rule.name for rule in self.rules if rule.numeric)
+        self.label_fields = tuple(rule.name for rule in self.rules if not rule.numeric)
+        self._numeric_getter = itemgetter(*self.numeric_fields) if len(self.numeric_fields) > 1 else None
+
+    def record_error(self, record: object) -> dict:
+        return {
+            "type": "model_type",
+            "loc": (),
+            "msg": f"Input should be a valid dictionary or instance of {self.model.__name__}",
+            "input": record,
+        }
+
+    def failed_fields(self, mask: np.uint64) -> List[str]:
+        """Names of the fields flagged in an error bitmask"""
+        return [rule.name for rule in self.rules if mask & rule.bit]
+
+    def validate_columns(self, columns: Mapping[str, np.ndarray], size: int) -> np.ndarray:
+        """
+        Error bitmasks, as in ``BulkValidationResult.errors``, of rows given as
+        columns: float64 arrays for numeric fields and object arrays for
+        labels. A table cell cannot be left out the way a JSON key can, so a
+        NaN (missing or unparseable) number or a label that is not a string
+        counts as missing; the bounds are then checked as for records.
+        """
+        errors = np.zeros(size, dtype=np.uint64)
+        for rule in self.rules:
+            column = columns.get(rule.name)
+            if column is None:
+                errors |= rule.bit
+            elif rule.numeric:
+                errors[np.isnan(column) | rule.failed(column)] |= rule.bit
+            else:
+                errors[np.fromiter((type(value) is not str for value in column), dtype=bool, count=size)] |= rule.bit
+        return errors
+
+    def _numeric_table(self, rows: Sequence[Mapping[str, object]]) -> Optional[np.ndarray]:
+        """All numeric fields as one fields x rows float64 array, or None unless every value is a plain number"""
+        if self._numeric_getter is None:
+            return None
+        try:
+            table = list(map(self._numeric_getter, rows))
+        except KeyError:
+            return None
+        if not set(map(type, chain.from_iterable(table))) <= _NUMBER_TYPES:
+            return None
+        try:
+            return np.array(table, dtype=np.float64).reshape(len(rows), -1).T.copy()
+        except OverflowError:
+            return None
+
+    def _gather(
+        self, rule: FieldRule, rows: Sequence[Mapping[str, object]], positions: np.ndarray, size: int,
+        errors: np.ndarray, parse_errors: Dict[Tuple[int, str], dict]
+    ) -> np.ndarray:
+        """One field as a column over all rows; unparseable cells are flagged and left NaN (or None)"""
+        values = [row.get(rule.name, _MISSING) for row in rows]
+        if rule.numeric:
+            column = np.full(size, np.nan)
+            if set(map(type, values)) <= _NUMBER_TYPES:
+                try:
+                    column[positions] = values
+                    return column
+                except OverflowError:
+                    pass
+        else:
+            column = np.full(size, None, dtype=object)
+            if set(map(type, values)) == {str}:
+                column[positions] = values
+                return column
+
+        for position, value in zip(positions.tolist(), values):
+            if value is _MISSING:
+                errors[position] |= rule.bit
+                continue
+            try:
+                column[position] = rule.adapter.validate_python(value)
+            except ValidationError as e:
+                errors[position] |= rule.bit
+                error = e.errors(include_url=False, include_context=False)[0]
+                parse_errors[(position, rule.name)] = {**error, "loc": (rule.name,) + tuple(error["loc"])}
+        return column
+
+    def validate_records(self, records: Sequence[object]) -> BulkValidationResult:
+        """Validate raw records (for example decoded JSON objects) column by column"""
+        size = len(records)
+        errors = np.zeros(size, dtype=np.uint64)
+        is_mapping = np.fromiter(
+            (type(record) is dict or isinstance(record, Mapping) for record in records), dtype=bool, count=size
+        )
+        errors[~is_mapping] = self.record_bit
+        positions = np.flatnonzero(is_mapping)
+        rows = [records[i] for i in positions] if len(positions) < size else records
+
+        parse_errors: Dict[Tuple[int, str], dict] = {}
+        columns = {}
+        table = self._numeric_table(rows)
+        for rule in self.rules:
+            if table is not None and rule.numeric:
+                column = np.full(size, np.nan)
+                column[positions] = table[self.numeric_fields.index(rule.name)]
+            else:
+                column = self._gather(rule, rows, positions, size, errors, parse_errors)
+            if rule.numeric and rule.bounds:
+                # Cells that are missing or did not parse are NaN and already flagged
+                errors[rule.failed(column) & is_mapping] |= rule.bit
+            columns[rule.name] = column
+        return BulkValidationResult(self, records, errors, parse_errors, columns)
+
+
+company_validator = BulkValidator(CompanyFinancialData)
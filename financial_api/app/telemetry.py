@@ -0,0 +1,301 @@
+"""
+In-process request and service metrics, exported in the Prometheus text format
+"""
+
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import math
+import threading
+import time
+
+# Seconds; covers microsecond single-company calls up to long file analyses
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+# Bytes, from a single company up to large uploads
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))
+
+TIMING_SCOPE_KEY = "financial_api.timing"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with a fixed label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}_total{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labels", "_started")
+
+    def __init__(self, histogram: "Histogram", labels: Labels):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._histogram.observe(self._labels, time.perf_counter() - self._started)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed label set"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: one count per bucket plus +Inf, then the sum
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float) -> None:
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[position] += 1
+            series[-1] += value
+
+    def time(self, labels: Labels = ()) -> _Timer:
+        """Context manager observing the elapsed seconds of its block"""
+        return _Timer(self, labels)
+
+    def count(self, labels: Labels = ()) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        lines = []
+        for labels, values in series:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), values[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(values[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {_format_value(cumulative)}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        read: Callable[[], Iterable[Tuple[Labels, float]]],
+        labelnames: Sequence[str] = ()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._read = read
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._read()
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(
+        self, name: str, documentation: str, read: Callable[[], Iterable[Tuple[Labels, float]]],
+        labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, read, labelnames))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                samples = metric.samples()
+            except Exception:
+                # A failing gauge callback must not break the scrape
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    "financial_api_http_requests", "HTTP requests by route and status", ("method", "route", "status")
+)
+REQUEST_DURATION = registry.histogram(
+    "financial_api_http_request_duration_seconds", "HTTP request latency, until the response is sent",
+    ("method", "route")
+)
+REQUEST_STAGE_DURATION = registry.histogram(
+    "financial_api_http_request_stage_duration_seconds",
+    "Request handling split into parse (body read and validation), endpoint and serialize stages",
+    ("route", "stage")
+)
+REQUEST_SIZE = registry.histogram(
+    "financial_api_http_request_size_bytes", "Request body size", ("route",), SIZE_BUCKETS
+)
+RESPONSE_SIZE = registry.histogram(
+    "financial_api_http_response_size_bytes", "Response body size", ("route",), SIZE_BUCKETS
+)
+VALIDATION_FAILURES = registry.counter(
+    "financial_api_validation_failures", "Requests or batch records rejected by input validation", ("route",)
+)
+FAMILY_DURATION = registry.histogram(
+    "financial_api_metric_family_duration_seconds",
+    "Time to evaluate a metric family, or a complete analysis",
+    ("engine", "family")
+)
+OPERATION_DURATION = registry.histogram(
+    "financial_api_operation_duration_seconds", "Time spent in other instrumented service operations",
+    ("operation",)
+)
+
+
+class RequestTiming:
+    """Per-request stage marks, shared between the middleware and the route handler"""
+
+    __slots__ = ("route", "stages", "request_bytes")
+
+    def __init__(self):
+        self.route: Optional[str] = None
+        self.stages: Dict[str, float] = {}
+        self.request_bytes = 0
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in self.stages.items())
+
+
+class TelemetryMiddleware:
+    """
+    Pure ASGI middleware recording request counts, latency, payload sizes and
+    stage timings, and optionally adding a Server-Timing header.
+
+    Routes are labelled by their path template (``/api/v1/snapshots/{ticker}``)
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timing = RequestTiming()
+        scope[TIMING_SCOPE_KEY] = timing
+        status = 500
+        response_bytes = 0
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                timing.request_bytes += len(message.get("body", b""))
+            return message
+
+        async def instrumented_send(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing and timing.stages:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", timing.server_timing().encode("latin-1"))
+                    ]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, instrumented_send)
+        finally:
+            route = timing.route or "unmatched"
+            REQUESTS.inc((scope["method"], route, str(status)))
+            REQUEST_DURATION.observe((scope["method"], route), time.perf_counter() - started)
+            REQUEST_SIZE.observe((route,), timing.request_bytes)
+            RESPONSE_SIZE.observe((route,), response_bytes)
+            for stage, seconds in timing.stages.items():
+                REQUEST_STAGE_DURATION.observe((route, stage), seconds)
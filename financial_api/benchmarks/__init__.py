@@ -0,0 +1,5 @@
+"""
+Benchmark harness for the analysis service and HTTP endpoints.
+
+Run ``python -m benchmarks --help`` from the financial_api directory.
+"""
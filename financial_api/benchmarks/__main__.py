@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Run the benchmark suite, write JSON results and optionally fail on regressions
+
+Usage:
+    python -m benchmarks --output results.json
+    python -m benchmarks --output current.json --baseline baseline.json --threshold 0.15
+"""
+
+from benchmarks.harness import compare, run_benchmarks
+import argparse
+import json
+import sys
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the financial analysis service and endpoints")
+    parser.add_argument("--size", type=int, default=1000, help="Companies in the synthetic universe")
+    parser.add_argument("--seed", type=int, default=0, help="Universe random seed")
+    parser.add_argument("--rounds", type=int, default=5, help="Passes per throughput benchmark (best is kept)")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per route")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per route")
+    parser.add_argument("--use-cache", action="store_true", help="Keep the result cache enabled for endpoint runs")
+    parser.add_argument(
+        "--startup-runs", type=int, default=3, help="Fresh-interpreter cold starts to time (0 skips them)"
+    )
+    parser.add_argument(
+        "--storm-clients", type=int, default=8,
+        help="Concurrent batch clients in the overload benchmark (0 skips it)"
+    )
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous results file")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="Relative slowdown beyond which a benchmark counts as a regression (default 0.2 = 20%%)"
+    )
+    parser.add_argument(
+        "--no-normalize", action="store_true",
+        help="Compare raw numbers instead of scaling by the calibration workload"
+    )
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        args.size, args.seed, args.rounds, args.requests, args.warmup, args.use_cache, args.startup_runs,
+        args.storm_clients
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    width = max(len(name) for name in report["results"])
+    for name, result in report["results"].items():
+        print(f"{name:<{width}}  {result['value']:>14,.3f} {result['unit']}")
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(baseline, report, args.threshold, normalize=not args.no_normalize)
+    regressions = [row for row in rows if row["regression"]]
+
+    print(f"\nCompared with {args.baseline} (threshold {args.threshold:.0%}):")
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:<{width}}  {row['change']:>+8.1%}  {flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed beyond {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
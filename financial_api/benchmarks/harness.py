@@ -0,0 +1,365 @@
+"""
+Service, validation, serialization and in-process ASGI benchmarks
+"""
+
+from app.api.endpoints import financial_analysis
+from app.api.responses import dumps_json, nested_result
+from app.models.financial_models import CompanyFinancialData, FinancialAnalysisResult
+from app.services.batch_service import BatchAnalysisService, CompanyBatch
+from app.services.cache_service import CachedAnalysisService, FAMILY_CALCULATORS
+from app.services.financial_service import FinancialAnalysisService
+from benchmarks.startup import measure_startup
+from benchmarks.universe import generate_payloads
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from typing import Callable, Dict, List, Optional, Sequence
+import asyncio
+import datetime
+import json
+import platform
+import time
+
+API_PREFIX = "/api/v1"
+
+# Values for required query parameters of benchmarked routes
+QUERY_DEFAULTS = {"metrics": "roe,ev_ebitda_ratio,current_ratio"}
+
+Result = Dict[str, object]
+
+CALIBRATION = "calibration.reference_workload"
+
+
+def _result(value: float, unit: str, higher_is_better: bool) -> Result:
+    return {"value": round(value, 6), "unit": unit, "higher_is_better": higher_is_better}
+
+
+def measure_throughput(func: Callable[[object], object], items: Sequence[object], rounds: int) -> float:
+    """Items per second over the best of ``rounds`` passes"""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - started)
+    return len(items) / best
+
+
+def _reference_workload(n: int) -> float:
+    """Fixed pure-Python work (float arithmetic, dict and attribute access) to gauge machine speed"""
+    values = {"a": 1.5, "b": 2.5}
+    total = 0.0
+    for i in range(n):
+        values["a"] = values["b"] * 1.0001 + i
+        total += values["a"] / (i + 1)
+    return total
+
+
+def _percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class ASGIDriver:
+    """Calls an ASGI app directly, without a server or a test client in between"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, query: str = "", body: Optional[bytes] = None) -> int:
+        headers = [(b"host", b"benchmark")]
+        if body is not None:
+            headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": query.encode(),
+            "headers": headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("benchmark", 80),
+        }
+        messages = [{"type": "http.request", "body": body or b"", "more_body": False}]
+        status = 0
+        finished = asyncio.Event()
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # As a server would, report the disconnect only once the response is complete,
+            # so streaming responses are not cut short
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            finished.set()
+        return status
+
+
+def _route_requests(route: APIRoute, payloads: List[bytes]):
+    """Request arguments for one route, cycling through the universe for bodies"""
+    missing = [
+        param.name for param in route.dependant.query_params
+        if param.required and param.name not in QUERY_DEFAULTS
+    ]
+    if missing:
+        return None
+    query = "&".join(
+        f"{param.name}={QUERY_DEFAULTS[param.name]}"
+        for param in route.dependant.query_params if param.name in QUERY_DEFAULTS
+    )
+    method = sorted(route.methods)[0]
+    path = API_PREFIX + route.path
+
+    def arguments(i: int):
+        body = payloads[i % len(payloads)] if route.body_field is not None else None
+        return method, path, query, body
+
+    return f"{method} {path}", arguments
+
+
+async def _measure_routes(app, payloads: List[bytes], requests: int, warmup: int, rounds: int) -> Dict[str, Result]:
+    """
+    p50/p99 latency per route. Each percentile is the best over ``rounds``
+    passes of ``requests`` requests, which keeps scheduler noise out of p99.
+    """
+    driver = ASGIDriver(app)
+    results = {}
+    for route in financial_analysis.router.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        prepared = _route_requests(route, payloads)
+        if prepared is None:
+            continue
+        name, arguments = prepared
+
+        for i in range(warmup):
+            await driver.request(*arguments(i))
+        p50 = p99 = float("inf")
+        for _ in range(rounds):
+            latencies = []
+            for i in range(requests):
+                started = time.perf_counter()
+                status = await driver.request(*arguments(i))
+                latencies.append(time.perf_counter() - started)
+                if status >= 400:
+                    raise RuntimeError(f"{name} returned {status}")
+            latencies.sort()
+            p50 = min(p50, _percentile(latencies, 0.50))
+            p99 = min(p99, _percentile(latencies, 0.99))
+
+        results[f"asgi.{name}.p50_ms"] = _result(p50 * 1000, "ms", False)
+        results[f"asgi.{name}.p99_ms"] = _result(p99 * 1000, "ms", False)
+    return results
+
+
+async def _measure_overload(
+    app, payloads: List[bytes], requests: int, bulk_clients: int, interactive_clients: int = 4
+) -> Dict[str, Result]:
+    """
+    Latency of single-company analyses during a batch storm: ``bulk_clients``
+    clients post the whole universe to ``/analyze/batch`` back to back while
+    ``interactive_clients`` clients share ``requests`` calls to ``/analyze``.
+    Shed requests (429/503) are counted, not timed; shed bulk clients back off briefly.
+    """
+    driver = ASGIDriver(app)
+    batch_body = b"[" + b",".join(payloads) + b"]"
+    storming = True
+    bulk_done = bulk_shed = interactive_shed = 0
+    latencies = []
+
+    async def bulk_client():
+        nonlocal bulk_done, bulk_shed
+        while storming:
+            status = await driver.request("POST", API_PREFIX + "/analyze/batch", body=batch_body)
+            if status in (429, 503):
+                bulk_shed += 1
+                await asyncio.sleep(0.05)
+            elif status >= 400:
+                raise RuntimeError(f"POST {API_PREFIX}/analyze/batch returned {status}")
+            else:
+                bulk_done += 1
+
+    async def interactive_client(offset: int):
+        nonlocal interactive_shed
+        for i in range(offset, requests, interactive_clients):
+            started = time.perf_counter()
+            status = await driver.request("POST", API_PREFIX + "/analyze", body=payloads[i % len(payloads)])
+            if status in (429, 503):
+                interactive_shed += 1
+            elif status >= 400:
+                raise RuntimeError(f"POST {API_PREFIX}/analyze returned {status}")
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    storm = [asyncio.ensure_future(bulk_client()) for _ in range(bulk_clients)]
+    # Let the storm build up before measuring
+    await asyncio.sleep(0.5)
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(interactive_client(offset) for offset in range(interactive_clients)))
+    finally:
+        storming = False
+        await asyncio.gather(*storm)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    results = {
+        "overload.analyze.shed": _result(interactive_shed, "requests", False),
+        "overload.batch.completed": _result(bulk_done / elapsed, "batches/s", True),
+        "overload.batch.shed": _result(bulk_shed, "requests", False),
+    }
+    if latencies:
+        results["overload.analyze.p50_ms"] = _result(_percentile(latencies, 0.50) * 1000, "ms", False)
+        results["overload.analyze.p99_ms"] = _result(_percentile(latencies, 0.99) * 1000, "ms", False)
+    return results
+
+
+def run_benchmarks(
+    size: int = 1000,
+    seed: int = 0,
+    rounds: int = 5,
+    requests: int = 500,
+    warmup: int = 50,
+    use_cache: bool = False,
+    startup_runs: int = 3,
+    storm_clients: int = 8
+) -> Dict[str, object]:
+    """
+    Run every benchmark over a synthetic universe of ``size`` companies.
+
+    The result cache is disabled unless ``use_cache`` is set, so repeated
+    payloads measure computation rather than cache lookups.
+    """
+    raw_payloads = generate_payloads(size, seed)
+    json_payloads = [json.dumps(payload).encode() for payload in raw_payloads]
+    companies = [CompanyFinancialData.model_validate(payload) for payload in raw_payloads]
+    analyses = [FinancialAnalysisService.perform_complete_analysis(company) for company in companies]
+    values = [FinancialAnalysisService.calculate_values(company) for company in companies]
+
+    results: Dict[str, Result] = {}
+
+    # Machine speed, used to normalize comparisons between runs
+    results[CALIBRATION] = _result(measure_throughput(_reference_workload, [100_000] * 5, rounds * 2) * 100_000, "ops/s", True)
+
+    # Scalar service
+    results["service.complete_analysis"] = _result(
+        measure_throughput(FinancialAnalysisService.perform_complete_analysis, companies, rounds), "companies/s", True
+    )
+    for family, calculate in FAMILY_CALCULATORS.items():
+        results[f"service.family.{family}"] = _result(
+            measure_throughput(calculate, companies, rounds), "companies/s", True
+        )
+
+    # Vectorized engine, whole universe per call
+    batch = CompanyBatch.from_records(companies)
+    results["batch.complete_analysis"] = _result(
+        measure_throughput(BatchAnalysisService.perform_complete_analysis, [batch], rounds) * size, "companies/s", True
+    )
+
+    # Request validation and response serialization
+    results["validation.model_validate"] = _result(
+        measure_throughput(CompanyFinancialData.model_validate, raw_payloads, rounds), "records/s", True
+    )
+    results["validation.model_validate_json"] = _result(
+        measure_throughput(CompanyFinancialData.model_validate_json, json_payloads, rounds), "records/s", True
+    )
+    results["serialization.model_dump_json"] = _result(
+        measure_throughput(FinancialAnalysisResult.model_dump_json, analyses, rounds), "records/s", True
+    )
+    # What FastAPI does for a response_model: revalidate, encode, json.dumps
+    results["serialization.response_model"] = _result(
+        measure_throughput(
+            lambda result: json.dumps(jsonable_encoder(FinancialAnalysisResult.model_validate(result.model_dump()))),
+            analyses,
+            rounds
+        ),
+        "records/s",
+        True
+    )
+    # The fast response path: shape flat values as plain dicts and encode once
+    results["serialization.fast_json"] = _result(
+        measure_throughput(lambda result: dumps_json(nested_result(result)), values, rounds), "records/s", True
+    )
+
+    # In-process HTTP latency for every financial analysis route
+    from main import app
+
+    cache = CachedAnalysisService.cache
+    if not use_cache:
+        CachedAnalysisService.cache = None
+    try:
+        results.update(asyncio.run(_measure_routes(app, json_payloads, requests, warmup, rounds)))
+        # Interactive latency while batch requests saturate the service; run with
+        # FINANCIAL_API_ADMISSION_ENABLED=false to see it without admission control
+        if storm_clients:
+            results.update(asyncio.run(_measure_overload(app, json_payloads, requests, storm_clients)))
+    finally:
+        CachedAnalysisService.cache = cache
+
+    # Cold start in fresh interpreters: import, lifespan, first request, OpenAPI schema
+    if startup_runs:
+        for name, value in measure_startup(startup_runs).items():
+            unit = "MB" if name.endswith("_mb") else "ms"
+            results[f"startup.{name}"] = _result(value, unit, False)
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "size": size,
+            "seed": seed,
+            "rounds": rounds,
+            "requests": requests,
+            "use_cache": use_cache,
+            "startup_runs": startup_runs,
+            "storm_clients": storm_clients,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: Dict[str, object], current: Dict[str, object], threshold: float, normalize: bool = True
+) -> List[Dict[str, object]]:
+    """
+    Relative change of every benchmark present in both runs; a benchmark
+    regresses when it is worse than the baseline by more than ``threshold``.
+
+    With ``normalize``, results are first scaled by the change of the
+    calibration workload, so a uniformly slower or faster machine (CPU
+    frequency, noisy neighbours on a CI runner) is not reported as a change.
+    """
+    speed = 1.0
+    if normalize and CALIBRATION in baseline["results"] and CALIBRATION in current["results"]:
+        speed = current["results"][CALIBRATION]["value"] / baseline["results"][CALIBRATION]["value"]
+
+    rows = []
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if name == CALIBRATION or previous is None or not previous["value"]:
+            continue
+        expected = previous["value"] * speed if result["higher_is_better"] else previous["value"] / speed
+        change = result["value"] / expected - 1
+        worse = -change if result["higher_is_better"] else change
+        rows.append({
+            "name": name,
+            "baseline": previous["value"],
+            "current": result["value"],
+            "unit": result["unit"],
+            "change": change,
+            "regression": worse > threshold,
+        })
+    return rows
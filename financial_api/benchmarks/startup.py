@@ -0,0 +1,74 @@
+"""
+Cold-start benchmark: each run is a fresh interpreter that imports the app,
+runs its startup, serves a first analysis request and builds the OpenAPI
+schema, reporting the time of each step and the peak resident memory
+"""
+
+from typing import Dict, Optional
+import json
+import os
+import subprocess
+import sys
+
+_CHILD = "from benchmarks.startup import _measure_cold_start; _measure_cold_start()"
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _measure_cold_start() -> None:
+    """Child process body; prints one JSON object of timings"""
+    import time
+
+    started = time.perf_counter()
+    from main import app
+    imported = time.perf_counter()
+
+    import asyncio
+    from benchmarks.harness import ASGIDriver
+    from app.services.financial_service import FinancialAnalysisService
+
+    body = FinancialAnalysisService.get_sample_data().model_dump_json().encode()
+    driver = ASGIDriver(app)
+    timings = {}
+
+    async def run():
+        begin = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            timings["startup_ms"] = (time.perf_counter() - begin) * 1000
+            begin = time.perf_counter()
+            status = await driver.request("POST", "/api/v1/analyze", body=body)
+            timings["first_request_ms"] = (time.perf_counter() - begin) * 1000
+            if status != 200:
+                raise RuntimeError(f"First request returned {status}")
+            begin = time.perf_counter()
+            await driver.request("GET", "/openapi.json")
+            timings["openapi_ms"] = (time.perf_counter() - begin) * 1000
+
+    asyncio.run(run())
+    timings["import_ms"] = (imported - started) * 1000
+    timings["peak_rss_mb"] = _peak_rss_mb()
+    print(json.dumps(timings))
+
+
+def measure_startup(runs: int = 3, env: Optional[Dict[str, str]] = None) -> Dict[str, float]:
+    """Best of ``runs`` cold starts for each timing, and the largest peak memory"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    child_env = {**os.environ, **(env or {}), "PYTHONDONTWRITEBYTECODE": "1", "PYTHONWARNINGS": "ignore"}
+    best: Dict[str, float] = {}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _CHILD], cwd=root, env=child_env, capture_output=True, text=True, check=True
+        ).stdout
+        timings = json.loads(output.strip().splitlines()[-1])
+        for name, value in timings.items():
+            if name == "peak_rss_mb":
+                best[name] = max(best.get(name, 0.0), value)
+            else:
+                best[name] = min(best.get(name, float("inf")), value)
+    return best
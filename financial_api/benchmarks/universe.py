@@ -0,0 +1,50 @@
+"""
+Synthetic CompanyFinancialData universes modeled on the service's sample data
+"""
+
+from app.models.financial_models import CompanyFinancialData
+from app.services.financial_service import FinancialAnalysisService
+from typing import Dict, List
+import random
+
+INDUSTRIES = ("Technology", "Healthcare", "Financials", "Energy", "Utilities", "Industrials", "Consumer")
+
+
+def generate_payloads(size: int, seed: int = 0, edge_case_ratio: float = 0.2) -> List[Dict[str, object]]:
+    """
+    Request payloads for ``size`` companies.
+
+    Every numeric field of the sample company is scaled by its own random
+    factor, so ratios vary realistically while staying within the model's
+    constraints. About ``edge_case_ratio`` of the companies hit a guard
+    branch (losses, no interest expense, no dividends, negative EBITDA).
+    """
+    rng = random.Random(seed)
+    base = FinancialAnalysisService.get_sample_data().model_dump()
+    payloads = []
+    for i in range(size):
+        payload = {
+            name: (value * rng.lognormvariate(0, 0.6) if isinstance(value, (int, float)) else value)
+            for name, value in base.items()
+        }
+        payload["company_name"] = f"Company {i:06d}"
+        payload["industry"] = rng.choice(INDUSTRIES)
+        payload["years"] = rng.choice([1, 3, 5, 10])
+
+        if rng.random() < edge_case_ratio:
+            edge_case = rng.randrange(4)
+            if edge_case == 0:
+                payload["net_income"] = -payload["net_income"]
+            elif edge_case == 1:
+                payload["interest_expense"] = 0
+            elif edge_case == 2:
+                payload["dividends"] = 0
+            else:
+                payload["ebit"] = -(payload["depreciation"] + payload["amortization"]) * 2
+        payloads.append(payload)
+    return payloads
+
+
+def generate_universe(size: int, seed: int = 0, edge_case_ratio: float = 0.2) -> List[CompanyFinancialData]:
+    """Validated models for ``size`` synthetic companies"""
+    return [CompanyFinancialData(**payload) for payload in generate_payloads(size, seed, edge_case_ratio)]
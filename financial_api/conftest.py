@@ -0,0 +1,8 @@
+"""
+Test session settings, applied before the app reads its configuration
+"""
+
+import os
+
+# Keep background jobs in memory instead of writing ./jobs
+os.environ.setdefault("FINANCIAL_API_JOBS_PATH", ":memory:")
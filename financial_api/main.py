@@ -1,12 +1,54 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.endpoints import financial_analysis
+from fastapi.responses import Response
+from app.admission import AdmissionMiddleware, admission_controller
+from app.api.openapi import install_schema_cache
+from app.api.routing import TimedRoute
+from app.api.endpoints import financial_analysis, batch_analysis, snapshots, live_valuation, peers, screening, jobs, portfolios
+from app.config import settings
+from app.services.executor import analysis_executor
+from app.services.job_service import job_manager
+from app.services.metric_store import MetricStore
+from app.services.screening_service import screening_store
+from app.telemetry import PROMETHEUS_CONTENT_TYPE, TelemetryMiddleware, registry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start analysis workers before serving so the first batch does not pay for them,
+    # unless startup latency matters more (the pool is then created on first use)
+    if not settings.lean_startup:
+        analysis_executor.start()
+    # Reload the screening universe persisted by earlier runs
+    if settings.store_path:
+        screening_store.attach(
+            MetricStore(settings.store_path, settings.store_compact_ratio, settings.store_max_segments)
+        )
+    # Resume background jobs queued (or interrupted) by earlier runs
+    job_manager.start(settings.jobs_path, settings.jobs_concurrency)
+    yield
+    await job_manager.shutdown()
+    screening_store.detach()
+    analysis_executor.shutdown()
+
 
 app = FastAPI(
     title="Financial Analysis API",
     description="A REST API for comprehensive financial analysis and metrics calculation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+app.router.route_class = TimedRoute
+
+# Reuse the OpenAPI schema built by an earlier process
+if settings.openapi_cache_path:
+    install_schema_cache(app, settings.openapi_cache_path)
+
+# Shed load per lane before it reaches the endpoints; added first so rejections
+# still get CORS headers and are counted by the telemetry middleware
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -17,12 +59,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts, latency, payload sizes and stage timings for /metrics
+if settings.metrics_enabled:
+    app.add_middleware(TelemetryMiddleware, server_timing=settings.server_timing)
+
 # Include routers
 app.include_router(
     financial_analysis.router,
     prefix="/api/v1",
     tags=["financial-analysis"]
 )
+app.include_router(
+    batch_analysis.router,
+    prefix="/api/v1",
+    tags=["batch-analysis"]
+)
+app.include_router(
+    snapshots.router,
+    prefix="/api/v1",
+    tags=["snapshots"]
+)
+app.include_router(
+    live_valuation.router,
+    prefix="/api/v1",
+    tags=["live-valuation"]
+)
+app.include_router(
+    peers.router,
+    prefix="/api/v1",
+    tags=["peer-statistics"]
+)
+app.include_router(
+    screening.router,
+    prefix="/api/v1",
+    tags=["screening"]
+)
+app.include_router(
+    portfolios.router,
+    prefix="/api/v1",
+    tags=["portfolios"]
+)
+app.include_router(
+    jobs.router,
+    prefix="/api/v1",
+    tags=["jobs"]
+)
 
 @app.get("/")
 async def root():
@@ -35,3 +116,13 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Concurrency limit, load and rejections of each admission lane"""
+    return admission_controller.stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Tests for adaptive admission control and load shedding
+"""
+
+import asyncio
+import math
+
+from fastapi.testclient import TestClient
+
+from app.admission import BULK, INTERACTIVE, AdmissionController, AdmissionMiddleware, LaneLimiter, lane_for
+from main import app
+
+
+def scope(method: str, path: str) -> dict:
+    return {"type": "http", "method": method, "path": path, "headers": []}
+
+
+async def call(middleware: AdmissionMiddleware, method: str, path: str) -> dict:
+    """Run one request through the middleware; the start message plus the body"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope(method, path), receive, send)
+    return {**messages[0], "body": b"".join(m.get("body", b"") for m in messages[1:])}
+
+
+def test_requests_are_routed_to_lanes():
+    assert lane_for("POST", "/api/v1/analyze") == INTERACTIVE
+    assert lane_for("POST", "/api/v1/analyze/profitability") == INTERACTIVE
+    assert lane_for("GET", "/api/v1/snapshots/AAPL") == INTERACTIVE
+    assert lane_for("GET", "/api/v1/jobs/abc") == INTERACTIVE
+    assert lane_for("POST", "/api/v1/analyze/batch") == BULK
+    assert lane_for("PUT", "/api/v1/portfolios/book") == BULK
+    assert lane_for("POST", "/api/v1/snapshots/prices") == BULK
+    assert lane_for("POST", "/api/v1/jobs/file") == BULK
+    assert lane_for("POST", "/api/v1/analyze/batchx") == INTERACTIVE
+    for path in ("/health", "/metrics", "/docs", "/admission/stats"):
+        assert lane_for("GET", path) is None
+
+
+def test_saturated_lanes_shed_with_429_and_503():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        controller = AdmissionController(interactive_max=4, bulk_max=4, max_queue=1,
+                                         interactive_queue_timeout=0.05, bulk_queue_timeout=5)
+        middleware = AdmissionMiddleware(slow_app, controller)
+        bulk = controller.lanes[BULK]
+        assert bulk.limit == 1
+
+        # One bulk request runs, one waits, the next finds the queue full
+        running = asyncio.ensure_future(call(middleware, "POST", "/api/v1/analyze/batch"))
+        queued = asyncio.ensure_future(call(middleware, "POST", "/api/v1/analyze/batch"))
+        await asyncio.sleep(0.01)
+        assert (bulk.in_flight, bulk.queue_depth) == (1, 1)
+        rejected = await call(middleware, "POST", "/api/v1/analyze/batch")
+        assert rejected["status"] == 429
+        assert (b"retry-after", b"1") in rejected["headers"]
+        assert b"bulk" in rejected["body"]
+
+        # The interactive lane is unaffected until it fills too; then queued requests time out
+        interactive = [asyncio.ensure_future(call(middleware, "POST", "/api/v1/analyze")) for _ in range(5)]
+        await asyncio.sleep(0.1)
+        timed_out = [task.result()["status"] for task in interactive if task.done()]
+        assert timed_out == [503]
+
+        release.set()
+        statuses = [response["status"] for response in await asyncio.gather(running, queued, *interactive)]
+        assert statuses == [200, 200, 200, 200, 200, 200, 503]
+        assert all(lane.in_flight == 0 and lane.queue_depth == 0 for lane in controller.lanes.values())
+        assert controller.stats()[BULK]["rejected"]["queue_full"] >= 1
+
+    asyncio.run(scenario())
+
+
+def test_waiters_are_admitted_in_order_as_slots_free():
+    async def scenario():
+        lane = LaneLimiter("test", 1, 1, 1, 10, 5)
+        assert await lane.acquire() is None
+        order = []
+
+        async def waiter(name):
+            assert await lane.acquire() is None
+            order.append(name)
+            lane.release(0.01)
+
+        tasks = [asyncio.ensure_future(waiter(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        assert lane.queue_depth == 3
+        lane.release(0.01)
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c"] and lane.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_limits_follow_latency_and_bulk_yields_to_interactive():
+    controller = AdmissionController(interactive_max=256, bulk_max=16)
+    interactive, bulk = controller.lanes[INTERACTIVE], controller.lanes[BULK]
+
+    def busy(lane, latency, rounds=50):
+        for _ in range(rounds):
+            lane.in_flight = int(lane.limit)
+            lane.release(latency)
+
+    # Steady latency at full use grows the limits
+    start = interactive.limit
+    busy(bulk, 0.5)
+    busy(interactive, 0.01)
+    grown = interactive.limit
+    assert grown > start and bulk.limit == bulk.max_limit
+
+    # An interactive slowdown shrinks its own limit, and the bulk one with every slow sample
+    busy(interactive, 0.2)
+    assert interactive.limit < grown / 2
+    assert bulk.limit == bulk.min_limit
+
+    # Bulk latency alone is steady, but the bulk lane stays back while interactive requests are slow
+    busy(bulk, 0.5)
+    assert bulk.limit == bulk.min_limit
+    assert math.isclose(controller.stats()[INTERACTIVE]["baseline_latency_ms"], 10, rel_tol=1e-3)
+
+
+def test_admission_metrics_and_stats():
+    with TestClient(app) as client:
+        assert client.get("/api/v1/sample-data").status_code == 200
+        stats = client.get("/admission/stats").json()
+        assert set(stats) == {INTERACTIVE, BULK}
+        assert stats[INTERACTIVE]["admitted"] >= 1 and stats[INTERACTIVE]["in_flight"] == 0
+        metrics = client.get("/metrics").text
+        for name in ("limit", "in_flight", "queue_depth"):
+            assert f'financial_api_admission_{name}{{lane="bulk"}}' in metrics
+        assert "financial_api_admission_queue_wait_seconds_count" in metrics
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for Arrow IPC bulk analysis
+"""
+
+import numpy as np
+import pyarrow as pa
+from fastapi.testclient import TestClient
+
+from app.services.arrow_service import ARROW_STREAM_MEDIA_TYPE
+from app.services.batch_service import BatchAnalysisService, CompanyBatch
+from main import app
+from test_batch_service import make_universe
+
+
+def ipc_stream(table: pa.Table, max_chunksize=None) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=max_chunksize)
+    return sink.getvalue().to_pybytes()
+
+
+def post_arrow(client: TestClient, body: bytes):
+    return client.post("/api/v1/analyze/arrow", content=body, headers={"content-type": ARROW_STREAM_MEDIA_TYPE})
+
+
+def test_arrow_round_trip_matches_batch_engine():
+    companies = make_universe(300)
+    rows = [company.model_dump() for company in companies]
+    # Integer columns are accepted alongside float64 ones
+    table = pa.Table.from_pylist(rows)
+    table = table.set_column(
+        table.schema.get_field_index("market_price_per_share"),
+        "market_price_per_share",
+        pa.array([int(row["market_price_per_share"]) for row in rows])
+    )
+    for row in rows:
+        row["market_price_per_share"] = float(int(row["market_price_per_share"]))
+
+    response = post_arrow(TestClient(app), ipc_stream(table, max_chunksize=128))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == ARROW_STREAM_MEDIA_TYPE
+
+    result = pa.ipc.open_stream(response.content).read_all()
+    assert result.num_rows == len(rows)
+    assert result.column("company_name").to_pylist() == [row["company_name"] for row in rows]
+
+    expected = BatchAnalysisService.perform_complete_analysis(CompanyBatch.from_records(rows))
+    for columns in expected.values():
+        for name, column in columns.items():
+            actual = result.column(name).to_numpy()
+            assert np.array_equal(actual, np.broadcast_to(column, actual.shape), equal_nan=True), name
+
+
+def test_arrow_rejects_bad_input():
+    client = TestClient(app)
+    assert post_arrow(client, b"not arrow").status_code == 400
+
+    table = pa.Table.from_pylist([make_universe(1)[0].model_dump()]).drop(["revenue"])
+    response = post_arrow(client, ipc_stream(table))
+    assert response.status_code == 400
+    assert "revenue" in response.json()["detail"]
+
+
+def test_arrow_rows_failing_validation_are_flagged():
+    rows = [company.model_dump() for company in make_universe(4)]
+    rows[1]["shares_outstanding"] = 0
+    rows[2]["total_equity"] = -5
+    rows[3]["industry"] = None
+    response = post_arrow(TestClient(app), ipc_stream(pa.Table.from_pylist(rows)))
+    assert response.status_code == 200
+
+    result = pa.ipc.open_stream(response.content).read_all()
+    assert result.column("error").to_pylist() == [
+        None,
+        "validation_error: shares_outstanding",
+        "validation_error: total_equity",
+        "validation_error: industry",
+    ]
+    # Rejected rows keep their place with NaN metrics; the valid row matches the batch engine
+    expected = BatchAnalysisService.perform_complete_analysis(CompanyBatch.from_records(rows[:1]))
+    for columns in expected.values():
+        for name, column in columns.items():
+            actual = result.column(name).to_numpy()
+            assert np.array_equal(actual[:1], np.broadcast_to(column, (1,)), equal_nan=True), name
+            assert np.isnan(actual[1:]).all(), name
+    assert result.column("industry").to_pylist()[3] is None
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Equivalence and regression tests for the vectorized batch analysis engine
+"""
+
+import math
+import random
+
+import pandas as pd
+
+from app.models.financial_models import CompanyFinancialData
+from app.services.batch_service import BatchAnalysisService, CompanyBatch, METRIC_FAMILIES
+from app.services.financial_service import FinancialAnalysisService
+
+
+def make_universe(size: int, seed: int = 7):
+    """Random companies around the sample data, including guard-branch edge cases"""
+    rng = random.Random(seed)
+    base = FinancialAnalysisService.get_sample_data().model_dump()
+    companies = []
+    for i in range(size):
+        row = {
+            key: (value * rng.uniform(0.2, 5) if isinstance(value, (int, float)) else value)
+            for key, value in base.items()
+        }
+        row["company_name"] = f"Company {i}"
+        row["industry"] = rng.choice(["Technology", "Energy", "Utilities"])
+        row["years"] = rng.choice([1, 3, 5, 7.5, 10])
+        # Exercise every guard branch of the scalar service
+        if i % 5 == 1:
+            row["net_income"] = -row["net_income"]
+        if i % 7 == 2:
+            row["ebit"] = -(row["depreciation"] + row["amortization"]) * 2
+        if i % 4 == 3:
+            row["interest_expense"] = 0
+        if i % 6 == 4:
+            row["dividends"] = 0
+        if i % 11 == 5:
+            row["net_income"] = 0
+        companies.append(CompanyFinancialData(**row))
+    return companies
+
+
+def assert_matches_scalar(companies, metrics):
+    for i, company in enumerate(companies):
+        expected = FinancialAnalysisService.perform_complete_analysis(company)
+        for family in METRIC_FAMILIES:
+            for name, value in getattr(expected, family).model_dump().items():
+                actual = float(metrics[family][name][i])
+                if value is None:
+                    assert math.isnan(actual), (i, name)
+                else:
+                    assert actual == value, (i, name, actual, value)
+
+
+def test_batch_matches_scalar_service():
+    companies = make_universe(2000)
+    metrics = BatchAnalysisService.perform_complete_analysis(companies)
+    assert_matches_scalar(companies, metrics)
+
+
+def test_dataframe_input_matches_records():
+    companies = make_universe(300, seed=11)
+    df = pd.DataFrame([company.model_dump() for company in companies])
+    metrics = BatchAnalysisService.perform_complete_analysis(df)
+    assert_matches_scalar(companies, metrics)
+
+
+def test_to_results_round_trips_scalar_models():
+    companies = make_universe(200, seed=3)
+    batch = CompanyBatch.from_records(companies)
+    results = BatchAnalysisService.to_results(
+        batch, BatchAnalysisService.perform_complete_analysis(batch)
+    )
+    for company, result in zip(companies, results):
+        assert result == FinancialAnalysisService.perform_complete_analysis(company)
+
+
+# Metrics of the sample company as computed by the original scalar formulas
+SAMPLE_METRICS = {
+    "pe_ratio": 1.6666666666666667,
+    "pb_ratio": 0.3125,
+    "dividend_yield": 0.08,
+    "payout_ratio": 0.13333333333333333,
+    "ev_ebitda_ratio": 1.25,
+    "interest_coverage_ratio": 10.0,
+    "price_to_sales_ratio": 0.20833333333333334,
+    "revenue_cagr": 0.08447177119769855,
+    "net_income_cagr": 0.021295687600135116,
+    "dividend_growth_rate": 0.01031145931793609,
+    "ebitda_growth_rate": 0.021295687600135116,
+    "roa": 0.125,
+    "roe": 0.1875,
+    "net_profit_margin": 0.125,
+    "operating_margin": 0.16666666666666666,
+    "gross_profit_margin": 0.4,
+    "asset_turnover": 1.0,
+    "roic": 0.18181818181818182,
+    "current_ratio": 2.0,
+    "quick_ratio": 1.6,
+    "cash_ratio": 0.2,
+    "net_debt_to_equity": 0.375,
+    "debt_to_assets": 0.25,
+    "debt_to_ebitda": 1.25,
+}
+
+# (input overrides, metrics that differ from SAMPLE_METRICS) covering the guard branches
+REGRESSION_CASES = [
+    ({}, {}),
+    ({"net_income": -5000}, {
+        "pe_ratio": None, "payout_ratio": 0.0, "net_income_cagr": 0.0,
+        "roa": -0.041666666666666664, "roe": -0.0625, "net_profit_margin": -0.041666666666666664,
+    }),
+    ({"net_income": 0}, {
+        "pe_ratio": None, "payout_ratio": 0.0, "net_income_cagr": 0.0,
+        "roa": 0.0, "roe": 0.0, "net_profit_margin": 0.0,
+    }),
+    ({"ebit": -8000}, {
+        "ev_ebitda_ratio": 0.0, "interest_coverage_ratio": -4.0, "ebitda_growth_rate": 0.0,
+        "operating_margin": -0.06666666666666667, "roic": -0.07272727272727272, "debt_to_ebitda": 0.0,
+    }),
+    ({"interest_expense": 0, "dividends": 0}, {
+        "dividend_yield": 0.0, "payout_ratio": 0.0, "interest_coverage_ratio": 0.0, "dividend_growth_rate": 0.0,
+    }),
+]
+
+
+def test_metrics_match_original_formulas():
+    sample = FinancialAnalysisService.get_sample_data().model_dump()
+    companies = [CompanyFinancialData(**{**sample, **overrides}) for overrides, _ in REGRESSION_CASES]
+    metrics = BatchAnalysisService.perform_complete_analysis(companies)
+    for i, (company, (overrides, changes)) in enumerate(zip(companies, REGRESSION_CASES)):
+        expected = {**SAMPLE_METRICS, **changes}
+        result = FinancialAnalysisService.perform_complete_analysis(company)
+        scalar = {}
+        for family in METRIC_FAMILIES:
+            scalar.update(getattr(result, family).model_dump())
+        assert scalar.keys() == expected.keys()
+        for name, value in expected.items():
+            actual = float(next(metrics[family][name][i] for family in METRIC_FAMILIES if name in metrics[family]))
+            if value is None:
+                assert scalar[name] is None and math.isnan(actual), (overrides, name)
+            else:
+                assert math.isclose(scalar[name], value, rel_tol=1e-12), (overrides, name, scalar[name], value)
+                assert math.isclose(actual, value, rel_tol=1e-12, abs_tol=1e-15), (overrides, name, actual, value)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests for the benchmark regression gate
+"""
+
+import pytest
+
+from benchmarks.harness import CALIBRATION, compare
+
+
+def report(calibration: float, throughput: float, latency: float) -> dict:
+    return {"results": {
+        CALIBRATION: {"value": calibration, "unit": "ops/s", "higher_is_better": True},
+        "service.throughput": {"value": throughput, "unit": "companies/s", "higher_is_better": True},
+        "endpoint.latency_p99": {"value": latency, "unit": "ms", "higher_is_better": False},
+    }}
+
+
+def regressions(baseline: dict, current: dict, **kwargs) -> dict:
+    return {row["name"]: row["regression"] for row in compare(baseline, current, 0.2, **kwargs)}
+
+
+def test_changes_beyond_the_threshold_are_regressions():
+    baseline = report(1000, 500, 10)
+    # 10% less throughput and 15% more latency are within tolerance
+    assert regressions(baseline, report(1000, 450, 11.5)) == {
+        "service.throughput": False, "endpoint.latency_p99": False
+    }
+    # 30% less throughput and 25% more latency are not
+    assert regressions(baseline, report(1000, 350, 12.5)) == {
+        "service.throughput": True, "endpoint.latency_p99": True
+    }
+    # Improvements never fail the gate
+    rows = compare(baseline, report(1000, 1000, 5), 0.2)
+    assert [row["change"] for row in rows] == pytest.approx([1.0, -0.5])
+    assert not any(row["regression"] for row in rows)
+
+
+def test_results_are_normalized_by_the_calibration_workload():
+    baseline = report(1000, 500, 10)
+    # A machine half as fast halves throughput and doubles latency
+    slower = report(500, 250, 20)
+    assert regressions(baseline, slower) == {"service.throughput": False, "endpoint.latency_p99": False}
+    assert regressions(baseline, slower, normalize=False) == {
+        "service.throughput": True, "endpoint.latency_p99": True
+    }
+    # Benchmarks missing from either run are skipped
+    del slower["results"]["endpoint.latency_p99"]
+    assert [row["name"] for row in compare(baseline, slower, 0.2)] == ["service.throughput"]
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the LRU/TTL result cache and its shared backend
+"""
+
+from fastapi.testclient import TestClient
+
+from app.models.financial_models import SelectedMetricsResult
+from app.services import cache_service
+from app.services.cache_service import (
+    CachedAnalysisService,
+    InProcessSharedBackend,
+    ResultCache,
+    SharedCacheBackend
+)
+from main import app
+
+
+def value(name: str) -> SelectedMetricsResult:
+    return SelectedMetricsResult(company_name=name, industry="Technology", metrics={"roe": 0.1})
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FailingBackend(SharedCacheBackend):
+    """A shared backend whose server is down"""
+
+    def get(self, key):
+        raise ConnectionError("connection refused")
+
+    def set(self, key, value, ttl_seconds):
+        raise TimeoutError("timed out")
+
+    def clear(self):
+        raise ConnectionError("connection refused")
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResultCache(max_size=2)
+    cache.set("a", value("a"))
+    cache.set("b", value("b"))
+    assert cache.get("a", SelectedMetricsResult).company_name == "a"
+    cache.set("c", value("c"))
+
+    assert cache.get("b", SelectedMetricsResult) is None
+    assert [cache.get(key, SelectedMetricsResult).company_name for key in "ac"] == ["a", "c"]
+    stats = cache.stats()
+    assert (stats["size"], stats["evictions"], stats["hits"], stats["misses"]) == (2, 1, 3, 1)
+    assert stats["hit_ratio"] == 0.75
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_service.time, "monotonic", clock)
+    cache = ResultCache(ttl_seconds=10)
+    cache.set("a", value("a"))
+
+    clock.now += 9.9
+    assert cache.get("a", SelectedMetricsResult) is not None
+    clock.now += 0.2
+    assert cache.get("a", SelectedMetricsResult) is None
+    stats = cache.stats()
+    assert (stats["size"], stats["expirations"], stats["hits"], stats["misses"]) == (0, 1, 1, 1)
+
+
+def test_shared_backend_serves_other_workers():
+    shared = InProcessSharedBackend()
+    first, second = ResultCache(shared_backend=shared), ResultCache(shared_backend=shared)
+    first.set("a", value("a"))
+
+    assert second.get("a", SelectedMetricsResult) == value("a")
+    assert second.get("a", SelectedMetricsResult) == value("a")
+    assert second.get("b", SelectedMetricsResult, record_miss=False) is None
+    stats = second.stats()
+    assert (stats["shared_hits"], stats["hits"], stats["misses"]) == (1, 1, 0)
+
+
+def test_backend_failures_fall_back_to_computing():
+    cache = ResultCache(shared_backend=FailingBackend())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return value("a")
+
+    assert cache.get_or_compute("a", SelectedMetricsResult, compute) == value("a")
+    # The failed write still leaves the result in the local LRU
+    assert cache.get_or_compute("a", SelectedMetricsResult, compute) == value("a")
+    cache.clear()
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats["backend_errors"], stats["misses"], stats["hits"]) == (3, 1, 1)
+
+    # A corrupt shared value is a miss too
+    shared = InProcessSharedBackend()
+    shared.set("b", b"not json", 60)
+    cache = ResultCache(shared_backend=shared)
+    assert cache.get("b", SelectedMetricsResult) is None and cache.stats()["backend_errors"] == 1
+
+
+def test_analysis_survives_a_shared_backend_outage(monkeypatch):
+    cache = ResultCache(shared_backend=FailingBackend())
+    monkeypatch.setattr(CachedAnalysisService, "cache", cache)
+    with TestClient(app) as client:
+        sample = client.get("/api/v1/sample-data").json()
+        for _ in range(2):
+            response = client.post("/api/v1/analyze", json=sample)
+            assert response.status_code == 200
+        assert client.get("/api/v1/cache/stats").json()["backend_errors"] >= 1
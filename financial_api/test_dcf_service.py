@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized DCF valuation
+"""
+
+
+import numpy as np
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.financial_models import DCFAssumptions
+from app.services.arrow_service import ARROW_STREAM_MEDIA_TYPE
+from app.services.dcf_service import DCFService
+from main import app
+from test_batch_service import make_universe
+
+
+def reference_value_per_share(company, assumptions, wacc=None, terminal=None):
+    """Year-by-year DCF of one company"""
+    if wacc is None:
+        wacc = assumptions.wacc
+    if wacc is None:
+        equity = company.market_price_per_share * company.shares_outstanding
+        cost_of_equity = assumptions.risk_free_rate + assumptions.beta * assumptions.equity_risk_premium
+        cost_of_debt = assumptions.cost_of_debt * (1 - assumptions.tax_rate)
+        wacc = (equity * cost_of_equity + company.total_debt * cost_of_debt) / (equity + company.total_debt)
+
+    growth = []
+    for stage in assumptions.stages:
+        start = company.eps_growth_percent / 100 if stage.growth is None else stage.growth
+        end = start if stage.growth_end is None else stage.growth_end
+        growth += [start + (end - start) * (k / (stage.years - 1) if stage.years > 1 else 0) for k in range(stage.years)]
+
+    cash_flow = company.free_cash_flow
+    ebitda = company.ebit + company.depreciation + company.amortization
+    present_value = 0.0
+    for year, rate in enumerate(growth, 1):
+        cash_flow *= 1 + rate
+        ebitda *= 1 + rate
+        present_value += cash_flow / (1 + wacc) ** year
+
+    if assumptions.terminal_method == "gordon":
+        terminal_growth = assumptions.terminal_growth if terminal is None else terminal
+        if wacc <= terminal_growth:
+            return None
+        terminal_value = cash_flow * (1 + terminal_growth) / (wacc - terminal_growth)
+    else:
+        terminal_value = ebitda * (assumptions.exit_multiple if terminal is None else terminal)
+    enterprise_value = present_value + terminal_value / (1 + wacc) ** len(growth)
+    return (enterprise_value - company.total_debt + 0.1 * company.current_assets) / company.shares_outstanding
+
+
+def assert_close(actual, expected):
+    if expected is None:
+        assert actual is None
+    else:
+        assert actual == pytest.approx(expected, rel=1e-12, abs=1e-9)
+
+
+@pytest.mark.parametrize("assumptions", [
+    DCFAssumptions(),
+    DCFAssumptions(wacc=0.09, terminal_method="exit_multiple", exit_multiple=8),
+    DCFAssumptions(
+        stages=[{"years": 3, "growth": 0.2}, {"years": 1}, {"years": 4, "growth": 0.1, "growth_end": 0.02}],
+        wacc_grid=[0.03, 0.07, 0.1],
+        terminal_grid=[0.01, 0.04, 0.08],
+    ),
+    DCFAssumptions(terminal_method="exit_multiple", terminal_grid=[6, 12]),
+])
+def test_matches_year_by_year_reference(assumptions):
+    companies = make_universe(200)
+    result = DCFService.analyze(companies, assumptions)
+    assert result["wacc_grid"] == assumptions.wacc_grid
+
+    for company, valuation in zip(companies, result["valuations"]):
+        expected = reference_value_per_share(company, assumptions)
+        assert_close(valuation["value_per_share"], expected)
+        if expected is not None:
+            assert valuation["upside"] == pytest.approx(expected / company.market_price_per_share - 1, rel=1e-9)
+        if assumptions.wacc_grid is None and assumptions.terminal_grid is None:
+            assert valuation["sensitivity"] is None
+            continue
+        for i, wacc in enumerate(assumptions.wacc_grid or [None]):
+            for j, terminal in enumerate(assumptions.terminal_grid or [None]):
+                assert_close(valuation["sensitivity"][i][j], reference_value_per_share(company, assumptions, wacc, terminal))
+
+
+def test_dcf_endpoint_json_and_arrow():
+    companies = [company.model_dump() for company in make_universe(50)]
+    body = {"companies": companies, "assumptions": {"wacc_grid": [0.08, 0.1], "terminal_grid": [0.01, 0.02, 0.03]}}
+    with TestClient(app) as client:
+        response = client.post("/api/v1/analyze/dcf", json=body)
+        assert response.status_code == 200
+        valuations = response.json()["valuations"]
+        assert len(valuations) == 50 and len(valuations[0]["sensitivity"]) == 2
+
+        arrow = client.post("/api/v1/analyze/dcf", json=body, headers={"Accept": ARROW_STREAM_MEDIA_TYPE})
+        assert arrow.headers["content-type"] == ARROW_STREAM_MEDIA_TYPE
+        table = pa.ipc.open_stream(arrow.content).read_all()
+        tables = table.column("sensitivity").combine_chunks().flatten().to_numpy().reshape(50, 2, 3)
+        assert np.allclose(tables, [valuation["sensitivity"] for valuation in valuations])
+        assert table.column("value_per_share").to_pylist() == [v["value_per_share"] for v in valuations]
+
+        invalid = client.post("/api/v1/analyze/dcf", json={"companies": companies, "assumptions": {"stages": []}})
+        assert invalid.status_code == 422
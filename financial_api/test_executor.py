@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for the analysis executor backends, timeouts and cancellation
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.batch_service import BatchAnalysisService, CompanyBatch
+from app.services.executor import AnalysisExecutor, ClientDisconnectedError, ExecutorTimeoutError, analysis_executor
+from app.services.panel_service import PanelAnalysisService
+from main import app
+from test_batch_service import make_universe
+
+BATCH = CompanyBatch.from_records(make_universe(50))
+EXPECTED = BatchAnalysisService.analyze_to_dicts(BATCH)
+
+
+def current_thread_name() -> str:
+    return threading.current_thread().name
+
+
+def fail():
+    raise ValueError("broken input")
+
+
+class DisconnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return True
+
+
+def run(executor: AnalysisExecutor, *args, **kwargs):
+    return asyncio.run(executor.run(*args, **kwargs))
+
+
+@pytest.mark.parametrize("backend", ["inline", "thread", "process"])
+def test_backends_return_the_analysis(backend):
+    executor = AnalysisExecutor(backend, max_workers=2, inline_threshold=0)
+    try:
+        executor.start()
+        assert run(executor, BatchAnalysisService.analyze_to_dicts, BATCH, size=len(BATCH)) == EXPECTED
+        stats = executor.stats()
+        if backend == "inline":
+            assert (stats["inline"], stats["submitted"]) == (1, 0)
+        else:
+            assert (stats["inline"], stats["submitted"], stats["completed"]) == (0, 1, 1)
+            assert stats["in_flight"] == 0
+    finally:
+        executor.shutdown()
+
+
+def test_small_work_falls_back_to_running_inline():
+    executor = AnalysisExecutor("thread", max_workers=1, inline_threshold=100)
+    try:
+        # Below the threshold the call runs on the caller's thread without a pool
+        assert run(executor, current_thread_name, size=99) == threading.current_thread().name
+        assert executor._pool is None
+        # At the threshold, or of unknown size, it is dispatched
+        assert run(executor, current_thread_name, size=100).startswith("analysis")
+        assert run(executor, current_thread_name).startswith("analysis")
+        stats = executor.stats()
+        assert (stats["inline"], stats["submitted"]) == (1, 2)
+    finally:
+        executor.shutdown()
+
+
+def test_failures_propagate_and_are_counted():
+    executor = AnalysisExecutor("thread", max_workers=1, inline_threshold=0)
+    try:
+        with pytest.raises(ValueError, match="broken input"):
+            run(executor, fail)
+        assert executor.stats()["failed"] == 1
+    finally:
+        executor.shutdown()
+    with pytest.raises(ValueError, match="Unsupported executor backend"):
+        AnalysisExecutor("gpu")
+
+
+def test_timeouts_and_disconnects_cancel_the_work():
+    executor = AnalysisExecutor("thread", max_workers=1, inline_threshold=0, timeout_seconds=0.05,
+                                disconnect_poll_interval=0.01)
+    try:
+        started = time.perf_counter()
+        with pytest.raises(ExecutorTimeoutError):
+            run(executor, time.sleep, 0.5)
+        assert time.perf_counter() - started < 0.4
+        # A per-call timeout overrides the default; None waits as long as it takes
+        assert run(executor, time.sleep, 0.1, timeout=None) is None
+
+        with pytest.raises(ClientDisconnectedError):
+            run(executor, time.sleep, 0.5, request=DisconnectedRequest(), timeout=5)
+        stats = executor.stats()
+        assert (stats["timeouts"], stats["cancelled"]) == (1, 1)
+    finally:
+        executor.shutdown()
+
+
+def test_endpoint_maps_a_timeout_to_504(monkeypatch):
+    def slow(panels):
+        time.sleep(0.3)
+        return []
+
+    monkeypatch.setattr(analysis_executor, "inline_threshold", 0)
+    monkeypatch.setattr(analysis_executor, "timeout_seconds", 0.05)
+    monkeypatch.setattr(PanelAnalysisService, "analyze_panels", slow)
+    period = {"period_end": "2023-12-31", "revenue": 100, "net_income": 10, "ebit": 20, "total_assets": 1000,
+              "total_equity": 500}
+    with TestClient(app) as client:
+        response = client.post("/api/v1/analyze/panel", json=[{
+            "company_name": "Slow Corp", "industry": "Technology", "frequency": "annual", "periods": [period]
+        }])
+        assert response.status_code == 504
+        assert client.get("/api/v1/executor/stats").json()["timeouts"] >= 1
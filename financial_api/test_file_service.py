@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for chunked CSV/Parquet file analysis
+"""
+
+import io
+import math
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from fastapi.testclient import TestClient
+
+from app.services.batch_service import METRIC_FAMILIES
+from app.services.file_service import FILE_OUTPUT_COLUMNS, FileAnalysisService
+from app.services.financial_service import FinancialAnalysisService
+from main import app
+from test_batch_service import make_universe
+
+COMPANIES = make_universe(40)
+
+
+def expected_rows(companies):
+    rows = []
+    for company in companies:
+        result = FinancialAnalysisService.perform_complete_analysis(company)
+        row = {"company_name": company.company_name, "industry": company.industry}
+        for family in METRIC_FAMILIES:
+            row.update(getattr(result, family).model_dump())
+        rows.append(row)
+    return rows
+
+
+def assert_rows_match(frame: pd.DataFrame, expected):
+    assert list(frame.columns) == list(FILE_OUTPUT_COLUMNS) and len(frame) == len(expected)
+    for (_, row), want in zip(frame.iterrows(), expected):
+        for name, value in want.items():
+            if value is None:
+                assert math.isnan(row[name]), name
+            elif isinstance(value, str):
+                assert row[name] == value, name
+            else:
+                assert math.isclose(row[name], value, rel_tol=1e-12, abs_tol=1e-12), (name, row[name], value)
+        assert row["error"] is None or (isinstance(row["error"], float) and math.isnan(row["error"]))
+
+
+def analyze(upload: bytes, input_format: str, output_format: str, chunk_size: int = 7) -> pd.DataFrame:
+    output = io.BytesIO()
+    rows = FileAnalysisService.analyze_file(io.BytesIO(upload), output, input_format, output_format, chunk_size)
+    output.seek(0)
+    frame = pd.read_csv(output) if output_format == "csv" else pq.read_table(output).to_pandas()
+    assert rows == len(frame)
+    return frame
+
+
+def test_csv_round_trip():
+    upload = pd.DataFrame([company.model_dump() for company in COMPANIES]).to_csv(index=False).encode()
+    assert_rows_match(analyze(upload, "csv", "csv"), expected_rows(COMPANIES))
+
+
+def test_parquet_round_trip():
+    buffer = io.BytesIO()
+    pd.DataFrame([company.model_dump() for company in COMPANIES]).to_parquet(buffer, index=False)
+    assert_rows_match(analyze(buffer.getvalue(), "parquet", "parquet"), expected_rows(COMPANIES))
+
+
+def test_invalid_rows_are_flagged_not_analyzed():
+    records = [company.model_dump() for company in COMPANIES[:8]]
+    records[1]["total_equity"] = 0
+    records[2]["shares_outstanding"] = -5
+    records[3]["net_income"] = float("nan")
+    records[4]["revenue"] = "lots"
+    records[5]["industry"] = None
+    records[6]["total_equity"] = -1
+    records[6]["current_liabilities"] = 0
+    upload = pd.DataFrame(records).to_csv(index=False).encode()
+
+    frame = analyze(upload, "csv", "parquet", chunk_size=3)
+    assert frame["error"].tolist() == [
+        None,
+        "validation_error: total_equity",
+        "validation_error: shares_outstanding",
+        "validation_error: net_income",
+        "validation_error: revenue",
+        "validation_error: industry",
+        "validation_error: total_equity, current_liabilities",
+        None,
+    ]
+    metrics = frame.drop(columns=["company_name", "industry", "error"]).to_numpy()
+    assert np.isnan(metrics[1:7]).all() and not np.isinf(metrics).any()
+    assert frame["company_name"][2] == records[2]["company_name"] and frame["industry"][5] is None
+    assert_rows_match(frame.iloc[[0, 7]], expected_rows([COMPANIES[0], COMPANIES[7]]))
+
+
+def test_file_endpoint_returns_error_column():
+    records = [company.model_dump() for company in COMPANIES[:5]]
+    records[2]["total_equity"] = 0
+    upload = pd.DataFrame(records).to_csv(index=False).encode()
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/v1/analyze/file?output_format=csv",
+            files={"file": ("companies.csv", io.BytesIO(upload), "text/csv")}
+        )
+    assert response.status_code == 200 and response.headers["x-row-count"] == "5"
+    frame = pd.read_csv(io.BytesIO(response.content))
+    assert frame["error"].fillna("").tolist() == ["", "", "validation_error: total_equity", "", ""]
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent background job queue
+"""
+
+import io
+import json
+import time
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.models.financial_models import DCFAssumptions
+from app.services.dcf_service import DCFService
+from app.services.job_service import MEMORY, JobManager, JobStore, new_job_id
+from main import app
+from test_batch_service import make_universe
+
+COMPANIES = [company.model_dump() for company in make_universe(25)]
+
+
+def submit(store: JobStore, priority: str = "normal", companies=COMPANIES, chunk_size: int = 10) -> str:
+    job_id = new_job_id()
+    params = json.dumps({"companies": companies, "chunk_size": chunk_size}).encode()
+    store.submit(job_id, "batch", priority, params, len(companies))
+    return job_id
+
+
+def wait(client: TestClient, job_id: str) -> dict:
+    for _ in range(500):
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_claims_by_priority_then_age_and_requeues_after_restart(tmp_path):
+    store = JobStore(str(tmp_path))
+    low, first, second, high = (submit(store, p) for p in ("low", "normal", "normal", "high"))
+    assert [store.claim()[0] for _ in range(2)] == [high, first]
+    store.add_results(first, 0, [b'{"index": 0}\n'])
+    store.close()
+
+    # A restart queues running jobs again, without their partial results
+    store = JobStore(str(tmp_path))
+    assert store.requeue_running() == 2
+    assert store.results(first, 0, 10) == []
+    assert [store.claim()[0] for _ in range(4)] == [high, first, second, low]
+    assert store.claim() is None
+    store.close()
+
+
+def test_cancel_and_shutdown_stop_a_running_job():
+    manager = JobManager()
+    manager.store = JobStore(MEMORY)
+    job_id = submit(manager.store)
+    assert manager.store.cancel(submit(manager.store))["status"] == "cancelled"
+
+    claimed = manager.store.claim()
+    assert manager.store.cancel(job_id)["status"] == "running"
+    manager._execute(*claimed)
+    job = manager.store.get(job_id)
+    assert job["status"] == "cancelled" and job["cancel_requested"] and manager.store.results(job_id, 0, 100) == []
+
+    # Interrupted by a shutdown, a job goes back to the queue
+    job_id = submit(manager.store)
+    manager.stopping = True
+    manager._execute(*manager.store.claim())
+    assert manager.store.get(job_id)["status"] == "queued"
+    manager.store.close()
+
+
+def test_batch_and_dcf_jobs_match_the_synchronous_endpoints():
+    companies = COMPANIES[:12] + [{"company_name": "Broken"}] + COMPANIES[12:]
+    with TestClient(app) as client:
+        response = client.post("/api/v1/jobs", json={"kind": "batch", "companies": companies, "chunk_size": 7})
+        assert response.status_code == 202
+        job = wait(client, response.json()["id"])
+        assert job["status"] == "succeeded" and job["result_rows"] == 26
+        assert job["progress"] == {"done": 26, "total": 26, "fraction": 1.0}
+
+        expected = client.post("/api/v1/analyze/batch", json=companies, headers={"Accept": "application/x-ndjson"})
+        expected = [json.loads(line) for line in expected.text.splitlines()]
+        page = client.get(f"/api/v1/jobs/{job['id']}/results?offset=5&limit=10").json()
+        assert page["total"] == 26 and page["records"] == expected[5:15]
+        assert page["records"][7]["error"] == "validation_error"
+        download = client.get(f"/api/v1/jobs/{job['id']}/download")
+        assert [json.loads(line) for line in download.text.splitlines()] == expected
+
+        assumptions = {"wacc": 0.09, "terminal_growth": 0.02}
+        response = client.post("/api/v1/jobs", json={
+            "kind": "dcf", "priority": "high", "companies": COMPANIES, "assumptions": assumptions
+        })
+        job = wait(client, response.json()["id"])
+        records = client.get(f"/api/v1/jobs/{job['id']}/results").json()["records"]
+        expected = DCFService.analyze(make_universe(25), DCFAssumptions(**assumptions))["valuations"]
+        assert [record["result"] for record in records] == json.loads(json.dumps(expected))
+
+        assert client.delete(f"/api/v1/jobs/{job['id']}").status_code == 204
+        assert client.get(f"/api/v1/jobs/{job['id']}").status_code == 404
+        assert client.post("/api/v1/jobs", json={"kind": "dcf"}).status_code == 422
+
+
+def test_file_job_writes_a_downloadable_metrics_file():
+    upload = pd.DataFrame(COMPANIES).to_csv(index=False).encode()
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/v1/jobs/file?output_format=csv&chunk_size=10",
+            files={"file": ("companies.csv", io.BytesIO(upload), "text/csv")}
+        )
+        job = wait(client, response.json()["id"])
+        assert job["status"] == "succeeded" and job["progress"]["done"] == 25
+        assert client.get(f"/api/v1/jobs/{job['id']}/results").status_code == 409
+
+        download = client.get(f"/api/v1/jobs/{job['id']}/download")
+        expected = client.post(
+            "/api/v1/analyze/file?output_format=csv",
+            files={"file": ("companies.csv", io.BytesIO(upload), "text/csv")}
+        )
+        assert download.headers["x-row-count"] == "25" and download.content == expected.content
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tests and load test for the live valuation WebSocket stream
+"""
+
+import asyncio
+import random
+import time
+
+from fastapi.testclient import TestClient
+
+from app.services.live_valuation import LiveValuationHub, Subscriber
+from app.services.snapshot_service import FundamentalsSnapshotStore
+from main import app
+from test_batch_service import make_universe
+
+PRICE_FIELDS = {"pe_ratio", "pb_ratio", "dividend_yield", "ev_ebitda_ratio", "price_to_sales_ratio"}
+
+
+def make_hub(tickers: int) -> LiveValuationHub:
+    store = FundamentalsSnapshotStore()
+    store.register([(f"T{i}", data) for i, data in enumerate(make_universe(tickers))])
+    return LiveValuationHub(store)
+
+
+def test_websocket_streams_changed_fields_only():
+    client = TestClient(app)
+    company = make_universe(1)[0].model_dump()
+    assert client.post("/api/v1/snapshots", json=[{"ticker": "WS1", "data": company}]).status_code == 200
+
+    with client.websocket_connect("/api/v1/ws/valuation") as ws:
+        ws.send_json({"action": "subscribe", "tickers": ["WS1", "MISSING"]})
+        snapshot = ws.receive_json()
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["unknown_tickers"] == ["MISSING"]
+        assert set(snapshot["metrics"]["WS1"]) >= PRICE_FIELDS
+
+        ws.send_json({"action": "tick", "prices": {"WS1": company["market_price_per_share"] * 2}})
+        update = ws.receive_json()
+        assert update["type"] == "valuation"
+        # Payout ratio and interest coverage do not move with the price
+        assert set(update["updates"]["WS1"]) <= PRICE_FIELDS
+        expected = client.get("/api/v1/snapshots/WS1/market-valuation").json()
+        for name, value in update["updates"]["WS1"].items():
+            assert value == expected[name]
+
+        ws.send_json({"action": "tick", "prices": {"WS1": -1}})
+        assert ws.receive_json()["type"] == "error"
+
+    client.delete("/api/v1/snapshots/WS1")
+
+
+def test_fast_ticks_are_coalesced():
+    async def scenario():
+        hub = make_hub(1)
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        subscriber = Subscriber(send, coalesce_interval=0.02)
+        hub.connect(subscriber)
+        hub.subscribe(subscriber, ["T0"])
+        sender = asyncio.create_task(subscriber.run())
+
+        base = hub.store.get_fundamentals("T0").market_price_per_share
+        for step in range(1, 51):
+            hub.publish({"T0": base * (1 + step / 100)})
+        await asyncio.sleep(0.1)
+        # Re-publishing the current price produces no message
+        hub.publish({"T0": base * 1.5})
+        await asyncio.sleep(0.05)
+        sender.cancel()
+
+        assert len(sent) == 1
+        assert sent[0]["updates"]["T0"]["pb_ratio"] == hub.store.market_valuation(["T0"])["T0"]["pb_ratio"]
+        assert subscriber.updates_coalesced == 49
+
+    asyncio.run(scenario())
+
+
+def test_load_thousands_of_subscribers_with_slow_consumers():
+    """
+    3,000 subscribers over 500 tickers receive 50 tick rounds. Every 100th
+    subscriber never completes a send; it must be dropped after the send
+    timeout without delaying the others or blocking the event loop.
+    """
+    subscriber_count, ticker_count, rounds = 3_000, 500, 50
+
+    async def scenario():
+        hub = make_hub(ticker_count)
+        rng = random.Random(11)
+        received = {}
+        subscribers, senders, slow = [], [], set()
+
+        for i in range(subscriber_count):
+            latest = received.setdefault(i, {})
+
+            if i % 100 == 0:
+                async def send(message):
+                    await asyncio.sleep(3600)
+                slow.add(i)
+            else:
+                async def send(message, latest=latest):
+                    # Simulated network write
+                    await asyncio.sleep(0)
+                    if message["type"] == "valuation":
+                        for ticker, changed in message["updates"].items():
+                            latest.setdefault(ticker, {}).update(changed)
+
+            subscriber = Subscriber(send, coalesce_interval=0.01, send_timeout=0.5)
+            hub.connect(subscriber)
+            current, _ = hub.subscribe(subscriber, [f"T{rng.randrange(ticker_count)}" for _ in range(10)])
+            for ticker, values in current.items():
+                latest.setdefault(ticker, {}).update(values)
+            subscribers.append(subscriber)
+            senders.append(asyncio.create_task(subscriber.run()))
+
+        # Track event loop responsiveness while ticks flow
+        lags = []
+
+        async def heartbeat():
+            while True:
+                started = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(time.perf_counter() - started - 0.005)
+
+        monitor = asyncio.create_task(heartbeat())
+        publish_times = []
+        tickers = [f"T{i}" for i in range(ticker_count)]
+        base = {t: hub.store.get_fundamentals(t).market_price_per_share for t in tickers}
+        for step in range(rounds):
+            started = time.perf_counter()
+            hub.publish({t: base[t] * rng.uniform(0.8, 1.2) for t in tickers})
+            publish_times.append(time.perf_counter() - started)
+            await asyncio.sleep(0.002)
+
+        # Let slow consumers hit the send timeout and fast ones flush
+        await asyncio.sleep(1.0)
+        monitor.cancel()
+
+        final = hub.store.market_valuation(tickers)
+        for i, subscriber in enumerate(subscribers):
+            if i in slow:
+                assert senders[i].done() and senders[i].exception() is not None
+                continue
+            assert not senders[i].done()
+            for ticker in subscriber.tickers:
+                for name in PRICE_FIELDS:
+                    assert received[i][ticker][name] == final[ticker][name]
+
+        for task in senders:
+            task.cancel()
+        await asyncio.gather(*senders, return_exceptions=True)
+
+        stats = hub.stats()
+        lags.sort()
+        assert stats["updates_coalesced"] > 0
+        assert max(publish_times) < 0.5
+        # Fan-out to thousands of subscribers must not stall the event loop
+        assert lags[int(len(lags) * 0.99)] < 1.0
+
+    asyncio.run(scenario())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent metric store and screening write-through
+"""
+
+
+import os
+
+import numpy as np
+import pytest
+
+from app.services.metric_store import FLOAT_COLUMNS, MANIFEST, EncodedLabels, MetricStore
+from app.services.screening_service import ScreeningStore
+from test_batch_service import make_universe
+
+
+def make_columns(values):
+    values = np.asarray(values, dtype=float)
+    return {name: values + i for i, name in enumerate(FLOAT_COLUMNS)}
+
+
+def read_rows(store):
+    universe = store.read()
+    return {
+        ticker: (name, industry, universe.columns["roe"][i], universe.columns["input.revenue"][i])
+        for i, (ticker, name, industry) in enumerate(zip(universe.tickers, universe.company_names, universe.industries))
+    }
+
+
+def test_write_update_delete_reopen_and_compact(tmp_path):
+    store = MetricStore(str(tmp_path), compact_ratio=10, max_segments=100)
+    store.write(["A", "B", "C"], ["Alpha", "Beta", "Gamma"], ["Tech", "Energy", "Tech"], make_columns([1, 2, 3]))
+    # Re-analyzed company, a repeat within one write and a non-ASCII label
+    store.write(["B", "D", "D"], ["Beta 2", "Delta", "Délta"], ["Energy", "Utilities", "Utilities"],
+                make_columns([20, 4, 40]))
+    store.delete(["A", "missing"])
+
+    roe = FLOAT_COLUMNS.index("roe")
+    revenue = FLOAT_COLUMNS.index("input.revenue")
+    expected = {
+        "B": ("Beta 2", "Energy", 20.0 + roe, 20.0 + revenue),
+        "C": ("Gamma", "Tech", 3.0 + roe, 3.0 + revenue),
+        "D": ("Délta", "Utilities", 40.0 + roe, 40.0 + revenue),
+    }
+    assert read_rows(store) == expected
+    assert len(store) == 3
+
+    reopened = MetricStore(str(tmp_path))
+    assert read_rows(reopened) == expected
+    assert reopened.stats()["superseded_rows"] == 2
+
+    reopened.compact()
+    assert reopened.stats()["segments"] == 1 and reopened.stats()["superseded_rows"] == 0
+    assert sorted(f for f in os.listdir(tmp_path) if f.endswith(".seg")) == ["00000002.seg"]
+    assert read_rows(MetricStore(str(tmp_path))) == expected
+
+    # Updates after compaction still supersede the compacted rows
+    reopened.write(["C"], ["Gamma"], ["Tech"], make_columns([5]))
+    assert read_rows(MetricStore(str(tmp_path)))["C"][2] == 5.0 + roe
+
+
+def test_uncommitted_writes_are_ignored(tmp_path):
+    store = MetricStore(str(tmp_path), compact_ratio=10)
+    store.write(["A", "B"], ["Alpha", "Beta"], ["Tech", "Tech"], make_columns([1, 2]))
+    manifest = open(tmp_path / MANIFEST, "rb").read()
+
+    # Crash after the segment and tombstones were written but before the manifest was replaced
+    store.write(["A"], ["Alpha"], ["Tech"], make_columns([9]))
+    open(tmp_path / MANIFEST, "wb").write(manifest)
+
+    reopened = MetricStore(str(tmp_path))
+    assert sorted(read_rows(reopened)) == ["A", "B"]
+    assert read_rows(reopened)["A"][2] == 1.0 + FLOAT_COLUMNS.index("roe")
+    assert sorted(f for f in os.listdir(tmp_path) if f.endswith(".seg")) == ["00000000.seg"]
+
+    # The stale tombstone past the committed count is overwritten by the next write
+    reopened.write(["B"], ["Beta"], ["Tech"], make_columns([7]))
+    assert sorted(read_rows(MetricStore(str(tmp_path)))) == ["A", "B"]
+
+
+def test_automatic_compaction(tmp_path):
+    store = MetricStore(str(tmp_path), compact_ratio=0.5, max_segments=4)
+    for i in range(10):
+        store.write([f"T{i}", "X"], ["n", "x"], ["Tech", "Tech"], make_columns([i, i]))
+        assert store.stats()["segments"] <= 4
+    assert len(store) == 11
+    assert store.stats()["superseded_rows"] <= 0.5 * store.rows
+
+
+def test_screening_store_round_trip(tmp_path):
+    companies = make_universe(500)
+    screening = ScreeningStore()
+    screening.attach(MetricStore(str(tmp_path)))
+    screening.add_companies([(f"S{i}", company) for i, company in enumerate(companies)])
+    screening.add_companies([("S3", companies[3].model_copy(update={"net_income": 1.5 * companies[3].net_income}))])
+    screening.remove("S4")
+    query = ("roe > 0.1 OR industry = 'Energy'", ["-roe", "pe_ratio"], 1000, None)
+    expected = screening.query(*query)
+
+    restarted = ScreeningStore()
+    assert restarted.attach(MetricStore(str(tmp_path))) == 499
+    assert restarted.query(*query) == expected
+    assert restarted.stats()["store"]["rows"] == 499
+
+    restarted.clear()
+    assert len(MetricStore(str(tmp_path))) == 0
+
+
+def test_rejects_other_metric_sets(tmp_path):
+    MetricStore(str(tmp_path)).write(["A"], ["Alpha"], ["Tech"], make_columns([1]))
+    manifest = (tmp_path / MANIFEST).read_text().replace('"roe"', '"return_on_equity"')
+    (tmp_path / MANIFEST).write_text(manifest)
+    with pytest.raises(ValueError):
+        MetricStore(str(tmp_path))
+
+
+def test_attach_keeps_mapped_columns_until_the_first_change(tmp_path):
+    companies = make_universe(200)
+    store = MetricStore(str(tmp_path))
+    store.write([f"S{i}" for i in range(200)], [c.company_name for c in companies], [c.industry for c in companies],
+                make_columns(np.arange(200)))
+    store.compact()
+
+    screening = ScreeningStore()
+    screening.attach(MetricStore(str(tmp_path)))
+    # Nothing is copied or decoded by loading
+    assert isinstance(screening._tickers, EncodedLabels) and screening._index is None
+    assert isinstance(screening._values["roe"].base, np.memmap)
+    result = screening.query("ticker IN ('S7', 'S9') OR company_name = 'Company 3'", ["roe"], 10)
+    assert [row["ticker"] for row in result["results"]] == ["S3", "S7", "S9"]
+    assert result["results"][0]["company_name"] == "Company 3"
+
+    screening.add_companies([("S200", companies[0])])
+    assert isinstance(screening._tickers, list) and screening._values["roe"].base is None
+    assert screening.query("ticker IN ('S200', 'S7')")["total"] == 2 and len(screening) == 201
+
+
+def test_compaction_defers_deleting_files_that_are_still_mapped(tmp_path, monkeypatch):
+    store = MetricStore(str(tmp_path), compact_ratio=10, max_segments=100)
+    store.write(["A", "B"], ["Alpha", "Beta"], ["Tech", "Tech"], make_columns([1, 2]))
+    store.write(["C"], ["Gamma"], ["Tech"], make_columns([3]))
+    universe = store.read()
+
+    # Windows refuses to delete a file while a memory map of it is open
+    unlink = os.unlink
+    refused = []
+
+    def windows_unlink(path):
+        if path.endswith(".seg") and not allow_deletes:
+            refused.append(os.path.basename(path))
+            raise PermissionError(13, "The process cannot access the file because it is being used", path)
+        unlink(path)
+
+    allow_deletes = False
+    monkeypatch.setattr(os, "unlink", windows_unlink)
+    store.compact()
+    assert refused == ["00000000.seg", "00000001.seg"] and store.stats()["segments"] == 1
+    assert list(universe.tickers) == ["A", "B", "C"]
+    assert universe.columns["roe"][2] == 3 + FLOAT_COLUMNS.index("roe")
+    assert read_rows(MetricStore(str(tmp_path)))["C"][0] == "Gamma"
+
+    # The next commit retries once the mappings are gone
+    allow_deletes = True
+    del universe
+    store.write(["D"], ["Delta"], ["Tech"], make_columns([4]))
+    assert sorted(f for f in os.listdir(tmp_path) if f.endswith(".seg")) == ["00000002.seg", "00000003.seg"]
+    assert sorted(read_rows(MetricStore(str(tmp_path)))) == ["A", "B", "C", "D"]
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for streamed JSON array / NDJSON parsing and the NDJSON batch endpoint
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.api.ndjson import NDJSONStreamingResponse, RecordParseError, RequestBody, iter_json_records, ndjson_line
+from app.services.batch_service import BatchAnalysisService
+from main import app
+from test_batch_service import make_universe
+
+COMPANIES = [company.model_dump() for company in make_universe(12)]
+
+
+def parse(chunks):
+    """Records parsed from a body sent as the given chunks; parse errors as their messages"""
+    async def source():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [
+            (index, f"error: {record}" if isinstance(record, RecordParseError) else record)
+            async for index, record in iter_json_records(source())
+        ]
+
+    return asyncio.run(collect())
+
+
+def byte_chunks(body: bytes):
+    return [body[i:i + 1] for i in range(len(body))]
+
+
+def test_records_survive_any_chunking():
+    records = [{"a": 1, "b": [1, 2]}, 1234, "x,]", [], {"nested": {"c": None}}]
+    expected = list(enumerate(records))
+    array = json.dumps(records).encode()
+    ndjson = b"\n".join(json.dumps(record).encode() for record in records) + b"\n"
+    for body in (array, ndjson):
+        assert parse([body]) == expected
+        assert parse(byte_chunks(body)) == expected
+    assert parse([b"[]"]) == [] and parse([b"  "]) == []
+
+
+def test_malformed_arrays_are_rejected():
+    for body in (b"[,,{}]", b"[,{}]", b"[{},,{}]", b"[{} {}]", b"[1 2]", b"[{},]", b"[{}"):
+        for chunks in ([body], byte_chunks(body)):
+            records = parse(chunks)
+            assert records and records[-1][1].startswith("error: "), (body, records)
+            assert not any(isinstance(record, str) for _, record in records[:-1]), (body, records)
+    assert parse([b"[{}, 1] x"])[-1] == (2, "error: Unexpected data after end of array")
+
+    # An NDJSON line that is not JSON is reported on its own row
+    records = parse([b'{"a": 1}\n{oops\n{"b": 2}\n'])
+    assert [index for index, _ in records] == [0, 1, 2] and records[1][1].startswith("error: Invalid JSON")
+
+
+def test_non_finite_values_are_encoded_as_null():
+    record = {"a": float("inf"), "b": [1.5, float("nan")], "c": {"d": -float("inf")}, "e": "NaN"}
+    line = ndjson_line(record)
+    assert line.endswith(b"\n") and b"Infinity" not in line
+    assert json.loads(line, parse_constant=lambda token: pytest.fail(token)) == {
+        "a": None, "b": [1.5, None], "c": {"d": None}, "e": "NaN"
+    }
+    assert ndjson_line({"a": 1.0}) == b'{"a": 1.0}\n'
+
+
+def test_batch_stream_keeps_input_order_with_per_row_errors():
+    broken = dict(COMPANIES[4], shares_outstanding=-1)
+    lines = [json.dumps(company) for company in COMPANIES[:4]] + [json.dumps(broken), "{oops"]
+    lines += [json.dumps(company) for company in COMPANIES[4:]]
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/v1/analyze/batch?chunk_size=3", content="\n".join(lines),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 200
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert [record["index"] for record in records] == list(range(len(lines)))
+        assert records[4]["error"] == "validation_error" and records[4]["detail"][0]["loc"] == ["shares_outstanding"]
+        assert records[5]["error"] == "invalid_json"
+        assert [record["result"]["company_name"] for record in records if "result" in record] == [
+            company["company_name"] for company in COMPANIES
+        ]
+
+        response = client.post("/api/v1/analyze/batch", content=b"[" + json.dumps(COMPANIES[0]).encode() + b",,{}]")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert "result" in records[0] and records[1]["error"] == "invalid_json" and len(records) == 2
+
+
+def test_failed_chunk_is_reported_per_row(monkeypatch):
+    analyze = BatchAnalysisService.analyze_to_dicts
+
+    def failing(batch):
+        if "Company 3" in batch.company_names:
+            raise ValueError("engine failure")
+        return analyze(batch)
+
+    monkeypatch.setattr(BatchAnalysisService, "analyze_to_dicts", failing)
+    with TestClient(app) as client:
+        response = client.post("/api/v1/analyze/batch?chunk_size=3", json=COMPANIES)
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["index"] for record in records] == list(range(len(COMPANIES)))
+    assert [record.get("error") for record in records[3:6]] == ["analysis_error"] * 3
+    assert records[3]["detail"] == "engine failure"
+    assert all("result" in record for record in records[:3] + records[6:])
+
+
+def test_stream_stops_when_client_disconnects_after_the_body():
+    async def scenario():
+        messages = [{"type": "http.request", "body": b"[1]", "more_body": False}]
+        sent = []
+        closed = asyncio.Event()
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # The client goes away once it has sent the body and seen some output
+            while not sent:
+                await asyncio.sleep(0.01)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/", "headers": [], "query_string": b""}
+        body = RequestBody(Request(scope, receive))
+
+        async def endless():
+            try:
+                async for _ in body.stream():
+                    pass
+                while True:
+                    yield b"{}\n"
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.set()
+
+        await asyncio.wait_for(NDJSONStreamingResponse(endless(), body=body)(scope, receive, send), 5)
+        assert closed.is_set() and sent[0]["type"] == "http.response.start"
+
+    asyncio.run(scenario())
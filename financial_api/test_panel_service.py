@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for multi-period TTM, growth and rolling metrics
+"""
+
+from datetime import date
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.financial_models import CompanyFinancialPanel, period_slot
+from app.services.panel_service import PanelAnalysisService, period_slots
+from main import app
+
+QUARTER_ENDS = ["2022-03-31", "2022-06-30", "2022-09-30", "2022-12-31", "2023-03-31", "2023-06-30", "2023-09-30"]
+REVENUE = [100, 110, 120, 130, 140, 150, 160]
+
+
+def period(period_end: str, revenue: float) -> dict:
+    return {
+        "period_end": period_end, "revenue": revenue, "net_income": revenue / 10, "ebit": revenue / 5,
+        "total_assets": 1000, "total_equity": 500, "total_debt": 100,
+    }
+
+
+def panel(periods, frequency: str = "quarterly") -> dict:
+    return {"company_name": "Example Corp", "industry": "Technology", "frequency": frequency, "periods": periods}
+
+
+def analyze(*panels):
+    return PanelAnalysisService.analyze_panels([CompanyFinancialPanel(**p) for p in panels])
+
+
+def test_quarterly_metrics_match_hand_computed_values():
+    result = analyze(panel([period(end, revenue) for end, revenue in zip(QUARTER_ENDS, REVENUE)]))[0]
+    assert result.ttm["revenue"] == [None, None, None, 460, 500, 540, 580]
+    assert result.ttm["net_income"][3:] == pytest.approx([46, 50, 54, 58])
+    assert result.yoy_growth["revenue"][:4] == [None] * 4
+    assert result.yoy_growth["revenue"][4:] == pytest.approx([140 / 100 - 1, 150 / 110 - 1, 160 / 120 - 1])
+    assert result.qoq_growth["revenue"][0] is None
+    assert result.qoq_growth["revenue"][1:] == pytest.approx([0.1, 120 / 110 - 1, 130 / 120 - 1,
+                                                               140 / 130 - 1, 150 / 140 - 1, 160 / 150 - 1])
+    # TTM net income over the average of opening (a year earlier) and closing equity, which is constant
+    assert result.rolling_roe[:4] == [None] * 4
+    assert result.rolling_roe[4:] == pytest.approx([50 / 500, 54 / 500, 58 / 500])
+    # Three quarters (0.75 years) between the first TTM revenue (2022-12-31) and the last (2023-09-30)
+    assert result.cagr["revenue"] == pytest.approx((580 / 460) ** (1 / 0.75) - 1)
+
+
+def test_annual_metrics_match_hand_computed_values():
+    ends = ["2020-12-31", "2021-12-31", "2022-12-31"]
+    result = analyze(panel([period(end, revenue) for end, revenue in zip(ends, [100, 125, 150])], "annual"))[0]
+    assert result.ttm["revenue"] == [100, 125, 150]
+    assert result.yoy_growth["revenue"] == [None, pytest.approx(0.25), pytest.approx(0.2)]
+    assert result.qoq_growth is None
+    assert result.cagr["revenue"] == pytest.approx(1.5 ** 0.5 - 1)
+
+
+def test_windows_spanning_a_missing_period_are_undefined():
+    # The 2022-09-30 quarter is missing
+    reported = [i for i in range(len(QUARTER_ENDS)) if i != 2]
+    result = analyze(panel([period(QUARTER_ENDS[i], REVENUE[i]) for i in reported]))[0]
+    assert [str(end) for end in result.period_ends] == [QUARTER_ENDS[i] for i in reported]
+    # Every trailing year up to 2023-06-30 contains the missing quarter
+    assert result.ttm["revenue"] == [None, None, None, None, None, 580]
+    assert result.yoy_growth["revenue"] == [None, None, None, pytest.approx(0.4), pytest.approx(150 / 110 - 1), None]
+    assert result.qoq_growth["revenue"] == [None, pytest.approx(0.1), None, pytest.approx(140 / 130 - 1),
+                                            pytest.approx(150 / 140 - 1), pytest.approx(160 / 150 - 1)]
+    assert result.rolling_roe[:5] == [None] * 5
+
+    # Annual gaps count as the years they span
+    annual = analyze(panel([period("2019-12-31", 100), period("2021-12-31", 121)], "annual"))[0]
+    assert annual.yoy_growth["revenue"] == [None, None]
+    assert annual.cagr["revenue"] == pytest.approx(0.1)
+
+
+def test_companies_with_different_histories_share_a_batch():
+    full = panel([period(end, revenue) for end, revenue in zip(QUARTER_ENDS, REVENUE)])
+    short = dict(panel([period(end, 200) for end in QUARTER_ENDS[2:5:2]]), company_name="Short Corp")
+    results = analyze(full, short)
+    assert results[0].ttm["revenue"][-1] == 580
+    assert [str(end) for end in results[1].period_ends] == ["2022-09-30", "2023-03-31"]
+    assert results[1].qoq_growth["revenue"] == [None, None]
+    assert results[1].yoy_growth["revenue"] == [None, None]
+
+
+def test_period_slots_follow_fiscal_calendars():
+    # 52/53-week years end a few days either side of the month end
+    ends = [date(2022, 12, 31), date(2023, 1, 1), date(2023, 4, 1), date(2023, 6, 24), date(2023, 9, 30)]
+    slots = [period_slot(end, "quarterly") for end in ends]
+    assert slots[1] == slots[0] and slots[2:] == [slots[0] + 1, slots[0] + 2, slots[0] + 3]
+    assert period_slots(np.array(ends, dtype="datetime64[D]"), "quarterly").tolist() == slots
+    assert period_slot(date(2023, 1, 2), "annual") == period_slot(date(2022, 12, 28), "annual")
+
+
+def test_panel_endpoint_rejects_two_periods_in_one_quarter():
+    periods = [period("2022-12-31", 100), period("2023-01-01", 110), period("2023-03-31", 120)]
+    with TestClient(app) as client:
+        response = client.post("/api/v1/analyze/panel", json=[panel(periods)])
+        assert response.status_code == 422
+        assert "same quarter" in response.text
+
+        gapped = [period("2022-03-31", 100), period("2022-12-31", 130)]
+        response = client.post("/api/v1/analyze/panel", json=[panel(gapped)])
+        assert response.status_code == 200
+        assert response.json()[0]["qoq_growth"]["revenue"] == [None, None]
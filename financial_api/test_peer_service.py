@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Accuracy tests for the peer statistics sketches and endpoints
+"""
+
+import random
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.services.peer_service import PEER_METRICS, PeerStatistics, RunningMoments, TDigest
+from app.services.snapshot_service import FundamentalsSnapshotStore
+from main import app
+from test_batch_service import make_universe
+
+
+def test_tdigest_quantiles_and_merge():
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(0, 1, 50_000)
+    left, right = TDigest(), TDigest()
+    for chunk in np.array_split(values, 40):
+        left.update(chunk[: len(chunk) // 2])
+        right.update(chunk[len(chunk) // 2:])
+    left.merge(right)
+
+    assert left.count == len(values)
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        # Rank error, which is what the sketch bounds
+        assert abs(np.mean(values <= left.quantile(q)) - q) < 0.005
+    for x in np.quantile(values, [0.05, 0.5, 0.95]):
+        assert abs(left.cdf(x) - np.mean(values <= x)) < 0.005
+
+
+def test_running_moments_remove_is_exact():
+    rng = np.random.default_rng(4)
+    values = rng.normal(10, 3, 1000)
+    moments = RunningMoments()
+    moments.update(values[:600])
+    moments.update(values[600:])
+    moments.remove(values[100:400])
+    kept = np.r_[values[:100], values[400:]]
+    assert moments.count == len(kept)
+    assert np.isclose(moments.mean, kept.mean())
+    assert np.isclose(moments.std, kept.std(ddof=1))
+
+
+def test_store_keeps_peer_statistics_current():
+    companies = make_universe(600)
+    store = FundamentalsSnapshotStore(peers=PeerStatistics(rebuild_fraction=0.05))
+    store.register([(f"P{i}", company) for i, company in enumerate(companies)])
+    # Replace, reprice and remove some companies
+    store.register([(f"P{i}", companies[-i - 1]) for i in range(50)])
+    rng = random.Random(5)
+    for _ in range(20):
+        store.update_prices({f"P{rng.randrange(600)}": rng.uniform(10, 300) for _ in range(30)})
+    for i in range(0, 90, 3):
+        store.remove(f"P{i}")
+
+    peers = store.sync_peers()
+    for industry, count in peers.industries().items():
+        rows = [store._index[t] for t in store.tickers() if store._industries[store._index[t]] == industry]
+        assert count == len(rows)
+        summary = peers.summary(industry)
+        for name in ("roe", "pe_ratio", "ev_ebitda_ratio", "net_debt_to_equity"):
+            column = store._values[name][rows]
+            column = column[np.isfinite(column)]
+            assert summary["metrics"][name]["count"] == len(column)
+            assert np.isclose(summary["metrics"][name]["mean"], column.mean())
+            for value in column[::25]:
+                rank = peers.rank(industry, {name: value})[name]
+                expected = (np.mean(column < value) + np.mean(column <= value)) * 50
+                assert abs(rank["percentile"] - expected) < 2
+                assert np.isclose(rank["z_score"], (value - column.mean()) / column.std(ddof=1))
+
+
+def test_peer_comparison_endpoints():
+    client = TestClient(app)
+    companies = [company.model_dump() for company in make_universe(40)]
+    for company in companies:
+        company["industry"] = "Peer Test Industry"
+    snapshots = [{"ticker": f"PEER{i}", "data": company} for i, company in enumerate(companies)]
+    assert client.post("/api/v1/snapshots", json=snapshots).status_code == 200
+
+    comparison = client.get("/api/v1/snapshots/PEER0/peers").json()
+    assert comparison["industry"] == "Peer Test Industry"
+    assert comparison["peer_count"] == 40
+    assert set(comparison["metrics"]) == set(PEER_METRICS)
+    assert 0 <= comparison["metrics"]["roe"]["percentile"] <= 100
+
+    statistics = client.get("/api/v1/peers/Peer Test Industry").json()
+    assert statistics["count"] == 40
+    assert statistics["metrics"]["roe"]["quantiles"]["p50"] is not None
+
+    # An unregistered copy of PEER0 ranks exactly like PEER0
+    ranked = client.post("/api/v1/analyze/peers", json=companies[0]).json()
+    assert ranked["metrics"]["roe"] == comparison["metrics"]["roe"]
+
+    companies[0]["industry"] = "Unregistered Industry"
+    assert client.post("/api/v1/analyze/peers", json=companies[0]).status_code == 404
+    assert client.get("/api/v1/peers/Unregistered Industry").status_code == 404
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for market-value-weighted portfolio aggregation
+"""
+
+import json
+import math
+import random
+from collections import defaultdict
+
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.models.financial_models import PortfolioHolding, PortfolioRequest
+from app.services.financial_service import FinancialAnalysisService
+from app.services.portfolio_service import PortfolioAnalysisService, PortfolioFrame, PortfolioValidationError
+from main import app
+from test_batch_service import make_universe
+from test_validation_service import ODD_VALUES
+
+
+def make_holdings(size: int, seed: int = 5):
+    rng = random.Random(seed)
+    return [
+        PortfolioHolding(ticker=f"T{i}", shares=rng.choice([0, 10, 250, 4000]) if i else 100, data=company)
+        for i, company in enumerate(make_universe(size))
+    ]
+
+
+def expected_aggregates(holdings):
+    """Portfolio totals computed holding by holding with the scalar service"""
+    value = earnings = book = dividends = roe = debt_to_assets = 0.0
+    industries = defaultdict(float)
+    for holding in holdings:
+        data = holding.data
+        result = FinancialAnalysisService.perform_complete_analysis(data)
+        position = holding.shares * data.market_price_per_share
+        owned = holding.shares / data.shares_outstanding
+        value += position
+        earnings += owned * data.net_income
+        book += owned * data.total_equity
+        dividends += owned * data.dividends
+        roe += position * result.profitability_metrics.roe
+        debt_to_assets += position * result.leverage_metrics.debt_to_assets
+        industries[data.industry] += position
+    return {
+        "total_market_value": value,
+        "pe_ratio": value / earnings,
+        "pb_ratio": value / book,
+        "dividend_yield": dividends / value,
+        "roe": roe / value,
+        "debt_to_assets": debt_to_assets / value,
+        "industries": {industry: amount / value for industry, amount in industries.items() if amount},
+    }
+
+
+def test_aggregates_match_position_totals():
+    holdings = make_holdings(500)
+    result = PortfolioAnalysisService.analyze(holdings, include_positions=True)
+    expected = expected_aggregates(holdings)
+
+    assert math.isclose(result["total_market_value"], expected["total_market_value"], rel_tol=1e-12)
+    for name in ("pe_ratio", "pb_ratio", "dividend_yield", "roe", "debt_to_assets"):
+        assert math.isclose(result["metrics"][name], expected[name], rel_tol=1e-9), name
+    exposure = {row["industry"]: row["weight"] for row in result["industry_exposure"]}
+    assert exposure.keys() == expected["industries"].keys()
+    for industry, weight in expected["industries"].items():
+        assert math.isclose(exposure[industry], weight, rel_tol=1e-12), industry
+    assert result["holdings"] == sum(1 for h in holdings if h.shares) == sum(
+        row["holdings"] for row in result["industry_exposure"]
+    )
+    assert math.isclose(sum(p["weight"] for p in result["positions"]), 1.0)
+    assert result["effective_holdings"] <= result["holdings"]
+    # Negative earners make P/E undefined for them but not for the portfolio
+    assert result["coverage"]["pe_ratio"] == 1.0
+
+
+def test_reweighting_matches_a_fresh_analysis():
+    holdings = make_holdings(300)
+    frame = PortfolioFrame.from_holdings(holdings)
+    frame.set_shares({"T0": 0, "T3": 1234.5, "T7": 10})
+
+    changed = [
+        holding.model_copy(update={"shares": {"T0": 0, "T3": 1234.5, "T7": 10}.get(holding.ticker, holding.shares)})
+        for holding in holdings
+    ]
+    reweighted, fresh = frame.aggregate(True), PortfolioAnalysisService.analyze(changed, True)
+    assert reweighted["positions"] == fresh["positions"]
+    assert reweighted["industry_exposure"] == fresh["industry_exposure"]
+    for name, value in fresh["metrics"].items():
+        assert (value is None and reweighted["metrics"][name] is None) or math.isclose(
+            reweighted["metrics"][name], value, rel_tol=1e-12
+        ), name
+
+
+def test_payload_validation_matches_the_request_model():
+    holdings = [holding.model_dump() for holding in make_holdings(200)]
+    assert PortfolioFrame.from_payload({"holdings": holdings}).aggregate() == PortfolioAnalysisService.analyze(
+        PortfolioRequest.model_validate({"holdings": holdings}).holdings
+    )
+
+    rng = random.Random(9)
+    for holding in holdings[::7]:
+        target = holding if rng.random() < 0.4 else holding["data"]
+        name = rng.choice([name for name in target if name not in ("ticker", "data")])
+        if rng.random() < 0.2:
+            del target[name]
+        else:
+            target[name] = rng.choice(ODD_VALUES)
+    holdings[3] = "not a holding"
+    del holdings[5]["data"]
+    holdings[8]["data"] = [1]
+    payloads = [{"holdings": holdings}, {"holdings": []}, {"holdings": {}}, {}, [], {"holdings": holdings[:2] * 2}]
+
+    for payload in json.loads(json.dumps(payloads)):
+        try:
+            PortfolioRequest.model_validate(payload)
+        except ValidationError as e:
+            expected = e.errors(include_url=False, include_context=False)
+        try:
+            PortfolioFrame.from_payload(payload)
+        except PortfolioValidationError as e:
+            assert repr(e.errors) == repr(expected)
+        else:
+            raise AssertionError("payload accepted")
+
+
+def test_portfolio_endpoints():
+    holdings = [holding.model_dump() for holding in make_holdings(40)]
+    with TestClient(app) as client:
+        stateless = client.post("/api/v1/analyze/portfolio", json={"holdings": holdings}).json()
+        stored = client.put("/api/v1/portfolios/book", json={"holdings": holdings}).json()
+        assert stored.pop("portfolio_id") == "book" and stored == stateless
+
+        response = client.post("/api/v1/portfolios/book/weights?include_positions=true", json={"shares": {"T1": 0}})
+        assert response.status_code == 200
+        assert response.json()["positions"][1]["weight"] == 0.0
+
+        assert client.post("/api/v1/portfolios/book/weights", json={"shares": {"XX": 1}}).status_code == 400
+        assert client.post("/api/v1/portfolios/book/weights", json={"shares": {"T1": -1}}).status_code == 422
+        duplicate = {"holdings": holdings[:2] + holdings[:1]}
+        response = client.post("/api/v1/analyze/portfolio", json=duplicate)
+        assert response.status_code == 422 and response.json()["detail"][0]["loc"] == ["body", "holdings"]
+        response = client.put("/api/v1/portfolios/other", content=b"{")
+        assert response.status_code == 422 and response.json()["detail"][0]["type"] == "json_invalid"
+
+        assert client.delete("/api/v1/portfolios/book").status_code == 204
+        assert client.get("/api/v1/portfolios/book").status_code == 404
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the fast response path
+"""
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.api import responses
+from app.api.responses import dumps_json, negotiate_format
+from app.config import settings
+from app.services.cache_service import CachedAnalysisService
+from app.services.metric_graph import ALL_FAMILY_METRICS
+from main import app
+from test_batch_service import make_universe
+
+PATHS = ("/analyze", "/analyze/growth", "/analyze/leverage")
+
+
+def test_fast_responses_match_model_path_bytes():
+    client = TestClient(app)
+    cache, CachedAnalysisService.cache = CachedAnalysisService.cache, None
+    try:
+        for company in make_universe(50):
+            payload = company.model_dump()
+            for path in PATHS:
+                settings.fast_responses = False
+                expected = client.post("/api/v1" + path, json=payload)
+                settings.fast_responses = True
+                actual = client.post("/api/v1" + path, json=payload)
+                assert actual.status_code == expected.status_code == 200
+                assert actual.content == expected.content
+    finally:
+        settings.fast_responses = True
+        CachedAnalysisService.cache = cache
+
+
+def test_compact_result_is_flat():
+    client = TestClient(app)
+    result = client.post("/api/v1/analyze?compact=true", json=make_universe(1)[0].model_dump()).json()
+    assert set(result) == {"company_name", "industry"} | set(ALL_FAMILY_METRICS)
+
+
+def test_dumps_json_falls_back_for_exponent_floats():
+    assert dumps_json({"a": 1e-7, "b": 1e20, "c": 0.5}) == b'{"a":1e-07,"b":1e+20,"c":0.5}'
+
+
+def test_msgpack_negotiation_honours_q_values(monkeypatch):
+    monkeypatch.setattr(responses, "msgpack", object())
+    cases = {
+        "application/msgpack": "msgpack",
+        "application/x-msgpack;q=0.5, */*;q=0.1": "msgpack",
+        "application/msgpack;q=0.5, application/json": "json",
+        "application/json, application/msgpack": "msgpack",
+        "application/msgpack;q=0.5": "msgpack",
+        "*/*": "json",
+        "": "json",
+    }
+    for refused in ("q=0", "q=0.0", "q=0.00", "q = 0.000", "Q=0", "q=oops"):
+        cases[f"application/msgpack;{refused}, application/json;q=0.1"] = "json"
+        cases[f"application/msgpack; {refused}"] = "json"
+    for accept, expected in cases.items():
+        assert negotiate_format(Request({"type": "http", "headers": [(b"accept", accept.encode())]})) == expected, accept
+
+
+def test_msgpack_without_the_package_is_406_unless_json_is_accepted(monkeypatch):
+    monkeypatch.setattr(responses, "msgpack", None)
+    client = TestClient(app)
+    payload = make_universe(1)[0].model_dump()
+    response = client.post("/api/v1/analyze", json=payload, headers={"Accept": "application/msgpack"})
+    assert response.status_code == 406 and "msgpack" in response.json()["detail"]
+    for accept in ("application/msgpack, application/json;q=0.5", "application/vnd.msgpack, */*;q=0.1",
+                   "application/msgpack;q=0.0"):
+        response = client.post("/api/v1/analyze", json=payload, headers={"Accept": accept})
+        assert response.status_code == 200 and response.headers["content-type"] == "application/json"
+
+
+def test_msgpack_round_trip():
+    msgpack = pytest.importorskip("msgpack")
+    client = TestClient(app)
+    payload = make_universe(1)[0].model_dump()
+    expected = client.post("/api/v1/analyze", json=payload).json()
+    response = client.post("/api/v1/analyze", json=payload, headers={"Accept": "application/msgpack"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == expected
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for Monte Carlo / grid scenario analysis
+"""
+
+
+import itertools
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.models.financial_models import ScenarioRequest
+from app.services.financial_service import FinancialAnalysisService
+from app.services.scenario_service import ScenarioAnalysisService
+from main import app
+
+DISTRIBUTIONS = [
+    {"field": "market_price_per_share", "distribution": "lognormal", "std": 0.2},
+    {"field": "ebit", "std": 0.15},
+    {"field": "total_debt", "distribution": "uniform", "low": -0.2, "high": 0.3},
+    {"field": "shares_outstanding", "distribution": "triangular", "low": -0.05, "mode": 0, "high": 0.1},
+]
+
+
+def test_seeded_runs_do_not_depend_on_chunking():
+    request = ScenarioRequest(
+        base=FinancialAnalysisService.get_sample_data(), distributions=DISTRIBUTIONS, scenarios=50_000, seed=7
+    )
+    exact = ScenarioAnalysisService.analyze(request, chunk_size=50_000)
+    chunked = ScenarioAnalysisService.analyze(request, chunk_size=4_099)
+
+    for name, statistics in exact["metrics"].items():
+        other = chunked["metrics"][name]
+        assert (statistics["count"], statistics["undefined"]) == (other["count"], other["undefined"])
+        assert statistics["min"] == other["min"] and statistics["max"] == other["max"]
+        assert np.isclose(statistics["mean"], other["mean"], rtol=1e-9)
+        spread = statistics["max"] - statistics["min"]
+        for key, value in statistics["quantiles"].items():
+            # t-digest estimates against exact quantiles
+            assert abs(value - other["quantiles"][key]) <= 0.005 * spread + 1e-12
+
+    assert ScenarioAnalysisService.analyze(request, chunk_size=4_099) == chunked
+    # A metric no perturbed field reaches is the base value in every scenario
+    assert exact["metrics"]["roe"]["std"] == 0.0 and exact["metrics"]["roe"]["mean"] == exact["base"]["roe"]
+
+
+def test_grid_matches_scalar_service():
+    base = FinancialAnalysisService.get_sample_data()
+    price_shocks, income_shocks = [-0.1, 0, 0.25], [-2, -0.5, 0.5]
+    request = ScenarioRequest(
+        base=base,
+        grids=[
+            {"field": "market_price_per_share", "shocks": price_shocks},
+            {"field": "net_income", "shocks": income_shocks},
+        ],
+        quantiles=[0, 1],
+    )
+    result = ScenarioAnalysisService.analyze(request)
+    assert result["scenarios"] == 9
+
+    expected = {}
+    for price, income in itertools.product(price_shocks, income_shocks):
+        data = base.model_copy(update={
+            "market_price_per_share": base.market_price_per_share * (1 + price),
+            "net_income": base.net_income * (1 + income),
+        })
+        for name, value in FinancialAnalysisService.calculate_values(data).metrics.items():
+            expected.setdefault(name, []).append(value)
+
+    for name, values in expected.items():
+        defined = [value for value in values if value is not None]
+        statistics = result["metrics"][name]
+        assert statistics["count"] == len(defined)
+        assert statistics["undefined"] == len(values) - len(defined)
+        assert np.isclose(statistics["quantiles"]["p0"], min(defined), rtol=1e-12)
+        assert np.isclose(statistics["quantiles"]["p100"], max(defined), rtol=1e-12)
+
+
+def test_scenario_endpoint():
+    base = FinancialAnalysisService.get_sample_data().model_dump()
+    with TestClient(app) as client:
+        response = client.post("/api/v1/analyze/scenarios", json={
+            "base": base, "distributions": DISTRIBUTIONS, "scenarios": 2_000, "sensitivity": True
+        })
+        assert response.status_code == 200
+        body = response.json()
+        assert body["scenarios"] == 2_000 and isinstance(body["seed"], int)
+
+        # Tornado bars only list fields the metric depends on, largest swing first
+        bars = body["sensitivities"]["ev_ebitda_ratio"]
+        assert {bar["field"] for bar in bars} == {d["field"] for d in DISTRIBUTIONS}
+        assert [bar["swing"] for bar in bars] == sorted((bar["swing"] for bar in bars), reverse=True)
+        assert [bar["field"] for bar in body["sensitivities"]["roic"]] == ["ebit", "total_debt"]
+
+        repeat = client.post("/api/v1/analyze/scenarios", json={
+            "base": base, "distributions": DISTRIBUTIONS, "scenarios": 2_000, "seed": body["seed"]
+        })
+        assert repeat.json()["metrics"] == body["metrics"]
+
+        too_many = client.post("/api/v1/analyze/scenarios", json={
+            "base": base, "distributions": DISTRIBUTIONS, "scenarios": 10_000_001
+        })
+        assert too_many.status_code == 400
+        unknown_field = client.post("/api/v1/analyze/scenarios", json={
+            "base": base, "grids": [{"field": "industry", "shocks": [0.1]}]
+        })
+        assert unknown_field.status_code == 422
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the indexed screening store and its query language
+"""
+
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.screening_service import ScreenQueryError, ScreeningStore, parse_filter
+from main import app
+from test_batch_service import make_universe
+
+
+@pytest.fixture(scope="module")
+def universe():
+    companies = make_universe(3000)
+    store = ScreeningStore(initial_capacity=16)
+    store.add_companies([(f"S{i}", company) for i, company in enumerate(companies)])
+    for i in range(0, 300, 5):
+        store.remove(f"S{i}")
+
+    # Reference frame straight from the stored columns
+    frame = pd.DataFrame({name: column[:len(store)] for name, column in store._values.items()})
+    frame["industry"] = [store._industry_names[code] for code in store._industries[:len(store)]]
+    frame["ticker"] = store._tickers
+    return store, frame
+
+
+@pytest.mark.parametrize("where, expected", [
+    ("roe > 0.15 AND debt_to_ebitda < 3 AND industry = 'Technology'",
+     "roe > 0.15 and debt_to_ebitda < 3 and industry == 'Technology'"),
+    ("pe_ratio BETWEEN 5 AND 15 OR dividend_yield >= 4",
+     "(pe_ratio >= 5 and pe_ratio <= 15) or dividend_yield >= 4"),
+    ("(industry IN ('Energy', 'Utilities') OR roa > 0.2) AND net_profit_margin != 0",
+     "(industry in ('Energy', 'Utilities') or roa > 0.2) and net_profit_margin != 0"),
+    ("ticker IN ('S1', 'S7', 'S5') AND roe <= 1", "ticker in ('S1', 'S7') and roe <= 1"),
+    ("", "roe == roe or roe != roe"),
+])
+def test_query_matches_full_scan(universe, where, expected):
+    store, frame = universe
+    result = store.query(where, ["-roe"], limit=25)
+    matches = frame.query(expected)
+    assert result["total"] == len(matches)
+    assert [row["metrics"]["roe"] for row in result["results"]] == matches["roe"].nlargest(25).tolist()
+
+
+def test_multi_key_sort_puts_undefined_last(universe):
+    store, frame = universe
+    result = store.query("net_profit_margin < 0 OR pe_ratio < 10", ["pe_ratio", "-roe"], limit=10_000)
+    pe = [row["metrics"]["pe_ratio"] for row in result["results"]]
+    defined = [value for value in pe if value is not None]
+    assert defined == sorted(defined)
+    assert pe[len(defined):] == [None] * (len(pe) - len(defined))
+    assert result["total"] == len(frame.query("net_profit_margin < 0 or pe_ratio < 10"))
+
+
+@pytest.mark.parametrize("where", [
+    "roe >", "roe > 'x'", "industry > 'A'", "unknown_metric > 1", "roe > 1 AND", "(roe > 1", "roe > 1 ~",
+])
+def test_invalid_filters_are_rejected(where):
+    with pytest.raises(ScreenQueryError):
+        parse_filter(where)
+
+
+def test_screen_endpoint():
+    client = TestClient(app)
+    companies = [{"ticker": f"SCR{i}", "data": c.model_dump()} for i, c in enumerate(make_universe(50))]
+    assert client.post("/api/v1/screening/companies", json=companies).json()["stored"] == 50
+
+    response = client.get("/api/v1/screen", params={
+        "where": "ticker IN ('SCR1', 'SCR2', 'SCR3') AND roe > -1000", "sort": "-roe", "fields": "roe,pe_ratio"
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 3
+    assert set(body["results"][0]["metrics"]) == {"roe", "pe_ratio"}
+
+    assert client.get("/api/v1/screen", params={"where": "roe >>"}).status_code == 400
+    assert client.get("/api/v1/screen", params={"sort": "industry"}).status_code == 400
+    assert client.delete("/api/v1/screening/companies/SCR1").status_code == 204
+    assert client.delete("/api/v1/screening/companies/SCR1").status_code == 404
+
+
+def test_repeated_in_values_match_each_row_once(universe):
+    store, frame = universe
+    technology = int((frame["industry"] == "Technology").sum())
+    assert store.query("industry IN ('Technology', 'Technology')")["total"] == technology
+    assert store.query("ticker IN ('S1', 'S1', 'S7')")["total"] == 2
+    roe = frame["roe"].dropna().iloc[0]
+    same = int((frame["roe"] == roe).sum())
+    assert store.query(f"roe IN ({roe!r}, {roe!r}, {roe!r})")["total"] == same
+
+
+@pytest.mark.parametrize("where", [
+    "pe_ratio != 5", "pe_ratio = 5", "pe_ratio < 10", "pe_ratio >= 10", "pe_ratio BETWEEN 1 AND 20",
+    "pe_ratio IN (5, 10)", "industry != 'Energy'", "ticker IN ('S1', 'S2', 'S2')",
+])
+def test_probe_and_index_paths_agree(universe, where):
+    store, frame = universe
+    # Undefined P/E (loss-making companies) must not match, whichever path evaluates it
+    assert frame["pe_ratio"].isna().any()
+    node = parse_filter(where)
+    with store._lock:
+        assert np.array_equal(store._probe(node, np.arange(len(store))), store._bitmap(node))
+
+
+def test_not_equal_skips_undefined_metrics_when_probing(universe):
+    store, frame = universe
+    loss_making = frame.index[frame["pe_ratio"].isna()][0]
+    ticker = frame["ticker"][loss_making]
+    # The ticker is the most selective predicate, so pe_ratio is probed on its row
+    assert store.query(f"pe_ratio != 5 AND ticker = '{ticker}'")["total"] == 0
+    assert store.query(f"pe_ratio != 5 OR ticker = '{ticker}'")["total"] == int(frame["pe_ratio"].notna().sum()) + 1
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for coalescing concurrent identical analyses
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.cache_service import CachedAnalysisService
+from app.services.financial_service import FinancialAnalysisService
+from app.services.single_flight import CoalescedAnalysisService, SingleFlight
+from main import app
+from test_batch_service import make_universe
+
+
+@pytest.fixture
+def flights(monkeypatch):
+    """A fresh coalescing group with the result cache disabled, counting value computations"""
+    calls = []
+    calculate_values = FinancialAnalysisService.calculate_values
+
+    def counting(data, family=None):
+        calls.append(family)
+        return calculate_values(data, family)
+
+    monkeypatch.setattr(FinancialAnalysisService, "calculate_values", staticmethod(counting))
+    monkeypatch.setattr(CachedAnalysisService, "cache", None)
+    monkeypatch.setattr(CoalescedAnalysisService, "flights", SingleFlight())
+    return CoalescedAnalysisService.flights, calls
+
+
+def test_identical_requests_share_one_computation(flights):
+    group, calls = flights
+    first, second = make_universe(2)
+
+    async def run():
+        return await asyncio.gather(
+            *(CoalescedAnalysisService.analysis_values(first) for _ in range(20)),
+            *(CoalescedAnalysisService.analysis_values(second.model_copy()) for _ in range(5)),
+        )
+
+    results = asyncio.run(run())
+    assert calls == [None, None]
+    assert all(result is results[0] for result in results[:20])
+    assert results[20] == FinancialAnalysisService.calculate_values(second)
+    stats = group.stats()
+    assert (stats["leaders"], stats["coalesced"], stats["in_flight"]) == (2, 23, 0)
+
+    # Nothing is cached: a later identical request computes again
+    asyncio.run(CoalescedAnalysisService.analysis_values(first))
+    assert group.stats()["leaders"] == 3
+
+
+def test_family_requests_join_a_complete_analysis(flights):
+    group, calls = flights
+    company = make_universe(1)[0]
+
+    async def run():
+        return await asyncio.gather(
+            CoalescedAnalysisService.analysis_values(company),
+            CoalescedAnalysisService.analysis_values(company, "growth_metrics"),
+            CoalescedAnalysisService.analysis_values(company, "leverage_metrics"),
+            CoalescedAnalysisService.calculate_family("leverage_metrics", company),
+        )
+
+    complete, growth, leverage, leverage_model = asyncio.run(run())
+    assert calls == [None]
+    assert growth == FinancialAnalysisService.calculate_values(company, "growth_metrics")
+    assert leverage == FinancialAnalysisService.calculate_values(company, "leverage_metrics")
+    assert leverage_model == FinancialAnalysisService.calculate_leverage_metrics(company)
+    assert group.stats()["coalesced_by_kind"] == {"complete_analysis": 2}
+
+
+def test_errors_reach_every_waiter():
+    group = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(*(group.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert [str(error) for error in errors] == ["boom"] * 3
+    assert group.stats()["in_flight"] == 0
+
+
+def test_coalescing_stats_endpoint():
+    with TestClient(app) as client:
+        client.post("/api/v1/analyze", json=make_universe(1)[0].model_dump())
+        stats = client.get("/api/v1/coalescing/stats").json()
+        assert stats["enabled"] and stats["leaders"] >= 1
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the snapshot store's incremental updates
+"""
+
+import random
+
+import numpy as np
+
+from app.services.financial_service import FinancialAnalysisService
+from app.services.peer_service import PeerStatistics
+from app.services.snapshot_service import FundamentalsSnapshotStore
+from test_batch_service import make_universe
+
+
+def test_incremental_updates_match_a_full_recompute():
+    rng = random.Random(9)
+    companies = make_universe(300)
+    replacements = make_universe(60, seed=21)
+    store = FundamentalsSnapshotStore(initial_capacity=16, peers=PeerStatistics(rebuild_fraction=0.05))
+    # The fundamentals each ticker should end up with
+    expected = {}
+
+    def register(snapshots):
+        store.register(snapshots)
+        expected.update((ticker, data) for ticker, data in snapshots)
+
+    def reprice(count):
+        prices = {f"S{rng.randrange(330)}": rng.uniform(5, 400) for _ in range(count)}
+        updated, unknown = store.update_prices(prices)
+        assert sorted(updated + unknown) == sorted(prices)
+        for ticker in updated:
+            expected[ticker] = expected[ticker].model_copy(update={"market_price_per_share": prices[ticker]})
+
+    def remove(ticker):
+        assert store.remove(ticker) == (ticker in expected)
+        expected.pop(ticker, None)
+
+    register([(f"S{i}", company) for i, company in enumerate(companies)])
+    reprice(200)
+    # Upsert existing tickers (some changing industry) and add new ones
+    register([(f"S{i * 5}", company) for i, company in enumerate(replacements[:40])])
+    register([(f"S{300 + i}", company) for i, company in enumerate(replacements[40:])])
+    reprice(200)
+    for i in range(1, 330, 7):
+        remove(f"S{i}")
+    reprice(200)
+    # Re-register removed tickers and reprice again before anything reads the peers
+    register([(f"S{i}", companies[i]) for i in range(1, 100, 14)])
+    reprice(50)
+
+    fresh = FundamentalsSnapshotStore(peers=PeerStatistics(rebuild_fraction=0.05))
+    fresh.register(list(expected.items()))
+    assert sorted(store.tickers()) == sorted(expected) and len(store) == len(expected)
+
+    for ticker, data in expected.items():
+        assert store.get_fundamentals(ticker) == data
+        result = store.get(ticker)
+        assert result == fresh.get(ticker)
+        assert result == FinancialAnalysisService.perform_complete_analysis(data)
+
+    incremental, recomputed = store.sync_peers(), fresh.sync_peers()
+    assert incremental.industries() == recomputed.industries()
+    for industry in recomputed.industries():
+        got, want = incremental.summary(industry), recomputed.summary(industry)
+        for name, metric in want["metrics"].items():
+            assert got["metrics"][name]["count"] == metric["count"], (industry, name)
+            for key in ("mean", "std", "min", "max"):
+                if metric[key] is None:
+                    assert got["metrics"][name][key] is None
+                else:
+                    assert np.isclose(got["metrics"][name][key], metric[key]), (industry, name, key)
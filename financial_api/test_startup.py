@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for the lean startup path: deferred imports and the cached OpenAPI schema
+"""
+
+import json
+import subprocess
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.openapi import install_schema_cache, source_fingerprint
+from app.services.financial_service import FinancialAnalysisService
+from main import app
+
+
+def test_importing_the_app_defers_pandas_and_pyarrow():
+    script = "import sys, main; print(sorted(m for m in ('pandas', 'pyarrow') if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-W", "ignore", "-c", script], capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
+
+    with TestClient(app) as client:
+        response = client.post("/api/v1/analyze/dataframe", json=FinancialAnalysisService.get_sample_data().model_dump())
+        assert response.status_code == 200 and response.json()["shape"] == [1, 10]
+
+
+def test_openapi_schema_is_cached_on_disk(tmp_path, monkeypatch):
+    path = tmp_path / "schema" / "openapi.json"
+    expected = FastAPI.openapi(app)
+    monkeypatch.setattr(app, "openapi_schema", None)
+    install_schema_cache(app, str(path))
+    try:
+        assert app.openapi() == expected
+        cached = json.loads(path.read_text())
+        assert cached["fingerprint"] == source_fingerprint(app)
+
+        # A later process loads the file instead of building the schema
+        cached["schema"]["info"]["title"] = "From cache"
+        path.write_text(json.dumps(cached))
+        app.openapi_schema = None
+        assert app.openapi()["info"]["title"] == "From cache"
+
+        # A file written for other sources is rebuilt
+        cached["fingerprint"] = "stale"
+        path.write_text(json.dumps(cached))
+        app.openapi_schema = None
+        assert app.openapi() == expected
+        assert json.loads(path.read_text())["fingerprint"] == source_fingerprint(app)
+    finally:
+        del app.openapi
+        app.openapi_schema = None
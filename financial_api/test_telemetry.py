@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus exposition and per-route request telemetry
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routing import TimedRoute
+from app.telemetry import (
+    REQUEST_DURATION,
+    REQUEST_STAGE_DURATION,
+    REQUESTS,
+    VALIDATION_FAILURES,
+    Registry,
+    TelemetryMiddleware
+)
+from main import app
+
+
+def test_exposition_format():
+    registry = Registry()
+    counter = registry.counter("test_requests", "Requests seen", ("route",))
+    histogram = registry.histogram("test_latency_seconds", "Latency", ("route",), buckets=(0.1, 1))
+    registry.gauge("test_depth", "Queue depth", lambda: [((), 3)])
+    registry.gauge("test_broken", "Failing callback", lambda: 1 / 0)
+
+    counter.inc(('/a/"b"\n',))
+    counter.inc(('/a/"b"\n',), 2)
+    histogram.observe(("/a",), 0.05)
+    histogram.observe(("/a",), 0.1)
+    histogram.observe(("/a",), 0.5)
+    histogram.observe(("/a",), 7.25)
+
+    assert registry.render() == "\n".join([
+        "# HELP test_requests Requests seen",
+        "# TYPE test_requests counter",
+        'test_requests_total{route="/a/\\"b\\"\\n"} 3',
+        "# HELP test_latency_seconds Latency",
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'test_latency_seconds_bucket{route="/a",le="1"} 3',
+        'test_latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'test_latency_seconds_sum{route="/a"} 7.9',
+        'test_latency_seconds_count{route="/a"} 4',
+        "# HELP test_depth Queue depth",
+        "# TYPE test_depth gauge",
+        "test_depth 3",
+    ]) + "\n"
+    assert histogram.count(("/a",)) == 4 and counter.value(("/missing",)) == 0
+    with pytest.raises(ValueError):
+        registry.counter("test_requests", "Duplicate")
+
+
+def test_requests_are_labelled_by_route_template():
+    ticker_route = "/api/v1/snapshots/{ticker}"
+    before = REQUESTS.value(("GET", ticker_route, "404"))
+    unmatched = REQUESTS.value(("GET", "unmatched", "404"))
+    invalid = VALIDATION_FAILURES.value(("/api/v1/analyze",))
+    analyzed = REQUEST_STAGE_DURATION.count(("/api/v1/analyze", "endpoint"))
+
+    with TestClient(app) as client:
+        for ticker in ("NOPE1", "NOPE2"):
+            assert client.get(f"/api/v1/snapshots/{ticker}").status_code == 404
+        assert client.get("/no/such/path").status_code == 404
+        assert client.post("/api/v1/analyze", json={"company_name": "Broken"}).status_code == 422
+        sample = client.get("/api/v1/sample-data").json()
+        assert client.post("/api/v1/analyze", json=sample).status_code == 200
+        metrics = client.get("/metrics")
+
+    # Concrete tickers never become labels
+    assert REQUESTS.value(("GET", ticker_route, "404")) == before + 2
+    assert REQUESTS.value(("GET", "unmatched", "404")) == unmatched + 1
+    assert VALIDATION_FAILURES.value(("/api/v1/analyze",)) == invalid + 1
+    assert REQUEST_STAGE_DURATION.count(("/api/v1/analyze", "endpoint")) == analyzed + 1
+    assert REQUEST_DURATION.count(("POST", "/api/v1/analyze")) >= 2
+
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = metrics.text
+    assert f'financial_api_http_requests_total{{method="GET",route="{ticker_route}",status="404"}}' in text
+    assert "NOPE1" not in text
+    assert 'financial_api_http_request_stage_duration_seconds_count{route="/api/v1/analyze",stage="parse"}' in text
+
+
+def test_server_timing_header_splits_the_stages():
+    timed_app = FastAPI()
+    timed_app.router.route_class = TimedRoute
+    timed_app.add_middleware(TelemetryMiddleware, server_timing=True)
+
+    @timed_app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"item_id": item_id}
+
+    client = TestClient(timed_app)
+    response = client.get("/items/7")
+    stages = [part.split(";")[0] for part in response.headers["server-timing"].split(", ")]
+    assert response.json() == {"item_id": 7} and stages == ["parse", "endpoint", "serialize"]
+    # Requests rejected during parsing only have a parse stage
+    assert client.get("/items/x").headers["server-timing"].startswith("parse;dur=")
+    assert REQUESTS.value(("GET", "/items/{item_id}", "422")) >= 1
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for column-wise bulk validation against CompanyFinancialData
+"""
+
+import json
+import random
+
+import numpy as np
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.models.financial_models import CompanyFinancialData
+from app.services.batch_service import CompanyBatch, NUMERIC_FIELDS, ndjson_line
+from app.services.cache_service import payload_key
+from app.services.financial_service import FinancialAnalysisService
+from app.services.validation_service import company_validator
+from main import app
+from test_batch_service import make_universe
+
+# Values Pydantic accepts or rejects for a float field, depending on its bounds
+ODD_VALUES = [0, -0.0, -1, float("nan"), float("inf"), -float("inf"), True, "12", " 12 ", "abc", "nan", None, [1], 10 ** 400]
+
+
+def mutated_records(size: int, seed: int = 3):
+    rng = random.Random(seed)
+    records = [company.model_dump() for company in make_universe(size)]
+    for record in records:
+        for _ in range(rng.choice([0, 0, 1, 2])):
+            name = rng.choice(list(record))
+            roll = rng.random()
+            if roll < 0.15:
+                del record[name]
+            elif name in ("company_name", "industry"):
+                record[name] = rng.choice([5, None, "Renamed"])
+            else:
+                record[name] = rng.choice(ODD_VALUES)
+    records[1] = [1, 2]
+    records[2] = "not a record"
+    return records
+
+
+def test_matches_pydantic_acceptance_and_errors():
+    records = mutated_records(600)
+    result = company_validator.validate_records(records)
+
+    expected_models = []
+    for i, record in enumerate(records):
+        try:
+            expected_models.append(CompanyFinancialData.model_validate(record))
+            assert result.valid[i] and result.errors[i] == 0, i
+        except ValidationError as e:
+            assert not result.valid[i], i
+            expected = e.errors(include_url=False, include_context=False)
+            # repr compares NaN inputs as equal
+            assert repr(result.row_errors(i)) == repr(expected), i
+            assert result.failed_fields(i) == [error["loc"][0] for error in expected if error["loc"]]
+
+    assert 100 < len(expected_models) < 600
+    expected = CompanyBatch.from_records(expected_models)
+    batch = result.batch
+    assert batch.company_names == expected.company_names and batch.industries == expected.industries
+    for name in NUMERIC_FIELDS:
+        np.testing.assert_array_equal(batch.columns[name], expected.columns[name])
+
+
+def test_records_feed_the_scalar_service():
+    companies = make_universe(30)
+    result = company_validator.validate_records([company.model_dump() for company in companies])
+    for company, record in zip(companies, result.records()):
+        assert record.model_dump() == company.model_dump()
+        assert payload_key(record) == payload_key(company)
+        assert FinancialAnalysisService.calculate_values(record) == FinancialAnalysisService.calculate_values(company)
+    assert result.batch.record(3).model_dump() == companies[3].model_dump()
+
+
+def test_batch_endpoint_reports_pydantic_errors():
+    records = mutated_records(60, seed=11)
+    body = "\n".join(json.dumps(record) for record in records)
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/v1/analyze/batch?chunk_size=16", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == list(range(60))
+
+    for line, record in zip(lines, json.loads(json.dumps(records))):
+        try:
+            company = CompanyFinancialData.model_validate(record)
+        except ValidationError as e:
+            # Non-finite inputs are echoed back as null
+            expected = json.loads(ndjson_line(e.errors(include_url=False, include_context=False)))
+            assert line["error"] == "validation_error" and line["detail"] == expected
+        else:
+            assert line["result"]["company_name"] == company.company_name